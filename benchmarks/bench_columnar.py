@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Happy Frog - Columnar Analytics Benchmark
+
+Compares script statistics computed by looping over HappyFrogCommand objects
+with the same statistics computed on a ScriptArray (vectorized when NumPy is
+installed), and reports what getting the columns costs: converting a parsed
+script, parsing straight into columns, and converting back to objects.
+
+Usage:
+    python benchmarks/bench_columnar.py [--lines 1000000]
+
+Author: ZeroDumb
+License: GNU GPLv3
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from happy_frog_parser import HappyFrogParser, CommandType
+from happy_frog_parser.columnar import ScriptArray, NUMPY_AVAILABLE
+
+
+SAMPLE_LINES = [
+    "DELAY {delay}",
+    "STRING notepad line {i}",
+    "ENTER",
+    "CTRL c",
+    "REM ---",
+]
+
+
+def generate_script(line_count: int) -> str:
+    """Generate a script with the given number of lines."""
+    return '\n'.join(
+        SAMPLE_LINES[i % len(SAMPLE_LINES)].format(i=i, delay=(i * 7919) % 90000)
+        for i in range(line_count)
+    )
+
+
+def object_statistics(parser: HappyFrogParser, script) -> tuple:
+    """Compute the statistics with plain loops over the command objects."""
+    counts = {}
+    total_delay = 0
+    for cmd in script.commands:
+        counts[cmd.command_type] = counts.get(cmd.command_type, 0) + 1
+        if cmd.command_type == CommandType.DELAY:
+            total_delay += int(cmd.parameters[0])
+    return counts, total_delay, parser.validate_script(script)
+
+
+def columnar_statistics(columns: ScriptArray) -> tuple:
+    """Compute the same statistics on the columnar form."""
+    return columns.command_counts(), columns.total_delay(), columns.validate()
+
+
+def time_it(function, *args):
+    """Return the result and wall-clock time of a single call."""
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main() -> int:
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    arg_parser.add_argument('--lines', type=int, default=1_000_000,
+                            help='Number of script lines to generate')
+    args = arg_parser.parse_args()
+
+    parser = HappyFrogParser()
+    content = generate_script(args.lines)
+    script, parse_time = time_it(parser.parse_string, content)
+
+    columns, build_time = time_it(ScriptArray.from_script, script)
+    restored, restore_time = time_it(columns.to_script)
+    del restored
+    expected, object_time = time_it(object_statistics, parser, script)
+    result, columnar_time = time_it(columnar_statistics, columns)
+    assert result == expected
+    del script, columns
+
+    columns, direct_time = time_it(ScriptArray.from_string, content, parser)
+    assert columnar_statistics(columns) == expected
+
+    print(f"Commands:            {args.lines:,} (NumPy: {'yes' if NUMPY_AVAILABLE else 'no'})")
+    print(f"Parse to objects:    {parse_time:.2f}s")
+    print(f"Objects to columns:  {build_time:.2f}s")
+    print(f"Parse to columns:    {direct_time:.2f}s")
+    print(f"Columns to objects:  {restore_time:.2f}s")
+    print(f"Object loop stats:   {object_time:.3f}s")
+    print(f"Columnar stats:      {columnar_time:.3f}s")
+    print(f"Speedup:             {object_time / columnar_time:.1f}x "
+          f"({object_time / (build_time + columnar_time):.2f}x including the conversion)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
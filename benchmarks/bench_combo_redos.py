@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Happy Frog - Modifier Combo ReDoS Benchmark
+
+Feeds adversarial MODIFIER_COMBO lines (long runs of modifiers that fail on
+the very last token) to HappyFrogParser and checks that parse time grows
+linearly with the line length. Exits with status 1 if doubling the input
+more than triples the time at any step.
+
+Usage:
+    python benchmarks/bench_combo_redos.py [--start 1000] [--steps 6]
+
+Author: ZeroDumb
+License: GNU GPLv3
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from happy_frog_parser import HappyFrogParser, HappyFrogScriptError
+
+
+# Each shape is formatted with the token count and must fail to parse
+ADVERSARIAL_SHAPES = {
+    'modifier run': lambda n: "CTRL " + "MOD " * n + "!",
+    'key run': lambda n: "ALT" + " a" * n + " !",
+    'mixed run': lambda n: "SHIFT " + "CTRL ALT1 " * n + "-",
+    'long key': lambda n: "MOD " + "A" * n + "!",
+}
+
+# Allowed time ratio when the input doubles (2 is linear)
+MAX_GROWTH = 3.0
+
+
+def best_parse_time(parser: HappyFrogParser, line: str, repeats: int = 5) -> float:
+    """Return the fastest of several failing parses of the line."""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        try:
+            parser.parse_string(line)
+        except HappyFrogScriptError:
+            pass
+        else:
+            raise AssertionError(f"Adversarial line unexpectedly parsed: {line[:40]}...")
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> int:
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    arg_parser.add_argument('--start', type=int, default=1000,
+                            help='Token count of the smallest input')
+    arg_parser.add_argument('--steps', type=int, default=6,
+                            help='Number of times the input size is doubled')
+    args = arg_parser.parse_args()
+    
+    parser = HappyFrogParser()
+    failed = False
+    
+    for name, shape in ADVERSARIAL_SHAPES.items():
+        print(f"{name}:")
+        previous = None
+        for step in range(args.steps + 1):
+            tokens = args.start * 2 ** step
+            elapsed = best_parse_time(parser, shape(tokens))
+            growth = elapsed / previous if previous else 1.0
+            flag = ''
+            if previous and growth > MAX_GROWTH:
+                flag = '  <-- super-linear'
+                failed = True
+            print(f"   {tokens:>8,} tokens  {elapsed * 1000:8.3f}ms  x{growth:.2f}{flag}")
+            previous = elapsed
+    
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Happy Frog - Encoder Benchmark
+
+Encodes one parsed script with the CircuitPython encoder and with every
+device encoder, and reports the time per command. Parsing is done once up
+front, so only code generation is measured. The device encoders share one
+lowered copy of the script, as when compiling for many devices, and the
+lowering itself is reported on its own line. The hit rate of each encoder's
+fragment memo is shown next to its time.
+
+Usage:
+    python benchmarks/bench_encoders.py [--commands 20000] [--rounds 5]
+
+Author: ZeroDumb
+License: GNU GPLv3
+"""
+
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from happy_frog_parser import HappyFrogParser, CircuitPythonEncoder
+from devices.device_manager import DeviceManager
+
+# A mix of the commands payloads use most
+COMMAND_MIX = [
+    "STRING Hello, World!",
+    "DELAY 100",
+    "ENTER",
+    "CTRL ALT DELETE",
+    "TAB",
+    "F5",
+    "RANDOM_DELAY 10 50",
+    "REM Comment",
+]
+
+
+def best_time(encode, rounds: int) -> float:
+    """Return the best wall time of encode() in seconds."""
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        encode()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark the code generators")
+    arg_parser.add_argument('--commands', type=int, default=20000, help="Commands in the script")
+    arg_parser.add_argument('--rounds', type=int, default=5, help="Rounds per encoder (best is reported)")
+    args = arg_parser.parse_args()
+
+    lines = (COMMAND_MIX * (args.commands // len(COMMAND_MIX) + 1))[:args.commands]
+    script = HappyFrogParser().parse_string('\n'.join(lines))
+    count = len(script.commands)
+
+    manager = DeviceManager()
+    program = manager.lower_script(script)
+    circuitpython = CircuitPythonEncoder()
+    # name -> (encode function, memo or None)
+    encoders = {
+        'circuitpython': (lambda: circuitpython.encode(script), circuitpython.memo),
+        '(lowering)': (lambda: manager.lower_script(script), None),
+    }
+    for device in manager.list_devices():
+        encoders[device['id']] = (
+            lambda device_id=device['id']: manager.encode_script(script, device_id, program=program),
+            getattr(manager.get_encoder(device['id']), 'memo', None),
+        )
+
+    print(f"Encoding {count} commands (best of {args.rounds})")
+    for name, (encode, memo) in encoders.items():
+        if memo is not None:
+            # Start from an empty memo; later rounds reuse it like a long-running process would
+            memo.clear()
+        elapsed = best_time(encode, args.rounds)
+        hit_rate = f"{memo.stats()['hit_rate']:6.1%} memo hits" if memo is not None else ""
+        print(f"  {name:<20} {elapsed * 1000:8.1f} ms {elapsed / count * 1e6:8.2f} us/command  {hit_rate}".rstrip())
+
+
+if __name__ == '__main__':
+    main()
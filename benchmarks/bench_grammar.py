@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Happy Frog - Parser Construction Benchmark
+
+Measures how long it takes to import the parser packages and to create a
+parser. The grammar is compiled once at import and shared, so creating a
+parser should cost about as much as creating any small object. For
+comparison the benchmark also times the old approach of compiling the
+command patterns and keyword table for every new parser.
+
+Usage:
+    python benchmarks/bench_grammar.py [--parsers 10000] [--imports 5]
+
+Author: ZeroDumb
+License: GNU GPLv3
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import ducky_parser
+from happy_frog_parser import HappyFrogParser
+from happy_frog_parser.grammar import Grammar, HAPPY_FROG_GRAMMAR
+
+
+def compile_per_instance() -> Grammar:
+    """Build the grammar the way every parser used to in its __init__."""
+    return Grammar(
+        {command_type: re.compile(pattern.pattern, pattern.flags)
+         for command_type, pattern in HAPPY_FROG_GRAMMAR.command_patterns.items()},
+        HAPPY_FROG_GRAMMAR.parameter_groups,
+    )
+
+
+def time_construction(factory, count: int) -> float:
+    """Return the average time in microseconds to call factory()."""
+    start = time.perf_counter()
+    for _ in range(count):
+        factory()
+    return (time.perf_counter() - start) / count * 1e6
+
+
+def time_import(module: str, repeats: int) -> float:
+    """Return the best wall time in milliseconds to import a module in a fresh interpreter."""
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', f'import {module}'], cwd=ROOT, check=True)
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark parser import and construction")
+    arg_parser.add_argument('--parsers', type=int, default=10000, help="Parsers to create per measurement")
+    arg_parser.add_argument('--imports', type=int, default=5, help="Fresh interpreters per import measurement")
+    args = arg_parser.parse_args()
+
+    print(f"Creating {args.parsers} parsers")
+    print(f"  happy_frog_parser.HappyFrogParser(): {time_construction(HappyFrogParser, args.parsers):8.2f} us")
+    print(f"  ducky_parser.HappyFrogParser():      {time_construction(ducky_parser.HappyFrogParser, args.parsers):8.2f} us")
+    # Compiling is much slower, so fewer rounds are enough
+    rounds = max(1, args.parsers // 10)
+    print(f"  compiling the grammar per parser:    {time_construction(compile_per_instance, rounds):8.2f} us")
+
+    print(f"\nImport time (best of {args.imports} fresh interpreters)")
+    baseline = time_import('sys', args.imports)
+    print(f"  {'import sys':<30} {baseline:8.1f} ms")
+    for module in ('happy_frog_parser', 'ducky_parser'):
+        elapsed = time_import(module, args.imports)
+        print(f"  {'import ' + module:<30} {elapsed:8.1f} ms (+{elapsed - baseline:.1f} ms)")
+
+
+if __name__ == '__main__':
+    main()
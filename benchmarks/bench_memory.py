@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Happy Frog - Command Memory Benchmark
+
+Measures how many bytes each parsed command keeps alive, comparing the slotted
+HappyFrogCommand (line number + shared CommandShape) against the previous
+representation: a plain dataclass with its own __dict__, raw_text string and
+parameters list for every command.
+
+Usage:
+    python benchmarks/bench_memory.py [--lines 200000]
+
+Author: ZeroDumb
+License: GNU GPLv3
+"""
+
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+from dataclasses import dataclass
+from typing import List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from happy_frog_parser import HappyFrogParser, HappyFrogScriptError, CommandType
+
+
+# A typical payload: mostly bare keys, delays and combos, some typed text
+SAMPLE_LINES = [
+    "DELAY 500",
+    "MOD r",
+    "DELAY 500",
+    "STRING notepad line {i}",
+    "ENTER",
+    "TAB",
+    "TAB",
+    "CTRL c",
+    "ENTER",
+    "REM ---",
+]
+
+
+@dataclass
+class LegacyCommand:
+    """Replica of the dataclass HappyFrogCommand used before the compact representation."""
+    command_type: CommandType
+    line_number: int
+    raw_text: str
+    parameters: Optional[List[str]] = None
+
+    def __post_init__(self):
+        if self.parameters is None:
+            self.parameters = []
+
+
+def generate_script(line_count: int) -> str:
+    """Generate a script with the given number of lines."""
+    return '\n'.join(
+        SAMPLE_LINES[i % len(SAMPLE_LINES)].format(i=i) for i in range(line_count)
+    )
+
+
+def legacy_parse(parser: HappyFrogParser, content: str) -> list:
+    """Parse into LegacyCommand objects, allocating them the way the old parser did."""
+    commands = []
+    for line_number, line in enumerate(content.split('\n'), 1):
+        line = line.strip()
+        if not line:
+            continue
+        for command_type, pattern in parser.command_patterns.items():
+            match = pattern.match(line)
+            if match:
+                if command_type == CommandType.MODIFIER_COMBO:
+                    parameters = line.split()
+                else:
+                    parameters = [match.group(group) or ''
+                                  for group in parser.parameter_groups.get(command_type, ())]
+                commands.append(LegacyCommand(command_type, line_number, line, parameters))
+                break
+        else:
+            raise HappyFrogScriptError(f"Unknown command: {line}")
+    return commands
+
+
+def measure(function, *args) -> int:
+    """Return the bytes still allocated by the result of a call."""
+    gc.collect()
+    tracemalloc.start()
+    result = function(*args)
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def main() -> int:
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    arg_parser.add_argument('--lines', type=int, default=200_000,
+                            help='Number of script lines to generate')
+    args = arg_parser.parse_args()
+
+    parser = HappyFrogParser()
+    content = generate_script(args.lines)
+
+    before = measure(legacy_parse, parser, content)
+    after = measure(lambda text: parser.parse_string(text).commands, content)
+
+    print(f"Commands:            {args.lines:,}")
+    print(f"Dataclass commands:  {before / args.lines:,.1f} bytes/command")
+    print(f"Compact commands:    {after / args.lines:,.1f} bytes/command")
+    print(f"Reduction:           {before / after:.1f}x")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Happy Frog - Parser Throughput Benchmark
+
+Measures how many lines per second HappyFrogParser.parse_string handles on a
+large generated script, and compares the keyword-dispatch lexer against the
+old approach of trying every command pattern in order.
+
+Usage:
+    python benchmarks/bench_parser.py [--lines 1000000]
+
+Author: ZeroDumb
+License: GNU GPLv3
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from happy_frog_parser import HappyFrogCommand, HappyFrogParser, HappyFrogScriptError
+
+
+# Generated payloads are mostly comments and STRING lines
+SAMPLE_LINES = [
+    "REM Step {i}: type the next line",
+    "STRING echo Happy Frog line {i}",
+    "ENTER",
+    "# generated comment {i}",
+    "DELAY 100",
+    "STRING Get-Process | Select-Object -First {i}",
+    "CTRL c",
+    "REM ---",
+]
+
+
+def generate_script(line_count: int) -> str:
+    """Generate a script with the given number of lines."""
+    return '\n'.join(
+        SAMPLE_LINES[i % len(SAMPLE_LINES)].format(i=i) for i in range(line_count)
+    )
+
+
+def sequential_scan(parser: HappyFrogParser, content: str) -> list:
+    """Lex every line by trying each pattern in order (the pre-dispatch lexer)."""
+    commands = []
+    for line_number, line in enumerate(content.split('\n'), 1):
+        line = line.strip()
+        if not line:
+            continue
+        for command_type, pattern in parser.command_patterns.items():
+            match = pattern.match(line)
+            if match:
+                groups = parser.parameter_groups.get(command_type, ())
+                shape = parser._build_shape(command_type, groups, line, match)
+                commands.append(HappyFrogCommand.from_shape(shape, line_number))
+                break
+        else:
+            raise HappyFrogScriptError(f"Unknown command: {line}")
+    return commands
+
+
+def time_it(function, *args) -> float:
+    """Return the wall-clock time of a single call."""
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def main() -> int:
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    arg_parser.add_argument('--lines', type=int, default=1_000_000,
+                            help='Number of script lines to generate')
+    args = arg_parser.parse_args()
+    
+    parser = HappyFrogParser()
+    content = generate_script(args.lines)
+    
+    dispatch_time = time_it(parser.parse_string, content)
+    scan_time = time_it(sequential_scan, parser, content)
+    
+    print(f"Lines:               {args.lines:,}")
+    print(f"Keyword dispatch:    {dispatch_time:.2f}s "
+          f"({args.lines / dispatch_time:,.0f} lines/s)")
+    print(f"Sequential scan:     {scan_time:.2f}s "
+          f"({args.lines / scan_time:,.0f} lines/s)")
+    print(f"Speedup:             {scan_time / dispatch_time:.1f}x")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Happy Frog - CLI Startup Benchmark
+
+Runs each happy-frog subcommand in a fresh interpreter with
+``python -X importtime`` and reports the wall time of the run, the total
+import time and the most expensive top-level imports. Build scripts start
+the CLI once per payload, so this is most of their run time.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 5] [--top 8]
+
+Author: ZeroDumb
+License: GNU GPLv3
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = os.path.join(ROOT, 'payloads', 'hello_world.txt')
+
+IMPORT_LINE = re.compile(r'import time:\s+\d+ \|\s+(\d+) \| ( *)(\S+)')
+
+
+def run(args: list) -> tuple:
+    """Run main.py once; return (wall ms, import ms, {top-level module: import ms})."""
+    env = dict(os.environ)
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', os.path.join(ROOT, 'main.py')] + args,
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+    )
+    wall = (time.perf_counter() - start) * 1000
+
+    top_level = {}
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match and not match.group(2):
+            top_level[match.group(3)] = int(match.group(1)) / 1000
+    return wall, sum(top_level.values()), top_level
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark happy-frog CLI startup")
+    arg_parser.add_argument('--runs', type=int, default=5, help="Runs per subcommand (best is reported)")
+    arg_parser.add_argument('--top', type=int, default=8, help="Heaviest imports to list")
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        benchmark(output_dir, args)
+
+
+def benchmark(output_dir: str, args) -> None:
+    """Time every subcommand, writing their outputs to output_dir."""
+    commands = {
+        'parse': ['parse', SCRIPT],
+        'validate': ['validate', SCRIPT],
+        'encode': ['encode', SCRIPT, '-o', os.path.join(output_dir, 'out.py')],
+        'encode -d': ['encode', SCRIPT, '-d', 'xiao_rp2040', '-o', os.path.join(output_dir, 'out_xiao.py')],
+        'convert': ['convert', SCRIPT, '-o', os.path.join(output_dir, 'converted.txt')],
+    }
+
+    # Write the bytecode cache first so every measured run uses it
+    for command in commands.values():
+        run(command)
+
+    print(f"{'subcommand':<12} {'wall ms':>9} {'import ms':>10}   heaviest imports")
+    for name, command in commands.items():
+        results = [run(command) for _ in range(args.runs)]
+        wall = min(result[0] for result in results)
+        imports, top_level = min((result[1], result[2]) for result in results)
+        heaviest = sorted(top_level.items(), key=lambda item: -item[1])[:args.top]
+        print(f"{name:<12} {wall:9.1f} {imports:10.1f}   " +
+              ', '.join(f"{module} {ms:.1f}" for module, ms in heaviest))
+
+
+if __name__ == '__main__':
+    main()
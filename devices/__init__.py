@@ -11,14 +11,31 @@ Author: ZeroDumb
 License: GNU GPLv3
 """
 
-from .device_manager import DeviceManager
-from .xiao_rp2040_encoder import XiaoRP2040Encoder
-from .esp32 import ESP32Encoder
-from .digispark import DigiSparkEncoder
-from .teensy_4 import Teensy4Encoder
-from .raspberry_pi_pico import RaspberryPiPicoEncoder
-from .arduino_leonardo import ArduinoLeonardoEncoder
-from .evilcrow_cable import EvilCrowCableEncoder
+# Every class is imported from its module on first use, so importing one
+# device module does not load the encoders of all the others
+_LAZY_IMPORTS = {
+    "DeviceManager": ".device_manager",
+    "DeviceEncoder": ".base",
+    "XiaoRP2040Encoder": ".xiao_rp2040_encoder",
+    "ESP32Encoder": ".esp32",
+    "DigiSparkEncoder": ".digispark",
+    "Teensy4Encoder": ".teensy_4",
+    "RaspberryPiPicoEncoder": ".raspberry_pi_pico",
+    "ArduinoLeonardoEncoder": ".arduino_leonardo",
+    "EvilCrowCableEncoder": ".evilcrow_cable",
+}
+
+
+def __getattr__(name):
+    """Import the lazily loaded names (PEP 562)."""
+    module_name = _LAZY_IMPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from importlib import import_module
+    value = getattr(import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
 
 __version__ = "1.0.0"
 __author__ = "ZeroDumb"
@@ -29,6 +46,7 @@ __all__ = [
     "DeviceManager",
     
     # Encoder classes
+    "DeviceEncoder",
     "XiaoRP2040Encoder",
     "ESP32Encoder", 
     "DigiSparkEncoder",
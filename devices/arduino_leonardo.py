@@ -11,11 +11,13 @@ Author: ZeroDumb
 License: GNU GPLv3
 """
 
-from typing import List, Dict, Any, Optional
-from happy_frog_parser import HappyFrogScript, HappyFrogCommand, CommandType
+from typing import List, Dict, Any
+from happy_frog_parser import HappyFrogScript
+from happy_frog_parser.keymaps import ARDUINO_KEYMAP
+from .base import DeviceEncoder
 
 
-class ArduinoLeonardoEncoder:
+class ArduinoLeonardoEncoder(DeviceEncoder):
     """
     Encoder that generates Arduino code specifically for Arduino Leonardo.
     
@@ -23,6 +25,13 @@ class ArduinoLeonardoEncoder:
     making it ideal for keyboard and mouse emulation.
     """
     
+    label = "Leonardo"
+    keymap = ARDUINO_KEYMAP
+    delay_comment = "Leonardo delay"
+    string_comment = "Leonardo string input"
+    combo_comment = "Leonardo optimized modifier combo"
+    random_delay_comment = "Leonardo optimized random delay"
+    
     def __init__(self):
         """Initialize the Leonardo-specific encoder."""
         self.device_name = "Arduino Leonardo"
@@ -110,149 +119,6 @@ class ArduinoLeonardoEncoder:
         
         return lines
     
-    def encode_command(self, command: HappyFrogCommand) -> List[str]:
-        """Encode a command specifically for Arduino Leonardo."""
-        lines = []
-        
-        # Add Leonardo-specific comment
-        comment = f"  // Leonardo Command: {command.raw_text}"
-        lines.append(comment)
-        
-        # Encode based on command type with Leonardo optimizations
-        if command.command_type == CommandType.DELAY:
-            lines.extend(self._encode_delay_leonardo(command))
-        elif command.command_type == CommandType.STRING:
-            lines.extend(self._encode_string_leonardo(command))
-        elif command.command_type == CommandType.MODIFIER_COMBO:
-            lines.extend(self._encode_modifier_combo_leonardo(command))
-        elif command.command_type == CommandType.RANDOM_DELAY:
-            lines.extend(self._encode_random_delay_leonardo(command))
-        else:
-            # Use standard encoding for other commands
-            lines.extend(self._encode_standard_command_leonardo(command))
-        
-        return lines
-    
-    def _encode_delay_leonardo(self, command: HappyFrogCommand) -> List[str]:
-        """Encode delay with Leonardo-specific optimizations."""
-        try:
-            delay_ms = int(command.parameters[0])
-            if delay_ms < 0:
-                raise ValueError("Delay value must be non-negative")
-            
-            return [f"  delay({delay_ms});  // Leonardo delay: {delay_ms}ms"]
-                
-        except (ValueError, IndexError):
-            return ["  // ERROR: Invalid delay value"]
-    
-    def _encode_string_leonardo(self, command: HappyFrogCommand) -> List[str]:
-        """Encode string with Leonardo-specific optimizations."""
-        if not command.parameters:
-            return ["  // ERROR: STRING command missing text"]
-        
-        text = command.parameters[0]
-        # Arduino Keyboard.print() handles escaping automatically
-        return [
-            f'  Keyboard.print("{text}");  // Leonardo string input'
-        ]
-    
-    def _encode_modifier_combo_leonardo(self, command: HappyFrogCommand) -> List[str]:
-        """Encode modifier combo with Leonardo-specific optimizations."""
-        if not command.parameters:
-            return ["  // ERROR: MODIFIER_COMBO command missing parameters"]
-        
-        lines = []
-        lines.append("  // Leonardo optimized modifier combo")
-        
-        # Press all keys in the combo
-        for param in command.parameters:
-            if param.upper() in ['MOD', 'CTRL', 'SHIFT', 'ALT']:
-                key_code = self._get_arduino_keycode(param.upper())
-                lines.append(f"  Keyboard.press({key_code});  // Press {param}")
-            else:
-                key_code = self._get_arduino_keycode(param)
-                lines.append(f"  Keyboard.press({key_code});  // Press {param}")
-        
-        # Release all keys in reverse order
-        for param in reversed(command.parameters):
-            if param.upper() in ['MOD', 'CTRL', 'SHIFT', 'ALT']:
-                key_code = self._get_arduino_keycode(param.upper())
-                lines.append(f"  Keyboard.release({key_code});  // Release {param}")
-            else:
-                key_code = self._get_arduino_keycode(param)
-                lines.append(f"  Keyboard.release({key_code});  // Release {param}")
-        
-        return lines
-    
-    def _encode_random_delay_leonardo(self, command: HappyFrogCommand) -> List[str]:
-        """Encode random delay with Leonardo-specific optimizations."""
-        if len(command.parameters) < 2:
-            return ["  // ERROR: RANDOM_DELAY command missing min/max values"]
-        
-        try:
-            min_delay = int(command.parameters[0])
-            max_delay = int(command.parameters[1])
-            
-            return [
-                f"  // Leonardo optimized random delay: {min_delay}ms to {max_delay}ms",
-                "  int random_delay = random(min_delay, max_delay);",
-                "  delay(random_delay);"
-            ]
-            
-        except ValueError:
-            return ["  // ERROR: Invalid random delay values"]
-    
-    def _encode_standard_command_leonardo(self, command: HappyFrogCommand) -> List[str]:
-        """Encode standard commands for Leonardo."""
-        key_code = self._get_arduino_keycode(command.command_type.value)
-        return [
-            f"  Keyboard.press({key_code});  // Leonardo key press: {command.command_type.value}",
-            f"  Keyboard.release({key_code});  // Leonardo key release: {command.command_type.value}"
-        ]
-    
-    def _get_arduino_keycode(self, key: str) -> str:
-        """Get Arduino keycode for a key."""
-        key = key.upper()
-        
-        # Modifier keys
-        if key == 'MOD':
-            return "KEY_LEFT_GUI"
-        elif key == 'CTRL':
-            return "KEY_LEFT_CTRL"
-        elif key == 'SHIFT':
-            return "KEY_LEFT_SHIFT"
-        elif key == 'ALT':
-            return "KEY_LEFT_ALT"
-        
-        # Single letter keys
-        if len(key) == 1 and key.isalpha():
-            return f"'{key}'"
-        
-        # Number keys
-        if key.isdigit():
-            return f"'{key}'"
-        
-        # Special mappings
-        key_mappings = {
-            'ENTER': 'KEY_RETURN',
-            'SPACE': "' '",
-            'TAB': 'KEY_TAB',
-            'BACKSPACE': 'KEY_BACKSPACE',
-            'DELETE': 'KEY_DELETE',
-            'ESCAPE': 'KEY_ESC',
-            'HOME': 'KEY_HOME',
-            'END': 'KEY_END',
-            'INSERT': 'KEY_INSERT',
-            'PAGE_UP': 'KEY_PAGE_UP',
-            'PAGE_DOWN': 'KEY_PAGE_DOWN',
-            'UP': 'KEY_UP_ARROW',
-            'DOWN': 'KEY_DOWN_ARROW',
-            'LEFT': 'KEY_LEFT_ARROW',
-            'RIGHT': 'KEY_RIGHT_ARROW',
-        }
-        
-        return key_mappings.get(key, f"'{key}'")
-    
     def get_device_info(self) -> Dict[str, Any]:
         """Get device information for the Leonardo."""
         return {
@@ -0,0 +1,197 @@
+"""
+Happy Frog - Device Encoder Base
+
+This module provides the base class for the device encoders. A script is
+first lowered to device-neutral keystroke events (see
+happy_frog_parser.lowering), and a device encoder only prints those events:
+waits, typed text, keys going down and up, random waits and log messages.
+The base class prints every event, and the devices only supply the names of
+their library calls and the lines that differ.
+
+Educational Purpose: Demonstrates sharing behaviour through a base class
+while keeping device-specific code generation in small, readable overrides.
+
+Author: ZeroDumb
+License: GNU GPLv3
+"""
+
+import threading
+from typing import Iterable, List, Optional, Tuple
+from happy_frog_parser import HappyFrogCommand
+from happy_frog_parser.dispatch import EncoderBase, handles
+from happy_frog_parser.emitter import CodeEmitter
+from happy_frog_parser.keymaps import ARDUINO_KEYMAP, Keymap
+from happy_frog_parser.memo import DEFAULT_MAX_ENTRIES, FragmentMemo
+from happy_frog_parser.lowering import Event, EventType, LoweredCommand, lower_command
+
+
+# Guards creating an encoder's memo when several threads print at once
+_MEMO_LOCK = threading.Lock()
+
+
+class DeviceEncoder(EncoderBase):
+    """
+    Base class for device encoders.
+
+    The defaults generate Arduino code. Subclasses set the class attributes
+    below for their board and library, and override the *_line(s) methods
+    where their code looks different.
+    """
+
+    # Extension of the generated files: Arduino sketches by default
+    file_extension = ".ino"
+
+    # Bump when a code change makes the same script encode differently, so
+    # that cached build artifacts (see artifacts.ArtifactCache) are not reused
+    encoder_version = 1
+
+    # Syntax of the generated code
+    indent = "  "
+    comment_prefix = "//"
+    statement_end = ";"
+
+    # Key names -> keycodes, shared by every encoder of the target
+    keymap: Keymap = ARDUINO_KEYMAP
+
+    # Library calls
+    delay_call = "delay"
+    print_call = "Keyboard.print"
+    press_call = "Keyboard.press"
+    # None if pressed keys do not need to be released
+    release_call: Optional[str] = "Keyboard.release"
+
+    # Comments added to the generated code
+    label = ""
+    delay_comment = ""
+    string_comment = ""
+    combo_comment: Optional[str] = None
+    random_delay_comment = ""
+
+    # Number of distinct event sequences whose code is kept for reuse
+    memo_size = DEFAULT_MAX_ENTRIES
+
+    @property
+    def memo(self) -> FragmentMemo:
+        """The memo of printed events, created on first use (device __init__s do not call ours)."""
+        memo = self.__dict__.get('_memo')
+        if memo is None:
+            with _MEMO_LOCK:
+                memo = self.__dict__.get('_memo')
+                if memo is None:
+                    memo = self._memo = FragmentMemo(self.memo_size)
+        return memo
+
+    def encode_command(self, command: HappyFrogCommand) -> List[str]:
+        """Encode a command for this device."""
+        return self.print_command(command, lower_command(command))
+
+    def print_command(self, command: HappyFrogCommand, events: Tuple[Event, ...]) -> List[str]:
+        """Print the events a command was lowered to, after a comment naming the command."""
+        lines = [f"{self.indent}{self.comment_prefix} {self.label} Command: {command.raw_text}"]
+        lines.extend(self.print_events(events))
+        return lines
+
+    def print_events(self, events: Tuple[Event, ...]) -> Tuple[str, ...]:
+        """Print a command's events, reusing the code printed for the same events before."""
+        memo = self.memo
+        code = memo.get(events)
+        if code is None:
+            handlers = self._handlers
+            lines = []
+            for event in events:
+                lines.extend(handlers[event.type](self, event))
+            code = memo.put(events, lines)
+        return code
+
+    def emit_program(self, program: Iterable[LoweredCommand], emitter: CodeEmitter) -> None:
+        """Emit a lowered script, a command at a time, with a blank line after each command."""
+        # The loop of print_command(), inlined: this runs for every command
+        print_events = self.print_events
+        header = f"{self.indent}{self.comment_prefix} {self.label} Command: "
+        emit_lines = emitter.emit_lines
+        for command, events in program:
+            lines = [header + command.raw_text]
+            lines.extend(print_events(events))
+            lines.append("")
+            emit_lines(lines)
+
+    def _comment(self, text: str) -> str:
+        """Format a comment line."""
+        return f"{self.indent}{self.comment_prefix} {text}"
+
+    def _get_keycode(self, key: str) -> str:
+        """Get the device keycode for a key name."""
+        return self.keymap.keycode(key)
+
+    @handles(EventType.WAIT)
+    def _print_wait(self, event: Event) -> List[str]:
+        return self._delay_lines(event.value)
+
+    def _delay_lines(self, delay_ms: int) -> List[str]:
+        """Generate the code for a delay of delay_ms milliseconds."""
+        return [f"{self.indent}{self.delay_call}({delay_ms}){self.statement_end}  "
+                f"{self.comment_prefix} {self.delay_comment}: {delay_ms}ms"]
+
+    @handles(EventType.TYPE_TEXT)
+    def _print_type_text(self, event: Event) -> List[str]:
+        return self._string_lines(event.value)
+
+    def _string_lines(self, text: str) -> List[str]:
+        """Generate the code that types text. Arduino print() takes it as is."""
+        return [f'{self.indent}{self.print_call}("{text}"){self.statement_end}  '
+                f'{self.comment_prefix} {self.string_comment}']
+
+    @handles(EventType.CHORD)
+    def _print_chord(self, event: Event) -> List[str]:
+        return [self._comment(self.combo_comment)] if self.combo_comment else []
+
+    @handles(EventType.KEY_DOWN)
+    def _print_key_down(self, event: Event) -> List[str]:
+        return [self._press_line(self._get_keycode(event.value), event.value)]
+
+    @handles(EventType.KEY_UP)
+    def _print_key_up(self, event: Event) -> List[str]:
+        if not self.release_call:
+            return []
+        return [self._release_line(self._get_keycode(event.value), event.value)]
+
+    def _press_line(self, key_code: str, name: str) -> str:
+        """Generate the code that presses one key of a combo."""
+        return f"{self.indent}{self.press_call}({key_code}){self.statement_end}  {self.comment_prefix} Press {name}"
+
+    def _release_line(self, key_code: str, name: str) -> str:
+        """Generate the code that releases one key of a combo."""
+        return f"{self.indent}{self.release_call}({key_code}){self.statement_end}  {self.comment_prefix} Release {name}"
+
+    @handles(EventType.RANDOM_WAIT)
+    def _print_random_wait(self, event: Event) -> List[str]:
+        return self._random_delay_lines(*event.value)
+
+    def _random_delay_lines(self, min_delay: int, max_delay: int) -> List[str]:
+        """Generate the code for a random delay between min_delay and max_delay milliseconds."""
+        return [
+            self._comment(f"{self.random_delay_comment}: {min_delay}ms to {max_delay}ms"),
+            f"{self.indent}int random_delay = random(min_delay, max_delay);",
+            f"{self.indent}{self.delay_call}(random_delay);",
+        ]
+
+    @handles(EventType.KEY_TAP)
+    def _print_key_tap(self, event: Event) -> List[str]:
+        return self._key_lines(self._get_keycode(event.value), event.value)
+
+    def _key_lines(self, key_code: str, name: str) -> List[str]:
+        """Generate the code that presses and releases a single key."""
+        press = (f"{self.indent}{self.press_call}({key_code}){self.statement_end}  "
+                 f"{self.comment_prefix} {self.label} key press: {name}")
+        if not self.release_call:
+            return [press]
+        return [press, f"{self.indent}{self.release_call}({key_code}){self.statement_end}  "
+                       f"{self.comment_prefix} {self.label} key release: {name}"]
+
+    @handles(EventType.LOG)
+    def _print_log(self, event: Event) -> List[str]:
+        return [self._comment(f"LOG: {event.value}")]
+
+    @handles(EventType.ERROR)
+    def _print_error(self, event: Event) -> List[str]:
+        return [self._comment(f"ERROR: {event.value}")]
@@ -0,0 +1,267 @@
+"""
+Happy Frog - Batch Build
+
+This module compiles whole directories of scripts for one device. The
+script files are found from a directory or a glob pattern, parsed and
+encoded on a process pool, and the generated code is written into an
+output tree that mirrors the source tree: payloads/windows/open_cmd.txt
+becomes compiled/windows/open_cmd.py.
+
+Each worker process keeps one parser and one set of device encoders for
+all the files it is given, instead of a new interpreter being started for
+every file. A file that fails to parse or encode does not stop the others;
+its BuildResult carries the error.
+
+Educational Purpose: Demonstrates batch processing on a worker pool,
+isolating failures per item and mirroring a directory tree.
+
+Author: ZeroDumb
+License: GNU GPLv3
+"""
+
+import glob
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, List, Optional, TextIO, Tuple
+
+
+# Files picked up when a directory is built
+SCRIPT_EXTENSIONS = ('.txt',)
+
+# Largest number of files sent to a worker at once
+MAX_FILE_BATCH = 16
+
+# Parser and device manager of the current worker process (set by _init_worker)
+_worker_state: Optional[tuple] = None
+
+
+@dataclass
+class BuildResult:
+    """The outcome of building one script file with build_files."""
+    source: str
+    output_file: str
+    commands: int = 0
+    line_count: int = 0
+    byte_count: int = 0
+    seconds: float = 0.0
+    warnings: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+    # Taken from the artifact cache instead of encoded
+    cached: bool = False
+    # False if the output already held this code and was left untouched
+    written: bool = True
+
+    @property
+    def ok(self) -> bool:
+        """True if the file was parsed, encoded and written."""
+        return self.error is None
+
+
+def discover_scripts(target: str) -> Tuple[str, List[str]]:
+    """
+    Find the script files to build.
+
+    Args:
+        target: A directory (searched recursively for SCRIPT_EXTENSIONS
+            files, skipping hidden directories), a glob pattern such as
+            "payloads/**/*.txt", or a single file
+
+    Returns:
+        (root, paths): the directory the output tree mirrors and the script
+        files found, sorted
+    """
+    if os.path.isdir(target):
+        paths = []
+        for directory, subdirectories, files in os.walk(target):
+            subdirectories[:] = [name for name in subdirectories
+                                 if not name.startswith('.') and name != '__pycache__']
+            paths.extend(os.path.join(directory, name) for name in files
+                         if name.lower().endswith(SCRIPT_EXTENSIONS))
+        return target, sorted(paths)
+
+    paths = sorted(path for path in glob.glob(target, recursive=True) if os.path.isfile(path))
+    # The root is the part of the pattern before the first wildcard
+    parts = os.path.normpath(target).split(os.sep)
+    magic = [index for index, part in enumerate(parts) if glob.has_magic(part)]
+    root = os.sep.join(parts[:magic[0]]) if magic else os.path.dirname(target)
+    return root or os.curdir, paths
+
+
+def output_path(source: str, root: str, output_root: str, extension: str) -> str:
+    """Return the path source is built to, mirroring its place under root."""
+    relative = os.path.relpath(source, root)
+    if relative.startswith(os.pardir):
+        relative = os.path.basename(source)
+    return os.path.join(output_root, os.path.splitext(relative)[0] + extension)
+
+
+def build_file(source: str, output_file: str, device_id: Optional[str], parser, device_manager,
+               cache=None) -> BuildResult:
+    """
+    Parse and encode one script file and write the code to output_file.
+
+    Args:
+        source: Script file (.txt, or .hfb if already compiled)
+        output_file: Where the generated code is written
+        device_id: Device to encode for, or None for the default CircuitPython encoder
+        parser: HappyFrogParser used to parse the file
+        device_manager: DeviceManager providing the device encoders
+        cache: ArtifactCache to reuse the code of unchanged scripts from;
+            with a cache, output files that already hold the right code
+            are not rewritten
+
+    Returns:
+        BuildResult with the statistics, the warnings or the error
+    """
+    result = BuildResult(source, output_file)
+    start = time.perf_counter()
+    try:
+        os.makedirs(os.path.dirname(output_file) or os.curdir, exist_ok=True)
+        if cache is not None:
+            _build_cached(result, device_id, parser, device_manager, cache)
+        else:
+            from happy_frog_parser.emitter import open_output
+            with _load_script(source, parser) as script, open_output(output_file) as f:
+                _encode(script, f, result, device_id, device_manager)
+    except Exception as e:
+        result.error = str(e)
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+def _load_script(source: str, parser, content: Optional[bytes] = None):
+    """Return a context manager giving the parsed (or memory-mapped .hfb) script."""
+    if source.lower().endswith('.hfb'):
+        from happy_frog_parser.hfb import load_hfb, loads_hfb
+        return load_hfb(source) if content is None else loads_hfb(content, source)
+    if content is None:
+        return nullcontext(parser.parse_file(source))
+    return nullcontext(parser.parse_bytes(content, source))
+
+
+def _encode(script, stream: TextIO, result: BuildResult, device_id: Optional[str], device_manager) -> None:
+    """Encode a loaded script to stream and fill in the statistics and warnings."""
+    if device_id is not None:
+        emitter = device_manager.encode_script_to(script, device_id, stream)
+        result.warnings = device_manager.validate_device_support(device_id, script)
+    else:
+        from happy_frog_parser import CircuitPythonEncoder
+        encoder = CircuitPythonEncoder()
+        emitter = encoder.encode_to(script, stream)
+        result.warnings = encoder.validate_script(script)
+    result.commands = len(script.commands)
+    result.line_count = emitter.line_count
+    result.byte_count = emitter.byte_count
+
+
+def _build_cached(result: BuildResult, device_id: Optional[str], parser, device_manager, cache) -> None:
+    """Build through an ArtifactCache, encoding only if the cache has no entry."""
+    from happy_frog_parser.artifacts import encoder_fingerprint
+
+    # The source is read once, so the key always matches the code stored under it
+    with open(result.source, 'rb') as f:
+        content = f.read()
+    if device_id is not None:
+        encoder_class = device_manager.get_encoder_class(device_id)
+    else:
+        from happy_frog_parser import CircuitPythonEncoder
+        encoder_class = CircuitPythonEncoder
+    # Generated code names its source file, so identical scripts at
+    # different paths need entries of their own
+    key = cache.key(content, result.source, device_id or '', encoder_fingerprint(encoder_class),
+                    parser.grammar_fingerprint())
+
+    info = cache.get(key)
+    if info is not None:
+        try:
+            result.written = cache.install(key, result.output_file)
+        except OSError:
+            # Evicted meanwhile; encode it again
+            pass
+        else:
+            result.cached = True
+            for name in ('commands', 'line_count', 'byte_count', 'warnings'):
+                setattr(result, name, info[name])
+            return
+
+    buffer = io.StringIO()
+    with _load_script(result.source, parser, content) as script:
+        _encode(script, buffer, result, device_id, device_manager)
+    code = buffer.getvalue()
+    info = {name: getattr(result, name) for name in ('commands', 'line_count', 'byte_count', 'warnings')}
+    if cache.put(key, code, info):
+        result.written = cache.install(key, result.output_file)
+    else:
+        from happy_frog_parser.emitter import open_output
+        with open_output(result.output_file) as f:
+            f.write(code)
+
+
+def _init_worker(parser, cache) -> None:
+    """Create the device manager of this worker process and keep the parser and cache."""
+    global _worker_state
+    from devices.device_manager import DeviceManager
+    _worker_state = (parser, DeviceManager(), cache)
+
+
+def _build_batch(jobs: List[Tuple[str, str]], device_id: Optional[str]) -> List[BuildResult]:
+    """Build a batch of (source, output file) jobs in a worker process."""
+    parser, device_manager, cache = _worker_state
+    return [build_file(source, output_file, device_id, parser, device_manager, cache)
+            for source, output_file in jobs]
+
+
+def build_files(paths: Iterable[str], root: str, device_id: Optional[str] = None,
+                output_root: str = 'compiled', parser=None,
+                workers: Optional[int] = None, cache=None) -> Iterator[BuildResult]:
+    """
+    Build many script files into a tree that mirrors root.
+
+    Args:
+        paths: Script files to build, as found by discover_scripts()
+        root: Directory the output tree mirrors
+        device_id: Device to encode for, or None for the default CircuitPython encoder
+        output_root: Top of the output tree
+        parser: HappyFrogParser to use (copied to the workers); a plain
+            parser if not given
+        workers: Number of worker processes (default: one per CPU); with 1
+            the files are built in this process
+        cache: ArtifactCache for skipping unchanged scripts (see build_file)
+
+    Yields:
+        BuildResult objects in the order the files finish
+    """
+    from happy_frog_parser import HappyFrogParser
+    from devices.device_manager import DeviceManager
+
+    if parser is None:
+        parser = HappyFrogParser()
+    device_manager = DeviceManager()
+    extension = device_manager.get_file_extension(device_id) if device_id is not None else '.py'
+    jobs = [(str(path), output_path(str(path), root, output_root, extension)) for path in paths]
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(jobs))
+
+    if workers <= 1:
+        for source, output_file in jobs:
+            yield build_file(source, output_file, device_id, parser, device_manager, cache)
+        return
+
+    # A few batches per worker keep the pool balanced when file sizes differ
+    batch_size = max(1, min(MAX_FILE_BATCH, len(jobs) // (workers * 4)))
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(parser, cache)) as pool:
+        futures = [pool.submit(_build_batch, jobs[start:start + batch_size], device_id)
+                   for start in range(0, len(jobs), batch_size)]
+        try:
+            for future in as_completed(futures):
+                yield from future.result()
+        finally:
+            # Stop early if the caller stops iterating
+            for future in futures:
+                future.cancel()
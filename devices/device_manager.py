@@ -10,17 +10,302 @@ Author: ZeroDumb
 License: GNU GPLv3
 """
 
-from typing import List, Dict, Any, Optional, Type
-from happy_frog_parser import HappyFrogScript, HappyFrogCommand, CommandType
+import io
+import os
+import time
+from collections.abc import MutableMapping
+from dataclasses import dataclass
+from typing import List, Dict, Any, Optional, TextIO, Type
+from happy_frog_parser import HappyFrogScript, CommandType
 
-# Import all device encoders
-from devices.raspberry_pi_pico import RaspberryPiPicoEncoder
-from devices.arduino_leonardo import ArduinoLeonardoEncoder
-from devices.teensy_4 import Teensy4Encoder
-from devices.digispark import DigiSparkEncoder
-from devices.esp32 import ESP32Encoder
-from devices.xiao_rp2040_encoder import XiaoRP2040Encoder
-from devices.evilcrow_cable import EvilCrowCableEncoder
+
+# Entry point group that third-party device backends register under. The
+# entry point name is the device id and its value the encoder class, e.g. in
+# a backend's setup.py:
+#
+#     entry_points={"happy_frog.devices": ["my_board = my_backend.encoder:MyBoardEncoder"]}
+#
+# Entry points are only read when a device id is not built in (or every
+# device is listed), and a backend is only imported when its device is used.
+ENTRY_POINT_GROUP = "happy_frog.devices"
+
+# Built-in devices. Encoders are given as "module:Class" and imported the
+# first time the device is used. DeviceManager.devices shows each entry with
+# the resolved class under 'encoder_class'.
+BUILTIN_DEVICES = {
+    'raspberry_pi_pico': {
+        'name': 'Raspberry Pi Pico',
+        'encoder': 'devices.raspberry_pi_pico:RaspberryPiPicoEncoder',
+        'description': 'Low-cost, high-performance device with CircuitPython support',
+        'difficulty': 'Beginner',
+        'price_range': '$4-8',
+        'best_for': ['Education', 'Cost-effective projects', 'CircuitPython learning']
+    },
+    'arduino_leonardo': {
+        'name': 'Arduino Leonardo',
+        'encoder': 'devices.arduino_leonardo:ArduinoLeonardoEncoder',
+        'description': 'Classic choice with native USB HID support',
+        'difficulty': 'Intermediate',
+        'price_range': '$15-25',
+        'best_for': ['Traditional Arduino projects', 'Security research', 'Reliable HID emulation']
+    },
+    'teensy_4': {
+        'name': 'Teensy 4.0',
+        'encoder': 'devices.teensy_4:Teensy4Encoder',
+        'description': 'High-performance device for advanced applications',
+        'difficulty': 'Advanced',
+        'price_range': '$25-35',
+        'best_for': ['High-performance applications', 'Advanced security research', 'Complex automation']
+    },
+    'digispark': {
+        'name': 'DigiSpark',
+        'encoder': 'devices.digispark:DigiSparkEncoder',
+        'description': 'Ultra-compact device for portable applications',
+        'difficulty': 'Beginner',
+        'price_range': '$2-5',
+        'best_for': ['Portable projects', 'Ultra-compact applications', 'Cost-sensitive projects']
+    },
+    'esp32': {
+        'name': 'ESP32',
+        'encoder': 'devices.esp32:ESP32Encoder',
+        'description': 'WiFi-enabled device for wireless applications',
+        'difficulty': 'Intermediate',
+        'price_range': '$5-15',
+        'best_for': ['Wireless applications', 'IoT projects', 'Remote control scenarios']
+    },
+    'xiao_rp2040': {
+        'name': 'Seeed Xiao RP2040',
+        'encoder': 'devices.xiao_rp2040_encoder:XiaoRP2040Encoder',
+        'description': 'Affordable, compact RP2040 device for CircuitPython HID emulation',
+        'difficulty': 'Beginner',
+        'price_range': '$5-10',
+        'best_for': ['Education', 'Compact projects', 'CircuitPython HID']
+    },
+    'evilcrow_cable': {
+        'name': 'EvilCrow-Cable',
+        'encoder': 'devices.evilcrow_cable:EvilCrowCableEncoder',
+        'description': 'Specialized BadUSB device with built-in USB-C connectors',
+        'difficulty': 'Advanced',
+        'price_range': '$15-30',
+        'best_for': ['Advanced security research', 'BadUSB demonstrations', 'Stealth operations']
+    },
+}
+
+# Registered devices and per-process caches shared by every DeviceManager
+_registry: Dict[str, Dict[str, Any]] = {device_id: dict(info) for device_id, info in BUILTIN_DEVICES.items()}
+_entry_points_loaded = False
+_encoder_classes: Dict[str, Type] = {}
+_encoders: Dict[str, Any] = {}
+_encoder_info: Dict[str, Dict[str, Any]] = {}
+
+
+def register_device(device_id: str, encoder, name: Optional[str] = None, description: str = '',
+                    difficulty: str = 'Unknown', price_range: str = 'Unknown',
+                    best_for: Optional[List[str]] = None, replace: bool = False) -> None:
+    """
+    Register a device backend.
+    
+    Args:
+        device_id: Id used to select the device (e.g. with --device)
+        encoder: The encoder class, a "module:Class" string or an entry
+            point; strings and entry points are loaded on first use
+        name: Display name (defaults to the device id)
+        description, difficulty, price_range, best_for: Shown when devices
+            are listed and used by DeviceManager.recommend_device
+        replace: Replace an already registered device with the same id
+        
+    Raises:
+        ValueError: If the id is taken and replace is False
+    """
+    if device_id in _registry and not replace:
+        raise ValueError(f"Device already registered: {device_id}")
+    _registry[device_id] = {
+        'name': name or device_id,
+        'encoder': encoder,
+        'description': description,
+        'difficulty': difficulty,
+        'price_range': price_range,
+        'best_for': list(best_for or []),
+    }
+    _forget(device_id)
+
+
+def _forget(device_id: str) -> None:
+    """Drop the cached encoder class, encoder and info of a device."""
+    for cache in (_encoder_classes, _encoders, _encoder_info):
+        cache.pop(device_id, None)
+
+
+def _find_device(device_id: str) -> Optional[Dict[str, Any]]:
+    """Return the registry entry of a device, or None if it is unknown."""
+    device = _registry.get(device_id)
+    if device is None and not _entry_points_loaded:
+        _load_entry_points()
+        device = _registry.get(device_id)
+    return device
+
+
+def _encoder_class(device_id: str) -> Type:
+    """Return the encoder class of a device, importing its module on first use."""
+    encoder_class = _encoder_classes.get(device_id)
+    if encoder_class is None:
+        device = _find_device(device_id)
+        if device is None:
+            raise ValueError(f"Unknown device: {device_id}")
+        encoder_class = _encoder_classes[device_id] = _load_encoder_class(device['encoder'])
+    return encoder_class
+
+
+def _entry_points() -> list:
+    """Return the entry points registered under ENTRY_POINT_GROUP."""
+    try:
+        from importlib.metadata import entry_points
+    except ImportError:
+        # Python < 3.8 has no importlib.metadata
+        return []
+    points = entry_points()
+    if hasattr(points, 'select'):
+        return list(points.select(group=ENTRY_POINT_GROUP))
+    return list(points.get(ENTRY_POINT_GROUP, ()))
+
+
+def _load_entry_points() -> None:
+    """Register the third-party backends found through entry points (once)."""
+    global _entry_points_loaded
+    if _entry_points_loaded:
+        return
+    _entry_points_loaded = True
+    for entry_point in _entry_points():
+        # Built-in and explicitly registered devices take precedence
+        if entry_point.name not in _registry:
+            register_device(entry_point.name, entry_point)
+
+
+def _load_encoder_class(encoder) -> Type:
+    """Import the encoder class behind a registry entry."""
+    if isinstance(encoder, str):
+        from importlib import import_module
+        module_name, _, class_name = encoder.partition(':')
+        return getattr(import_module(module_name), class_name)
+    if hasattr(encoder, 'load'):
+        return encoder.load()
+    return encoder
+
+
+class DeviceInfo(MutableMapping):
+    """
+    A device of DeviceManager.devices.
+    
+    Reads and writes go to the shared registry entry. The 'encoder_class'
+    key holds the encoder class, which is only imported when it is read;
+    setting it (or 'encoder') replaces the device's encoder.
+    """
+    
+    def __init__(self, device_id: str):
+        self.device_id = device_id
+    
+    @property
+    def _entry(self) -> Dict[str, Any]:
+        return _registry[self.device_id]
+    
+    def __getitem__(self, key):
+        if key == 'encoder_class':
+            return _encoder_class(self.device_id)
+        return self._entry[key]
+    
+    def __setitem__(self, key, value):
+        if key == 'encoder_class':
+            key = 'encoder'
+        self._entry[key] = value
+        if key == 'encoder':
+            _forget(self.device_id)
+    
+    def __delitem__(self, key):
+        if key in ('encoder', 'encoder_class'):
+            raise KeyError(f"A device needs an encoder: {key}")
+        del self._entry[key]
+    
+    def __iter__(self):
+        yield from list(self._entry)
+        yield 'encoder_class'
+    
+    def __len__(self) -> int:
+        return len(self._entry) + 1
+    
+    def __contains__(self, key) -> bool:
+        return key == 'encoder_class' or key in self._entry
+    
+    def __repr__(self) -> str:
+        return f"DeviceInfo({self.device_id!r}, {self._entry!r})"
+    
+    def copy(self) -> Dict[str, Any]:
+        """Return the device as a plain dictionary (importing its encoder)."""
+        return dict(self)
+
+
+class DeviceRegistry(MutableMapping):
+    """
+    The registered devices by id, as returned by DeviceManager.devices.
+    
+    Adding a device, e.g. ``manager.devices['my_board'] = {'name': ...,
+    'encoder_class': MyBoardEncoder}``, registers it with register_device, so
+    every DeviceManager sees it.
+    """
+    
+    def __getitem__(self, device_id: str) -> DeviceInfo:
+        if _find_device(device_id) is None:
+            raise KeyError(device_id)
+        return DeviceInfo(device_id)
+    
+    def __setitem__(self, device_id: str, info) -> None:
+        info = dict(info.items())
+        encoder = info.pop('encoder_class', None)
+        fallback = info.pop('encoder', None)
+        encoder = encoder if encoder is not None else fallback
+        if encoder is None:
+            raise ValueError(f"No encoder given for device: {device_id}")
+        register_device(device_id, encoder, name=info.pop('name', None),
+                        description=info.pop('description', ''),
+                        difficulty=info.pop('difficulty', 'Unknown'),
+                        price_range=info.pop('price_range', 'Unknown'),
+                        best_for=info.pop('best_for', None), replace=True)
+        _registry[device_id].update(info)
+    
+    def __delitem__(self, device_id: str) -> None:
+        if _find_device(device_id) is None:
+            raise KeyError(device_id)
+        del _registry[device_id]
+        _forget(device_id)
+    
+    def __iter__(self):
+        _load_entry_points()
+        return iter(list(_registry))
+    
+    def __len__(self) -> int:
+        _load_entry_points()
+        return len(_registry)
+    
+    def __contains__(self, device_id) -> bool:
+        return isinstance(device_id, str) and _find_device(device_id) is not None
+    
+    def __repr__(self) -> str:
+        return f"DeviceRegistry({list(self)!r})"
+
+
+@dataclass
+class DeviceEncodeResult:
+    """The outcome of encoding a script for one device with encode_devices."""
+    device_id: str
+    output_file: str
+    line_count: int = 0
+    byte_count: int = 0
+    seconds: float = 0.0
+    error: Optional[Exception] = None
+    
+    @property
+    def ok(self) -> bool:
+        """True if the code was generated and written."""
+        return self.error is None
 
 
 class DeviceManager:
@@ -29,68 +314,19 @@ class DeviceManager:
     
     This class acts as a central hub for all device-specific encoders,
     allowing users to easily switch between different devices and platforms.
+    Device modules are imported when a device is first used, and every
+    DeviceManager in a process shares one encoder and one info dictionary
+    per device.
     """
     
-    def __init__(self):
-        """Initialize the device manager with all supported devices."""
-        self.devices = {
-            'raspberry_pi_pico': {
-                'name': 'Raspberry Pi Pico',
-                'encoder_class': RaspberryPiPicoEncoder,
-                'description': 'Low-cost, high-performance device with CircuitPython support',
-                'difficulty': 'Beginner',
-                'price_range': '$4-8',
-                'best_for': ['Education', 'Cost-effective projects', 'CircuitPython learning']
-            },
-            'arduino_leonardo': {
-                'name': 'Arduino Leonardo',
-                'encoder_class': ArduinoLeonardoEncoder,
-                'description': 'Classic choice with native USB HID support',
-                'difficulty': 'Intermediate',
-                'price_range': '$15-25',
-                'best_for': ['Traditional Arduino projects', 'Security research', 'Reliable HID emulation']
-            },
-            'teensy_4': {
-                'name': 'Teensy 4.0',
-                'encoder_class': Teensy4Encoder,
-                'description': 'High-performance device for advanced applications',
-                'difficulty': 'Advanced',
-                'price_range': '$25-35',
-                'best_for': ['High-performance applications', 'Advanced security research', 'Complex automation']
-            },
-            'digispark': {
-                'name': 'DigiSpark',
-                'encoder_class': DigiSparkEncoder,
-                'description': 'Ultra-compact device for portable applications',
-                'difficulty': 'Beginner',
-                'price_range': '$2-5',
-                'best_for': ['Portable projects', 'Ultra-compact applications', 'Cost-sensitive projects']
-            },
-            'esp32': {
-                'name': 'ESP32',
-                'encoder_class': ESP32Encoder,
-                'description': 'WiFi-enabled device for wireless applications',
-                'difficulty': 'Intermediate',
-                'price_range': '$5-15',
-                'best_for': ['Wireless applications', 'IoT projects', 'Remote control scenarios']
-            },
-            'xiao_rp2040': {
-                'name': 'Seeed Xiao RP2040',
-                'encoder_class': XiaoRP2040Encoder,
-                'description': 'Affordable, compact RP2040 device for CircuitPython HID emulation',
-                'difficulty': 'Beginner',
-                'price_range': '$5-10',
-                'best_for': ['Education', 'Compact projects', 'CircuitPython HID']
-            },
-            'evilcrow_cable': {
-                'name': 'EvilCrow-Cable',
-                'encoder_class': EvilCrowCableEncoder,
-                'description': 'Specialized BadUSB device with built-in USB-C connectors',
-                'difficulty': 'Advanced',
-                'price_range': '$15-30',
-                'best_for': ['Advanced security research', 'BadUSB demonstrations', 'Stealth operations']
-            },
-        }
+    @property
+    def devices(self) -> DeviceRegistry:
+        """All registered devices, including entry point backends, by id."""
+        return DeviceRegistry()
+    
+    def _device(self, device_id: str) -> Optional[Dict[str, Any]]:
+        """Return the registry entry of a device, or None if it is unknown."""
+        return _find_device(device_id)
     
     def list_devices(self) -> List[Dict[str, Any]]:
         """List all supported devices with their information."""
@@ -108,63 +344,181 @@ class DeviceManager:
     
     def get_device_info(self, device_id: str) -> Optional[Dict[str, Any]]:
         """Get detailed information about a specific device."""
-        if device_id not in self.devices:
+        device = self._device(device_id)
+        if device is None:
             return None
         
-        device_info = self.devices[device_id].copy()
-        device_info['id'] = device_id
-        
-        # Get additional info from the encoder
-        encoder_class = device_info['encoder_class']
-        encoder_instance = encoder_class()
-        device_info.update(encoder_instance.get_device_info())
+        # The encoder's information is static, so it is fetched once
+        encoder_info = _encoder_info.get(device_id)
+        if encoder_info is None:
+            encoder_info = _encoder_info[device_id] = self.get_encoder(device_id).get_device_info()
         
+        device_info = dict(device)
+        device_info['id'] = device_id
+        device_info['encoder_class'] = self.get_encoder_class(device_id)
+        device_info.update(encoder_info)
         return device_info
     
+    def get_encoder_class(self, device_id: str) -> Type:
+        """Return the encoder class of a device, importing its module on first use."""
+        return _encoder_class(device_id)
+    
+    def get_encoder(self, device_id: str):
+        """Return the shared encoder instance for the specified device."""
+        encoder = _encoders.get(device_id)
+        if encoder is None:
+            encoder = _encoders[device_id] = self.get_encoder_class(device_id)()
+        return encoder
+    
     def create_encoder(self, device_id: str):
-        """Create an encoder instance for the specified device."""
-        if device_id not in self.devices:
-            raise ValueError(f"Unknown device: {device_id}")
+        """Create a new encoder instance for the specified device."""
+        return self.get_encoder_class(device_id)()
+    
+    def resolve_devices(self, selection: str) -> List[str]:
+        """
+        Turn a device selection into device ids.
         
-        encoder_class = self.devices[device_id]['encoder_class']
-        return encoder_class()
+        Args:
+            selection: A device id, a comma-separated list of ids, or 'all'
+            
+        Raises:
+            ValueError: If a device is unknown or none is given
+        """
+        if selection.strip().lower() == 'all':
+            return list(self.devices)
+        device_ids = []
+        for device_id in selection.split(','):
+            device_id = device_id.strip()
+            if not device_id or device_id in device_ids:
+                continue
+            if self._device(device_id) is None:
+                raise ValueError(f"Unknown device: {device_id}")
+            device_ids.append(device_id)
+        if not device_ids:
+            raise ValueError("No device given")
+        return device_ids
+    
+    def get_file_extension(self, device_id: str) -> str:
+        """Return the extension of the files generated for a device ('.py' or '.ino')."""
+        return getattr(self.get_encoder_class(device_id), 'file_extension', '.py')
     
-    def encode_script(self, script: HappyFrogScript, device_id: str, output_file: Optional[str] = None) -> str:
-        """Encode a script for a specific device."""
-        encoder = self.create_encoder(device_id)
+    def lower_script(self, script: HappyFrogScript):
+        """
+        Lower a script to keystroke events.
+
+        The result can be passed to encode_script() for any number of
+        devices, so that the script is only lowered once.
+        """
+        from happy_frog_parser.lowering import lower_script
+        return lower_script(script)
+    
+    def encode_script(self, script: HappyFrogScript, device_id: str, output_file: Optional[str] = None,
+                      program=None) -> str:
+        """
+        Encode a script (a HappyFrogScript or a MappedScript loaded from .hfb) for a specific device.
         
-        # Generate device-specific code
-        code_lines = []
+        Args:
+            program: The script as returned by lower_script(), to reuse it
+                across devices; the script is lowered here if not given
+        """
+        buffer = io.StringIO()
+        self.encode_script_to(script, device_id, buffer, program)
+        code = buffer.getvalue()
+        
+        # Write to file if specified
+        if output_file:
+            with open(output_file, 'w', encoding='utf-8') as f:
+                f.write(code)
+        
+        return code
+    
+    def encode_script_to(self, script: HappyFrogScript, device_id: str, stream: TextIO, program=None,
+                         head_size: int = 0):
+        """
+        Encode a script for a device, writing the code to a text stream as it is generated.
+        
+        Args:
+            stream: Text stream to write the code to
+            program: The script as returned by lower_script(), if already lowered
+            head_size: Number of leading lines to keep for a preview
+            
+        Returns:
+            The CodeEmitter, with the line and byte counts of the code
+        """
+        from happy_frog_parser.emitter import CodeEmitter
+        encoder = self.get_encoder(device_id)
+        emitter = CodeEmitter(stream, head_size)
         
         # Add header
-        code_lines.extend(encoder.generate_header(script))
+        emitter.emit_lines(encoder.generate_header(script))
         
         # Add main execution code
-        code_lines.extend(self._generate_main_code(encoder, script))
+        self._emit_main_code(encoder, script, program, emitter)
         
         # Add footer
-        code_lines.extend(encoder.generate_footer())
+        emitter.emit_lines(encoder.generate_footer())
+        emitter.flush()
         
-        # Join all lines
-        code = '\n'.join(code_lines)
+        return emitter
+    
+    def encode_devices(self, script: HappyFrogScript, device_ids: List[str], output_files: Dict[str, str],
+                       program=None, max_workers: Optional[int] = None) -> List[DeviceEncodeResult]:
+        """
+        Encode one script for several devices at once and write the files.
         
-        # Write to file if specified
-        if output_file:
-            with open(output_file, 'w', encoding='utf-8') as f:
-                f.write(code)
+        The script is lowered once and every device prints the same lowered
+        copy; the devices are encoded on a thread pool. A device that fails
+        does not stop the others.
         
-        return code
+        Args:
+            script: The parsed script
+            device_ids: Devices to encode for
+            output_files: Output path for each device
+            program: The script as returned by lower_script(), if already lowered
+            max_workers: Number of threads (default: one per device, up to the CPU count)
+            
+        Returns:
+            One DeviceEncodeResult per device, in the order of device_ids
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        from happy_frog_parser.emitter import open_output
+        
+        if program is None:
+            program = self.lower_script(script)
+        # Load the device modules here rather than from several threads
+        for device_id in device_ids:
+            self.get_encoder(device_id)
+        
+        def encode(device_id: str) -> DeviceEncodeResult:
+            result = DeviceEncodeResult(device_id, str(output_files[device_id]))
+            start = time.perf_counter()
+            try:
+                with open_output(result.output_file) as f:
+                    emitter = self.encode_script_to(script, device_id, f, program)
+                result.line_count = emitter.line_count
+                result.byte_count = emitter.byte_count
+            except Exception as e:
+                result.error = e
+            result.seconds = time.perf_counter() - start
+            return result
+        
+        if max_workers is None:
+            max_workers = min(len(device_ids), os.cpu_count() or 1)
+        with ThreadPoolExecutor(max_workers=max(max_workers, 1)) as pool:
+            return list(pool.map(encode, device_ids))
     
-    def _generate_main_code(self, encoder, script: HappyFrogScript) -> List[str]:
-        """Generate the main execution code for a device."""
-        lines = []
+    def _emit_main_code(self, encoder, script: HappyFrogScript, program, emitter) -> None:
+        """Emit the main execution code for a device, a command at a time."""
+        # Encoders built on DeviceEncoder print the lowered script
+        if hasattr(encoder, 'emit_program'):
+            encoder.emit_program(program if program is not None else self.lower_script(script), emitter)
+            return
         
         # Process each command
-        for i, command in enumerate(script.commands):
-            lines.extend(encoder.encode_command(command))
+        for command in script.commands:
+            lines = list(encoder.encode_command(command))
             lines.append("")  # Add blank line for readability
-        
-        return lines
+            emitter.emit_lines(lines)
     
     def recommend_device(self, criteria: Dict[str, Any]) -> str:
         """Recommend a device based on user criteria."""
@@ -230,15 +584,14 @@ class DeviceManager:
         }
         
         for device_id, device_info in self.devices.items():
-            encoder = self.create_encoder(device_id)
-            device_details = encoder.get_device_info()
+            device_details = self.get_device_info(device_id)
             
             comparison['rows'].append([
                 device_info['name'],
                 device_info['price_range'],
                 device_info['difficulty'],
                 ', '.join(device_info['best_for']),
-                ', '.join(device_details['features'][:3])  # First 3 features
+                ', '.join(device_details.get('features', [])[:3])  # First 3 features
             ])
         
         return comparison
@@ -247,7 +600,7 @@ class DeviceManager:
         """Validate if a device can support all commands in a script."""
         warnings = []
         
-        if device_id not in self.devices:
+        if self._device(device_id) is None:
             warnings.append(f"Unknown device: {device_id}")
             return warnings
         
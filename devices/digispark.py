@@ -11,11 +11,13 @@ Author: ZeroDumb
 License: GNU GPLv3
 """
 
-from typing import List, Dict, Any, Optional
-from happy_frog_parser import HappyFrogScript, HappyFrogCommand, CommandType
+from typing import List, Dict, Any
+from happy_frog_parser import HappyFrogScript
+from happy_frog_parser.keymaps import DIGIKEYBOARD_KEYMAP
+from .base import DeviceEncoder
 
 
-class DigiSparkEncoder:
+class DigiSparkEncoder(DeviceEncoder):
     """
     Encoder that generates Arduino code specifically for DigiSpark.
     
@@ -23,6 +25,18 @@ class DigiSparkEncoder:
     HID emulation capabilities in a tiny form factor.
     """
     
+    delay_call = "DigiKeyboard.delay"
+    print_call = "DigiKeyboard.print"
+    # sendKeyPress() sends the keys at once, so there is nothing to release
+    press_call = "DigiKeyboard.sendKeyPress"
+    release_call = None
+    label = "DigiSpark"
+    keymap = DIGIKEYBOARD_KEYMAP
+    delay_comment = "DigiSpark delay"
+    string_comment = "DigiSpark string input"
+    combo_comment = "DigiSpark compact modifier combo"
+    random_delay_comment = "DigiSpark compact random delay"
+    
     def __init__(self):
         """Initialize the DigiSpark-specific encoder."""
         self.device_name = "DigiSpark"
@@ -109,140 +123,6 @@ class DigiSparkEncoder:
         
         return lines
     
-    def encode_command(self, command: HappyFrogCommand) -> List[str]:
-        """Encode a command specifically for DigiSpark."""
-        lines = []
-        
-        # Add DigiSpark-specific comment
-        comment = f"  // DigiSpark Command: {command.raw_text}"
-        lines.append(comment)
-        
-        # Encode based on command type with DigiSpark optimizations
-        if command.command_type == CommandType.DELAY:
-            lines.extend(self._encode_delay_digispark(command))
-        elif command.command_type == CommandType.STRING:
-            lines.extend(self._encode_string_digispark(command))
-        elif command.command_type == CommandType.MODIFIER_COMBO:
-            lines.extend(self._encode_modifier_combo_digispark(command))
-        elif command.command_type == CommandType.RANDOM_DELAY:
-            lines.extend(self._encode_random_delay_digispark(command))
-        else:
-            # Use standard encoding for other commands
-            lines.extend(self._encode_standard_command_digispark(command))
-        
-        return lines
-    
-    def _encode_delay_digispark(self, command: HappyFrogCommand) -> List[str]:
-        """Encode delay with DigiSpark-specific optimizations."""
-        try:
-            delay_ms = int(command.parameters[0])
-            if delay_ms < 0:
-                raise ValueError("Delay value must be non-negative")
-            
-            # DigiSpark: Compact delay implementation
-            return [f"  DigiKeyboard.delay({delay_ms});  // DigiSpark delay: {delay_ms}ms"]
-                
-        except (ValueError, IndexError):
-            return ["  // ERROR: Invalid delay value"]
-    
-    def _encode_string_digispark(self, command: HappyFrogCommand) -> List[str]:
-        """Encode string with DigiSpark-specific optimizations."""
-        if not command.parameters:
-            return ["  // ERROR: STRING command missing text"]
-        
-        text = command.parameters[0]
-        # DigiSpark: Compact string input
-        return [
-            f'  DigiKeyboard.print("{text}");  // DigiSpark string input'
-        ]
-    
-    def _encode_modifier_combo_digispark(self, command: HappyFrogCommand) -> List[str]:
-        """Encode modifier combo with DigiSpark-specific optimizations."""
-        if not command.parameters:
-            return ["  // ERROR: MODIFIER_COMBO command missing parameters"]
-        
-        lines = []
-        lines.append("  // DigiSpark compact modifier combo")
-        
-        # Press all keys in the combo
-        for param in command.parameters:
-            if param.upper() in ['MOD', 'CTRL', 'SHIFT', 'ALT']:
-                key_code = self._get_digispark_keycode(param.upper())
-                lines.append(f"  DigiKeyboard.sendKeyPress({key_code});  // Press {param}")
-            else:
-                key_code = self._get_digispark_keycode(param)
-                lines.append(f"  DigiKeyboard.sendKeyPress({key_code});  // Press {param}")
-        
-        return lines
-    
-    def _encode_random_delay_digispark(self, command: HappyFrogCommand) -> List[str]:
-        """Encode random delay with DigiSpark-specific optimizations."""
-        if len(command.parameters) < 2:
-            return ["  // ERROR: RANDOM_DELAY command missing min/max values"]
-        
-        try:
-            min_delay = int(command.parameters[0])
-            max_delay = int(command.parameters[1])
-            
-            return [
-                f"  // DigiSpark compact random delay: {min_delay}ms to {max_delay}ms",
-                "  int random_delay = random(min_delay, max_delay);",
-                "  DigiKeyboard.delay(random_delay);"
-            ]
-            
-        except ValueError:
-            return ["  // ERROR: Invalid random delay values"]
-    
-    def _encode_standard_command_digispark(self, command: HappyFrogCommand) -> List[str]:
-        """Encode standard commands for DigiSpark."""
-        key_code = self._get_digispark_keycode(command.command_type.value)
-        return [
-            f"  DigiKeyboard.sendKeyPress({key_code});  // DigiSpark key press: {command.command_type.value}"
-        ]
-    
-    def _get_digispark_keycode(self, key: str) -> str:
-        """Get DigiSpark keycode for a key."""
-        key = key.upper()
-        
-        # Modifier keys
-        if key == 'MOD':
-            return "KEY_GUI"
-        elif key == 'CTRL':
-            return "KEY_CTRL"
-        elif key == 'SHIFT':
-            return "KEY_SHIFT"
-        elif key == 'ALT':
-            return "KEY_ALT"
-        
-        # Single letter keys
-        if len(key) == 1 and key.isalpha():
-            return f"KEY_{key}"
-        
-        # Number keys
-        if key.isdigit():
-            return f"KEY_{key}"
-        
-        # Special mappings
-        key_mappings = {
-            'ENTER': 'KEY_ENTER',
-            'SPACE': 'KEY_SPACE',
-            'TAB': 'KEY_TAB',
-            'BACKSPACE': 'KEY_BACKSPACE',
-            'DELETE': 'KEY_DELETE',
-            'ESCAPE': 'KEY_ESC',
-            'HOME': 'KEY_HOME',
-            'END': 'KEY_END',
-            'INSERT': 'KEY_INSERT',
-            'PAGE_UP': 'KEY_PAGE_UP',
-            'PAGE_DOWN': 'KEY_PAGE_DOWN',
-            'UP': 'KEY_UP_ARROW',
-            'DOWN': 'KEY_DOWN_ARROW',
-            'LEFT': 'KEY_LEFT_ARROW',
-            'RIGHT': 'KEY_RIGHT_ARROW',
-        }
-        
-        return key_mappings.get(key, f"KEY_{key}")
-    
     def get_device_info(self) -> Dict[str, Any]:
         """Get device information for the DigiSpark."""
         return {
@@ -11,11 +11,13 @@ Author: ZeroDumb
 License: GNU GPLv3
 """
 
-from typing import List, Dict, Any, Optional
-from happy_frog_parser import HappyFrogScript, HappyFrogCommand, CommandType
+from typing import List, Dict, Any
+from happy_frog_parser import HappyFrogScript
+from happy_frog_parser.keymaps import DIGIKEYBOARD_KEYMAP
+from .base import DeviceEncoder
 
 
-class ESP32Encoder:
+class ESP32Encoder(DeviceEncoder):
     """
     Encoder that generates Arduino code specifically for ESP32.
     
@@ -23,6 +25,16 @@ class ESP32Encoder:
     making it ideal for wireless HID emulation and IoT security research.
     """
     
+    print_call = "bleKeyboard.print"
+    press_call = "bleKeyboard.press"
+    release_call = "bleKeyboard.release"
+    label = "ESP32"
+    keymap = DIGIKEYBOARD_KEYMAP
+    delay_comment = "ESP32 delay"
+    string_comment = "ESP32 Bluetooth string input"
+    combo_comment = "ESP32 Bluetooth modifier combo"
+    random_delay_comment = "ESP32 wireless random delay"
+    
     def __init__(self):
         """Initialize the ESP32-specific encoder."""
         self.device_name = "ESP32"
@@ -127,150 +139,6 @@ class ESP32Encoder:
         
         return lines
     
-    def encode_command(self, command: HappyFrogCommand) -> List[str]:
-        """Encode a command specifically for ESP32."""
-        lines = []
-        
-        # Add ESP32-specific comment
-        comment = f"  // ESP32 Command: {command.raw_text}"
-        lines.append(comment)
-        
-        # Encode based on command type with ESP32 optimizations
-        if command.command_type == CommandType.DELAY:
-            lines.extend(self._encode_delay_esp32(command))
-        elif command.command_type == CommandType.STRING:
-            lines.extend(self._encode_string_esp32(command))
-        elif command.command_type == CommandType.MODIFIER_COMBO:
-            lines.extend(self._encode_modifier_combo_esp32(command))
-        elif command.command_type == CommandType.RANDOM_DELAY:
-            lines.extend(self._encode_random_delay_esp32(command))
-        else:
-            # Use standard encoding for other commands
-            lines.extend(self._encode_standard_command_esp32(command))
-        
-        return lines
-    
-    def _encode_delay_esp32(self, command: HappyFrogCommand) -> List[str]:
-        """Encode delay with ESP32-specific optimizations."""
-        try:
-            delay_ms = int(command.parameters[0])
-            if delay_ms < 0:
-                raise ValueError("Delay value must be non-negative")
-            
-            # ESP32: High-precision delays with WiFi considerations
-            return [f"  delay({delay_ms});  // ESP32 delay: {delay_ms}ms"]
-                
-        except (ValueError, IndexError):
-            return ["  // ERROR: Invalid delay value"]
-    
-    def _encode_string_esp32(self, command: HappyFrogCommand) -> List[str]:
-        """Encode string with ESP32-specific optimizations."""
-        if not command.parameters:
-            return ["  // ERROR: STRING command missing text"]
-        
-        text = command.parameters[0]
-        # ESP32: Bluetooth HID string input
-        return [
-            f'  bleKeyboard.print("{text}");  // ESP32 Bluetooth string input'
-        ]
-    
-    def _encode_modifier_combo_esp32(self, command: HappyFrogCommand) -> List[str]:
-        """Encode modifier combo with ESP32-specific optimizations."""
-        if not command.parameters:
-            return ["  // ERROR: MODIFIER_COMBO command missing parameters"]
-        
-        lines = []
-        lines.append("  // ESP32 Bluetooth modifier combo")
-        
-        # Press all keys in the combo
-        for param in command.parameters:
-            if param.upper() in ['MOD', 'CTRL', 'SHIFT', 'ALT']:
-                key_code = self._get_esp32_keycode(param.upper())
-                lines.append(f"  bleKeyboard.press({key_code});  // Press {param}")
-            else:
-                key_code = self._get_esp32_keycode(param)
-                lines.append(f"  bleKeyboard.press({key_code});  // Press {param}")
-        
-        # Release all keys in reverse order
-        for param in reversed(command.parameters):
-            if param.upper() in ['MOD', 'CTRL', 'SHIFT', 'ALT']:
-                key_code = self._get_esp32_keycode(param.upper())
-                lines.append(f"  bleKeyboard.release({key_code});  // Release {param}")
-            else:
-                key_code = self._get_esp32_keycode(param)
-                lines.append(f"  bleKeyboard.release({key_code});  // Release {param}")
-        
-        return lines
-    
-    def _encode_random_delay_esp32(self, command: HappyFrogCommand) -> List[str]:
-        """Encode random delay with ESP32-specific optimizations."""
-        if len(command.parameters) < 2:
-            return ["  // ERROR: RANDOM_DELAY command missing min/max values"]
-        
-        try:
-            min_delay = int(command.parameters[0])
-            max_delay = int(command.parameters[1])
-            
-            return [
-                f"  // ESP32 wireless random delay: {min_delay}ms to {max_delay}ms",
-                "  int random_delay = random(min_delay, max_delay);",
-                "  delay(random_delay);"
-            ]
-            
-        except ValueError:
-            return ["  // ERROR: Invalid random delay values"]
-    
-    def _encode_standard_command_esp32(self, command: HappyFrogCommand) -> List[str]:
-        """Encode standard commands for ESP32."""
-        key_code = self._get_esp32_keycode(command.command_type.value)
-        return [
-            f"  bleKeyboard.press({key_code});  // ESP32 key press: {command.command_type.value}",
-            f"  bleKeyboard.release({key_code});  // ESP32 key release: {command.command_type.value}"
-        ]
-    
-    def _get_esp32_keycode(self, key: str) -> str:
-        """Get ESP32 keycode for a key."""
-        key = key.upper()
-        
-        # Modifier keys
-        if key == 'MOD':
-            return "KEY_GUI"
-        elif key == 'CTRL':
-            return "KEY_CTRL"
-        elif key == 'SHIFT':
-            return "KEY_SHIFT"
-        elif key == 'ALT':
-            return "KEY_ALT"
-        
-        # Single letter keys
-        if len(key) == 1 and key.isalpha():
-            return f"KEY_{key}"
-        
-        # Number keys
-        if key.isdigit():
-            return f"KEY_{key}"
-        
-        # Special mappings
-        key_mappings = {
-            'ENTER': 'KEY_ENTER',
-            'SPACE': 'KEY_SPACE',
-            'TAB': 'KEY_TAB',
-            'BACKSPACE': 'KEY_BACKSPACE',
-            'DELETE': 'KEY_DELETE',
-            'ESCAPE': 'KEY_ESC',
-            'HOME': 'KEY_HOME',
-            'END': 'KEY_END',
-            'INSERT': 'KEY_INSERT',
-            'PAGE_UP': 'KEY_PAGE_UP',
-            'PAGE_DOWN': 'KEY_PAGE_DOWN',
-            'UP': 'KEY_UP_ARROW',
-            'DOWN': 'KEY_DOWN_ARROW',
-            'LEFT': 'KEY_LEFT_ARROW',
-            'RIGHT': 'KEY_RIGHT_ARROW',
-        }
-        
-        return key_mappings.get(key, f"KEY_{key}")
-    
     def get_device_info(self) -> Dict[str, Any]:
         """Get device information for the ESP32."""
         return {
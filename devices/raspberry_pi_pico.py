@@ -11,11 +11,13 @@ Author: ZeroDumb
 License: GNU GPLv3
 """
 
-from typing import List, Dict, Any, Optional
-from happy_frog_parser import HappyFrogScript, HappyFrogCommand, CommandType
+from typing import List, Dict, Any
+from happy_frog_parser import HappyFrogScript
+from happy_frog_parser.keymaps import CIRCUITPYTHON_KEYMAP
+from .base import DeviceEncoder
 
 
-class RaspberryPiPicoEncoder:
+class RaspberryPiPicoEncoder(DeviceEncoder):
     """
     Encoder that generates CircuitPython code specifically for Raspberry Pi Pico.
     
@@ -23,6 +25,16 @@ class RaspberryPiPicoEncoder:
     for HID emulation. This encoder optimizes code for the Pico's capabilities.
     """
     
+    file_extension = ".py"
+    indent = "    "
+    comment_prefix = "#"
+    statement_end = ""
+    press_call = "keyboard.press"
+    release_call = "keyboard.release"
+    label = "Pico"
+    keymap = CIRCUITPYTHON_KEYMAP
+    combo_comment = "Pico optimized modifier combo"
+    
     def __init__(self):
         """Initialize the Pico-specific encoder."""
         self.device_name = "Raspberry Pi Pico"
@@ -98,157 +110,26 @@ class RaspberryPiPicoEncoder:
         
         return lines
     
-    def encode_command(self, command: HappyFrogCommand) -> List[str]:
-        """Encode a command specifically for Raspberry Pi Pico."""
-        lines = []
-        
-        # Add Pico-specific comment
-        comment = f"    # Pico Command: {command.raw_text}"
-        lines.append(comment)
-        
-        # Encode based on command type with Pico optimizations
-        if command.command_type == CommandType.DELAY:
-            lines.extend(self._encode_delay_pico(command))
-        elif command.command_type == CommandType.STRING:
-            lines.extend(self._encode_string_pico(command))
-        elif command.command_type == CommandType.MODIFIER_COMBO:
-            lines.extend(self._encode_modifier_combo_pico(command))
-        elif command.command_type == CommandType.RANDOM_DELAY:
-            lines.extend(self._encode_random_delay_pico(command))
-        else:
-            # Use standard encoding for other commands
-            lines.extend(self._encode_standard_command(command))
-        
-        return lines
-    
-    def _encode_delay_pico(self, command: HappyFrogCommand) -> List[str]:
-        """Encode delay with Pico-specific optimizations."""
-        try:
-            delay_ms = int(command.parameters[0])
-            if delay_ms < 0:
-                raise ValueError("Delay value must be non-negative")
-            
-            # Pico-specific delay optimization
-            if delay_ms < 10:
-                # Very short delays - use microsecond precision
-                return [f"    time.sleep({delay_ms / 1000.0})  # Pico optimized delay: {delay_ms}ms"]
-            else:
-                # Standard delays
-                return [f"    time.sleep({delay_ms / 1000.0})  # Delay: {delay_ms}ms"]
-                
-        except (ValueError, IndexError):
-            return ["    # ERROR: Invalid delay value"]
+    def _delay_lines(self, delay_ms: int) -> List[str]:
+        """Generate a delay, marking the very short ones."""
+        if delay_ms < 10:
+            return [f"    time.sleep({delay_ms / 1000.0})  # Pico optimized delay: {delay_ms}ms"]
+        return [f"    time.sleep({delay_ms / 1000.0})  # Delay: {delay_ms}ms"]
     
-    def _encode_string_pico(self, command: HappyFrogCommand) -> List[str]:
-        """Encode string with Pico-specific optimizations."""
-        if not command.parameters:
-            return ["    # ERROR: STRING command missing text"]
-        
-        text = command.parameters[0]
+    def _string_lines(self, text: str) -> List[str]:
+        """Generate a keyboard_layout.write() call with the text escaped."""
         escaped_text = text.replace('\\', '\\\\').replace('"', '\\"')
-        
-        return [
-            f'    keyboard_layout.write("{escaped_text}")  # Pico string input: {text}'
-        ]
-    
-    def _encode_modifier_combo_pico(self, command: HappyFrogCommand) -> List[str]:
-        """Encode modifier combo with Pico-specific optimizations."""
-        if not command.parameters:
-            return ["    # ERROR: MODIFIER_COMBO command missing parameters"]
-        
-        lines = []
-        lines.append("    # Pico optimized modifier combo")
-        
-        # Press all keys in the combo
-        for param in command.parameters:
-            if param.upper() in ['MOD', 'CTRL', 'SHIFT', 'ALT']:
-                key_code = self._get_keycode(param.upper())
-                lines.append(f"    keyboard.press({key_code})  # Press {param}")
-            else:
-                key_code = self._get_keycode(param)
-                lines.append(f"    keyboard.press({key_code})  # Press {param}")
-        
-        # Release all keys in reverse order
-        for param in reversed(command.parameters):
-            if param.upper() in ['MOD', 'CTRL', 'SHIFT', 'ALT']:
-                key_code = self._get_keycode(param.upper())
-                lines.append(f"    keyboard.release({key_code})  # Release {param}")
-            else:
-                key_code = self._get_keycode(param)
-                lines.append(f"    keyboard.release({key_code})  # Release {param}")
-        
-        return lines
-    
-    def _encode_random_delay_pico(self, command: HappyFrogCommand) -> List[str]:
-        """Encode random delay with Pico-specific optimizations."""
-        if len(command.parameters) < 2:
-            return ["    # ERROR: RANDOM_DELAY command missing min/max values"]
-        
-        try:
-            min_delay = int(command.parameters[0])
-            max_delay = int(command.parameters[1])
-            
-            return [
-                f"    # Pico optimized random delay: {min_delay}ms to {max_delay}ms",
-                "    import random",
-                f"    random_delay = random.uniform({min_delay / 1000.0}, {max_delay / 1000.0})",
-                "    time.sleep(random_delay)"
-            ]
-            
-        except ValueError:
-            return ["    # ERROR: Invalid random delay values"]
+        return [f'    keyboard_layout.write("{escaped_text}")  # Pico string input: {text}']
     
-    def _encode_standard_command(self, command: HappyFrogCommand) -> List[str]:
-        """Encode standard commands for Pico."""
-        key_code = self._get_keycode(command.command_type.value)
+    def _random_delay_lines(self, min_delay: int, max_delay: int) -> List[str]:
+        """Generate a random delay with Python's random module."""
         return [
-            f"    keyboard.press({key_code})  # Pico key press: {command.command_type.value}",
-            f"    keyboard.release({key_code})  # Pico key release: {command.command_type.value}"
+            f"    # Pico optimized random delay: {min_delay}ms to {max_delay}ms",
+            "    import random",
+            f"    random_delay = random.uniform({min_delay / 1000.0}, {max_delay / 1000.0})",
+            "    time.sleep(random_delay)"
         ]
     
-    def _get_keycode(self, key: str) -> str:
-        """Get CircuitPython keycode for a key."""
-        key = key.upper()
-        
-        # Modifier keys
-        if key == 'MOD':
-            return "Keycode.GUI"
-        elif key == 'CTRL':
-            return "Keycode.CONTROL"
-        elif key == 'SHIFT':
-            return "Keycode.SHIFT"
-        elif key == 'ALT':
-            return "Keycode.ALT"
-        
-        # Single letter keys
-        if len(key) == 1 and key.isalpha():
-            return f"Keycode.{key}"
-        
-        # Number keys
-        if key.isdigit():
-            return f"Keycode.{key}"
-        
-        # Special mappings
-        key_mappings = {
-            'ENTER': 'Keycode.ENTER',
-            'SPACE': 'Keycode.SPACE',
-            'TAB': 'Keycode.TAB',
-            'BACKSPACE': 'Keycode.BACKSPACE',
-            'DELETE': 'Keycode.DELETE',
-            'ESCAPE': 'Keycode.ESCAPE',
-            'HOME': 'Keycode.HOME',
-            'END': 'Keycode.END',
-            'INSERT': 'Keycode.INSERT',
-            'PAGE_UP': 'Keycode.PAGE_UP',
-            'PAGE_DOWN': 'Keycode.PAGE_DOWN',
-            'UP': 'Keycode.UP_ARROW',
-            'DOWN': 'Keycode.DOWN_ARROW',
-            'LEFT': 'Keycode.LEFT_ARROW',
-            'RIGHT': 'Keycode.RIGHT_ARROW',
-        }
-        
-        return key_mappings.get(key, f"Keycode.{key}")
-    
     def get_device_info(self) -> Dict[str, Any]:
         """Get device information for the Pico."""
         return {
@@ -11,11 +11,13 @@ Author: ZeroDumb
 License: GNU GPLv3
 """
 
-from typing import List, Dict, Any, Optional
-from happy_frog_parser import HappyFrogScript, HappyFrogCommand, CommandType
+from typing import List, Dict, Any
+from happy_frog_parser import HappyFrogScript
+from happy_frog_parser.keymaps import ARDUINO_KEYMAP
+from .base import DeviceEncoder
 
 
-class Teensy4Encoder:
+class Teensy4Encoder(DeviceEncoder):
     """
     Encoder that generates Arduino code specifically for Teensy 4.0.
     
@@ -23,6 +25,13 @@ class Teensy4Encoder:
     performance for complex HID emulation scenarios.
     """
     
+    label = "Teensy 4.0"
+    keymap = ARDUINO_KEYMAP
+    delay_comment = "Teensy 4.0 optimized delay"
+    string_comment = "Teensy 4.0 high-performance string input"
+    combo_comment = "Teensy 4.0 high-performance modifier combo"
+    random_delay_comment = "Teensy 4.0 high-precision random delay"
+    
     def __init__(self):
         """Initialize the Teensy 4.0-specific encoder."""
         self.device_name = "Teensy 4.0"
@@ -112,152 +121,11 @@ class Teensy4Encoder:
         
         return lines
     
-    def encode_command(self, command: HappyFrogCommand) -> List[str]:
-        """Encode a command specifically for Teensy 4.0."""
-        lines = []
-        
-        # Add Teensy 4.0-specific comment
-        comment = f"  // Teensy 4.0 Command: {command.raw_text}"
-        lines.append(comment)
-        
-        # Encode based on command type with Teensy 4.0 optimizations
-        if command.command_type == CommandType.DELAY:
-            lines.extend(self._encode_delay_teensy(command))
-        elif command.command_type == CommandType.STRING:
-            lines.extend(self._encode_string_teensy(command))
-        elif command.command_type == CommandType.MODIFIER_COMBO:
-            lines.extend(self._encode_modifier_combo_teensy(command))
-        elif command.command_type == CommandType.RANDOM_DELAY:
-            lines.extend(self._encode_random_delay_teensy(command))
-        else:
-            # Use standard encoding for other commands
-            lines.extend(self._encode_standard_command_teensy(command))
-        
-        return lines
-    
-    def _encode_delay_teensy(self, command: HappyFrogCommand) -> List[str]:
-        """Encode delay with Teensy 4.0-specific optimizations."""
-        try:
-            delay_ms = int(command.parameters[0])
-            if delay_ms < 0:
-                raise ValueError("Delay value must be non-negative")
-            
-            # Teensy 4.0: High-precision delays
-            if delay_ms < 1:
-                return [f"  delayMicroseconds({delay_ms * 1000});  // Teensy 4.0 microsecond delay"]
-            else:
-                return [f"  delay({delay_ms});  // Teensy 4.0 optimized delay: {delay_ms}ms"]
-                
-        except (ValueError, IndexError):
-            return ["  // ERROR: Invalid delay value"]
-    
-    def _encode_string_teensy(self, command: HappyFrogCommand) -> List[str]:
-        """Encode string with Teensy 4.0-specific optimizations."""
-        if not command.parameters:
-            return ["  // ERROR: STRING command missing text"]
-        
-        text = command.parameters[0]
-        # Teensy 4.0: High-performance string input
-        return [
-            f'  Keyboard.print("{text}");  // Teensy 4.0 high-performance string input'
-        ]
-    
-    def _encode_modifier_combo_teensy(self, command: HappyFrogCommand) -> List[str]:
-        """Encode modifier combo with Teensy 4.0-specific optimizations."""
-        if not command.parameters:
-            return ["  // ERROR: MODIFIER_COMBO command missing parameters"]
-        
-        lines = []
-        lines.append("  // Teensy 4.0 high-performance modifier combo")
-        
-        # Press all keys in the combo
-        for param in command.parameters:
-            if param.upper() in ['MOD', 'CTRL', 'SHIFT', 'ALT']:
-                key_code = self._get_teensy_keycode(param.upper())
-                lines.append(f"  Keyboard.press({key_code});  // Press {param}")
-            else:
-                key_code = self._get_teensy_keycode(param)
-                lines.append(f"  Keyboard.press({key_code});  // Press {param}")
-        
-        # Release all keys in reverse order
-        for param in reversed(command.parameters):
-            if param.upper() in ['MOD', 'CTRL', 'SHIFT', 'ALT']:
-                key_code = self._get_teensy_keycode(param.upper())
-                lines.append(f"  Keyboard.release({key_code});  // Release {param}")
-            else:
-                key_code = self._get_teensy_keycode(param)
-                lines.append(f"  Keyboard.release({key_code});  // Release {param}")
-        
-        return lines
-    
-    def _encode_random_delay_teensy(self, command: HappyFrogCommand) -> List[str]:
-        """Encode random delay with Teensy 4.0-specific optimizations."""
-        if len(command.parameters) < 2:
-            return ["  // ERROR: RANDOM_DELAY command missing min/max values"]
-        
-        try:
-            min_delay = int(command.parameters[0])
-            max_delay = int(command.parameters[1])
-            
-            return [
-                f"  // Teensy 4.0 high-precision random delay: {min_delay}ms to {max_delay}ms",
-                "  int random_delay = random(min_delay, max_delay);",
-                "  delay(random_delay);"
-            ]
-            
-        except ValueError:
-            return ["  // ERROR: Invalid random delay values"]
-    
-    def _encode_standard_command_teensy(self, command: HappyFrogCommand) -> List[str]:
-        """Encode standard commands for Teensy 4.0."""
-        key_code = self._get_teensy_keycode(command.command_type.value)
-        return [
-            f"  Keyboard.press({key_code});  // Teensy 4.0 key press: {command.command_type.value}",
-            f"  Keyboard.release({key_code});  // Teensy 4.0 key release: {command.command_type.value}"
-        ]
-    
-    def _get_teensy_keycode(self, key: str) -> str:
-        """Get Teensy keycode for a key."""
-        key = key.upper()
-        
-        # Modifier keys
-        if key == 'MOD':
-            return "KEY_LEFT_GUI"
-        elif key == 'CTRL':
-            return "KEY_LEFT_CTRL"
-        elif key == 'SHIFT':
-            return "KEY_LEFT_SHIFT"
-        elif key == 'ALT':
-            return "KEY_LEFT_ALT"
-        
-        # Single letter keys
-        if len(key) == 1 and key.isalpha():
-            return f"'{key}'"
-        
-        # Number keys
-        if key.isdigit():
-            return f"'{key}'"
-        
-        # Special mappings
-        key_mappings = {
-            'ENTER': 'KEY_RETURN',
-            'SPACE': "' '",
-            'TAB': 'KEY_TAB',
-            'BACKSPACE': 'KEY_BACKSPACE',
-            'DELETE': 'KEY_DELETE',
-            'ESCAPE': 'KEY_ESC',
-            'HOME': 'KEY_HOME',
-            'END': 'KEY_END',
-            'INSERT': 'KEY_INSERT',
-            'PAGE_UP': 'KEY_PAGE_UP',
-            'PAGE_DOWN': 'KEY_PAGE_DOWN',
-            'UP': 'KEY_UP_ARROW',
-            'DOWN': 'KEY_DOWN_ARROW',
-            'LEFT': 'KEY_LEFT_ARROW',
-            'RIGHT': 'KEY_RIGHT_ARROW',
-        }
-        
-        return key_mappings.get(key, f"'{key}'")
+    def _delay_lines(self, delay_ms: int) -> List[str]:
+        """Generate a delay, using microsecond precision below 1ms."""
+        if delay_ms < 1:
+            return [f"  delayMicroseconds({delay_ms * 1000});  // Teensy 4.0 microsecond delay"]
+        return super()._delay_lines(delay_ms)
     
     def get_device_info(self) -> Dict[str, Any]:
         """Get device information for the Teensy 4.0."""
@@ -0,0 +1,456 @@
+"""
+Happy Frog - Watch Mode
+
+This module rebuilds scripts as they are saved. One process keeps the
+parser, the device registry and the device encoders loaded, so a rebuild
+costs only the parse and encode of the files that changed - not a new
+interpreter importing everything again for every save.
+
+Changes are detected with inotify on Linux (through ctypes, no extra
+packages needed) and by polling file modification times elsewhere, or when
+inotify is unavailable. Editors often write a file several times per save
+(a temporary file, a rename, a metadata update), so changes are debounced:
+a rebuild starts once no further change has arrived for a short while.
+
+Educational Purpose: Demonstrates file system notifications, debouncing
+bursts of events and keeping a warm process instead of restarting one.
+
+Author: ZeroDumb
+License: GNU GPLv3
+"""
+
+import glob
+import os
+import select
+import struct
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from .build import SCRIPT_EXTENSIONS, BuildResult, build_file, discover_scripts, output_path
+
+
+# Quiet time after the last change before a rebuild starts, in seconds
+DEFAULT_DEBOUNCE = 0.1
+
+# Time between two scans of the polling watcher, in seconds
+DEFAULT_POLL_INTERVAL = 0.5
+
+# inotify event flags (see inotify(7))
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+class PollingWatcher:
+    """
+    Finds changed files by comparing their modification times and sizes.
+
+    Works everywhere; a change is seen within one poll interval.
+    """
+
+    def __init__(self, list_files: Callable[[], Iterable[str]], interval: float = DEFAULT_POLL_INTERVAL):
+        """
+        Initialize the watcher.
+
+        Args:
+            list_files: Returns the files to watch; called on every scan so
+                new files are picked up
+            interval: Time between two scans, in seconds
+        """
+        self.list_files = list_files
+        self.interval = interval
+        self._snapshot = self._scan()
+        self._next_scan = time.monotonic() + interval
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        snapshot = {}
+        for path in self.list_files():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def wait(self, timeout: Optional[float]) -> Set[str]:
+        """
+        Wait up to timeout seconds (None: until something changes) for changes.
+
+        Returns:
+            The files that were created or modified since the last call
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if deadline is not None and deadline < self._next_scan:
+                time.sleep(max(0.0, deadline - time.monotonic()))
+                return set()
+            time.sleep(max(0.0, self._next_scan - time.monotonic()))
+
+            self._next_scan = time.monotonic() + self.interval
+            snapshot = self._scan()
+            changed = {path for path, state in snapshot.items() if self._snapshot.get(path) != state}
+            self._snapshot = snapshot
+            if changed:
+                return changed
+
+    def close(self) -> None:
+        """Release the watcher (nothing to release when polling)."""
+
+
+class InotifyWatcher:
+    """
+    Finds changed files with Linux inotify.
+
+    Directories are watched rather than files, so files that editors save
+    by renaming a new copy over the old one are still seen. New
+    subdirectories are watched as they appear. A directory that does not
+    exist yet is waited for by watching its nearest existing parent.
+    """
+
+    MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+    def __init__(self, directories: Iterable[str], shallow: Iterable[str] = ()):
+        """
+        Start watching directories.
+
+        Args:
+            directories: Directories watched with everything below them
+            shallow: Directories watched without their subdirectories
+
+        Raises:
+            OSError: inotify is not available (not Linux, or out of watches)
+        """
+        import ctypes
+        import ctypes.util
+
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+            self._add_watch = libc.inotify_add_watch
+            self._fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        except (AttributeError, TypeError) as e:
+            raise OSError(f"inotify is not available: {e}")
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._add_watch.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+        self._directories: Dict[int, str] = {}
+        # Watches whose new subdirectories are watched too
+        self._recursive: Set[int] = set()
+        # Directories that do not exist yet, and whether to watch below them
+        self._pending: Dict[str, bool] = {}
+        try:
+            for directory in directories:
+                self._watch(directory, True)
+            for directory in shallow:
+                self._watch(directory, False)
+        except OSError:
+            self.close()
+            raise
+
+    def _add(self, directory: str, recursive: bool) -> None:
+        """Add an inotify watch for one directory."""
+        wd = self._add_watch(self._fd, os.fsencode(directory), self.MASK)
+        if wd < 0:
+            import ctypes
+            errno = ctypes.get_errno()
+            raise OSError(errno, f"Cannot watch {directory}: {os.strerror(errno)}")
+        self._directories[wd] = directory
+        if recursive:
+            self._recursive.add(wd)
+
+    def _watch(self, directory: str, recursive: bool) -> Set[str]:
+        """
+        Watch a directory, or its nearest existing parent until it is created.
+
+        Returns:
+            The files already in the directory
+        """
+        directory = os.path.normpath(directory)
+        if not os.path.isdir(directory):
+            self._pending[directory] = recursive
+            parent = directory
+            while True:
+                parent = os.path.dirname(parent) or os.curdir
+                if os.path.isdir(parent):
+                    break
+            self._add(parent, False)
+            return set()
+        self._pending.pop(directory, None)
+        if recursive:
+            return self._watch_tree(directory)
+        self._add(directory, False)
+        with os.scandir(directory) as scan:
+            return {entry.path for entry in scan if entry.is_file()}
+
+    def _watch_tree(self, top: str) -> Set[str]:
+        """
+        Watch a directory and its subdirectories.
+
+        Returns:
+            The files already in them
+        """
+        files = set()
+        for directory, subdirectories, names in os.walk(top):
+            subdirectories[:] = [name for name in subdirectories
+                                 if not name.startswith('.') and name != '__pycache__']
+            self._add(directory, True)
+            files.update(os.path.join(directory, name) for name in names)
+        return files
+
+    def _directory_created(self, wd: int, path: str) -> Set[str]:
+        """
+        Watch a directory that appeared in a watched directory, if it is wanted.
+
+        Returns:
+            The files already in it
+        """
+        if wd in self._recursive:
+            return self._watch_tree(path)
+        # Below a shallow watch only the way to a pending directory is followed
+        path = os.path.normpath(path)
+        files = set()
+        for directory, recursive in list(self._pending.items()):
+            if directory == path or directory.startswith(os.path.join(path, '')):
+                files |= self._watch(directory, recursive)
+        return files
+
+    def wait(self, timeout: Optional[float]) -> Set[str]:
+        """
+        Wait up to timeout seconds (None: until something changes) for changes.
+
+        Returns:
+            The files that were written, created or moved into a watched
+            directory since the last call; every watched directory's files
+            if the event queue overflowed
+        """
+        changed: Set[str] = set()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not changed:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not select.select([self._fd], [], [], remaining)[0]:
+                return changed
+            try:
+                data = os.read(self._fd, 65536)
+            except BlockingIOError:
+                continue
+            changed |= self._decode(data)
+        return changed
+
+    def _decode(self, data: bytes) -> Set[str]:
+        """Turn a buffer of inotify events into changed paths."""
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                # Events were lost; report everything so nothing is missed
+                for directory in list(self._directories.values()):
+                    try:
+                        with os.scandir(directory) as scan:
+                            changed.update(entry.path for entry in scan if entry.is_file())
+                    except OSError:
+                        pass
+                for directory, recursive in list(self._pending.items()):
+                    try:
+                        changed |= self._watch(directory, recursive)
+                    except OSError:
+                        pass
+                continue
+            directory = self._directories.get(wd)
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, name)
+            if mask & IN_ISDIR:
+                # A new directory may already hold files when it is watched
+                try:
+                    changed |= self._directory_created(wd, path)
+                except OSError:
+                    # Removed again meanwhile
+                    pass
+            else:
+                changed.add(path)
+        return changed
+
+    def close(self) -> None:
+        """Stop watching."""
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+def _watched_directory(target: str) -> Tuple[str, bool]:
+    """
+    Return the directory to watch for a build target, and whether to watch below it.
+
+    A directory is watched with its subdirectories. A single file only needs
+    its own directory, and so does a pattern with wildcards in the file name
+    alone ("payloads/*.txt"). A target that does not exist yet counts as a
+    file if it has a script extension, and as a directory otherwise.
+    """
+    if os.path.isdir(target):
+        return target, True
+    parts = os.path.normpath(target).split(os.sep)
+    magic = [index for index, part in enumerate(parts) if glob.has_magic(part)]
+    if magic:
+        return os.sep.join(parts[:magic[0]]) or os.curdir, magic[0] < len(parts) - 1
+    if os.path.isfile(target) or target.lower().endswith(SCRIPT_EXTENSIONS):
+        return os.path.dirname(target) or os.curdir, False
+    return target, True
+
+
+@dataclass
+class Rebuild:
+    """One round of rebuilding after a burst of changes."""
+    results: List[BuildResult] = field(default_factory=list)
+    # From when the first change of the burst was seen to the end of the rebuild
+    latency: float = 0.0
+    # Time spent parsing and encoding
+    build_seconds: float = 0.0
+
+
+class WatchSession:
+    """
+    Keeps the scripts of some targets built while they change.
+
+    The parser, device manager and cache are created once and used for
+    every rebuild.
+    """
+
+    def __init__(self, targets: List[str], device_id: Optional[str] = None, output_root: str = 'compiled',
+                 parser=None, cache=None, debounce: float = DEFAULT_DEBOUNCE, poll: bool = False,
+                 poll_interval: float = DEFAULT_POLL_INTERVAL):
+        """
+        Initialize the session and start watching.
+
+        Args:
+            targets: Directories, glob patterns or files, as for the build command
+            device_id: Device to encode for, or None for the default CircuitPython encoder
+            output_root: Top of the output tree
+            parser: HappyFrogParser to use; a plain parser if not given
+            cache: Optional ArtifactCache (see build.build_file)
+            debounce: Quiet time after the last change before rebuilding, in seconds
+            poll: Poll for changes even where inotify is available
+            poll_interval: Time between two scans when polling, in seconds
+        """
+        from happy_frog_parser import HappyFrogParser
+        from devices.device_manager import DeviceManager
+
+        self.targets = list(targets)
+        self.device_id = device_id
+        self.output_root = output_root
+        self.parser = parser if parser is not None else HappyFrogParser()
+        self.cache = cache
+        self.debounce = debounce
+        self.device_manager = DeviceManager()
+        self.extension = (self.device_manager.get_file_extension(device_id)
+                          if device_id is not None else '.py')
+        # Load the device encoder now rather than on the first save
+        if device_id is not None:
+            self.device_manager.get_encoder(device_id)
+
+        self.watcher = None
+        if not poll:
+            watched = [_watched_directory(target) for target in self.targets]
+            try:
+                self.watcher = InotifyWatcher([directory for directory, recursive in watched if recursive],
+                                              [directory for directory, recursive in watched if not recursive])
+            except OSError:
+                pass
+        if self.watcher is None:
+            self.watcher = PollingWatcher(lambda: self.scripts(), poll_interval)
+
+    @property
+    def method(self) -> str:
+        """How changes are detected: 'inotify' or 'polling'."""
+        return 'inotify' if isinstance(self.watcher, InotifyWatcher) else 'polling'
+
+    def _discover(self) -> List[Tuple[str, List[str]]]:
+        return [discover_scripts(target) for target in self.targets]
+
+    def scripts(self) -> Dict[str, str]:
+        """Return every watched script file, mapped to the root its output mirrors."""
+        scripts = {}
+        for root, paths in self._discover():
+            for path in paths:
+                scripts.setdefault(os.path.normpath(path), root)
+        return scripts
+
+    def rebuild(self, paths: Iterable[str], first_change: Optional[float] = None) -> Rebuild:
+        """
+        Build the given script files.
+
+        Args:
+            paths: Script files to build; files that are not watched
+                scripts are ignored
+            first_change: time.perf_counter() when the first change was seen
+
+        Returns:
+            Rebuild with a BuildResult per file and the latency
+        """
+        scripts = self.scripts()
+        start = time.perf_counter()
+        rebuild = Rebuild()
+        for path in sorted(set(os.path.normpath(path) for path in paths)):
+            root = scripts.get(path)
+            if root is None:
+                continue
+            rebuild.results.append(build_file(
+                path, output_path(path, root, self.output_root, self.extension),
+                self.device_id, self.parser, self.device_manager, self.cache,
+            ))
+        end = time.perf_counter()
+        rebuild.build_seconds = end - start
+        rebuild.latency = end - (first_change if first_change is not None else start)
+        return rebuild
+
+    def wait_for_changes(self, timeout: Optional[float] = None) -> Tuple[Set[str], Optional[float]]:
+        """
+        Wait for a burst of changes to end.
+
+        Args:
+            timeout: Longest wait for the first change (None: no limit)
+
+        Returns:
+            (changed paths, time.perf_counter() of the first change); an
+            empty set and None if nothing changed within timeout
+        """
+        changed = self.watcher.wait(timeout)
+        if not changed:
+            return set(), None
+        first_change = time.perf_counter()
+        while True:
+            more = self.watcher.wait(self.debounce)
+            if not more:
+                return changed, first_change
+            changed |= more
+
+    def run(self, on_rebuild: Callable[[Rebuild], None], build_first: bool = True) -> None:
+        """
+        Rebuild changed scripts until interrupted (KeyboardInterrupt).
+
+        Args:
+            on_rebuild: Called with every Rebuild that built at least one file
+            build_first: Build every script once before watching
+        """
+        try:
+            if build_first:
+                on_rebuild(self.rebuild(self.scripts()))
+            while True:
+                changed, first_change = self.wait_for_changes()
+                rebuild = self.rebuild(changed, first_change)
+                if rebuild.results:
+                    on_rebuild(rebuild)
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        """Stop watching."""
+        self.watcher.close()
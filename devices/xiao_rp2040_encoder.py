@@ -1,11 +1,19 @@
 from typing import List, Dict, Any
-from happy_frog_parser import HappyFrogScript, HappyFrogCommand, CommandType
+from happy_frog_parser import HappyFrogScript
+from happy_frog_parser.keymaps import XIAO_RP2040_KEYMAP
+from .base import DeviceEncoder
 
-class XiaoRP2040Encoder:
+class XiaoRP2040Encoder(DeviceEncoder):
     """
     Encoder that generates CircuitPython code for the Seeed Xiao RP2040.
     The output is meant to be copied to the device as code.py.
     """
+    file_extension = ".py"
+    indent = "    "
+    comment_prefix = "#"
+    label = "Xiao RP2040"
+    keymap = XIAO_RP2040_KEYMAP
+
     def __init__(self):
         self.device_name = "Seeed Xiao RP2040"
         self.processor = "RP2040"
@@ -59,81 +67,28 @@ class XiaoRP2040Encoder:
         lines.append("        print('Happy Frog execution completed.')")
         return lines
 
-    def encode_command(self, command: HappyFrogCommand) -> List[str]:
-        lines = []
-        # Add Xiao RP2040-specific comment
-        comment = f"    # Xiao RP2040 Command: {command.raw_text}"
-        lines.append(comment)
-        if command.command_type == CommandType.DELAY:
-            try:
-                delay_ms = int(command.parameters[0])
-                lines.append(f"    time.sleep({delay_ms/1000:.3f})  # Delay {delay_ms}ms")
-            except (ValueError, IndexError):
-                lines.append("    # ERROR: Invalid delay value")
-        elif command.command_type == CommandType.STRING:
-            if command.parameters:
-                text = command.parameters[0].replace('"', '\\"')
-                lines.append(f'    keyboard_layout.write("{text}")')
-            else:
-                lines.append("    # ERROR: STRING command missing text")
-        elif command.command_type == CommandType.MODIFIER_COMBO:
-            # Example: MOD r or CTRL ALT DEL
-            for param in command.parameters:
-                keycode = self._get_keycode(param)
-                lines.append(f"    keyboard.press({keycode})")
-            for param in reversed(command.parameters):
-                keycode = self._get_keycode(param)
-                lines.append(f"    keyboard.release({keycode})")
-        else:
-            # Standard key press/release
-            keycode = self._get_keycode(command.command_type.value)
-            lines.append(f"    keyboard.press({keycode})")
-            lines.append(f"    keyboard.release({keycode})")
-        return lines
+    def _delay_lines(self, delay_ms: int) -> List[str]:
+        return [f"    time.sleep({delay_ms/1000:.3f})  # Delay {delay_ms}ms"]
 
-    def _get_keycode(self, key: str) -> str:
-        # Map Happy Frog/standard keys to Keycode constants
-        key = key.upper()
-        mapping = {
-            'MOD': 'Keycode.WINDOWS',
-            'WINDOWS': 'Keycode.WINDOWS',
-            'CTRL': 'Keycode.CONTROL',
-            'CONTROL': 'Keycode.CONTROL',
-            'SHIFT': 'Keycode.SHIFT',
-            'ALT': 'Keycode.ALT',
-            'ENTER': 'Keycode.ENTER',
-            'TAB': 'Keycode.TAB',
-            'ESC': 'Keycode.ESCAPE',
-            'ESCAPE': 'Keycode.ESCAPE',
-            'UP': 'Keycode.UP_ARROW',
-            'DOWN': 'Keycode.DOWN_ARROW',
-            'LEFT': 'Keycode.LEFT_ARROW',
-            'RIGHT': 'Keycode.RIGHT_ARROW',
-            'SPACE': 'Keycode.SPACEBAR',
-            'DELETE': 'Keycode.DELETE',
-            'BACKSPACE': 'Keycode.BACKSPACE',
-            'CAPSLOCK': 'Keycode.CAPS_LOCK',
-            'F1': 'Keycode.F1',
-            'F2': 'Keycode.F2',
-            'F3': 'Keycode.F3',
-            'F4': 'Keycode.F4',
-            'F5': 'Keycode.F5',
-            'F6': 'Keycode.F6',
-            'F7': 'Keycode.F7',
-            'F8': 'Keycode.F8',
-            'F9': 'Keycode.F9',
-            'F10': 'Keycode.F10',
-            'F11': 'Keycode.F11',
-            'F12': 'Keycode.F12',
-        }
-        if key in mapping:
-            return mapping[key]
-        elif len(key) == 1 and key.isalpha():
-            return f'Keycode.{key}'
-        elif len(key) == 1 and key.isdigit():
-            return f'Keycode.{key}'
-        else:
-            return f'Keycode.{key}'
+    def _string_lines(self, text: str) -> List[str]:
+        text = text.replace('"', '\\"')
+        return [f'    keyboard_layout.write("{text}")']
+
+    def _press_line(self, key_code: str, name: str) -> str:
+        return f"    keyboard.press({key_code})"
+
+    def _release_line(self, key_code: str, name: str) -> str:
+        return f"    keyboard.release({key_code})"
+
+    def _key_lines(self, key_code: str, name: str) -> List[str]:
+        return [f"    keyboard.press({key_code})", f"    keyboard.release({key_code})"]
+
+    def _random_delay_lines(self, min_delay: int, max_delay: int) -> List[str]:
+        return [
+            "    import random",
+            f"    time.sleep(random.uniform({min_delay/1000:.3f}, {max_delay/1000:.3f}))  "
+            f"# Random delay {min_delay}ms to {max_delay}ms",
+        ]
 
     def get_device_info(self) -> Dict[str, any]:
         return {
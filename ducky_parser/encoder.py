@@ -13,11 +13,8 @@ License: MIT
 
 from typing import List, Dict, Any, Optional
 from .parser import HappyFrogScript, HappyFrogCommand, CommandType
-
-
-class EncoderError(Exception):
-    """Custom exception for encoding errors."""
-    pass
+from happy_frog_parser.encoder import EncoderError
+from happy_frog_parser.keymaps import DUCKY_KEYMAP
 
 
 class CircuitPythonEncoder:
@@ -307,35 +304,7 @@ class CircuitPythonEncoder:
     
     def _map_key_to_keycode(self, key: str) -> str:
         """Map a key string to its CircuitPython keycode."""
-        key_mappings = {
-            'a': 'Keycode.A', 'b': 'Keycode.B', 'c': 'Keycode.C', 'd': 'Keycode.D',
-            'e': 'Keycode.E', 'f': 'Keycode.F', 'g': 'Keycode.G', 'h': 'Keycode.H',
-            'i': 'Keycode.I', 'j': 'Keycode.J', 'k': 'Keycode.K', 'l': 'Keycode.L',
-            'm': 'Keycode.M', 'n': 'Keycode.N', 'o': 'Keycode.O', 'p': 'Keycode.P',
-            'q': 'Keycode.Q', 'r': 'Keycode.R', 's': 'Keycode.S', 't': 'Keycode.T',
-            'u': 'Keycode.U', 'v': 'Keycode.V', 'w': 'Keycode.W', 'x': 'Keycode.X',
-            'y': 'Keycode.Y', 'z': 'Keycode.Z',
-            '0': 'Keycode.ZERO', '1': 'Keycode.ONE', '2': 'Keycode.TWO', '3': 'Keycode.THREE',
-            '4': 'Keycode.FOUR', '5': 'Keycode.FIVE', '6': 'Keycode.SIX', '7': 'Keycode.SEVEN',
-            '8': 'Keycode.EIGHT', '9': 'Keycode.NINE',
-            'enter': 'Keycode.ENTER', 'space': 'Keycode.SPACE', 'tab': 'Keycode.TAB',
-            'backspace': 'Keycode.BACKSPACE', 'delete': 'Keycode.DELETE',
-            'up': 'Keycode.UP_ARROW', 'down': 'Keycode.DOWN_ARROW',
-            'left': 'Keycode.LEFT_ARROW', 'right': 'Keycode.RIGHT_ARROW',
-            'home': 'Keycode.HOME', 'end': 'Keycode.END', 'insert': 'Keycode.INSERT',
-            'page_up': 'Keycode.PAGE_UP', 'page_down': 'Keycode.PAGE_DOWN',
-            'escape': 'Keycode.ESCAPE', 'esc': 'Keycode.ESCAPE',
-            'f1': 'Keycode.F1', 'f2': 'Keycode.F2', 'f3': 'Keycode.F3', 'f4': 'Keycode.F4',
-            'f5': 'Keycode.F5', 'f6': 'Keycode.F6', 'f7': 'Keycode.F7', 'f8': 'Keycode.F8',
-            'f9': 'Keycode.F9', 'f10': 'Keycode.F10', 'f11': 'Keycode.F11', 'f12': 'Keycode.F12',
-        }
-        
-        key_lower = key.lower()
-        if key_lower in key_mappings:
-            return key_mappings[key_lower]
-        else:
-            # Try to construct the keycode directly
-            return f"Keycode.{key.upper()}"
+        return DUCKY_KEYMAP.keycode(key)
     
     def _encode_key_press(self, command: HappyFrogCommand) -> List[str]:
         """Encode a single key press command."""
@@ -15,15 +15,12 @@ from .parser import (
     HappyFrogParser,
     HappyFrogScript,
     HappyFrogCommand,
+    CommandShape,
     CommandType,
+    Block,
     HappyFrogScriptError
 )
 
-from .encoder import (
-    CircuitPythonEncoder,
-    EncoderError
-)
-
 try:
     from ._version import __version__, __version_tuple__
 except ImportError:
@@ -33,12 +30,33 @@ except ImportError:
 __author__ = "ZeroDumb"
 __license__ = "GNU GPLv3"
 
+# Names loaded on first use, so that importing the package for parsing does
+# not also load the code generators
+_LAZY_IMPORTS = {
+    "CircuitPythonEncoder": ".encoder",
+    "EncoderError": ".encoder",
+}
+
+
+def __getattr__(name):
+    """Import the lazily loaded names (PEP 562)."""
+    module_name = _LAZY_IMPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from importlib import import_module
+    value = getattr(import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
 __all__ = [
     # Parser classes
     "HappyFrogParser",
     "HappyFrogScript", 
     "HappyFrogCommand",
+    "CommandShape",
     "CommandType",
+    "Block",
     "HappyFrogScriptError",
     
     # Encoder classes
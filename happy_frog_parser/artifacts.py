@@ -0,0 +1,303 @@
+"""
+Happy Frog - Build Artifact Cache
+
+This module provides ArtifactCache, an on-disk cache of generated code. An
+entry is named after the SHA-256 of the script source together with
+everything else the code depends on: the source path, the target device,
+the encoder and its version, the parser's grammar and any encoder options. When none of
+these changed, a build copies (or hardlinks) the cached file into place
+instead of parsing and encoding the script again.
+
+Output files whose content is already what the cache holds are left
+alone, so their modification times only change when their code does and
+tools that watch them (rsync, make, a CIRCUITPY drive) see no update.
+
+Like the parse cache, entries are written atomically and several processes
+can share one directory; the least recently used entries are removed once
+the cache grows past its size limit. Recency is recorded in the access
+time of an entry, set explicitly on every hit, so that the modification
+time of a hardlinked output is never touched.
+
+Educational Purpose: Demonstrates incremental builds: content-addressed
+artifacts, skipping unchanged outputs and LRU eviction.
+
+Author: ZeroDumb
+License: GNU GPLv3
+"""
+
+import filecmp
+import hashlib
+import json
+import os
+import shutil
+import time
+from typing import Any, Dict, Optional
+
+from .cache import CACHE_DIR_ENV
+
+
+DEFAULT_MAX_SIZE = 256 * 1024 * 1024  # 256 MiB
+
+_ARTIFACT_SUFFIX = '.out'
+_INFO_SUFFIX = '.json'
+
+
+def default_artifact_dir() -> str:
+    """Return the artifacts folder in HAPPY_FROG_CACHE_DIR or the user cache folder."""
+    directory = os.environ.get(CACHE_DIR_ENV)
+    if directory:
+        return os.path.join(directory, 'artifacts')
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'happy-frog', 'artifacts')
+
+
+def encoder_fingerprint(encoder_class) -> str:
+    """
+    Return a string identifying the code an encoder class generates.
+
+    It covers the class, its encoder_version and the package version.
+    """
+    from . import __version__
+    return (f"{encoder_class.__module__}.{encoder_class.__qualname__}:"
+            f"{getattr(encoder_class, 'encoder_version', 0)}:{__version__}")
+
+
+def _same_content(path: str, other: str) -> bool:
+    """Return True if both files exist and hold the same bytes."""
+    try:
+        if os.path.samefile(path, other):
+            return True
+        return filecmp.cmp(path, other, shallow=False)
+    except OSError:
+        return False
+
+
+class ArtifactCache:
+    """
+    Content-addressed, size-bounded on-disk cache of generated code.
+
+    Each entry is the generated file plus a small JSON record of its build
+    statistics and warnings, so a hit can be reported like a fresh build.
+    I/O problems with the cache directory never fail a build; they are
+    counted as misses.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_size: int = DEFAULT_MAX_SIZE,
+                 hardlink: bool = False):
+        """
+        Initialize the cache.
+
+        Args:
+            directory: Cache directory (created on first write); defaults to
+                default_artifact_dir()
+            max_size: Total size in bytes above which the least recently
+                used entries are evicted
+            hardlink: Hardlink cached files into place instead of copying
+                them (falls back to copying across file systems). Outputs
+                then share their data with the cache, so they must not be
+                edited in place.
+        """
+        self.directory = directory or default_artifact_dir()
+        self.max_size = max_size
+        self.hardlink = hardlink
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Total size as last scanned plus what this process added since
+        self._size: Optional[int] = None
+
+    def key(self, content: bytes, *parts: str) -> str:
+        """
+        Return the cache key for a source built under the given settings.
+
+        Args:
+            content: Source text as bytes
+            parts: Everything else the generated code depends on, e.g. the
+                source path, the device id, encoder_fingerprint() and the
+                grammar fingerprint
+
+        Returns:
+            Hex digest naming the cache entry
+        """
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(str(part).encode('utf-8'))
+            digest.update(b'\0')
+        digest.update(content)
+        return digest.hexdigest()
+
+    def _path(self, key: str, suffix: str = _ARTIFACT_SUFFIX) -> str:
+        return os.path.join(self.directory, key + suffix)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up an artifact.
+
+        Args:
+            key: Cache key from key()
+
+        Returns:
+            The build record stored with the artifact, or None on a miss
+        """
+        path = self._path(key)
+        try:
+            with open(self._path(key, _INFO_SUFFIX), encoding='utf-8') as f:
+                info = json.load(f)
+            # Mark the entry as recently used, keeping its modification time
+            os.utime(path, ns=(time.time_ns(), os.stat(path).st_mtime_ns))
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return info
+
+    def put(self, key: str, code: str, info: Dict[str, Any]) -> bool:
+        """
+        Store an artifact.
+
+        The code is written to a temporary file in the cache directory and
+        renamed into place; the record is written last, so an entry is
+        only found once it is complete.
+
+        Args:
+            key: Cache key from key()
+            code: Generated code, written as the build would write it
+            info: JSON-serializable build record returned by get()
+
+        Returns:
+            True if the entry was stored
+        """
+        written = 0
+        for suffix, text in ((_ARTIFACT_SUFFIX, code), (_INFO_SUFFIX, json.dumps(info))):
+            temp_path = None
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                temp_path = self._path(f".{key}.{os.urandom(4).hex()}", '.tmp')
+                # Created like open() would, as hardlinked outputs share the permissions
+                fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+                with open(fd, 'w', encoding='utf-8') as f:
+                    f.write(text)
+                written += os.path.getsize(temp_path)
+                os.replace(temp_path, self._path(key, suffix))
+                temp_path = None
+            except OSError:
+                # An unwritable cache only costs the speedup
+                return False
+            finally:
+                if temp_path is not None:
+                    self._discard(temp_path)
+
+        if self._size is not None:
+            self._size += written
+        self._evict()
+        return True
+
+    def install(self, key: str, output_file: str) -> bool:
+        """
+        Put a cached artifact at output_file.
+
+        Args:
+            key: Cache key of an entry found with get()
+            output_file: Where the generated code belongs
+
+        Returns:
+            True if output_file was written, False if it already held the
+            same code and was left untouched
+
+        Raises:
+            OSError: The entry has gone (e.g. evicted by another process)
+                or output_file could not be written
+        """
+        path = self._path(key)
+        if _same_content(path, output_file):
+            return False
+
+        directory, name = os.path.split(os.path.abspath(output_file))
+        temp_path = os.path.join(directory, f".{name}.{os.urandom(4).hex()}.tmp")
+        try:
+            if self.hardlink:
+                try:
+                    os.link(path, temp_path)
+                except OSError:
+                    shutil.copyfile(path, temp_path)
+            else:
+                shutil.copyfile(path, temp_path)
+            os.replace(temp_path, output_file)
+        except BaseException:
+            self._discard(temp_path)
+            raise
+        return True
+
+    def _entries(self) -> list:
+        """Return (last use, size, key) for every cache entry."""
+        entries = []
+        try:
+            with os.scandir(self.directory) as scan:
+                for entry in scan:
+                    if not entry.name.endswith(_ARTIFACT_SUFFIX):
+                        continue
+                    key = entry.name[:-len(_ARTIFACT_SUFFIX)]
+                    try:
+                        stat = entry.stat()
+                        size = stat.st_size + os.path.getsize(self._path(key, _INFO_SUFFIX))
+                    except OSError:
+                        # Removed by another process meanwhile, or incomplete
+                        continue
+                    entries.append((stat.st_atime, size, key))
+        except OSError:
+            pass
+        return entries
+
+    def _evict(self) -> None:
+        """Remove least recently used entries until the cache fits in max_size."""
+        # The directory is only scanned again once this process has added
+        # enough to possibly go over the limit
+        if self._size is not None and self._size <= self.max_size:
+            return
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+
+        for _, size, key in sorted(entries):
+            if total <= self.max_size:
+                break
+            # The record goes first so that the entry stops being found
+            self._discard(self._path(key, _INFO_SUFFIX))
+            if self._discard(self._path(key)):
+                self.evictions += 1
+            total -= size
+        self._size = total
+
+    def _discard(self, path: str) -> bool:
+        """Delete a file, ignoring files that are already gone or in use."""
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+    def clear(self) -> None:
+        """Remove every cache entry."""
+        for _, _, key in self._entries():
+            self._discard(self._path(key, _INFO_SUFFIX))
+            self._discard(self._path(key))
+        self._size = None
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return the hit/miss counters and the current size of the cache.
+
+        Returns:
+            Dictionary with hits, misses, evictions, hit_rate, entries and
+            size_bytes
+        """
+        entries = self._entries()
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': len(entries),
+            'size_bytes': sum(size for _, size, _ in entries),
+        }
@@ -0,0 +1,247 @@
+"""
+Happy Frog - Zero-Copy Buffer Parsing
+
+This module parses a script straight from a bytes-like object - bytes, a
+memoryview or an mmap of the file - instead of decoding it to one big
+string and splitting it into line strings first.
+
+One pass over the buffer builds a compact line-offset index (the start of
+every line) and lexes each line in place. STRING commands, which carry most
+of the text in typical payloads, are recognized on the raw bytes and stored
+as (offset, length) slices of the buffer; their raw text and parameter only
+become strings when a command is read. Other lines are short and repeat a
+lot, so they are decoded and go through the parser's shape cache as usual.
+
+The result is exactly what parse_file returns for the same file, except
+that the commands are created as they are accessed (like a .hfb script).
+
+Educational Purpose: Demonstrates zero-copy I/O, line indexes and lazy
+materialization of parse results.
+
+Author: ZeroDumb
+License: GNU GPLv3
+"""
+
+import codecs
+import re
+from array import array
+from typing import List, Optional
+
+from .parser import (
+    BlockChecker, CommandShape, CommandType, HappyFrogCommand, HappyFrogParser,
+    HappyFrogScript, HappyFrogScriptError
+)
+from .hfb import CommandList
+
+
+# ASCII characters str.strip() and the \s regex class treat as whitespace,
+# apart from the line breaks themselves
+_WHITESPACE = b' \t\x0b\x0c\x1c\x1d\x1e\x1f'
+
+# UTF-8 encodings of the non-ASCII whitespace characters; text that starts
+# or ends with one of them needs str.strip() to be split exactly
+_UNICODE_WHITESPACE = tuple(
+    chr(code).encode('utf-8') for code in range(0x80, 0x3001) if chr(code).isspace()
+)
+
+# Line breaks as recognized when reading a file in text mode
+_LINE_BREAK = re.compile(rb'\r\n|\r|\n')
+
+# Leading whitespace, then optionally the STRING keyword and its separator
+_LINE_START = re.compile(rb'[ \t\x0b\x0c\x1c-\x1f]*(?:(STRING)[ \t\x0b\x0c\x1c-\x1f]+)?', re.IGNORECASE)
+
+# The grammar the STRING fast path reproduces
+_STRING_PATTERN = r'^STRING\s+(.+)$'
+
+# Size of the pieces non-ASCII input is validated in
+_VALIDATE_CHUNK = 1 << 20
+
+
+def _check_utf8(data) -> None:
+    """Raise UnicodeDecodeError unless the buffer is valid UTF-8 (without decoding it whole)."""
+    view = memoryview(data).cast('B')
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    for start in range(0, len(view), _VALIDATE_CHUNK):
+        chunk = view[start:start + _VALIDATE_CHUNK].tobytes()
+        if not chunk.isascii():
+            decoder.decode(chunk)
+        elif decoder.getstate()[0]:
+            # A multi-byte sequence cut short by ASCII
+            decoder.decode(chunk)
+    decoder.decode(b'', final=True)
+
+
+class BufferCommands:
+    """
+    Commands lexed from a buffer, decoded as they are accessed.
+
+    Provides the shape table and columns that hfb.CommandList reads. Shape
+    table entries for STRING commands hold no shape until first use, only
+    the offsets of their text in the buffer.
+    """
+
+    def __init__(self, data):
+        """
+        Args:
+            data: The buffer the commands were lexed from (kept alive)
+        """
+        self.data = data
+        self._shapes: List[Optional[CommandShape]] = []
+        # For STRING entries: start and end of the raw text, and start of
+        # the parameter; unused (0) for shapes that were lexed up front
+        self.spans = array('Q')
+        self.shape_ids = array('I')
+        self.line_numbers = array('I')
+        # Offset of the first byte of every source line
+        self.line_offsets = array('Q')
+
+    def __len__(self) -> int:
+        return len(self.shape_ids)
+
+    def shape(self, shape_id: int) -> CommandShape:
+        """Return the CommandShape of a shape table entry, decoding it on first use."""
+        shape = self._shapes[shape_id]
+        if shape is None:
+            start, end, parameter_start = self.spans[3 * shape_id:3 * shape_id + 3]
+            raw_text = bytes(self.data[start:end]).decode('utf-8')
+            # The keyword and separator before the parameter are ASCII, so
+            # byte and character offsets agree
+            shape = self._shapes[shape_id] = CommandShape(
+                CommandType.STRING, raw_text, [raw_text[parameter_start - start:]]
+            )
+        return shape
+
+    def command(self, index: int) -> HappyFrogCommand:
+        """Return the command at the given position."""
+        return HappyFrogCommand.from_shape(
+            self.shape(self.shape_ids[index]), self.line_numbers[index]
+        )
+
+    def source_line(self, line_number: int) -> str:
+        """Return the text of a source line (1-based), without its line break."""
+        offsets = self.line_offsets
+        start = offsets[line_number - 1]
+        if line_number < len(offsets):
+            end = offsets[line_number]
+            if self.data[end - 1:end] == b'\n':
+                end -= 1
+            if self.data[end - 1:end] == b'\r':
+                end -= 1
+        else:
+            end = len(self.data)
+        return bytes(self.data[start:end]).decode('utf-8')
+
+
+def _string_fast_path(parser: HappyFrogParser) -> bool:
+    """Return True if the parser lexes STRING lines with the standard grammar."""
+    candidates = parser.keyword_table.get('STRING', ())
+    if len(candidates) != 1:
+        return False
+    command_type, matcher, groups = candidates[0]
+    return (command_type is CommandType.STRING and groups == (1,) and
+            getattr(matcher, 'pattern', None) == _STRING_PATTERN and
+            bool(getattr(matcher, 'flags', 0) & re.IGNORECASE))
+
+
+def parse_buffer(parser: HappyFrogParser, data, source_name: str = "<bytes>") -> HappyFrogScript:
+    """
+    Parse a script from a bytes-like object without copying its text.
+
+    Args:
+        parser: Parser whose grammar is used
+        data: bytes, memoryview or mmap holding UTF-8 script text; it must
+            stay open while the commands are used
+        source_name: Name of the source (for error reporting)
+
+    Returns:
+        HappyFrogScript whose commands are a lazy CommandList over a
+        BufferCommands (with the line-offset index in
+        ``script.commands.source.line_offsets``)
+
+    Raises:
+        HappyFrogScriptError: If the buffer is not UTF-8 or a line cannot
+            be parsed (the same line-level errors as parse_file)
+    """
+    try:
+        _check_utf8(data)
+    except UnicodeDecodeError as e:
+        raise HappyFrogScriptError(f"Error reading {source_name}: {str(e)}")
+
+    commands = BufferCommands(data)
+    shapes = commands._shapes
+    spans = commands.spans
+    shape_ids = commands.shape_ids
+    line_numbers = commands.line_numbers
+    line_offsets = commands.line_offsets
+    shape_index = {}
+    blocks = BlockChecker()
+    fast_strings = _string_fast_path(parser)
+    line_shape = parser._line_shape
+    line_start = _LINE_START.match
+
+    line_number = 0
+    start = 0
+    size = len(data)
+    breaks = _LINE_BREAK.finditer(data)
+    while start is not None:
+        line_number += 1
+        line_offsets.append(start)
+        line_break = next(breaks, None)
+        if line_break is None:
+            end, next_start = size, None
+        else:
+            end, next_start = line_break.span()
+
+        # Strip ASCII whitespace in place; non-ASCII edges are left to
+        # str.strip() below, which knows all Unicode whitespace
+        lead = line_start(data, start, end)
+        content_start = lead.start(1) if lead.group(1) else lead.end()
+        content_end = end
+        while content_end > content_start and data[content_end - 1] in _WHITESPACE:
+            content_end -= 1
+
+        if content_start < content_end:
+            parameter_start = lead.end()
+            if (fast_strings and lead.group(1) and parameter_start < content_end and
+                    (data[parameter_start] < 0x80 or not
+                     data[parameter_start:parameter_start + 3].startswith(_UNICODE_WHITESPACE)) and
+                    (data[content_end - 1] < 0x80 or not
+                     data[content_end - 3:content_end].endswith(_UNICODE_WHITESPACE))):
+                # STRING <text>: keep offsets, decode on first access
+                shape_id = len(shapes)
+                shapes.append(None)
+                spans.extend((content_start, content_end, parameter_start))
+                shape_ids.append(shape_id)
+                line_numbers.append(line_number)
+            else:
+                line = bytes(data[start:end]).decode('utf-8').strip()
+                if line:
+                    try:
+                        shape = line_shape(line)
+                        role = shape.block_role
+                        if role is not None:
+                            blocks.feed(role, line_number)
+                    except HappyFrogScriptError as e:
+                        raise HappyFrogScriptError(
+                            f"Error in {source_name}, line {line_number}: {str(e)}"
+                        )
+                    shape_id = shape_index.get(id(shape))
+                    if shape_id is None:
+                        shape_id = shape_index[id(shape)] = len(shapes)
+                        shapes.append(shape)
+                        spans.extend((0, 0, 0))
+                    shape_ids.append(shape_id)
+                    line_numbers.append(line_number)
+
+        start = next_start
+
+    unclosed = blocks.unclosed()
+    if unclosed:
+        message, opened_on = unclosed
+        raise HappyFrogScriptError(f"Error in {source_name}, line {opened_on}: {message}")
+
+    return HappyFrogScript(commands=CommandList(commands), metadata={
+        'source': source_name,
+        'total_commands': len(commands),
+        'total_lines': line_number,
+    })
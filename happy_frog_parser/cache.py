@@ -0,0 +1,231 @@
+"""
+Happy Frog - Persistent Parse Cache
+
+This module provides ParseCache, an on-disk cache of parse results that
+HappyFrogParser consults when one is passed to it. Entries are compiled
+scripts (.hfb files) named after the SHA-256 of the source text plus the
+parser's grammar fingerprint, so an edited script or a changed grammar can
+never return a stale result.
+
+A cache hit costs one hash of the source and one read of the cached file;
+commands are only decoded as they are used. Entries are written
+atomically (temporary file + rename), so several processes can share a
+cache directory, and the least recently used entries are removed once the
+cache grows past its size limit.
+
+Educational Purpose: Demonstrates content-addressed storage, atomic file
+updates and LRU eviction - the building blocks of build caches.
+
+Author: ZeroDumb
+License: GNU GPLv3
+"""
+
+import hashlib
+import os
+import tempfile
+from typing import Dict, Any, Optional
+
+from .parser import HappyFrogScript, HappyFrogScriptError
+from .hfb import dumps_hfb, loads_hfb, FORMAT_VERSION
+
+
+# Environment variable that enables the cache for the command line tool
+CACHE_DIR_ENV = 'HAPPY_FROG_CACHE_DIR'
+
+DEFAULT_MAX_SIZE = 64 * 1024 * 1024  # 64 MiB
+
+_ENTRY_SUFFIX = '.hfb'
+
+
+def default_cache_dir() -> str:
+    """Return the cache directory from HAPPY_FROG_CACHE_DIR or the user cache folder."""
+    directory = os.environ.get(CACHE_DIR_ENV)
+    if directory:
+        return directory
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'happy-frog', 'parse')
+
+
+class ParseCache:
+    """
+    Content-addressed, size-bounded on-disk cache of parsed scripts.
+
+    Pass one to HappyFrogParser(cache=...) to make parse_file and
+    parse_string reuse earlier results. I/O problems with the cache
+    directory never fail a parse; they are counted as misses.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_size: int = DEFAULT_MAX_SIZE):
+        """
+        Initialize the cache.
+
+        Args:
+            directory: Cache directory (created on first write); defaults to
+                default_cache_dir()
+            max_size: Total size in bytes above which the least recently
+                used entries are evicted
+        """
+        self.directory = directory or default_cache_dir()
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Total size as last scanned plus what this process added since
+        self._size: Optional[int] = None
+
+    def key(self, content: bytes, grammar_fingerprint: str, line_breaks: str = 'universal') -> str:
+        """
+        Return the cache key for source text parsed with a given grammar.
+
+        Args:
+            content: Source text as bytes
+            grammar_fingerprint: HappyFrogParser.grammar_fingerprint()
+            line_breaks: How the text is split into lines: 'universal'
+                (\n, \r\n and \r, as parse_file reads files) or 'lf' (\n
+                only, as parse_string splits strings); the same bytes can
+                parse differently under each
+
+        Returns:
+            Hex digest naming the cache entry
+        """
+        digest = hashlib.sha256()
+        digest.update(f"{grammar_fingerprint}:hfb{FORMAT_VERSION}:{line_breaks}\0".encode('ascii'))
+        digest.update(content)
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + _ENTRY_SUFFIX)
+
+    def get(self, key: str) -> Optional[HappyFrogScript]:
+        """
+        Look up a parse result.
+
+        Args:
+            key: Cache key from key()
+
+        Returns:
+            The cached HappyFrogScript (its commands are decoded lazily
+            from the entry's contents), or None on a miss
+        """
+        path = self._path(key)
+        try:
+            # Read rather than memory-mapped, so no mapping or file handle
+            # outlives the call and the entry can be replaced or evicted
+            with open(path, 'rb') as f:
+                compiled = loads_hfb(f.read(), path)
+        except HappyFrogScriptError:
+            # Left over from an incompatible version
+            self._discard(path)
+            self.misses += 1
+            return None
+        except OSError:
+            self.misses += 1
+            return None
+
+        # Mark the entry as recently used for LRU eviction
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        self.hits += 1
+        return HappyFrogScript(commands=compiled.commands, metadata=dict(compiled.metadata))
+
+    def put(self, key: str, script: HappyFrogScript) -> None:
+        """
+        Store a parse result.
+
+        The entry is written to a temporary file in the cache directory and
+        renamed into place, so concurrent readers never see partial entries.
+
+        Args:
+            key: Cache key from key()
+            script: Parsed script to store
+        """
+        data = dumps_hfb(script)
+        temp_path = None
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, self._path(key))
+            temp_path = None
+            if self._size is not None:
+                self._size += len(data)
+        except OSError:
+            # An unwritable cache only costs the speedup
+            return
+        finally:
+            if temp_path is not None:
+                self._discard(temp_path)
+
+        self._evict()
+
+    def _entries(self) -> list:
+        """Return (mtime, size, path) for every cache entry."""
+        entries = []
+        try:
+            with os.scandir(self.directory) as scan:
+                for entry in scan:
+                    if not entry.name.endswith(_ENTRY_SUFFIX):
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        # Removed by another process meanwhile
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        except OSError:
+            pass
+        return entries
+
+    def _evict(self) -> None:
+        """Remove least recently used entries until the cache fits in max_size."""
+        # The directory is only scanned again once this process has added
+        # enough to possibly go over the limit
+        if self._size is not None and self._size <= self.max_size:
+            return
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+
+        for _, size, path in sorted(entries):
+            if total <= self.max_size:
+                break
+            if self._discard(path):
+                self.evictions += 1
+            total -= size
+        self._size = total
+
+    def _discard(self, path: str) -> bool:
+        """Delete a file, ignoring files that are already gone or in use."""
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+    def clear(self) -> None:
+        """Remove every cache entry."""
+        for _, _, path in self._entries():
+            self._discard(path)
+        self._size = None
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return the hit/miss counters and the current size of the cache.
+
+        Returns:
+            Dictionary with hits, misses, evictions, hit_rate, entries and
+            size_bytes
+        """
+        entries = self._entries()
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': len(entries),
+            'size_bytes': sum(size for _, size, _ in entries),
+        }
@@ -0,0 +1,450 @@
+"""
+Happy Frog - Columnar Script Representation
+
+This module provides ScriptArray, a column-oriented form of a parsed
+HappyFrogScript. Instead of one Python object per command it keeps a few
+flat arrays (opcodes, numeric arguments, line numbers) plus a string pool,
+so statistics over large scripts run as vectorized NumPy operations.
+
+NumPy is optional: without it the columns are plain ``array.array`` objects
+and every operation falls back to a simple Python loop with the same results.
+
+ScriptArray.from_string() parses text straight into columns and
+MappedScript.to_array() reads them from a .hfb file without copying.
+Converting an already parsed script with from_script() costs more than a
+single pass of statistics over its objects, so it pays off when the columns
+are used repeatedly or saved.
+
+Educational Purpose: Demonstrates struct-of-arrays data layout, string
+pooling and vectorized computation - the techniques behind columnar databases
+and data-frame libraries.
+
+Author: ZeroDumb
+License: GNU GPLv3
+"""
+
+from array import array
+from itertools import accumulate, chain, count
+from operator import attrgetter
+from typing import List, Dict, Any, Optional, Tuple
+
+from .parser import CommandType, CommandShape, HappyFrogCommand, HappyFrogParser, HappyFrogScript
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+
+# Opcode of each command type is its position in this tuple
+COMMAND_TYPES: Tuple[CommandType, ...] = tuple(CommandType)
+OPCODES: Dict[CommandType, int] = {
+    command_type: opcode for opcode, command_type in enumerate(COMMAND_TYPES)
+}
+
+# Value of the numeric argument columns for commands without such an argument,
+# or whose argument is not an integer that fits in 64 bits. The statistics
+# read integers too large for the column back from the command's text.
+MISSING = -(2 ** 63)
+
+INT64_MAX = 2 ** 63 - 1
+
+# Threshold used by HappyFrogParser.validate_script for suspicious delays
+LONG_DELAY_MS = 60000
+
+
+def _to_number(args: tuple, index: int) -> int:
+    """Return a numeric argument converted by the parser (CommandShape.args), or MISSING."""
+    value = args[index] if index < len(args) else None
+    return value if value is not None and MISSING < value <= INT64_MAX else MISSING
+
+
+def _view(column: array):
+    """Return a zero-copy NumPy view of a column, or the column itself without NumPy."""
+    if np is None:
+        return column
+    # Columns are array.array objects, or memoryviews of a mapped .hfb file
+    dtype = getattr(column, 'typecode', None) or column.format
+    if not len(column):
+        return np.zeros(0, dtype=dtype)
+    return np.frombuffer(column, dtype=dtype)
+
+
+class ScriptArray:
+    """
+    Column-oriented form of a HappyFrogScript.
+
+    Per-command columns (all of the same length):
+
+    - ``opcodes``: CommandType ordinals, see COMMAND_TYPES
+    - ``line_numbers``: source line of each command
+    - ``arg0`` / ``arg1``: first and second numeric argument (MISSING if none,
+      or if it does not fit in 64 bits)
+    - ``shape_ids``: index into the shape table below
+
+    Commands with the same text share a shape (see CommandShape), described
+    by ``shape_opcodes``, ``shape_raw`` (string pool index of the raw text)
+    and ``shape_params`` / ``shape_param_offsets`` (the string pool indices of
+    its parameters, in compressed sparse row layout). Every distinct string
+    is stored once in ``strings``.
+
+    Column properties return NumPy arrays when NumPy is installed and
+    ``array.array`` objects otherwise.
+    """
+
+    def __init__(self, opcodes: array, line_numbers: array, arg0: array, arg1: array,
+                 shape_ids: array, shape_opcodes: array, shape_raw: array,
+                 shape_param_offsets: array, shape_params: array, strings: List[str],
+                 metadata: Optional[Dict[str, Any]] = None):
+        """
+        Initialize a ScriptArray from its columns.
+
+        Use ScriptArray.from_script() to build one from a parsed script.
+        """
+        self._opcodes = opcodes
+        self._line_numbers = line_numbers
+        self._arg0 = arg0
+        self._arg1 = arg1
+        self._shape_ids = shape_ids
+        self._shape_opcodes = shape_opcodes
+        self._shape_raw = shape_raw
+        self._shape_param_offsets = shape_param_offsets
+        self._shape_params = shape_params
+        self.strings = strings
+        self.metadata = metadata if metadata is not None else {}
+
+    @classmethod
+    def from_script(cls, script: HappyFrogScript) -> 'ScriptArray':
+        """
+        Build the columnar form of a parsed script.
+
+        Work that depends only on a command's text (opcode lookup, numeric
+        conversion, string pooling) is done once per distinct CommandShape,
+        and every pass over the commands runs in C (map, zip, dict and
+        array constructors) rather than in a Python loop.
+
+        Args:
+            script: Parsed HappyFrogScript object
+
+        Returns:
+            ScriptArray holding the same commands
+        """
+        commands = script.commands
+        return cls._from_shapes(list(map(attrgetter('_shape'), commands)),
+                                array('I', map(attrgetter('line_number'), commands)),
+                                dict(script.metadata))
+
+    @classmethod
+    def from_string(cls, content: str, parser: Optional[HappyFrogParser] = None,
+                    source_name: str = "<string>") -> 'ScriptArray':
+        """
+        Parse script text straight into the columnar form.
+
+        Gives the same result as ``from_script(parser.parse_string(content))``
+        but keeps no object per command: each command is dropped as soon as
+        its shape and line number are recorded, so there is no script to
+        convert afterwards.
+
+        Args:
+            content: String containing Happy Frog Script commands
+            parser: HappyFrogParser to use; a plain parser if not given
+            source_name: Name of the source (for error reporting)
+
+        Returns:
+            ScriptArray holding the parsed commands
+
+        Raises:
+            HappyFrogScriptError: If a line cannot be parsed
+        """
+        if parser is None:
+            parser = HappyFrogParser()
+        metadata: Dict[str, Any] = {}
+        shapes = []
+        line_numbers = array('I')
+        for command in parser._iter_parse(content.split('\n'), source_name, metadata):
+            shapes.append(command._shape)
+            line_numbers.append(command.line_number)
+        return cls._from_shapes(shapes, line_numbers, metadata)
+
+    @classmethod
+    def _from_shapes(cls, shapes: List[CommandShape], line_numbers: array,
+                     metadata: Dict[str, Any]) -> 'ScriptArray':
+        """Build a ScriptArray from the shape and line number of every command."""
+        # Number the distinct shapes in order of first use; the list keeps
+        # them alive while we build, so their ids are stable
+        ids = list(map(id, shapes))
+        unique = dict(zip(ids, shapes))
+        unique_shapes = list(unique.values())
+        raw_texts = list(map(attrgetter('raw_text'), unique_shapes))
+
+        # Free text is not pooled (see CommandShape.intern), so equal shapes
+        # can be separate objects; those share one entry of the shape table
+        by_text = dict(zip(raw_texts, unique_shapes))
+        if len(by_text) < len(unique_shapes):
+            entries = [
+                other if shape is other or shape == other else shape
+                for shape, other in zip(unique_shapes, map(by_text.__getitem__, raw_texts))
+            ]
+            entry_ids = list(map(id, entries))
+            unique_entries = dict(zip(entry_ids, entries))
+            entry_index = dict(zip(unique_entries, count()))
+            shape_index = dict(zip(unique, map(entry_index.__getitem__, entry_ids)))
+            unique_shapes = list(unique_entries.values())
+            raw_texts = list(map(attrgetter('raw_text'), unique_shapes))
+        else:
+            shape_index = dict(zip(unique, count()))
+
+        # Every distinct string is pooled once
+        parameters = list(map(attrgetter('parameters'), unique_shapes))
+        string_ids = dict(zip(dict.fromkeys(chain(raw_texts, chain.from_iterable(parameters))), count()))
+
+        shape_opcodes = array('B', map(OPCODES.__getitem__, map(attrgetter('command_type'), unique_shapes)))
+        shape_raw = array('I', map(string_ids.__getitem__, raw_texts))
+        shape_params = array('I', map(string_ids.__getitem__, chain.from_iterable(parameters)))
+        shape_param_offsets = array('I', chain((0,), accumulate(map(len, parameters))))
+
+        # Numeric arguments were converted by the parser (CommandShape.args)
+        shape_arg0 = array('q', [MISSING]) * len(unique_shapes)
+        shape_arg1 = array('q', [MISSING]) * len(unique_shapes)
+        for shape_id, args in enumerate(map(attrgetter('args'), unique_shapes)):
+            if args is not None:
+                shape_arg0[shape_id] = _to_number(args, 0)
+                shape_arg1[shape_id] = _to_number(args, 1)
+
+        # Expand the per-shape values to per-command columns
+        shape_ids = array('I', map(shape_index.__getitem__, ids))
+        opcodes = array('B', map(shape_opcodes.__getitem__, shape_ids))
+        arg0 = array('q', map(shape_arg0.__getitem__, shape_ids))
+        arg1 = array('q', map(shape_arg1.__getitem__, shape_ids))
+
+        return cls(opcodes, line_numbers, arg0, arg1, shape_ids, shape_opcodes,
+                   shape_raw, shape_param_offsets, shape_params, list(string_ids),
+                   metadata)
+
+    def to_script(self) -> HappyFrogScript:
+        """
+        Convert back to the object form.
+
+        Each shape is rebuilt once and shared by its commands, so this costs
+        one small object per command.
+
+        Returns:
+            HappyFrogScript equal to the one this array was built from
+        """
+        shapes = self.shapes()
+        commands = list(map(HappyFrogCommand.from_shape,
+                            map(shapes.__getitem__, self._shape_ids),
+                            self._line_numbers))
+        return HappyFrogScript(commands=commands, metadata=dict(self.metadata))
+
+    def shapes(self) -> List[CommandShape]:
+        """Return a CommandShape for each entry of the shape table."""
+        strings = self.strings
+        offsets = self._shape_param_offsets
+        params = self._shape_params
+        return [
+            CommandShape(
+                COMMAND_TYPES[opcode],
+                strings[raw],
+                list(map(strings.__getitem__, params[start:end])),
+            )
+            for opcode, raw, start, end in zip(self._shape_opcodes, self._shape_raw, offsets, offsets[1:])
+        ]
+
+    def __len__(self) -> int:
+        return len(self._opcodes)
+
+    # Column access
+
+    @property
+    def opcodes(self):
+        """CommandType ordinals, one per command."""
+        return _view(self._opcodes)
+
+    @property
+    def line_numbers(self):
+        """Source line number of each command."""
+        return _view(self._line_numbers)
+
+    @property
+    def arg0(self):
+        """First numeric argument of each command (MISSING if none or too large)."""
+        return _view(self._arg0)
+
+    @property
+    def arg1(self):
+        """Second numeric argument of each command (MISSING if none or too large)."""
+        return _view(self._arg1)
+
+    @property
+    def shape_ids(self):
+        """Shape table index of each command."""
+        return _view(self._shape_ids)
+
+    @property
+    def shape_opcodes(self):
+        """CommandType ordinal of each shape."""
+        return _view(self._shape_opcodes)
+
+    @property
+    def shape_raw(self):
+        """String pool index of each shape's raw text."""
+        return _view(self._shape_raw)
+
+    @property
+    def shape_param_offsets(self):
+        """Start of each shape's parameters in shape_params (plus the end)."""
+        return _view(self._shape_param_offsets)
+
+    @property
+    def shape_params(self):
+        """String pool indices of all shape parameters."""
+        return _view(self._shape_params)
+
+    # Aggregates and validation
+
+    def command_counts(self) -> Dict[CommandType, int]:
+        """
+        Count the commands of each type.
+
+        Returns:
+            Dictionary mapping each CommandType present to its count
+        """
+        if np is not None:
+            counts = np.bincount(self.opcodes, minlength=len(COMMAND_TYPES))
+        else:
+            counts = [0] * len(COMMAND_TYPES)
+            for opcode in self._opcodes:
+                counts[opcode] += 1
+
+        return {
+            COMMAND_TYPES[opcode]: int(count)
+            for opcode, count in enumerate(counts) if count
+        }
+
+    def lines_of(self, command_type: CommandType) -> List[int]:
+        """Return the line numbers of all commands of the given type."""
+        opcode = OPCODES[command_type]
+        if np is not None:
+            return self.line_numbers[self.opcodes == opcode].tolist()
+        return [
+            line_number
+            for current, line_number in zip(self._opcodes, self._line_numbers)
+            if current == opcode
+        ]
+
+    def total_delay(self) -> int:
+        """
+        Sum of all explicit DELAY times in milliseconds.
+
+        Delays that are negative or not integers are ignored, as the encoders
+        reject them.
+        """
+        opcode = OPCODES[CommandType.DELAY]
+        if np is not None:
+            delays = self.arg0[(self.opcodes == opcode) & (self.arg0 >= 0)]
+            if len(delays) and int(delays.max()) > INT64_MAX // len(delays):
+                # The int64 sum could wrap around; add as Python ints instead
+                total = sum(delays.tolist())
+            else:
+                total = int(delays.sum())
+        else:
+            total = sum(
+                delay for current, delay in zip(self._opcodes, self._arg0)
+                if current == opcode and delay >= 0
+            )
+        return total + sum(delay for delay in self._wide_delays().values() if delay >= 0)
+
+    def long_delays(self, threshold_ms: int = LONG_DELAY_MS) -> List[Tuple[int, int]]:
+        """
+        Find DELAY commands longer than a threshold.
+
+        Args:
+            threshold_ms: Delays strictly above this are reported
+
+        Returns:
+            List of (line number, delay in ms) tuples in script order
+        """
+        opcode = OPCODES[CommandType.DELAY]
+        if np is not None:
+            # MISSING is the smallest int64, so it never passes the threshold
+            rows = np.flatnonzero((self.opcodes == opcode) & (self.arg0 > threshold_ms))
+            found = list(zip(self.line_numbers[rows].tolist(), self.arg0[rows].tolist()))
+        else:
+            found = [
+                (line_number, delay)
+                for current, line_number, delay in zip(self._opcodes, self._line_numbers, self._arg0)
+                if current == opcode and delay > threshold_ms
+            ]
+        wide = [
+            (self._line_numbers[row], delay)
+            for row, delay in self._wide_delays().items() if delay > threshold_ms
+        ]
+        if wide:
+            # Commands are in line order
+            found = sorted(found + wide)
+        return found
+
+    def _wide_delays(self) -> Dict[int, int]:
+        """
+        Find DELAY commands whose integer value does not fit in the arg0 column.
+
+        Such values are stored as MISSING, like arguments that are not
+        integers at all; their exact value is converted again from the
+        shape's parameter text, once per shape.
+
+        Returns:
+            Dictionary mapping row to delay in ms
+        """
+        opcode = OPCODES[CommandType.DELAY]
+        if np is not None:
+            rows = np.flatnonzero((self.opcodes == opcode) & (self.arg0 == MISSING)).tolist()
+        else:
+            rows = [
+                row for row, (current, delay) in enumerate(zip(self._opcodes, self._arg0))
+                if current == opcode and delay == MISSING
+            ]
+
+        delays = {}
+        shape_delays: Dict[int, Optional[int]] = {}
+        for row in rows:
+            shape_id = self._shape_ids[row]
+            if shape_id not in shape_delays:
+                shape_delays[shape_id] = self._int_parameter(shape_id)
+            if shape_delays[shape_id] is not None:
+                delays[row] = shape_delays[shape_id]
+        return delays
+
+    def _int_parameter(self, shape_id: int) -> Optional[int]:
+        """Convert a shape's first parameter with int() as the parser does, or return None."""
+        start = self._shape_param_offsets[shape_id]
+        if start == self._shape_param_offsets[shape_id + 1]:
+            return None
+        try:
+            return int(self.strings[self._shape_params[start]])
+        except ValueError:
+            return None
+
+    def validate(self) -> List[str]:
+        """
+        Validate the script for common issues.
+
+        Produces the same warnings as HappyFrogParser.validate_script.
+
+        Returns:
+            List of warning messages (empty if no issues)
+        """
+        warnings = []
+
+        if not len(self):
+            warnings.append("Script contains no commands")
+
+        for line_number, delay_ms in self.long_delays():
+            warnings.append(
+                f"Line {line_number}: Very long delay ({delay_ms}ms) - "
+                "this might be an error"
+            )
+
+        return warnings
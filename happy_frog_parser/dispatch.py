@@ -0,0 +1,81 @@
+"""
+Happy Frog - Encoder Dispatch
+
+This module provides the base class shared by the CircuitPython encoder, the
+keystroke lowering and the device encoders. Each class gets a table that maps
+a CommandType (or, for the device encoders, an EventType) to the method
+handling it. The table is built once, when the class is
+created, so encoding a command is a single dictionary lookup instead of a
+long if/elif chain.
+
+Educational Purpose: This demonstrates table-driven dispatch, decorators that
+register methods, and building per-class data with __init_subclass__.
+
+Author: ZeroDumb
+License: GNU GPLv3
+"""
+
+from typing import Callable, Dict, Hashable, List
+from .parser import HappyFrogCommand
+
+
+def handles(*command_types: Hashable) -> Callable:
+    """
+    Register an encoder method as the handler for the given command types
+    (or event types).
+
+    Example:
+        @handles(CommandType.DELAY)
+        def _encode_delay(self, command):
+            ...
+    """
+    def register(method: Callable) -> Callable:
+        method._handles = command_types
+        return method
+    return register
+
+
+class EncoderBase:
+    """
+    Base class for encoders that turn one command into lines of code.
+
+    Subclasses mark their handlers with @handles. Handlers are inherited, and
+    a subclass can replace one either by registering another method for the
+    same command type or by overriding the method under the same name.
+    Command types without a handler go to encode_default().
+    """
+
+    # CommandType (or EventType) -> handler function, built for each subclass
+    _handlers: Dict[Hashable, Callable] = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        names = {}
+        # Walk from the base classes down so that subclasses win
+        for klass in reversed(cls.__mro__):
+            for name, attribute in vars(klass).items():
+                for command_type in getattr(attribute, '_handles', ()):
+                    names[command_type] = name
+        # Look the names up on cls so that plain overrides are used as well
+        cls._handlers = {command_type: getattr(cls, name) for command_type, name in names.items()}
+
+    @classmethod
+    def handled_commands(cls) -> List[Hashable]:
+        """Get the command (or event) types that have a handler in this class."""
+        return list(cls._handlers)
+
+    def dispatch(self, command: HappyFrogCommand, *args) -> List[str]:
+        """
+        Encode a command with the handler registered for its type.
+
+        Extra arguments, such as the CircuitPython encoder's context, are
+        passed on to the handler.
+        """
+        handler = self._handlers.get(command.command_type)
+        if handler is None:
+            return self.encode_default(command, *args)
+        return handler(self, command, *args)
+
+    def encode_default(self, command: HappyFrogCommand, *args) -> List[str]:
+        """Encode a command that has no registered handler."""
+        raise NotImplementedError(f"No handler for {command.command_type.value}")
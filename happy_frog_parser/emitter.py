@@ -0,0 +1,98 @@
+"""
+Happy Frog - Code Emitter
+
+This module provides the emitter the encoders write generated code through.
+Lines go to a text stream (an open file, sys.stdout, an io.StringIO) as
+they are produced, a command at a time, instead of being collected into one
+list and joined into one string at the end. The emitter counts the lines and
+UTF-8 bytes it has written, so callers can report statistics without
+keeping the output in memory.
+
+Educational Purpose: Demonstrates streaming output, and keeping running
+counters instead of measuring a result after the fact.
+
+Author: ZeroDumb
+License: GNU GPLv3
+"""
+
+import os
+from contextlib import contextmanager
+from typing import Iterator, List, Sequence, TextIO
+
+
+class CodeEmitter:
+    """
+    Writes lines of generated code to a text stream.
+
+    Lines are separated by newlines and the output does not end with one,
+    so the stream receives exactly '\\n'.join() of all emitted lines. Lines
+    are buffered and written in batches; call flush() when done.
+
+    Attributes:
+        stream: The text stream written to
+        line_count: Number of lines emitted so far
+        byte_count: Number of bytes written to the stream so far, encoded
+            as UTF-8; complete after flush()
+        head: The first head_size lines, for previews
+    """
+
+    # Lines buffered before they are written to the stream
+    batch_size = 1024
+
+    def __init__(self, stream: TextIO, head_size: int = 0):
+        self.stream = stream
+        self.line_count = 0
+        self.byte_count = 0
+        self.head: List[str] = []
+        self._head_size = head_size
+        self._pending: List[str] = []
+        self._written = False
+
+    def emit(self, line: str) -> None:
+        """Emit one line."""
+        self.emit_lines((line,))
+
+    def emit_lines(self, lines: Sequence[str]) -> None:
+        """Emit a group of lines."""
+        if self.line_count < self._head_size:
+            self.head.extend(lines[:self._head_size - self.line_count])
+        self.line_count += len(lines)
+        pending = self._pending
+        pending.extend(lines)
+        if len(pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write the buffered lines to the stream."""
+        if not self._pending:
+            return
+        chunk = '\n'.join(self._pending)
+        if self._written:
+            chunk = '\n' + chunk
+        self._pending.clear()
+        self._written = True
+        # ASCII text is one byte per character; only encode the rest
+        self.byte_count += len(chunk) if chunk.isascii() else len(chunk.encode('utf-8', 'surrogatepass'))
+        self.stream.write(chunk)
+
+
+@contextmanager
+def open_output(path) -> Iterator[TextIO]:
+    """
+    Open an output file for streaming generated code into.
+
+    The code is written to a temporary file next to path, which replaces
+    path only when the block completes, so a failed encode never leaves a
+    truncated file behind.
+    """
+    directory, name = os.path.split(os.path.abspath(path))
+    temp_path = os.path.join(directory, f".{name}.{os.urandom(4).hex()}.tmp")
+    # Created like open() would, so the file gets the usual permissions
+    fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+    try:
+        with open(fd, 'w', encoding='utf-8') as f:
+            yield f
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
@@ -11,8 +11,40 @@ Author: ZeroDumb
 License: GNU GPLv3
 """
 
-from typing import List, Dict, Any, Optional
+import io
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import List, Dict, Any, Optional, TextIO
 from .parser import HappyFrogScript, HappyFrogCommand, CommandType
+from .dispatch import EncoderBase, handles
+from .emitter import CodeEmitter
+from .memo import DEFAULT_MAX_ENTRIES, FragmentMemo
+from .keymaps import CIRCUITPYTHON_KEYMAP
+
+
+# Commands that press a single key, with their keycode
+KEY_CODES = MappingProxyType({
+    **{command_type: CIRCUITPYTHON_KEYMAP.keycode(command_type.value) for command_type in (
+        # Basic keys
+        CommandType.ENTER, CommandType.SPACE, CommandType.TAB, CommandType.BACKSPACE, CommandType.DELETE,
+        # Arrow keys
+        CommandType.UP, CommandType.DOWN, CommandType.LEFT, CommandType.RIGHT,
+        # Navigation keys
+        CommandType.HOME, CommandType.END, CommandType.INSERT, CommandType.PAGE_UP, CommandType.PAGE_DOWN,
+        CommandType.ESCAPE,
+        # Function keys
+        CommandType.F1, CommandType.F2, CommandType.F3, CommandType.F4, CommandType.F5, CommandType.F6,
+        CommandType.F7, CommandType.F8, CommandType.F9, CommandType.F10, CommandType.F11, CommandType.F12,
+        # Modifier keys; MOD is the GUI (Windows/Command) key
+        CommandType.CTRL, CommandType.SHIFT, CommandType.ALT, CommandType.MOD,
+    )},
+    # Execution control
+    CommandType.PAUSE: "PAUSE",  # Special handling for PAUSE command
+})
+
+
+# Commands REPEAT skips when looking for the command to repeat
+_NOT_REPEATABLE = frozenset({CommandType.REPEAT, CommandType.COMMENT, CommandType.REM})
 
 
 class EncoderError(Exception):
@@ -20,68 +52,67 @@ class EncoderError(Exception):
     pass
 
 
-class CircuitPythonEncoder:
+@dataclass
+class EncodingContext:
+    """
+    The state of one encoding run.
+    
+    Commands such as SAFE_MODE and DEFAULT_DELAY change how the rest of the
+    script is encoded. That state lives here, one context per encode()
+    call, rather than on the encoder, so an encoder never changes while it
+    encodes and can be shared between scripts and threads.
+    """
+    safe_mode: bool = True
+    default_delay: int = 0  # Default delay between commands
+    last_command: Optional[HappyFrogCommand] = None  # For REPEAT functionality
+
+
+class CircuitPythonEncoder(EncoderBase):
     """
     Encoder that converts parsed Happy Frog Script commands into CircuitPython code.
     
     This encoder generates human-readable CircuitPython code that can be directly
     uploaded to compatible microcontrollers. It includes educational comments
     to help users understand how each command works.
+    
+    Each command type is encoded by the method registered for it with
+    @handles; key presses and unknown commands go to encode_default().
+    Handlers receive the EncodingContext of the run; the encoder itself is
+    not changed by encoding, so one instance can be used from many threads.
     """
     
-    def __init__(self):
-        """Initialize the encoder with key mappings and templates."""
-        # USB HID key codes for CircuitPython
-        self.key_codes = {
-            # Basic keys
-            CommandType.ENTER: "Keycode.ENTER",
-            CommandType.SPACE: "Keycode.SPACE",
-            CommandType.TAB: "Keycode.TAB",
-            CommandType.BACKSPACE: "Keycode.BACKSPACE",
-            CommandType.DELETE: "Keycode.DELETE",
-            
-            # Arrow keys
-            CommandType.UP: "Keycode.UP_ARROW",
-            CommandType.DOWN: "Keycode.DOWN_ARROW",
-            CommandType.LEFT: "Keycode.LEFT_ARROW",
-            CommandType.RIGHT: "Keycode.RIGHT_ARROW",
-            
-            # Navigation keys
-            CommandType.HOME: "Keycode.HOME",
-            CommandType.END: "Keycode.END",
-            CommandType.INSERT: "Keycode.INSERT",
-            CommandType.PAGE_UP: "Keycode.PAGE_UP",
-            CommandType.PAGE_DOWN: "Keycode.PAGE_DOWN",
-            CommandType.ESCAPE: "Keycode.ESCAPE",
-            
-            # Function keys
-            CommandType.F1: "Keycode.F1",
-            CommandType.F2: "Keycode.F2",
-            CommandType.F3: "Keycode.F3",
-            CommandType.F4: "Keycode.F4",
-            CommandType.F5: "Keycode.F5",
-            CommandType.F6: "Keycode.F6",
-            CommandType.F7: "Keycode.F7",
-            CommandType.F8: "Keycode.F8",
-            CommandType.F9: "Keycode.F9",
-            CommandType.F10: "Keycode.F10",
-            CommandType.F11: "Keycode.F11",
-            CommandType.F12: "Keycode.F12",
-            
-            # Modifier keys
-            CommandType.CTRL: "Keycode.CONTROL",
-            CommandType.SHIFT: "Keycode.SHIFT",
-            CommandType.ALT: "Keycode.ALT",
-            CommandType.MOD: "Keycode.GUI",  # MOD maps to GUI (Windows/Command key)
-            
-            # Execution control
-            CommandType.PAUSE: "PAUSE",  # Special handling for PAUSE command
-        }
+    # Key names -> keycodes for MODIFIER_COMBO
+    keymap = CIRCUITPYTHON_KEYMAP
+    
+    # Bump when a code change makes the same script encode differently, so
+    # that cached build artifacts (see artifacts.ArtifactCache) are not reused
+    encoder_version = 1
+    
+    # Commands whose code depends on encoder state other than safe_mode, or
+    # that change it; they are encoded every time instead of memoized
+    unmemoized_commands = frozenset({
+        CommandType.REPEAT, CommandType.DEFAULT_DELAY, CommandType.SAFE_MODE, CommandType.ATTACKMODE,
+    })
+    
+    def __init__(self, memo_size: int = DEFAULT_MAX_ENTRIES, safe_mode: bool = True):
+        """
+        Initialize the encoder with key mappings and templates.
+        
+        Args:
+            memo_size: Number of distinct commands whose code is kept for
+                reuse (0 to encode every command anew)
+            safe_mode: Whether scripts start in safe mode; SAFE_MODE
+                commands change it for the rest of their own script only
+        """
+        # USB HID key codes for CircuitPython, shared by all encoders
+        self.key_codes = KEY_CODES
         
-        # State for advanced features (set before templates)
-        self.default_delay = 0  # Default delay between commands
-        self.last_command = None  # For REPEAT functionality
-        self.safe_mode = True  # Safe mode enabled by default
+        # Code of commands already encoded, keyed by command type,
+        # parameters and safe_mode
+        self.memo = FragmentMemo(memo_size)
+        
+        # Safe mode at the start of every script (set before templates)
+        self.safe_mode = safe_mode
         
         # CircuitPython code templates
         self.templates = {
@@ -102,7 +133,8 @@ class CircuitPythonEncoder:
         Encode a parsed Happy Frog Script into CircuitPython code.
         
         Args:
-            script: Parsed HappyFrogScript object
+            script: Parsed HappyFrogScript object (or a MappedScript loaded
+                from a compiled .hfb file)
             output_file: Optional output file path
             
         Returns:
@@ -111,38 +143,60 @@ class CircuitPythonEncoder:
         Raises:
             EncoderError: If encoding fails
         """
-        try:
-            # Generate the main code
-            code_lines = []
+        buffer = io.StringIO()
+        self.encode_to(script, buffer)
+        code = buffer.getvalue()
+        
+        # Write to file if specified
+        if output_file:
+            try:
+                with open(output_file, 'w', encoding='utf-8') as f:
+                    f.write(code)
+            except OSError as e:
+                raise EncoderError(f"Failed to encode script: {str(e)}")
+        
+        return code
+    
+    def encode_to(self, script: HappyFrogScript, stream: TextIO, head_size: int = 0) -> CodeEmitter:
+        """
+        Encode a script, writing the code to a text stream as it is generated.
+        
+        Args:
+            script: Parsed HappyFrogScript object (or a MappedScript loaded
+                from a compiled .hfb file)
+            stream: Text stream to write the code to
+            head_size: Number of leading lines to keep for a preview
+            
+        Returns:
+            The emitter, with the line and byte counts of the code
             
+        Raises:
+            EncoderError: If encoding fails
+        """
+        emitter = CodeEmitter(stream, head_size)
+        context = EncodingContext(safe_mode=self.safe_mode)
+        try:
             # Add header with educational comments
-            code_lines.extend(self._generate_header(script))
+            emitter.emit_lines(self._generate_header(script, context))
             
             # Add main execution code
-            code_lines.extend(self._generate_main_code(script))
+            self._emit_main_code(script, emitter, context)
             
             # Add footer
-            code_lines.extend(self._generate_footer())
-            
-            # Join all lines
-            code = '\n'.join(code_lines)
-            
-            # Write to file if specified
-            if output_file:
-                with open(output_file, 'w', encoding='utf-8') as f:
-                    f.write(code)
-            
-            return code
+            emitter.emit_lines(self._generate_footer(context))
+            emitter.flush()
             
         except Exception as e:
             raise EncoderError(f"Failed to encode script: {str(e)}")
+        
+        return emitter
     
-    def _generate_header(self, script: HappyFrogScript) -> List[str]:
+    def _generate_header(self, script: HappyFrogScript, context: EncodingContext) -> List[str]:
         """Generate the header section of the CircuitPython code."""
         lines = []
         
         # Add template header (conditional based on safe mode)
-        if self.safe_mode:
+        if context.safe_mode:
             lines.extend(self.templates['header'].split('\n'))
         else:
             # Minimal header for production code
@@ -164,7 +218,7 @@ class CircuitPythonEncoder:
             ])
         
         # Add script metadata as comments (only in safe mode)
-        if self.safe_mode:
+        if context.safe_mode:
             lines.append("")
             lines.append("# Script Information:")
             lines.append(f"# Source: {script.metadata.get('source', 'Unknown')}")
@@ -174,94 +228,68 @@ class CircuitPythonEncoder:
         
         return lines
     
-    def _generate_main_code(self, script: HappyFrogScript) -> List[str]:
-        """Generate the main execution code from script commands."""
+    def _emit_main_code(self, script: HappyFrogScript, emitter: CodeEmitter, context: EncodingContext) -> None:
+        """Emit the main execution code from script commands, a command at a time."""
         lines = []
         
-        if self.safe_mode:
+        if context.safe_mode:
             lines.append("# Main execution loop")
         lines.append("def main():")
-        if self.safe_mode:
+        if context.safe_mode:
             lines.append("    # Wait for system to recognize the device")
         lines.append("    time.sleep(2)")
         lines.append("")
+        emitter.emit_lines(lines)
         
         # Process each command
+        emit_lines = emitter.emit_lines
         for i, command in enumerate(script.commands):
-            lines.extend(self._encode_command(command, i + 1))
+            emit_lines(self._encode_command(command, i + 1, context))
         
-        lines.append("")
-        if self.safe_mode:
+        lines = [""]
+        if context.safe_mode:
             lines.append("# Run the main function")
         lines.append("if __name__ == '__main__':")
         lines.append("    main()")
         lines.append("")
-        
-        return lines
+        emitter.emit_lines(lines)
     
-    def _encode_command(self, command: HappyFrogCommand, command_index: int) -> List[str]:
+    def _encode_command(self, command: HappyFrogCommand, command_index: int,
+                        context: EncodingContext) -> List[str]:
         """Encode a single command into CircuitPython code."""
         lines = []
         
         # Add comment with original command (only in safe mode)
-        if self.safe_mode:
+        if context.safe_mode:
             comment = f"    # Command {command_index}: {command.raw_text}"
             lines.append(comment)
         
-        # Encode based on command type
-        if command.command_type == CommandType.DELAY:
-            lines.extend(self._encode_delay(command))
-        elif command.command_type == CommandType.STRING:
-            lines.extend(self._encode_string(command))
-        elif command.command_type == CommandType.MODIFIER_COMBO:
-            lines.extend(self._encode_modifier_combo(command))
-        elif command.command_type == CommandType.PAUSE:
-            lines.extend(self._encode_pause(command))
-        elif command.command_type == CommandType.REPEAT:
-            lines.extend(self._encode_repeat(command))
-        elif command.command_type in [CommandType.DEFAULT_DELAY, CommandType.DEFAULTDELAY]:
-            lines.extend(self._encode_default_delay(command))
-        elif command.command_type == CommandType.IF:
-            lines.extend(self._encode_if(command))
-        elif command.command_type == CommandType.ELSE:
-            lines.extend(self._encode_else(command))
-        elif command.command_type == CommandType.ENDIF:
-            lines.extend(self._encode_endif(command))
-        elif command.command_type == CommandType.WHILE:
-            lines.extend(self._encode_while(command))
-        elif command.command_type == CommandType.ENDWHILE:
-            lines.extend(self._encode_endwhile(command))
-        elif command.command_type == CommandType.RANDOM_DELAY:
-            lines.extend(self._encode_random_delay(command))
-        elif command.command_type == CommandType.LOG:
-            lines.extend(self._encode_log(command))
-        elif command.command_type == CommandType.VALIDATE:
-            lines.extend(self._encode_validate(command))
-        elif command.command_type == CommandType.SAFE_MODE:
-            lines.extend(self._encode_safe_mode(command))
-        elif command.command_type == CommandType.ATTACKMODE:
-            lines.extend(self._encode_attackmode(command))
-        elif command.command_type in self.key_codes:
-            lines.extend(self._encode_key_press(command))
-        elif command.command_type in [CommandType.COMMENT, CommandType.REM]:
-            lines.extend(self._encode_comment(command))
+        # Encode with the handler registered for the command type, reusing
+        # the code of an identical earlier command
+        command_type = command.command_type
+        if command_type in self.unmemoized_commands:
+            lines.extend(self.dispatch(command, context))
         else:
-            # Unknown command - add warning comment (only in safe mode)
-            if self.safe_mode:
-                lines.append(f"    # WARNING: Unknown command '{command.command_type}'")
-            lines.append("    pass")
+            key = (command_type, tuple(command.parameters), context.safe_mode)
+            code = self.memo.get(key)
+            if code is None:
+                code = self.memo.put(key, self.dispatch(command, context))
+            lines.extend(code)
+        if command_type not in _NOT_REPEATABLE:
+            context.last_command = command
         
         lines.append("")  # Add blank line for readability
         return lines
     
-    def _encode_delay(self, command: HappyFrogCommand) -> List[str]:
+    @handles(CommandType.DELAY)
+    def _encode_delay(self, command: HappyFrogCommand, context: EncodingContext) -> List[str]:
         """Encode a DELAY command."""
         try:
-            delay_ms = int(command.parameters[0])
+            delay_ms = command.int_arg(0)
             if delay_ms < 0:
                 raise EncoderError("Delay value must be non-negative")
             
-            if self.safe_mode:
+            if context.safe_mode:
                 return [
                     f"    time.sleep({delay_ms / 1000.0})  # Delay for {delay_ms}ms"
                 ]
@@ -272,7 +300,8 @@ class CircuitPythonEncoder:
         except (ValueError, IndexError):
             raise EncoderError(f"Invalid delay value '{command.parameters[0] if command.parameters else 'None'}' in command: {command.raw_text}")
     
-    def _encode_string(self, command: HappyFrogCommand) -> List[str]:
+    @handles(CommandType.STRING)
+    def _encode_string(self, command: HappyFrogCommand, context: EncodingContext) -> List[str]:
         """Encode a STRING command."""
         if not command.parameters:
             raise EncoderError(f"STRING command missing text: {command.raw_text}")
@@ -281,7 +310,7 @@ class CircuitPythonEncoder:
         # Escape quotes and special characters
         escaped_text = text.replace('\\', '\\\\').replace('"', '\\"')
         
-        if self.safe_mode:
+        if context.safe_mode:
             return [
                 f'    keyboard_layout.write("{escaped_text}")  # Type: {text}'
             ]
@@ -290,9 +319,10 @@ class CircuitPythonEncoder:
                 f'    keyboard_layout.write("{escaped_text}")'
             ]
     
-    def _encode_pause(self, command: HappyFrogCommand) -> List[str]:
+    @handles(CommandType.PAUSE)
+    def _encode_pause(self, command: HappyFrogCommand, context: EncodingContext) -> List[str]:
         """Encode a PAUSE command - wait for user input."""
-        if self.safe_mode:
+        if context.safe_mode:
             return [
                 "    # PAUSE: Waiting for user input (press any key to continue)",
                 "    # Note: In CircuitPython, we'll use a long delay as a simple pause",
@@ -304,84 +334,42 @@ class CircuitPythonEncoder:
                 "    time.sleep(5)"
             ]
     
-    def _encode_modifier_combo(self, command: HappyFrogCommand) -> List[str]:
+    @handles(CommandType.MODIFIER_COMBO)
+    def _encode_modifier_combo(self, command: HappyFrogCommand, context: EncodingContext) -> List[str]:
         """Encode a MODIFIER_COMBO command (e.g., MOD r, CTRL ALT DEL)."""
         if not command.parameters:
             raise EncoderError(f"MODIFIER_COMBO command missing parameters: {command.raw_text}")
         
         lines = []
+        key_codes = [(self.keymap.keycode(param), param) for param in command.parameters]
         
         # Press all keys in the combo
-        for param in command.parameters:
-            if param.upper() in ['MOD', 'CTRL', 'SHIFT', 'ALT']:
-                # It's a modifier key
-                key_code = self.key_codes.get(CommandType(param.upper()))
-                if key_code:
-                    if self.safe_mode:
-                        lines.append(f"    keyboard.press({key_code})  # Press {param}")
-                    else:
-                        lines.append(f"    keyboard.press({key_code})")
+        for key_code, param in key_codes:
+            if context.safe_mode:
+                lines.append(f"    keyboard.press({key_code})  # Press {param}")
             else:
-                # It's a regular key - map it to the appropriate keycode
-                key_code = self._map_key_to_keycode(param)
-                if key_code:
-                    if self.safe_mode:
-                        lines.append(f"    keyboard.press({key_code})  # Press {param}")
-                    else:
-                        lines.append(f"    keyboard.press({key_code})")
+                lines.append(f"    keyboard.press({key_code})")
         
         # Release all keys in reverse order
-        for param in reversed(command.parameters):
-            if param.upper() in ['MOD', 'CTRL', 'SHIFT', 'ALT']:
-                key_code = self.key_codes.get(CommandType(param.upper()))
-                if key_code:
-                    if self.safe_mode:
-                        lines.append(f"    keyboard.release({key_code})  # Release {param}")
-                    else:
-                        lines.append(f"    keyboard.release({key_code})")
+        for key_code, param in reversed(key_codes):
+            if context.safe_mode:
+                lines.append(f"    keyboard.release({key_code})  # Release {param}")
             else:
-                key_code = self._map_key_to_keycode(param)
-                if key_code:
-                    if self.safe_mode:
-                        lines.append(f"    keyboard.release({key_code})  # Release {param}")
-                    else:
-                        lines.append(f"    keyboard.release({key_code})")
+                lines.append(f"    keyboard.release({key_code})")
         
         return lines
     
     def _map_key_to_keycode(self, key: str) -> str:
         """Map a key string to its CircuitPython keycode."""
-        key = key.upper()
-        
-        # Single letter keys
-        if len(key) == 1 and key.isalpha():
-            return f"Keycode.{key}"
-        
-        # Number keys
-        if key.isdigit():
-            return f"Keycode.{key}"
-        
-        # Special mappings
-        key_mappings = {
-            'R': 'Keycode.R',
-            'DEL': 'Keycode.DELETE',
-            'BACKSPACE': 'Keycode.BACKSPACE',
-            'ENTER': 'Keycode.ENTER',
-            'SPACE': 'Keycode.SPACE',
-            'TAB': 'Keycode.TAB',
-            'ESC': 'Keycode.ESCAPE',
-            'ESCAPE': 'Keycode.ESCAPE',
-        }
-        
-        return key_mappings.get(key, f"Keycode.{key}")
+        return self.keymap.keycode(key)
     
-    def _encode_key_press(self, command: HappyFrogCommand) -> List[str]:
+    def _encode_key_press(self, command: HappyFrogCommand, context: EncodingContext) -> List[str]:
         """Encode a key press command."""
         key_code = self.key_codes.get(command.command_type)
         if not key_code:
             raise EncoderError(f"Unsupported key: {command.command_type}")
         
-        if self.safe_mode:
+        if context.safe_mode:
             return [
                 f"    keyboard.press({key_code})  # Press {command.command_type.value}",
                 f"    keyboard.release({key_code})  # Release {command.command_type.value}"
@@ -392,16 +380,29 @@ class CircuitPythonEncoder:
                 f"    keyboard.release({key_code})"
             ]
     
-    def _encode_comment(self, command: HappyFrogCommand) -> List[str]:
+    @handles(CommandType.COMMENT, CommandType.REM)
+    def _encode_comment(self, command: HappyFrogCommand, context: EncodingContext) -> List[str]:
         """Encode a comment command."""
         comment_text = command.parameters[0] if command.parameters else ""
         return [
             f"    # {comment_text}"
         ]
     
-    def _generate_footer(self) -> List[str]:
+    def encode_default(self, command: HappyFrogCommand, context: EncodingContext) -> List[str]:
+        """Encode a key press, or a placeholder for an unknown command."""
+        if command.command_type in self.key_codes:
+            return self._encode_key_press(command, context)
+        
+        # Unknown command - add warning comment (only in safe mode)
+        lines = []
+        if context.safe_mode:
+            lines.append(f"    # WARNING: Unknown command '{command.command_type}'")
+        lines.append("    pass")
+        return lines
+    
+    def _generate_footer(self, context: EncodingContext) -> List[str]:
         """Generate the footer section of the CircuitPython code."""
-        if self.safe_mode:
+        if context.safe_mode:
             return self.templates['footer'].split('\n')
         else:
             return ['"""', 'End of Happy Frog Generated Code', '"""']
@@ -530,17 +531,18 @@ For more information, visit: https://github.com/ZeroDumb/happy-frog
         
         return warnings
     
-    def _encode_repeat(self, command: HappyFrogCommand) -> List[str]:
+    @handles(CommandType.REPEAT)
+    def _encode_repeat(self, command: HappyFrogCommand, context: EncodingContext) -> List[str]:
         """Encode a REPEAT command - repeat the last command n times."""
         if not command.parameters:
             raise EncoderError(f"REPEAT command missing count: {command.raw_text}")
         
         try:
-            repeat_count = int(command.parameters[0])
+            repeat_count = command.int_arg(0)
             if repeat_count < 1:
                 raise EncoderError("Repeat count must be at least 1")
             
-            if not self.last_command:
+            if not context.last_command:
                 raise EncoderError("No previous command to repeat")
             
             lines = [
@@ -549,27 +551,30 @@ For more information, visit: https://github.com/ZeroDumb/happy-frog
             ]
             
             # Add the last command with proper indentation
-            last_lines = self._encode_command(self.last_command, 0)  # 0 for no line number
+            last_lines = self._encode_command(context.last_command, 0, context)  # 0 for no line number
             for line in last_lines:
                 if line.strip() and not line.strip().startswith('#'):
                     lines.append(f"        {line.strip()}")
+            if len(lines) == 2:
+                lines.append("        pass")
             
             return lines
             
         except ValueError:
             raise EncoderError(f"Invalid repeat count '{command.parameters[0]}' in command: {command.raw_text}")
     
-    def _encode_default_delay(self, command: HappyFrogCommand) -> List[str]:
+    @handles(CommandType.DEFAULT_DELAY)
+    def _encode_default_delay(self, command: HappyFrogCommand, context: EncodingContext) -> List[str]:
         """Encode a DEFAULT_DELAY command - set default delay between commands."""
         if not command.parameters:
             raise EncoderError(f"DEFAULT_DELAY command missing value: {command.raw_text}")
         
         try:
-            delay_ms = int(command.parameters[0])
+            delay_ms = command.int_arg(0)
             if delay_ms < 0:
                 raise EncoderError("Default delay value must be non-negative")
             
-            self.default_delay = delay_ms
+            context.default_delay = delay_ms
             return [
                 f"    # DEFAULT_DELAY: Set default delay to {delay_ms}ms between commands",
                 f"    default_delay = {delay_ms / 1000.0}  # Convert to seconds"
@@ -578,7 +583,8 @@ For more information, visit: https://github.com/ZeroDumb/happy-frog
         except ValueError:
             raise EncoderError(f"Invalid default delay value '{command.parameters[0]}' in command: {command.raw_text}")
     
-    def _encode_if(self, command: HappyFrogCommand) -> List[str]:
+    @handles(CommandType.IF)
+    def _encode_if(self, command: HappyFrogCommand, context: EncodingContext) -> List[str]:
         """Encode an IF command - conditional execution."""
         if not command.parameters:
             raise EncoderError(f"IF command missing condition: {command.raw_text}")
@@ -590,20 +596,23 @@ For more information, visit: https://github.com/ZeroDumb/happy-frog
             f"    if True:  # Placeholder for condition: {condition}"
         ]
     
-    def _encode_else(self, command: HappyFrogCommand) -> List[str]:
+    @handles(CommandType.ELSE)
+    def _encode_else(self, command: HappyFrogCommand, context: EncodingContext) -> List[str]:
         """Encode an ELSE command."""
         return [
             "    # ELSE: Alternative execution path",
             "    else:"
         ]
     
-    def _encode_endif(self, command: HappyFrogCommand) -> List[str]:
+    @handles(CommandType.ENDIF)
+    def _encode_endif(self, command: HappyFrogCommand, context: EncodingContext) -> List[str]:
         """Encode an ENDIF command."""
         return [
             "    # ENDIF: End conditional block"
         ]
     
-    def _encode_while(self, command: HappyFrogCommand) -> List[str]:
+    @handles(CommandType.WHILE)
+    def _encode_while(self, command: HappyFrogCommand, context: EncodingContext) -> List[str]:
         """Encode a WHILE command - loop execution."""
         if not command.parameters:
             raise EncoderError(f"WHILE command missing condition: {command.raw_text}")
@@ -615,20 +624,22 @@ For more information, visit: https://github.com/ZeroDumb/happy-frog
             f"    while True:  # Placeholder for condition: {condition}"
         ]
     
-    def _encode_endwhile(self, command: HappyFrogCommand) -> List[str]:
+    @handles(CommandType.ENDWHILE)
+    def _encode_endwhile(self, command: HappyFrogCommand, context: EncodingContext) -> List[str]:
         """Encode an ENDWHILE command."""
         return [
             "    # ENDWHILE: End loop block"
         ]
     
-    def _encode_random_delay(self, command: HappyFrogCommand) -> List[str]:
+    @handles(CommandType.RANDOM_DELAY)
+    def _encode_random_delay(self, command: HappyFrogCommand, context: EncodingContext) -> List[str]:
         """Encode a RANDOM_DELAY command - random delay for human-like behavior."""
         if len(command.parameters) < 2:
             raise EncoderError(f"RANDOM_DELAY command missing min/max values: {command.raw_text}")
         
         try:
-            min_delay = int(command.parameters[0])
-            max_delay = int(command.parameters[1])
+            min_delay = command.int_arg(0)
+            max_delay = command.int_arg(1)
             if min_delay < 0 or max_delay < min_delay:
                 raise EncoderError("Invalid random delay range")
             
@@ -642,7 +653,8 @@ For more information, visit: https://github.com/ZeroDumb/happy-frog
         except ValueError:
             raise EncoderError(f"Invalid random delay values in command: {command.raw_text}")
     
-    def _encode_log(self, command: HappyFrogCommand) -> List[str]:
+    @handles(CommandType.LOG)
+    def _encode_log(self, command: HappyFrogCommand, context: EncodingContext) -> List[str]:
         """Encode a LOG command - logging for debugging."""
         if not command.parameters:
             raise EncoderError(f"LOG command missing message: {command.raw_text}")
@@ -653,7 +665,8 @@ For more information, visit: https://github.com/ZeroDumb/happy-frog
             f"    print('Happy Frog Log: {message}')"
         ]
     
-    def _encode_validate(self, command: HappyFrogCommand) -> List[str]:
+    @handles(CommandType.VALIDATE)
+    def _encode_validate(self, command: HappyFrogCommand, context: EncodingContext) -> List[str]:
         """Encode a VALIDATE command - validate environment before execution."""
         if not command.parameters:
             raise EncoderError(f"VALIDATE command missing condition: {command.raw_text}")
@@ -665,7 +678,8 @@ For more information, visit: https://github.com/ZeroDumb/happy-frog
             f"    print('Validating: {condition}')"
         ]
     
-    def _encode_safe_mode(self, command: HappyFrogCommand) -> List[str]:
+    @handles(CommandType.SAFE_MODE)
+    def _encode_safe_mode(self, command: HappyFrogCommand, context: EncodingContext) -> List[str]:
         """Encode a SAFE_MODE command - enable/disable safe mode restrictions."""
         if not command.parameters:
             raise EncoderError(f"SAFE_MODE command missing ON/OFF value: {command.raw_text}")
@@ -674,13 +688,14 @@ For more information, visit: https://github.com/ZeroDumb/happy-frog
         if mode not in ['ON', 'OFF']:
             raise EncoderError("SAFE_MODE must be ON or OFF")
         
-        self.safe_mode = (mode == 'ON')
+        context.safe_mode = (mode == 'ON')
         return [
-            f"    # SAFE_MODE: {'Enabled' if self.safe_mode else 'Disabled'} safe mode restrictions",
-            f"    safe_mode = {str(self.safe_mode).lower()}"
+            f"    # SAFE_MODE: {'Enabled' if context.safe_mode else 'Disabled'} safe mode restrictions",
+            f"    safe_mode = {str(context.safe_mode).lower()}"
         ]
     
-    def _encode_attackmode(self, command: HappyFrogCommand) -> List[str]:
+    @handles(CommandType.ATTACKMODE)
+    def _encode_attackmode(self, command: HappyFrogCommand, context: EncodingContext) -> List[str]:
         """Encode an ATTACKMODE command - BadUSB attack mode configuration."""
         if not command.parameters:
             raise EncoderError(f"ATTACKMODE command missing configuration: {command.raw_text}")
@@ -702,10 +717,10 @@ For more information, visit: https://github.com/ZeroDumb/happy-frog
             ]
         elif mode_config in ['ON', 'OFF']:
             # Legacy ON/OFF support
-            self.safe_mode = (mode_config == 'ON')
+            context.safe_mode = (mode_config == 'ON')
             return [
-                f"    # ATTACKMODE: {'Enabled' if self.safe_mode else 'Disabled'} attack mode",
-                f"    safe_mode = {str(self.safe_mode).lower()}"
+                f"    # ATTACKMODE: {'Enabled' if context.safe_mode else 'Disabled'} attack mode",
+                f"    safe_mode = {str(context.safe_mode).lower()}"
             ]
         else:
             # Generic ATTACKMODE configuration
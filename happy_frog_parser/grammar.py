@@ -0,0 +1,392 @@
+"""
+Happy Frog - Script Grammar
+
+This module holds the command grammar shared by every parser: the command
+types, the regex for each command and the lookup tables the lexer derives
+from them.
+
+A Grammar is compiled once, when this module is imported, and is read-only
+afterwards, so any number of parsers can share it and creating a parser
+costs nothing. HAPPY_FROG_GRAMMAR is the full Happy Frog Script language;
+DUCKY_GRAMMAR is the Ducky Script subset used by the ducky_parser package.
+Dialects are made with Grammar.derive() rather than by editing a parser's
+patterns.
+
+Educational Purpose: Demonstrates separating a language definition from
+the code that uses it, and precomputing immutable lookup tables.
+
+Author: ZeroDumb
+License: GNU GPLv3
+"""
+
+import re
+from enum import Enum
+from types import MappingProxyType
+from typing import Dict, Iterable, List, Mapping, Optional, Pattern
+
+
+class CommandType(Enum):
+    """Enumeration of supported Happy Frog Script commands."""
+    DELAY = "DELAY"
+    STRING = "STRING"
+    ENTER = "ENTER"
+    SPACE = "SPACE"
+    TAB = "TAB"
+    BACKSPACE = "BACKSPACE"
+    DELETE = "DELETE"
+    UP = "UP"
+    DOWN = "DOWN"
+    LEFT = "LEFT"
+    RIGHT = "RIGHT"
+    HOME = "HOME"
+    END = "END"
+    INSERT = "INSERT"
+    PAGE_UP = "PAGE_UP"
+    PAGE_DOWN = "PAGE_DOWN"
+    ESCAPE = "ESCAPE"
+    F1 = "F1"
+    F2 = "F2"
+    F3 = "F3"
+    F4 = "F4"
+    F5 = "F5"
+    F6 = "F6"
+    F7 = "F7"
+    F8 = "F8"
+    F9 = "F9"
+    F10 = "F10"
+    F11 = "F11"
+    F12 = "F12"
+    CTRL = "CTRL"
+    SHIFT = "SHIFT"
+    ALT = "ALT"
+    MOD = "MOD"  # Modifier key (Windows/Command/Super)
+    MODIFIER_COMBO = "MODIFIER_COMBO"  # For combos like MOD r
+    PAUSE = "PAUSE"  # Pause execution (Ducky Script compatibility)
+    
+    # Advanced Ducky Script features
+    REPEAT = "REPEAT"  # Repeat previous command n times
+    DEFAULT_DELAY = "DEFAULT_DELAY"  # Set default delay between commands
+    DEFAULTDELAY = "DEFAULT_DELAY"  # Alternative syntax
+    
+    # Conditional logic (Happy Frog exclusive)
+    IF = "IF"  # Conditional execution
+    ELSE = "ELSE"  # Else block
+    ENDIF = "ENDIF"  # End conditional block
+    WHILE = "WHILE"  # While loop
+    ENDWHILE = "ENDWHILE"  # End while loop
+    
+    # Happy Frog exclusive features
+    RANDOM_DELAY = "RANDOM_DELAY"  # Random delay for human-like behavior
+    LOG = "LOG"  # Logging for debugging
+    VALIDATE = "VALIDATE"  # Validate environment before execution
+    SAFE_MODE = "SAFE_MODE"  # Enable safe mode restrictions
+    
+    # BadUSB compatibility commands
+    ATTACKMODE = "ATTACKMODE"  # BadUSB attack mode configuration
+    
+    COMMENT = "COMMENT"
+    REM = "REM"  # Alternative comment syntax
+    
+    # Members are singletons compared by identity, so the identity hash is
+    # enough. It saves Enum's Python-level __hash__ on every dict lookup,
+    # such as the encoders' handler tables.
+    __hash__ = object.__hash__
+
+
+# Version of the parsing rules that are not visible in the command patterns.
+# Bump it when a code change makes the same text parse differently, so that
+# cached parse results (see cache.ParseCache) are not reused.
+GRAMMAR_VERSION = 1
+
+
+class ModifierComboMatcher:
+    """
+    Linear-time recognizer for modifier combos such as ``CTRL ALT DEL``.
+    
+    The line is split on whitespace once and every token is checked on its
+    own against a pattern without nested repetition, so each character is
+    looked at a constant number of times no matter how the line ends. It
+    accepts exactly the lines the MODIFIER_COMBO regex accepts.
+    """
+    
+    modifier_pattern = re.compile(r'MOD|CTRL|SHIFT|ALT', re.IGNORECASE)
+    key_pattern = re.compile(r'[A-Z0-9]+', re.IGNORECASE)
+    
+    def match(self, line: str) -> Optional[List[str]]:
+        """
+        Match a stripped line against the modifier combo grammar.
+        
+        Args:
+            line: The line to check
+            
+        Returns:
+            The combo tokens (e.g. ['CTRL', 'ALT', 'DEL']) or None if the
+            line is not a modifier combo
+        """
+        if not line or line[0].isspace() or line[-1].isspace():
+            return None
+        
+        tokens = line.split()
+        if len(tokens) < 2 or not self.modifier_pattern.fullmatch(tokens[0]):
+            return None
+        
+        key_pattern = self.key_pattern
+        for token in tokens[1:]:
+            if not key_pattern.fullmatch(token):
+                return None
+        
+        return tokens
+
+
+class Grammar:
+    """
+    A compiled, read-only command grammar.
+    
+    Holds the command patterns (tried in order), the regex groups that
+    hold each command's parameters, and the keyword table the lexer uses
+    to pick the few patterns a line can match from its first token.
+    """
+    
+    def __init__(self, command_patterns: Mapping[CommandType, Pattern],
+                 parameter_groups: Optional[Mapping[CommandType, tuple]] = None,
+                 name: Optional[str] = None):
+        """
+        Compile the lookup tables for a set of command patterns.
+        
+        Args:
+            command_patterns: Compiled regex per command type, in the order
+                they are tried
+            parameter_groups: Regex groups holding each command's parameters
+                (commands not listed take none)
+            name: Name of the module-level variable holding this grammar, if
+                any, so pickled parsers refer to it instead of a copy
+        """
+        self.command_patterns = MappingProxyType(dict(command_patterns))
+        self.parameter_groups = MappingProxyType(dict(parameter_groups or {}))
+        self.name = name
+        self._fingerprint = None
+        
+        self.combo_matcher = ModifierComboMatcher()
+        self.ordered_candidates = tuple(
+            (command_type, self._get_matcher(command_type, pattern),
+             self.parameter_groups.get(command_type, ()))
+            for command_type, pattern in self.command_patterns.items()
+        )
+        self.keyword_table = MappingProxyType(self._build_keyword_table())
+        comment = self.command_patterns.get(CommandType.COMMENT)
+        self.comment_candidates = (
+            ((CommandType.COMMENT, comment, (1,)),) if comment is not None else ()
+        )
+    
+    def derive(self, command_patterns: Optional[Mapping[CommandType, Pattern]] = None,
+               parameter_groups: Optional[Mapping[CommandType, tuple]] = None,
+               command_types: Optional[Iterable[CommandType]] = None,
+               name: Optional[str] = None) -> 'Grammar':
+        """
+        Return a new grammar based on this one.
+        
+        Args:
+            command_patterns: Patterns to replace (in place) or add (at the end)
+            parameter_groups: Parameter groups to replace or add
+            command_types: Keep only these command types, in their current order
+            name: Name of the module-level variable the result is stored in
+            
+        Returns:
+            The new Grammar; this one is left unchanged
+        """
+        keep = None if command_types is None else frozenset(command_types)
+        patterns = {command_type: pattern for command_type, pattern in self.command_patterns.items()
+                    if keep is None or command_type in keep}
+        patterns.update(command_patterns or {})
+        groups = {command_type: group for command_type, group in self.parameter_groups.items()
+                  if command_type in patterns}
+        groups.update(parameter_groups or {})
+        return Grammar(patterns, groups, name)
+    
+    def fingerprint(self) -> str:
+        """Return a digest of GRAMMAR_VERSION and every command pattern."""
+        if self._fingerprint is None:
+            # hashlib is only needed with a parse cache; it is slow to import
+            import hashlib
+            digest = hashlib.sha256(str(GRAMMAR_VERSION).encode('utf-8'))
+            for command_type, pattern in self.command_patterns.items():
+                groups = self.parameter_groups.get(command_type, ())
+                digest.update(f"\0{command_type.name}:{pattern.pattern}:{pattern.flags}:{groups}".encode('utf-8'))
+            self._fingerprint = digest.hexdigest()
+        return self._fingerprint
+    
+    def _get_matcher(self, command_type: CommandType, pattern):
+        """Return the object whose match() recognizes the given command type."""
+        if command_type == CommandType.MODIFIER_COMBO:
+            # Token-based check instead of a regex so combos match in linear time
+            return self.combo_matcher
+        return pattern
+    
+    def _build_keyword_table(self) -> Dict[str, tuple]:
+        """
+        Build the keyword -> candidate patterns lookup used by the lexer.
+        
+        Candidates keep the order of ``command_patterns`` so that, for example,
+        ``CTRL c`` is still recognized as a MODIFIER_COMBO before the bare
+        CTRL key is tried.
+        
+        Returns:
+            Dictionary mapping upper-case keywords to tuples of
+            (CommandType, matcher, parameter groups) candidates
+        """
+        table: Dict[str, list] = {}
+        
+        for command_type, matcher, groups in self.ordered_candidates:
+            if command_type == CommandType.COMMENT:
+                # Comments are recognized by their leading '#' instead
+                continue
+            elif command_type == CommandType.MODIFIER_COMBO:
+                keywords = ['MOD', 'CTRL', 'SHIFT', 'ALT']
+            elif command_type == CommandType.DEFAULT_DELAY:
+                keywords = ['DEFAULT_DELAY', 'DEFAULTDELAY']
+            else:
+                keywords = [command_type.value]
+            
+            for keyword in keywords:
+                table.setdefault(keyword, []).append((command_type, matcher, groups))
+        
+        return {keyword: tuple(candidates) for keyword, candidates in table.items()}
+    
+    def __reduce__(self):
+        if self.name is not None and globals().get(self.name) is self:
+            # Module-level grammars unpickle to the shared instance
+            return self.name
+        return (Grammar, (dict(self.command_patterns), dict(self.parameter_groups)))
+    
+    def __repr__(self):
+        return f"Grammar({self.name or len(self.command_patterns)!r})"
+
+
+# Regex patterns for the Happy Frog Script commands, in the order they are tried
+_HAPPY_FROG_PATTERNS = {
+    # Modifier+key combos (e.g., MOD r, CTRL ALT DEL) - must have at least 2 parts.
+    # Keys are plain [A-Z0-9]+ (which already covers MOD/CTRL/SHIFT/ALT) so
+    # each token can only match one way and failures cannot backtrack
+    # exponentially. The parser itself uses ModifierComboMatcher.
+    CommandType.MODIFIER_COMBO: re.compile(r'^(MOD|CTRL|SHIFT|ALT)(?:\s+[A-Z0-9]+)+$', re.IGNORECASE),
+    # Delay command: DELAY <value> - captures any value for validation
+    CommandType.DELAY: re.compile(r'^DELAY\s+(.+)$', re.IGNORECASE),
+
+    # String command: STRING <text>
+    CommandType.STRING: re.compile(r'^STRING\s+(.+)$', re.IGNORECASE),
+
+    # Simple commands with no parameters
+    CommandType.ENTER: re.compile(r'^ENTER$', re.IGNORECASE),
+    CommandType.SPACE: re.compile(r'^SPACE$', re.IGNORECASE),
+    CommandType.TAB: re.compile(r'^TAB$', re.IGNORECASE),
+    CommandType.BACKSPACE: re.compile(r'^BACKSPACE$', re.IGNORECASE),
+    CommandType.DELETE: re.compile(r'^DELETE$', re.IGNORECASE),
+
+    # Arrow keys
+    CommandType.UP: re.compile(r'^UP$', re.IGNORECASE),
+    CommandType.DOWN: re.compile(r'^DOWN$', re.IGNORECASE),
+    CommandType.LEFT: re.compile(r'^LEFT$', re.IGNORECASE),
+    CommandType.RIGHT: re.compile(r'^RIGHT$', re.IGNORECASE),
+
+    # Navigation keys
+    CommandType.HOME: re.compile(r'^HOME$', re.IGNORECASE),
+    CommandType.END: re.compile(r'^END$', re.IGNORECASE),
+    CommandType.INSERT: re.compile(r'^INSERT$', re.IGNORECASE),
+    CommandType.PAGE_UP: re.compile(r'^PAGE_UP$', re.IGNORECASE),
+    CommandType.PAGE_DOWN: re.compile(r'^PAGE_DOWN$', re.IGNORECASE),
+    CommandType.ESCAPE: re.compile(r'^ESCAPE$', re.IGNORECASE),
+
+    # Function keys
+    CommandType.F1: re.compile(r'^F1$', re.IGNORECASE),
+    CommandType.F2: re.compile(r'^F2$', re.IGNORECASE),
+    CommandType.F3: re.compile(r'^F3$', re.IGNORECASE),
+    CommandType.F4: re.compile(r'^F4$', re.IGNORECASE),
+    CommandType.F5: re.compile(r'^F5$', re.IGNORECASE),
+    CommandType.F6: re.compile(r'^F6$', re.IGNORECASE),
+    CommandType.F7: re.compile(r'^F7$', re.IGNORECASE),
+    CommandType.F8: re.compile(r'^F8$', re.IGNORECASE),
+    CommandType.F9: re.compile(r'^F9$', re.IGNORECASE),
+    CommandType.F10: re.compile(r'^F10$', re.IGNORECASE),
+    CommandType.F11: re.compile(r'^F11$', re.IGNORECASE),
+    CommandType.F12: re.compile(r'^F12$', re.IGNORECASE),
+
+    # Modifier keys (single keys)
+    CommandType.CTRL: re.compile(r'^CTRL$', re.IGNORECASE),
+    CommandType.SHIFT: re.compile(r'^SHIFT$', re.IGNORECASE),
+    CommandType.ALT: re.compile(r'^ALT$', re.IGNORECASE),
+    CommandType.MOD: re.compile(r'^MOD$', re.IGNORECASE),  # Modifier key
+
+    # Execution control
+    CommandType.PAUSE: re.compile(r'^PAUSE$', re.IGNORECASE),  # Pause execution
+
+    # Advanced Ducky Script features
+    CommandType.REPEAT: re.compile(r'^REPEAT\s+(\d+)$', re.IGNORECASE),  # REPEAT n
+    CommandType.DEFAULT_DELAY: re.compile(r'^(DEFAULT_DELAY|DEFAULTDELAY)\s+(\d+)$', re.IGNORECASE),  # DEFAULT_DELAY or DEFAULTDELAY n
+
+    # Conditional logic (Happy Frog exclusive)
+    CommandType.IF: re.compile(r'^IF\s+(.+)$', re.IGNORECASE),  # IF condition
+    CommandType.ELSE: re.compile(r'^ELSE$', re.IGNORECASE),  # ELSE
+    CommandType.ENDIF: re.compile(r'^ENDIF$', re.IGNORECASE),  # ENDIF
+    CommandType.WHILE: re.compile(r'^WHILE\s+(.+)$', re.IGNORECASE),  # WHILE condition
+    CommandType.ENDWHILE: re.compile(r'^ENDWHILE$', re.IGNORECASE),  # ENDWHILE
+
+    # Happy Frog exclusive features
+    CommandType.RANDOM_DELAY: re.compile(r'^RANDOM_DELAY\s+(\d+)\s+(\d+)$', re.IGNORECASE),  # RANDOM_DELAY min max
+    CommandType.LOG: re.compile(r'^LOG\s+(.+)$', re.IGNORECASE),  # LOG message
+    CommandType.VALIDATE: re.compile(r'^VALIDATE\s+(.+)$', re.IGNORECASE),  # VALIDATE condition
+    CommandType.SAFE_MODE: re.compile(r'^SAFE_MODE\s+(ON|OFF)$', re.IGNORECASE),  # SAFE_MODE ON/OFF
+
+    # BadUSB compatibility commands
+    CommandType.ATTACKMODE: re.compile(r'^ATTACKMODE\s+(.+)$', re.IGNORECASE),  # ATTACKMODE configuration
+
+    # Comments
+    CommandType.COMMENT: re.compile(r'^#(.*)$', re.IGNORECASE),
+    CommandType.REM: re.compile(r'^REM(?:\s+(.+))?$', re.IGNORECASE),  # REM with optional text
+}
+
+# Regex groups holding each command's parameters. Commands that are
+# not listed here (ENTER, F1, ELSE, ...) take no parameters.
+_HAPPY_FROG_PARAMETERS = {
+    CommandType.DELAY: (1,),  # Validation happens in the encoder
+    CommandType.STRING: (1,),  # Rest of the line
+    CommandType.COMMENT: (1,),  # Everything after '#'
+    CommandType.REM: (1,),  # Optional text, '' when missing
+
+    # Advanced Ducky Script features
+    CommandType.REPEAT: (1,),
+    CommandType.DEFAULT_DELAY: (2,),  # group(1) is the keyword spelling
+
+    # Conditional logic (Happy Frog exclusive)
+    CommandType.IF: (1,),
+    CommandType.WHILE: (1,),
+
+    # Happy Frog exclusive features
+    CommandType.RANDOM_DELAY: (1, 2),  # min, max
+    CommandType.LOG: (1,),
+    CommandType.VALIDATE: (1,),
+    CommandType.SAFE_MODE: (1,),
+
+    # BadUSB compatibility commands
+    CommandType.ATTACKMODE: (1,),
+}
+
+
+HAPPY_FROG_GRAMMAR = Grammar(_HAPPY_FROG_PATTERNS, _HAPPY_FROG_PARAMETERS, name='HAPPY_FROG_GRAMMAR')
+
+# Ducky Script: the key and comment commands, without REPEAT, DEFAULT_DELAY,
+# blocks or the Happy Frog extensions, and only the classic attack modes
+DUCKY_GRAMMAR = HAPPY_FROG_GRAMMAR.derive(
+    command_patterns={
+        CommandType.ATTACKMODE: re.compile(r'^ATTACKMODE\s+(HID|STORAGE|HID\s+STORAGE|ON|OFF)$', re.IGNORECASE),
+    },
+    command_types=[
+        command_type for command_type in HAPPY_FROG_GRAMMAR.command_patterns
+        if command_type not in (
+            CommandType.REPEAT, CommandType.DEFAULT_DELAY,
+            CommandType.IF, CommandType.ELSE, CommandType.ENDIF,
+            CommandType.WHILE, CommandType.ENDWHILE,
+            CommandType.RANDOM_DELAY, CommandType.LOG, CommandType.VALIDATE,
+        )
+    ],
+    name='DUCKY_GRAMMAR',
+)
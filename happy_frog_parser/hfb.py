@@ -0,0 +1,449 @@
+"""
+Happy Frog - Compiled Script Format (.hfb)
+
+This module reads and writes ``.hfb`` files, a versioned binary form of a
+parsed Happy Frog Script. A payload can be parsed once, saved as .hfb and
+then encoded for any number of devices without running the text parser
+again.
+
+The file holds the columns of a ScriptArray (opcode stream, numeric
+argument table, line map, shape table) and a string pool. Every section is
+a flat little-endian array, so load_hfb() memory-maps the file and reads
+the columns in place: commands, strings and shapes are only decoded when
+they are used.
+
+Layout (all integers little-endian)::
+
+    header     magic b'HFB\\0', format version (u16), flags (u16),
+               section count (u32)
+    directory  (offset u64, length u64) for each section
+    sections   SECTIONS below, each starting on an 8-byte boundary
+
+Educational Purpose: Demonstrates binary file formats, versioning,
+memory-mapped I/O and lazy decoding.
+
+Author: ZeroDumb
+License: GNU GPLv3
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections.abc import MutableSequence, Sequence
+from typing import List, Dict, Any, Optional, Union, Iterator
+
+from .parser import (
+    CommandType, CommandShape, HappyFrogCommand, HappyFrogScript, HappyFrogScriptError
+)
+from .columnar import ScriptArray, COMMAND_TYPES
+
+
+MAGIC = b'HFB\0'
+FORMAT_VERSION = 1
+
+HEADER = struct.Struct('<4sHHI')
+DIRECTORY_ENTRY = struct.Struct('<QQ')
+
+# Sections in file order: (name, array typecode or None for raw bytes)
+SECTIONS = (
+    ('opcode_names', None),  # JSON list of CommandType names, in opcode order
+    ('opcodes', 'B'),
+    ('line_numbers', 'I'),
+    ('arg0', 'q'),
+    ('arg1', 'q'),
+    ('shape_ids', 'I'),
+    ('shape_opcodes', 'B'),
+    ('shape_raw', 'I'),
+    ('shape_param_offsets', 'I'),
+    ('shape_params', 'I'),
+    ('string_offsets', 'Q'),  # Start of each string in string_data (plus the end)
+    ('string_data', None),  # UTF-8 text of the string pool
+    ('metadata', None),  # JSON object
+)
+
+_ALIGNMENT = 8
+_LITTLE_ENDIAN = sys.byteorder == 'little'
+
+
+class HFBFormatError(HappyFrogScriptError):
+    """Raised when a .hfb file is malformed or from an unsupported version."""
+    pass
+
+
+def _column_bytes(column, typecode: str) -> bytes:
+    """Return the little-endian bytes of an integer column."""
+    if not isinstance(column, array) or column.typecode != typecode:
+        column = array(typecode, column)
+    if not _LITTLE_ENDIAN:
+        column = array(typecode, column)
+        column.byteswap()
+    return column.tobytes()
+
+
+def dumps_hfb(script: Union[HappyFrogScript, ScriptArray, 'MappedScript']) -> bytes:
+    """
+    Serialize a parsed script to .hfb bytes.
+
+    Args:
+        script: HappyFrogScript, ScriptArray or MappedScript to serialize
+
+    Returns:
+        The contents of a .hfb file
+    """
+    if isinstance(script, MappedScript):
+        script = script.to_array()
+    elif not isinstance(script, ScriptArray):
+        script = ScriptArray.from_script(script)
+
+    encoded = [text.encode('utf-8', 'surrogatepass') for text in script.strings]
+    string_offsets = array('Q', [0])
+    position = 0
+    for data in encoded:
+        position += len(data)
+        string_offsets.append(position)
+
+    columns = {
+        'opcodes': script.opcodes,
+        'line_numbers': script.line_numbers,
+        'arg0': script.arg0,
+        'arg1': script.arg1,
+        'shape_ids': script.shape_ids,
+        'shape_opcodes': script.shape_opcodes,
+        'shape_raw': script.shape_raw,
+        'shape_param_offsets': script.shape_param_offsets,
+        'shape_params': script.shape_params,
+        'string_offsets': string_offsets,
+    }
+    payloads = []
+    for name, typecode in SECTIONS:
+        if name == 'opcode_names':
+            payloads.append(json.dumps([command_type.name for command_type in COMMAND_TYPES]).encode('utf-8'))
+        elif name == 'string_data':
+            payloads.append(b''.join(encoded))
+        elif name == 'metadata':
+            payloads.append(json.dumps(script.metadata, default=str).encode('utf-8'))
+        else:
+            payloads.append(_column_bytes(columns[name], typecode))
+
+    # Lay the sections out after the header and directory
+    directory = []
+    chunks = []
+    offset = HEADER.size + DIRECTORY_ENTRY.size * len(SECTIONS)
+    for payload in payloads:
+        padding = -offset % _ALIGNMENT
+        chunks.append(b'\0' * padding)
+        offset += padding
+        directory.append(DIRECTORY_ENTRY.pack(offset, len(payload)))
+        chunks.append(payload)
+        offset += len(payload)
+
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(SECTIONS))
+    return b''.join([header] + directory + chunks)
+
+
+def dump_hfb(script: Union[HappyFrogScript, ScriptArray, 'MappedScript'], file_path: str) -> None:
+    """
+    Write a parsed script to a .hfb file.
+
+    Args:
+        script: HappyFrogScript, ScriptArray or MappedScript to save
+        file_path: Path of the .hfb file to write
+    """
+    data = dumps_hfb(script)
+    with open(file_path, 'wb') as f:
+        f.write(data)
+
+
+def loads_hfb(data: Union[bytes, bytearray, memoryview], source_name: str = "<bytes>") -> 'MappedScript':
+    """
+    Load a compiled script from .hfb bytes without copying them.
+
+    Args:
+        data: Contents of a .hfb file
+        source_name: Name of the source (for error reporting)
+
+    Returns:
+        MappedScript reading directly from the given buffer
+    """
+    return MappedScript(data, source_name)
+
+
+def load_hfb(file_path: str) -> 'MappedScript':
+    """
+    Memory-map a .hfb file.
+
+    Only the header and metadata are read up front; the command columns are
+    paged in by the operating system as they are accessed.
+
+    Args:
+        file_path: Path of the .hfb file
+
+    Returns:
+        MappedScript backed by the mapped file (close it, or use it as a
+        context manager, to release the mapping)
+
+    Raises:
+        HappyFrogScriptError: If the file is missing or not a valid .hfb file
+    """
+    try:
+        with open(file_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                raise HFBFormatError(f"Not a Happy Frog compiled script: {file_path}")
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except FileNotFoundError:
+        raise HappyFrogScriptError(f"File not found: {file_path}")
+
+    return MappedScript(mapping, file_path, mapping)
+
+
+class _StringPool(Sequence):
+    """The string pool of a MappedScript, decoding each string on first use."""
+
+    def __init__(self, offsets: memoryview, data: memoryview):
+        self._offsets = offsets
+        self._data = data
+        self._cache: List[Optional[str]] = [None] * (len(offsets) - 1)
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self._cache)
+        text = self._cache[index]
+        if text is None:
+            start, end = self._offsets[index], self._offsets[index + 1]
+            text = self._cache[index] = str(self._data[start:end], 'utf-8', 'surrogatepass')
+        return text
+
+
+class CommandList(MutableSequence):
+    """
+    The commands of a MappedScript, created as they are accessed.
+
+    It behaves like the list in HappyFrogScript.commands: it can be indexed,
+    sliced, compared with lists and modified. The first modification copies
+    the commands into a regular list; until then nothing is decoded.
+    """
+
+    def __init__(self, script: 'MappedScript'):
+        self._script = script
+        self._list: Optional[List[HappyFrogCommand]] = None
+
+    @property
+    def source(self):
+        """The object the commands are decoded from (e.g. the MappedScript)."""
+        return self._script
+
+    def _materialize(self) -> List[HappyFrogCommand]:
+        """Switch to a regular list holding every command."""
+        if self._list is None:
+            self._list = list(self._iter_mapped())
+        return self._list
+
+    def _iter_mapped(self) -> Iterator[HappyFrogCommand]:
+        script = self._script
+        shapes = script._shapes
+        from_shape = HappyFrogCommand.from_shape
+        for shape_id, line_number in zip(script.shape_ids, script.line_numbers):
+            yield from_shape(shapes[shape_id] or script.shape(shape_id), line_number)
+
+    def __len__(self) -> int:
+        if self._list is not None:
+            return len(self._list)
+        return len(self._script)
+
+    def __getitem__(self, index):
+        if self._list is not None:
+            return self._list[index]
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return self._script.command(index)
+
+    def __iter__(self) -> Iterator[HappyFrogCommand]:
+        if self._list is not None:
+            return iter(self._list)
+        return self._iter_mapped()
+
+    def __setitem__(self, index, value):
+        self._materialize()[index] = value
+
+    def __delitem__(self, index):
+        del self._materialize()[index]
+
+    def insert(self, index: int, value: HappyFrogCommand) -> None:
+        self._materialize().insert(index, value)
+
+    def __eq__(self, other):
+        if not isinstance(other, (list, CommandList)):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+
+class MappedScript:
+    """
+    A compiled (.hfb) script read in place from a buffer or memory-mapped file.
+
+    It can be used wherever a HappyFrogScript is read: ``commands`` is a lazy
+    sequence of HappyFrogCommand objects and ``metadata`` is the original
+    script's metadata, so the encoders and DeviceManager.encode_script accept
+    it directly. The columns are exposed as zero-copy memoryviews.
+    """
+
+    def __init__(self, buffer, source_name: str = "<bytes>", mapping: Optional[mmap.mmap] = None):
+        """
+        Read the header of a .hfb buffer.
+
+        Args:
+            buffer: Object supporting the buffer protocol with the file contents
+            source_name: Name of the source (for error reporting)
+            mapping: The mmap backing the buffer, closed by close()
+
+        Raises:
+            HFBFormatError: If the buffer is not a valid .hfb file
+        """
+        self.source_name = source_name
+        self._mapping = mapping
+        self._buffer = memoryview(buffer).cast('B')
+        self._views: List[memoryview] = [self._buffer]
+        try:
+            self._read_sections()
+        except Exception:
+            self.close()
+            raise
+
+    def _read_sections(self) -> None:
+        """Validate the header and set up the section views."""
+        source_name = self.source_name
+        if len(self._buffer) < HEADER.size:
+            raise HFBFormatError(f"Not a Happy Frog compiled script: {source_name}")
+        magic, version, _flags, section_count = HEADER.unpack_from(self._buffer)
+        if magic != MAGIC:
+            raise HFBFormatError(f"Not a Happy Frog compiled script: {source_name}")
+        if version != FORMAT_VERSION:
+            raise HFBFormatError(
+                f"Unsupported .hfb format version {version} in {source_name} "
+                f"(expected {FORMAT_VERSION})"
+            )
+        if section_count != len(SECTIONS):
+            raise HFBFormatError(f"Corrupt .hfb file {source_name}: bad section count")
+        if len(self._buffer) < HEADER.size + DIRECTORY_ENTRY.size * section_count:
+            raise HFBFormatError(f"Corrupt .hfb file {source_name}: truncated directory")
+
+        sections = {}
+        for index, (name, typecode) in enumerate(SECTIONS):
+            offset, length = DIRECTORY_ENTRY.unpack_from(
+                self._buffer, HEADER.size + index * DIRECTORY_ENTRY.size
+            )
+            if offset + length > len(self._buffer):
+                raise HFBFormatError(f"Corrupt .hfb file {source_name}: truncated {name} section")
+            sections[name] = self._section(offset, length, typecode)
+
+        self.opcodes = sections['opcodes']
+        self.line_numbers = sections['line_numbers']
+        self.arg0 = sections['arg0']
+        self.arg1 = sections['arg1']
+        self.shape_ids = sections['shape_ids']
+        self.shape_opcodes = sections['shape_opcodes']
+        self.shape_raw = sections['shape_raw']
+        self.shape_param_offsets = sections['shape_param_offsets']
+        self.shape_params = sections['shape_params']
+        self.strings = _StringPool(sections['string_offsets'], sections['string_data'])
+        try:
+            self.metadata: Dict[str, Any] = json.loads(bytes(sections['metadata']).decode('utf-8'))
+        except ValueError as e:
+            raise HFBFormatError(f"Corrupt .hfb file {source_name}: bad metadata ({e})")
+
+        self._command_types = self._read_command_types(sections['opcode_names'])
+        if self._command_types != COMMAND_TYPES:
+            # Written by a version with a different CommandType order:
+            # renumber the opcodes so they match this one
+            renumber = [COMMAND_TYPES.index(command_type) for command_type in self._command_types]
+            self.opcodes = array('B', [renumber[opcode] for opcode in self.opcodes])
+            self.shape_opcodes = array('B', [renumber[opcode] for opcode in self.shape_opcodes])
+
+        self._shapes: List[Optional[CommandShape]] = [None] * len(self.shape_opcodes)
+        self.commands = CommandList(self)
+
+    def _section(self, offset: int, length: int, typecode: Optional[str]):
+        """Return a view of one section, cast to its column type."""
+        view = self._buffer[offset:offset + length]
+        if typecode is None:
+            self._views.append(view)
+            return view
+        if length % array(typecode).itemsize:
+            raise HFBFormatError(f"Corrupt .hfb file {self.source_name}: misaligned section")
+        if not _LITTLE_ENDIAN:
+            column = array(typecode, bytes(view))
+            column.byteswap()
+            return column
+        view = view.cast(typecode)
+        self._views.append(view)
+        return view
+
+    def _read_command_types(self, names: memoryview) -> tuple:
+        """Map the opcode names stored in the file to CommandType members."""
+        try:
+            return tuple(CommandType[name] for name in json.loads(bytes(names).decode('utf-8')))
+        except (KeyError, ValueError) as e:
+            raise HFBFormatError(f"Unsupported command in {self.source_name}: {e}")
+
+    def __len__(self) -> int:
+        return len(self.opcodes)
+
+    def shape(self, shape_id: int) -> CommandShape:
+        """Return the CommandShape of a shape table entry, decoding it on first use."""
+        if shape_id < 0:
+            shape_id += len(self._shapes)
+        shape = self._shapes[shape_id]
+        if shape is None:
+            strings = self.strings
+            start = self.shape_param_offsets[shape_id]
+            end = self.shape_param_offsets[shape_id + 1]
+            shape = self._shapes[shape_id] = CommandShape(
+                COMMAND_TYPES[self.shape_opcodes[shape_id]],
+                strings[self.shape_raw[shape_id]],
+                [strings[index] for index in self.shape_params[start:end]],
+            )
+        return shape
+
+    def command(self, index: int) -> HappyFrogCommand:
+        """Return the command at the given position."""
+        return HappyFrogCommand.from_shape(
+            self.shape(self.shape_ids[index]), self.line_numbers[index]
+        )
+
+    def to_array(self) -> ScriptArray:
+        """Return a ScriptArray over the mapped columns (no copying)."""
+        return ScriptArray(
+            self.opcodes, self.line_numbers, self.arg0, self.arg1, self.shape_ids,
+            self.shape_opcodes, self.shape_raw, self.shape_param_offsets,
+            self.shape_params, self.strings, dict(self.metadata)
+        )
+
+    def to_script(self) -> HappyFrogScript:
+        """Decode every command into a regular HappyFrogScript."""
+        return HappyFrogScript(commands=list(self.commands), metadata=dict(self.metadata))
+
+    def close(self) -> None:
+        """Release the buffer (and unmap the file when loaded with load_hfb)."""
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        if self._mapping is not None:
+            self._mapping.close()
+            self._mapping = None
+
+    def __enter__(self) -> 'MappedScript':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
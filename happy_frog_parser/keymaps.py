@@ -0,0 +1,198 @@
+"""
+Happy Frog - Keymaps
+
+This module holds the key name -> keycode tables of every code generation
+target. A target's keymap is written as data: the keycodes of its named keys
+and a format for everything else (letters, digits and unknown names). It is
+compiled once, when this module is imported, into a read-only table that also
+contains the letters and digits, the shared aliases such as ESC for ESCAPE,
+and the lower case spelling of every name. Looking a key up is then a single
+dictionary access, and every encoder of a target shares the same table.
+
+Educational Purpose: Demonstrates keeping lookup tables as data instead of
+code, and precomputing them so the hot path does no work.
+
+Author: ZeroDumb
+License: GNU GPLv3
+"""
+
+import string
+from types import MappingProxyType
+from typing import Mapping, Optional
+
+
+# Other names for keys; each target gets them for every key it maps
+ALIASES = MappingProxyType({
+    'ESC': 'ESCAPE',
+    'DEL': 'DELETE',
+    'CONTROL': 'CTRL',
+    'GUI': 'MOD',
+    'WINDOWS': 'MOD',
+    'RETURN': 'ENTER',
+    'SPACEBAR': 'SPACE',
+    'PAGEUP': 'PAGE_UP',
+    'PAGEDOWN': 'PAGE_DOWN',
+    'UPARROW': 'UP',
+    'DOWNARROW': 'DOWN',
+    'LEFTARROW': 'LEFT',
+    'RIGHTARROW': 'RIGHT',
+})
+
+
+class Keymap:
+    """
+    Read-only key name -> keycode table for one target.
+
+    Attributes:
+        name: Name of the target
+        key_format: Format of the keycode of letters, digits and keys
+            without their own entry; {key} is the upper case key name
+        keys: The keycodes given for named keys
+        table: The compiled table used for lookups
+    """
+
+    __slots__ = ('name', 'key_format', 'keys', 'table')
+
+    def __init__(self, name: str, keys: Mapping[str, str], key_format: str):
+        self.name = name
+        self.key_format = key_format
+        self.keys = MappingProxyType(dict(keys))
+
+        table = {char: key_format.format(key=char)
+                 for char in string.ascii_uppercase + string.digits}
+        table.update(self.keys)
+        for alias, key in ALIASES.items():
+            if key in table and alias not in table:
+                table[alias] = table[key]
+        # Add the lower case spellings so that lookups need no upper()
+        for key_name, keycode in list(table.items()):
+            table.setdefault(key_name.lower(), keycode)
+        self.table = MappingProxyType(table)
+
+    def derive(self, keys: Optional[Mapping[str, str]] = None, name: Optional[str] = None,
+               key_format: Optional[str] = None) -> 'Keymap':
+        """Return a new keymap with keys added or replaced; this one is left unchanged."""
+        merged = dict(self.keys)
+        merged.update(keys or {})
+        return Keymap(name or self.name, merged, key_format or self.key_format)
+
+    def keycode(self, key: str) -> str:
+        """Get the keycode for a key name, in any case."""
+        keycode = self.table.get(key)
+        if keycode is None:
+            key = key.upper()
+            keycode = self.table.get(key)
+            if keycode is None:
+                keycode = self.key_format.format(key=key)
+        return keycode
+
+    def __repr__(self) -> str:
+        return f"Keymap({self.name!r}, {len(self.keys)} keys)"
+
+
+# adafruit_hid Keycode constants (CircuitPython)
+CIRCUITPYTHON_KEYMAP = Keymap('circuitpython', {
+    'MOD': 'Keycode.GUI',
+    'CTRL': 'Keycode.CONTROL',
+    'SHIFT': 'Keycode.SHIFT',
+    'ALT': 'Keycode.ALT',
+    'ENTER': 'Keycode.ENTER',
+    'SPACE': 'Keycode.SPACE',
+    'TAB': 'Keycode.TAB',
+    'BACKSPACE': 'Keycode.BACKSPACE',
+    'DELETE': 'Keycode.DELETE',
+    'ESCAPE': 'Keycode.ESCAPE',
+    'HOME': 'Keycode.HOME',
+    'END': 'Keycode.END',
+    'INSERT': 'Keycode.INSERT',
+    'PAGE_UP': 'Keycode.PAGE_UP',
+    'PAGE_DOWN': 'Keycode.PAGE_DOWN',
+    'UP': 'Keycode.UP_ARROW',
+    'DOWN': 'Keycode.DOWN_ARROW',
+    'LEFT': 'Keycode.LEFT_ARROW',
+    'RIGHT': 'Keycode.RIGHT_ARROW',
+}, 'Keycode.{key}')
+
+# The Xiao RP2040 code uses the Windows key and the spacebar names
+XIAO_RP2040_KEYMAP = CIRCUITPYTHON_KEYMAP.derive({
+    'MOD': 'Keycode.WINDOWS',
+    'SPACE': 'Keycode.SPACEBAR',
+    'CAPSLOCK': 'Keycode.CAPS_LOCK',
+}, name='xiao_rp2040')
+
+# The legacy Ducky Script encoder names the digit keycodes
+DUCKY_KEYMAP = CIRCUITPYTHON_KEYMAP.derive({
+    '0': 'Keycode.ZERO', '1': 'Keycode.ONE', '2': 'Keycode.TWO', '3': 'Keycode.THREE',
+    '4': 'Keycode.FOUR', '5': 'Keycode.FIVE', '6': 'Keycode.SIX', '7': 'Keycode.SEVEN',
+    '8': 'Keycode.EIGHT', '9': 'Keycode.NINE',
+}, name='ducky')
+
+# Arduino Keyboard library: modifier constants and character literals
+ARDUINO_KEYMAP = Keymap('arduino', {
+    'MOD': 'KEY_LEFT_GUI',
+    'CTRL': 'KEY_LEFT_CTRL',
+    'SHIFT': 'KEY_LEFT_SHIFT',
+    'ALT': 'KEY_LEFT_ALT',
+    'ENTER': 'KEY_RETURN',
+    'SPACE': "' '",
+    'TAB': 'KEY_TAB',
+    'BACKSPACE': 'KEY_BACKSPACE',
+    'DELETE': 'KEY_DELETE',
+    'ESCAPE': 'KEY_ESC',
+    'HOME': 'KEY_HOME',
+    'END': 'KEY_END',
+    'INSERT': 'KEY_INSERT',
+    'PAGE_UP': 'KEY_PAGE_UP',
+    'PAGE_DOWN': 'KEY_PAGE_DOWN',
+    'UP': 'KEY_UP_ARROW',
+    'DOWN': 'KEY_DOWN_ARROW',
+    'LEFT': 'KEY_LEFT_ARROW',
+    'RIGHT': 'KEY_RIGHT_ARROW',
+}, "'{key}'")
+
+# DigiKeyboard (ATtiny85 boards) and BleKeyboard (ESP32) KEY_* constants
+DIGIKEYBOARD_KEYMAP = Keymap('digikeyboard', {
+    'MOD': 'KEY_GUI',
+    'CTRL': 'KEY_CTRL',
+    'SHIFT': 'KEY_SHIFT',
+    'ALT': 'KEY_ALT',
+    'ENTER': 'KEY_ENTER',
+    'SPACE': 'KEY_SPACE',
+    'TAB': 'KEY_TAB',
+    'BACKSPACE': 'KEY_BACKSPACE',
+    'DELETE': 'KEY_DELETE',
+    'ESCAPE': 'KEY_ESC',
+    'HOME': 'KEY_HOME',
+    'END': 'KEY_END',
+    'INSERT': 'KEY_INSERT',
+    'PAGE_UP': 'KEY_PAGE_UP',
+    'PAGE_DOWN': 'KEY_PAGE_DOWN',
+    'UP': 'KEY_UP_ARROW',
+    'DOWN': 'KEY_DOWN_ARROW',
+    'LEFT': 'KEY_LEFT_ARROW',
+    'RIGHT': 'KEY_RIGHT_ARROW',
+    # Punctuation is sent as the key it is on
+    '!': 'KEY_1', '@': 'KEY_2', '#': 'KEY_3', '$': 'KEY_4',
+    '%': 'KEY_5', '^': 'KEY_6', '&': 'KEY_7', '*': 'KEY_8',
+    '(': 'KEY_9', ')': 'KEY_0', '-': 'KEY_MINUS', '=': 'KEY_EQUAL',
+    '[': 'KEY_LEFT_BRACE', ']': 'KEY_RIGHT_BRACE',
+    '\\': 'KEY_BACKSLASH', ';': 'KEY_SEMICOLON',
+    "'": 'KEY_QUOTE', ',': 'KEY_COMMA', '.': 'KEY_PERIOD',
+    '/': 'KEY_SLASH', '`': 'KEY_TILDE',
+}, 'KEY_{key}')
+
+# Every keymap by target name
+KEYMAPS: Mapping[str, Keymap] = MappingProxyType({
+    keymap.name: keymap for keymap in
+    (CIRCUITPYTHON_KEYMAP, XIAO_RP2040_KEYMAP, DUCKY_KEYMAP, ARDUINO_KEYMAP, DIGIKEYBOARD_KEYMAP)
+})
+
+
+def get_keymap(name: str) -> Keymap:
+    """
+    Get the keymap of a target.
+
+    Raises:
+        KeyError: If there is no keymap with that name
+    """
+    return KEYMAPS[name]
@@ -0,0 +1,169 @@
+"""
+Happy Frog - Keystroke Lowering
+
+This module turns a parsed script into a device-neutral stream of keystroke
+events: keys going down and up, text being typed, waits and log messages.
+What a command means is decided here, once: the press and release order of a
+modifier combo, which delay values are valid, what REPEAT repeats. The device
+encoders then only print the events in their own language.
+
+A script is lowered once and the result can be printed by any number of
+devices, so compiling one payload for every board does the expensive part of
+the work a single time.
+
+Educational Purpose: Demonstrates a two-stage compiler: a front end that
+lowers the source into a small intermediate representation, and thin back
+ends that print it.
+
+Author: ZeroDumb
+License: GNU GPLv3
+"""
+
+from enum import Enum
+from typing import Any, Iterable, NamedTuple, Tuple
+from .dispatch import EncoderBase, handles
+from .parser import CommandType, HappyFrogCommand
+
+
+class EventType(Enum):
+    """Kinds of keystroke events."""
+    KEY_DOWN = "key_down"        # value: key name, held until its KEY_UP
+    KEY_UP = "key_up"            # value: key name
+    KEY_TAP = "key_tap"          # value: key name, pressed and released
+    CHORD = "chord"              # value: key names; marks the start of a combo
+    TYPE_TEXT = "type_text"      # value: text
+    WAIT = "wait"                # value: milliseconds
+    RANDOM_WAIT = "random_wait"  # value: (min, max) milliseconds
+    LOG = "log"                  # value: message
+    ERROR = "error"              # value: message; the command could not be lowered
+
+    # Events are looked up in the printers' handler tables for every event
+    __hash__ = object.__hash__
+
+
+class Event(NamedTuple):
+    """One keystroke event."""
+    type: EventType
+    value: Any = None
+
+
+class LoweredCommand(NamedTuple):
+    """A command and the events it was lowered to."""
+    command: HappyFrogCommand
+    events: Tuple[Event, ...]
+
+
+class Lowerer(EncoderBase):
+    """
+    Lowers commands to keystroke events.
+
+    Commands without a handler of their own are sent as a tap of the key
+    they are named after.
+    """
+
+    def lower_command(self, command: HappyFrogCommand) -> Tuple[Event, ...]:
+        """Lower a single command. REPEAT needs a script and lowers to an error here."""
+        return self.dispatch(command)
+
+    def lower_commands(self, commands: Iterable[HappyFrogCommand]) -> Tuple[LoweredCommand, ...]:
+        """Lower a sequence of commands."""
+        handlers = self._handlers
+        repeat = CommandType.REPEAT
+        comments = (CommandType.COMMENT, CommandType.REM)
+        lowered = []
+        previous: Tuple[Event, ...] = ()
+        for command in commands:
+            command_type = command.command_type
+            if command_type is repeat:
+                events = self._lower_repeat(command, previous)
+            else:
+                handler = handlers.get(command_type)
+                events = self.encode_default(command) if handler is None else handler(self, command)
+                # REPEAT repeats the last command that is not a comment
+                if command_type not in comments:
+                    previous = events
+            lowered.append(LoweredCommand(command, events))
+        return tuple(lowered)
+
+    @handles(CommandType.DELAY)
+    def _lower_delay(self, command: HappyFrogCommand) -> Tuple[Event, ...]:
+        try:
+            delay_ms = command.int_arg(0)
+        except (ValueError, IndexError):
+            delay_ms = -1
+        if delay_ms < 0:
+            return (Event(EventType.ERROR, "Invalid delay value"),)
+        return (Event(EventType.WAIT, delay_ms),)
+
+    @handles(CommandType.STRING)
+    def _lower_string(self, command: HappyFrogCommand) -> Tuple[Event, ...]:
+        if not command.parameters:
+            return (Event(EventType.ERROR, "STRING command missing text"),)
+        return (Event(EventType.TYPE_TEXT, command.parameters[0]),)
+
+    @handles(CommandType.MODIFIER_COMBO)
+    def _lower_modifier_combo(self, command: HappyFrogCommand) -> Tuple[Event, ...]:
+        """Press all keys in order, then release them in reverse order."""
+        keys = tuple(command.parameters)
+        if not keys:
+            return (Event(EventType.ERROR, "MODIFIER_COMBO command missing parameters"),)
+        events = [Event(EventType.CHORD, keys)]
+        events.extend([Event(EventType.KEY_DOWN, key) for key in keys])
+        events.extend([Event(EventType.KEY_UP, key) for key in reversed(keys)])
+        return tuple(events)
+
+    @handles(CommandType.RANDOM_DELAY)
+    def _lower_random_delay(self, command: HappyFrogCommand) -> Tuple[Event, ...]:
+        if len(command.parameters) < 2:
+            return (Event(EventType.ERROR, "RANDOM_DELAY command missing min/max values"),)
+        try:
+            return (Event(EventType.RANDOM_WAIT, (command.int_arg(0), command.int_arg(1))),)
+        except ValueError:
+            return (Event(EventType.ERROR, "Invalid random delay values"),)
+
+    @handles(CommandType.REPEAT)
+    def _lower_repeat(self, command: HappyFrogCommand, previous: Tuple[Event, ...] = ()) -> Tuple[Event, ...]:
+        """Repeat the events of the previous command."""
+        try:
+            count = command.int_arg(0)
+        except (ValueError, IndexError):
+            count = 0
+        if count < 1:
+            return (Event(EventType.ERROR, "Invalid repeat count"),)
+        if not previous:
+            return (Event(EventType.ERROR, "No previous command to repeat"),)
+        return previous * count
+
+    @handles(CommandType.LOG)
+    def _lower_log(self, command: HappyFrogCommand) -> Tuple[Event, ...]:
+        if not command.parameters:
+            return (Event(EventType.ERROR, "LOG command missing message"),)
+        return (Event(EventType.LOG, command.parameters[0]),)
+
+    def encode_default(self, command: HappyFrogCommand) -> Tuple[Event, ...]:
+        events = _KEY_TAPS.get(command.command_type)
+        if events is None:
+            events = _KEY_TAPS[command.command_type] = (Event(EventType.KEY_TAP, command.command_type.value),)
+        return events
+
+
+# Key taps by command type; events are immutable, so commands can share them
+_KEY_TAPS = {}
+
+
+# Lowering keeps no state between calls, so one instance serves everyone
+_LOWERER = Lowerer()
+
+
+def lower_command(command: HappyFrogCommand) -> Tuple[Event, ...]:
+    """Lower a single command to keystroke events."""
+    return _LOWERER.lower_command(command)
+
+
+def lower_script(script) -> Tuple[LoweredCommand, ...]:
+    """
+    Lower a script (a HappyFrogScript or a MappedScript loaded from .hfb).
+
+    The result is immutable and can be printed by any number of devices.
+    """
+    return _LOWERER.lower_commands(script.commands)
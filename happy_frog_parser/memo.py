@@ -0,0 +1,95 @@
+"""
+Happy Frog - Fragment Memo
+
+This module provides FragmentMemo, a bounded in-memory LRU memo of encoded
+code fragments. Payloads repeat the same few commands thousands of times
+(ENTER, DELAY 100, CTRL c, identical STRING lines); the encoders render each
+distinct command once, keep the resulting lines, and reuse them for every
+later occurrence. Hit/miss counters show how much a script benefits.
+
+Educational Purpose: Demonstrates memoization, LRU eviction and measuring a
+cache with hit-rate counters.
+
+Author: ZeroDumb
+License: GNU GPLv3
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+DEFAULT_MAX_ENTRIES = 4096
+
+
+class FragmentMemo:
+    """
+    Bounded least-recently-used memo of encoded fragments.
+
+    Keys are hashable descriptions of a command (its type, parameters and
+    whatever encoder state its code depends on) and values are the rendered
+    lines, stored as tuples so they can be shared safely. A memo can be
+    used from several threads at once.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        """
+        Initialize the memo.
+
+        Args:
+            max_entries: Number of fragments kept; the least recently used
+                one is evicted past that. 0 disables the memo.
+        """
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[Hashable, Tuple[str, ...]]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Tuple[str, ...]]:
+        """Return the lines stored for key, or None."""
+        with self._lock:
+            lines = self._entries.get(key)
+            if lines is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return lines
+
+    def put(self, key: Hashable, lines) -> Tuple[str, ...]:
+        """Store the lines for key and return them as a tuple."""
+        lines = tuple(lines)
+        if self.max_entries > 0:
+            with self._lock:
+                entries = self._entries
+                entries[key] = lines
+                if len(entries) > self.max_entries:
+                    entries.popitem(last=False)
+                    self.evictions += 1
+        return lines
+
+    def clear(self) -> None:
+        """Remove every entry; the counters are kept."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return the hit/miss counters and the current size of the memo.
+
+        Returns:
+            Dictionary with hits, misses, evictions, hit_rate and entries
+        """
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': len(self._entries),
+        }
@@ -0,0 +1,368 @@
+"""
+Happy Frog - Parallel Parsing
+
+This module spreads parsing over several CPU cores in two ways.
+
+parse_files parses many script files on a process pool. Files are handed
+out in small batches, and results are yielded as soon as each batch is
+done, with parse errors attached to their file.
+
+parse_chunked parses one very large script. The source is split at line boundaries into chunks, each chunk is lexed in a worker
+process with its line-number offset, and the results are merged in order.
+Block structure (IF/ELSE/ENDIF, WHILE/ENDWHILE) is then checked in one
+sequential pass, so the result - including which error is reported first -
+is exactly what HappyFrogParser.parse_string returns.
+
+In both cases workers send back each distinct command shape once plus two
+packed integer arrays (shape index and line number per command), which is
+far cheaper to transfer between processes than pickled command objects.
+The results keep that form: like a script loaded from .hfb, their commands
+are created as they are accessed, so merging costs no more than
+concatenating arrays.
+
+Educational Purpose: Demonstrates data parallelism, ordered merging of
+partial results and compact inter-process serialization.
+
+Author: ZeroDumb
+License: GNU GPLv3
+"""
+
+import copy
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from .parser import (
+    BlockChecker, CommandShape, CommandType, HappyFrogCommand, HappyFrogParser,
+    HappyFrogScript, HappyFrogScriptError
+)
+from .hfb import CommandList
+
+
+# Chunks smaller than this are not worth a worker process
+MIN_CHUNK_LINES = 50000
+
+# Largest number of files sent to a worker at once by parse_files
+MAX_FILE_BATCH = 32
+
+# Parser used by the current worker process (set by _init_worker)
+_worker_parser: Optional[HappyFrogParser] = None
+
+
+def split_chunks(content: str, count: int) -> List[Tuple[str, int]]:
+    """
+    Split script text at line boundaries into at most count chunks.
+
+    Args:
+        content: Script text
+        count: Number of chunks wanted
+
+    Returns:
+        List of (chunk text, line number of its first line); joining the
+        chunk texts with '\\n' gives back the original text
+    """
+    chunks = []
+    start = 0
+    first_line = 1
+    for k in range(1, count):
+        end = content.find('\n', max(start, len(content) * k // count))
+        if end < 0:
+            break
+        chunk = content[start:end]
+        chunks.append((chunk, first_line))
+        first_line += chunk.count('\n') + 1
+        start = end + 1
+    chunks.append((content[start:], first_line))
+    return chunks
+
+
+class MergedChunks:
+    """
+    Lexed chunks joined into one script, decoded as they are accessed.
+
+    Provides the shape table and columns that hfb.CommandList reads, so a
+    chunked parse hands out the same lazy command list as a .hfb file.
+    """
+
+    def __init__(self):
+        self.shape_tuples: List[tuple] = []
+        self._shapes: List[Optional[CommandShape]] = []
+        self.shape_ids = array('I')
+        self.line_numbers = array('I')
+
+    def append(self, shape_tuples: List[tuple], shape_ids: bytes, line_numbers: bytes) -> None:
+        """Add the result of one chunk."""
+        offset = len(self.shape_tuples)
+        self.shape_tuples.extend(shape_tuples)
+        self._shapes.extend([None] * len(shape_tuples))
+        ids = array('I')
+        ids.frombytes(shape_ids)
+        if offset:
+            ids = array('I', map(offset.__add__, ids))
+        self.shape_ids.extend(ids)
+        self.line_numbers.frombytes(line_numbers)
+
+    def __len__(self) -> int:
+        return len(self.shape_ids)
+
+    def shape(self, shape_id: int) -> CommandShape:
+        """Return the CommandShape of a shape table entry, creating it on first use."""
+        shape = self._shapes[shape_id]
+        if shape is None:
+            value, raw_text, parameters = self.shape_tuples[shape_id]
+            shape = self._shapes[shape_id] = CommandShape(CommandType(value), raw_text, parameters)
+        return shape
+
+    def command(self, index: int) -> HappyFrogCommand:
+        """Return the command at the given position."""
+        return HappyFrogCommand.from_shape(
+            self.shape(self.shape_ids[index]), self.line_numbers[index]
+        )
+
+
+@dataclass
+class FileResult:
+    """The outcome of parsing one file with parse_files."""
+    path: str
+    script: Optional[HappyFrogScript] = None
+    error: Optional[HappyFrogScriptError] = None
+
+    @property
+    def ok(self) -> bool:
+        """True if the file parsed without errors."""
+        return self.error is None
+
+
+def _worker_copy(parser: HappyFrogParser, keep_cache: bool) -> HappyFrogParser:
+    """Return a copy of a parser to send to worker processes."""
+    worker_parser = copy.copy(parser)
+    worker_parser._shape_cache = {}
+    if not keep_cache:
+        worker_parser.cache = None
+    return worker_parser
+
+
+def _init_worker(parser: HappyFrogParser) -> None:
+    """Install the parser used by this worker process."""
+    global _worker_parser
+    _worker_parser = parser
+
+
+def _pack_commands(commands: Iterable[HappyFrogCommand]) -> tuple:
+    """Return (shape tuples, packed shape ids, packed line numbers) for commands."""
+    shapes = []
+    shape_index = {}
+    shape_ids = array('I')
+    line_numbers = array('I')
+    for command in commands:
+        shape = command._shape
+        index = shape_index.get(id(shape))
+        if index is None:
+            index = shape_index[id(shape)] = len(shapes)
+            shapes.append(shape)
+        shape_ids.append(index)
+        line_numbers.append(command.line_number)
+    return (
+        [(shape.command_type.value, shape.raw_text, tuple(shape.parameters)) for shape in shapes],
+        shape_ids.tobytes(),
+        line_numbers.tobytes(),
+    )
+
+
+def _parse_batch(paths: List[str]) -> List[tuple]:
+    """
+    Parse a batch of files in a worker process.
+
+    Returns:
+        One (path, packed commands, metadata, error message) tuple per file;
+        packed commands and metadata are None if the file failed to parse
+    """
+    replies = []
+    for path in paths:
+        try:
+            script = _worker_parser.parse_file(path)
+        except HappyFrogScriptError as e:
+            replies.append((path, None, None, str(e)))
+        else:
+            replies.append((path, _pack_commands(script.commands), dict(script.metadata), None))
+    return replies
+
+
+def _file_result(path: str, packed: Optional[tuple], metadata: Optional[dict],
+                 error: Optional[str]) -> FileResult:
+    """Turn a worker's reply into a FileResult."""
+    if error is not None:
+        return FileResult(path, error=HappyFrogScriptError(error))
+    commands = MergedChunks()
+    commands.append(*packed)
+    return FileResult(path, HappyFrogScript(commands=CommandList(commands), metadata=metadata))
+
+
+def parse_files(parser: HappyFrogParser, paths: Iterable[str],
+                workers: Optional[int] = None) -> Iterator[FileResult]:
+    """
+    Parse many script files concurrently.
+
+    A file that fails to parse does not stop the others; its FileResult
+    carries the error instead of a script. If the parser has a parse cache,
+    workers use it too.
+
+    Args:
+        parser: Parser whose grammar (and cache) is used
+        paths: Script files to parse
+        workers: Number of worker processes (default: one per CPU); with 1
+            the files are parsed in this process
+
+    Yields:
+        FileResult objects in the order the files finish
+    """
+    paths = [str(path) for path in paths]
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(paths))
+
+    if workers <= 1:
+        for path in paths:
+            try:
+                yield FileResult(path, parser.parse_file(path))
+            except HappyFrogScriptError as e:
+                yield FileResult(path, error=e)
+        return
+
+    # Batches amortize the cost of a round trip to a worker over several
+    # small files while still leaving a few batches per worker to balance
+    batch_size = max(1, min(MAX_FILE_BATCH, len(paths) // (workers * 4)))
+    worker_parser = _worker_copy(parser, keep_cache=True)
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(worker_parser,)) as pool:
+        futures = [pool.submit(_parse_batch, paths[start:start + batch_size])
+                   for start in range(0, len(paths), batch_size)]
+        try:
+            for future in as_completed(futures):
+                for reply in future.result():
+                    yield _file_result(*reply)
+        finally:
+            # Stop early if the caller stops iterating
+            for future in futures:
+                future.cancel()
+
+
+def _lex_chunk(text: str, first_line: int) -> tuple:
+    """
+    Lex one chunk in a worker process.
+
+    Lexing stops at the first line that cannot be parsed, since a serial
+    parse would report that error and read no further.
+
+    Returns:
+        (shapes, shape_ids, line_numbers, blocks, error) where shapes are
+        (type value, raw text, parameters) tuples, shape_ids and
+        line_numbers are packed 'I' arrays, blocks lists the (type value,
+        line number) of block commands and error is (line number, message)
+        or None
+    """
+    line_shape = _worker_parser._line_shape
+    shapes = []
+    shape_index = {}
+    shape_ids = array('I')
+    line_numbers = array('I')
+    blocks = []
+    error = None
+
+    for line_number, line in enumerate(text.split('\n'), first_line):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            shape = line_shape(line)
+        except HappyFrogScriptError as e:
+            error = (line_number, str(e))
+            break
+
+        index = shape_index.get(id(shape))
+        if index is None:
+            index = shape_index[id(shape)] = len(shapes)
+            shapes.append(shape)
+        shape_ids.append(index)
+        line_numbers.append(line_number)
+        if shape.block_role is not None:
+            blocks.append((shape.block_role.value, line_number))
+
+    return (
+        [(shape.command_type.value, shape.raw_text, tuple(shape.parameters)) for shape in shapes],
+        shape_ids.tobytes(),
+        line_numbers.tobytes(),
+        blocks,
+        error,
+    )
+
+
+def parse_chunked(parser: HappyFrogParser, content: str, source_name: str = "<string>",
+                  workers: int = 2) -> HappyFrogScript:
+    """
+    Parse a script string on several worker processes.
+
+    Scripts too small to split into chunks of MIN_CHUNK_LINES lines are
+    parsed serially.
+
+    Args:
+        parser: Parser whose grammar is used (copied to the workers)
+        content: Script text
+        source_name: Name of the source (for error reporting)
+        workers: Number of worker processes
+
+    Returns:
+        The same HappyFrogScript as parser.parse_string(content, source_name);
+        its commands are created on access (see MergedChunks)
+
+    Raises:
+        HappyFrogScriptError: The same error a serial parse would raise
+    """
+    total_lines = content.count('\n') + 1
+    count = min(workers, total_lines // MIN_CHUNK_LINES)
+    if count <= 1:
+        return parser._parse_lines(content.split('\n'), source_name)
+
+    # Workers only need the grammar, not the cache or lexed lines
+    worker_parser = _worker_copy(parser, keep_cache=False)
+
+    merged = MergedChunks()
+    blocks = BlockChecker()
+    error = None
+    with ProcessPoolExecutor(count, initializer=_init_worker, initargs=(worker_parser,)) as pool:
+        futures = [pool.submit(_lex_chunk, text, first_line)
+                   for text, first_line in split_chunks(content, count)]
+        try:
+            for future in futures:
+                shape_tuples, shape_ids, line_numbers, block_commands, error = future.result()
+                merged.append(shape_tuples, shape_ids, line_numbers)
+                # A nesting error before the first unparsable line is
+                # reported first, just as in a serial parse
+                for value, line_number in block_commands:
+                    try:
+                        blocks.feed(CommandType(value), line_number)
+                    except HappyFrogScriptError as e:
+                        raise HappyFrogScriptError(
+                            f"Error in {source_name}, line {line_number}: {str(e)}"
+                        )
+                if error is not None:
+                    # Later chunks cannot change the first error
+                    break
+        finally:
+            for future in futures:
+                future.cancel()
+
+    if error is not None:
+        line_number, message = error
+        raise HappyFrogScriptError(f"Error in {source_name}, line {line_number}: {message}")
+    unclosed = blocks.unclosed()
+    if unclosed:
+        message, opened_on = unclosed
+        raise HappyFrogScriptError(f"Error in {source_name}, line {opened_on}: {message}")
+
+    return HappyFrogScript(commands=CommandList(merged), metadata={
+        'source': source_name,
+        'total_commands': len(merged),
+        'total_lines': total_lines,
+    })
@@ -11,10 +11,13 @@ Author: ZeroDumb
 License: GNU GPLv3
 """
 
-import re
-from typing import List, Dict, Any, Optional, Union
-from dataclasses import dataclass
-from enum import Enum
+import io
+import sys
+from itertools import islice
+from typing import List, Dict, Any, Optional, Union, Iterable, Iterator, Mapping, Pattern, TextIO, Tuple
+from dataclasses import dataclass, field
+
+from .grammar import CommandType, GRAMMAR_VERSION, Grammar, HAPPY_FROG_GRAMMAR, ModifierComboMatcher
 
 
 class HappyFrogScriptError(Exception):
@@ -22,80 +25,247 @@ class HappyFrogScriptError(Exception):
     pass
 
 
-class CommandType(Enum):
-    """Enumeration of supported Happy Frog Script commands."""
-    DELAY = "DELAY"
-    STRING = "STRING"
-    ENTER = "ENTER"
-    SPACE = "SPACE"
-    TAB = "TAB"
-    BACKSPACE = "BACKSPACE"
-    DELETE = "DELETE"
-    UP = "UP"
-    DOWN = "DOWN"
-    LEFT = "LEFT"
-    RIGHT = "RIGHT"
-    HOME = "HOME"
-    END = "END"
-    INSERT = "INSERT"
-    PAGE_UP = "PAGE_UP"
-    PAGE_DOWN = "PAGE_DOWN"
-    ESCAPE = "ESCAPE"
-    F1 = "F1"
-    F2 = "F2"
-    F3 = "F3"
-    F4 = "F4"
-    F5 = "F5"
-    F6 = "F6"
-    F7 = "F7"
-    F8 = "F8"
-    F9 = "F9"
-    F10 = "F10"
-    F11 = "F11"
-    F12 = "F12"
-    CTRL = "CTRL"
-    SHIFT = "SHIFT"
-    ALT = "ALT"
-    MOD = "MOD"  # Modifier key (Windows/Command/Super)
-    MODIFIER_COMBO = "MODIFIER_COMBO"  # For combos like MOD r
-    PAUSE = "PAUSE"  # Pause execution (Ducky Script compatibility)
-    
-    # Advanced Ducky Script features
-    REPEAT = "REPEAT"  # Repeat previous command n times
-    DEFAULT_DELAY = "DEFAULT_DELAY"  # Set default delay between commands
-    DEFAULTDELAY = "DEFAULT_DELAY"  # Alternative syntax
-    
-    # Conditional logic (Happy Frog exclusive)
-    IF = "IF"  # Conditional execution
-    ELSE = "ELSE"  # Else block
-    ENDIF = "ENDIF"  # End conditional block
-    WHILE = "WHILE"  # While loop
-    ENDWHILE = "ENDWHILE"  # End while loop
-    
-    # Happy Frog exclusive features
-    RANDOM_DELAY = "RANDOM_DELAY"  # Random delay for human-like behavior
-    LOG = "LOG"  # Logging for debugging
-    VALIDATE = "VALIDATE"  # Validate environment before execution
-    SAFE_MODE = "SAFE_MODE"  # Enable safe mode restrictions
-    
-    # BadUSB compatibility commands
-    ATTACKMODE = "ATTACKMODE"  # BadUSB attack mode configuration
-    
-    COMMENT = "COMMENT"
-    REM = "REM"  # Alternative comment syntax
+# Commands that open, split or close an IF or WHILE block
+BLOCK_COMMANDS = frozenset({
+    CommandType.IF, CommandType.ELSE, CommandType.ENDIF,
+    CommandType.WHILE, CommandType.ENDWHILE,
+})
+
+# Commands whose parameters are integers (converted once per shape)
+NUMERIC_COMMANDS = frozenset({
+    CommandType.DELAY, CommandType.REPEAT,
+    CommandType.DEFAULT_DELAY, CommandType.RANDOM_DELAY,
+})
+
+# Commands carrying free text. Their lines are rarely repeated, so their
+# shapes are neither pooled nor cached by line
+FREE_TEXT_COMMANDS = frozenset({
+    CommandType.STRING, CommandType.REM, CommandType.COMMENT,
+})
+
+# Upper bound on the number of interned command shapes kept around. When a
+# pool is full, its least recently used entry is dropped.
+_SHAPE_CACHE_LIMIT = 256
+
+_shape_pool: Dict[tuple, 'CommandShape'] = {}
+
+
+def _numeric_args(parameters: List[str]) -> tuple:
+    """Convert parameters with int(), using None for those that are not integers."""
+    args = []
+    for parameter in parameters:
+        try:
+            args.append(int(parameter))
+        except (ValueError, TypeError):
+            args.append(None)
+    return tuple(args)
+
+
+def _is_internable(parameter) -> bool:
+    """Return True for short keyword or number parameters worth interning."""
+    return type(parameter) is str and len(parameter) <= 16 and parameter.isalnum()
+
+
+class ParameterList(list):
+    """
+    Read-only list of command parameters.
+    
+    Parameter lists are shared by every identical command, so they compare
+    equal to (and read like) ordinary lists but cannot be changed in place.
+    Assign a new list to ``command.parameters`` instead.
+    """
+    
+    __slots__ = ()
+    
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("Command parameters are shared and cannot be modified in place")
+    
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _read_only
+    append = extend = insert = pop = remove = clear = sort = reverse = _read_only
+    
+    def __reduce__(self):
+        return (ParameterList, (list(self),))
+
+
+class CommandShape:
+    """
+    The shared, immutable part of a command: its type, text and parameters.
+    
+    Identical commands (every bare ``ENTER``, every ``DELAY 500``) share one
+    CommandShape, so a script only stores a line number per command. Use
+    ``CommandShape.intern()`` to get the shared instance.
+    
+    The parser's typed view of the command is derived once per shape:
+    ``args`` holds the parameters of numeric commands (DELAY, REPEAT,
+    DEFAULT_DELAY, RANDOM_DELAY) converted to int, or None for the
+    parameters that are not integers, and ``block_role`` marks block commands.
+    """
+    
+    __slots__ = ('command_type', 'raw_text', 'parameters', 'block_role', 'args')
+    
+    def __init__(self, command_type: CommandType, raw_text: str,
+                 parameters: Optional[List[str]] = None):
+        object.__setattr__(self, 'command_type', command_type)
+        object.__setattr__(self, 'raw_text', raw_text)
+        object.__setattr__(self, 'parameters', ParameterList(parameters or ()))
+        # The command type for IF/ELSE/ENDIF/WHILE/ENDWHILE, None otherwise,
+        # so block checking can skip other commands with one attribute read
+        object.__setattr__(self, 'block_role',
+                           command_type if command_type in BLOCK_COMMANDS else None)
+        object.__setattr__(self, 'args', _numeric_args(self.parameters)
+                           if command_type in NUMERIC_COMMANDS else None)
+    
+    @classmethod
+    def intern(cls, command_type: CommandType, raw_text: str,
+               parameters: Optional[List[str]] = None) -> 'CommandShape':
+        """
+        Return the shared shape for a command, creating it if needed.
+        
+        Keyword-like parameters (``500``, ``ON``, ``CTRL``...) are interned
+        as well, so equal parameters of different commands (e.g. ``DELAY
+        500`` and ``DEFAULT_DELAY 500``) are stored once. Commands with free
+        text (FREE_TEXT_COMMANDS) get a shape of their own, so unique
+        payloads neither fill the pool nor push the shared shapes out.
+        """
+        if command_type in FREE_TEXT_COMMANDS:
+            return cls(command_type, raw_text, parameters)
+        
+        parameters = tuple(
+            sys.intern(parameter) if _is_internable(parameter) else parameter
+            for parameter in parameters or ()
+        )
+        key = (command_type, raw_text, parameters)
+        try:
+            # Taken out and put back below, keeping the pool in LRU order
+            shape = _shape_pool.pop(key, None)
+        except TypeError:
+            # Unhashable parameters cannot be pooled
+            return cls(command_type, raw_text, parameters)
+        
+        if shape is None:
+            shape = cls(command_type, raw_text, parameters)
+            if len(_shape_pool) >= _SHAPE_CACHE_LIMIT:
+                del _shape_pool[next(iter(_shape_pool))]
+        _shape_pool[key] = shape
+        return shape
+    
+    def __setattr__(self, name, value):
+        raise AttributeError(f"CommandShape is immutable (cannot set '{name}')")
+    
+    def __eq__(self, other):
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return (self.command_type == other.command_type and
+                self.raw_text == other.raw_text and
+                self.parameters == other.parameters)
+    
+    def __hash__(self):
+        return hash((self.command_type, self.raw_text, tuple(self.parameters)))
+    
+    def __repr__(self):
+        return (f"CommandShape(command_type={self.command_type!r}, "
+                f"raw_text={self.raw_text!r}, parameters={self.parameters!r})")
+    
+    def __reduce__(self):
+        return (CommandShape.intern, (self.command_type, self.raw_text, list(self.parameters)))
 
 
-@dataclass
 class HappyFrogCommand:
-    """Represents a single Happy Frog Script command with its parameters."""
-    command_type: CommandType
-    line_number: int
-    raw_text: str
-    parameters: Optional[List[str]] = None
+    """
+    Represents a single Happy Frog Script command with its parameters.
     
-    def __post_init__(self):
-        if self.parameters is None:
-            self.parameters = []
+    Commands are slotted and only hold their line number plus a reference
+    to a shared CommandShape with the command type, raw text and parameters.
+    The attributes read and compare like plain fields; assigning to one of
+    them gives the command a new shape instead of changing the shared one.
+    """
+    
+    __slots__ = ('line_number', '_shape')
+    
+    def __init__(self, command_type: CommandType, line_number: int, raw_text: str,
+                 parameters: Optional[List[str]] = None):
+        self.line_number = line_number
+        self._shape = CommandShape.intern(command_type, raw_text, parameters)
+    
+    @classmethod
+    def from_shape(cls, shape: CommandShape, line_number: int) -> 'HappyFrogCommand':
+        """Create a command on the given line that reuses an existing shape."""
+        command = object.__new__(cls)
+        command._shape = shape
+        command.line_number = line_number
+        return command
+    
+    @property
+    def shape(self) -> CommandShape:
+        """The shared CommandShape of this command."""
+        return self._shape
+    
+    @property
+    def command_type(self) -> CommandType:
+        return self._shape.command_type
+    
+    @command_type.setter
+    def command_type(self, value: CommandType):
+        shape = self._shape
+        self._shape = CommandShape.intern(value, shape.raw_text, shape.parameters)
+    
+    @property
+    def raw_text(self) -> str:
+        return self._shape.raw_text
+    
+    @raw_text.setter
+    def raw_text(self, value: str):
+        shape = self._shape
+        self._shape = CommandShape.intern(shape.command_type, value, shape.parameters)
+    
+    @property
+    def parameters(self) -> List[str]:
+        return self._shape.parameters
+    
+    @parameters.setter
+    def parameters(self, value: Optional[List[str]]):
+        shape = self._shape
+        self._shape = CommandShape.intern(shape.command_type, shape.raw_text, value)
+    
+    @property
+    def args(self) -> Optional[tuple]:
+        """The integer parameters of a numeric command (see CommandShape), else None."""
+        return self._shape.args
+    
+    def int_arg(self, index: int) -> int:
+        """
+        Return a parameter as an integer, converted once at parse time.
+        
+        Raises:
+            ValueError: If the parameter is not an integer
+            IndexError: If the command has no such parameter
+        """
+        args = self._shape.args
+        if args is not None:
+            value = args[index]
+            if value is not None:
+                return value
+        # Not a numeric command, or not an integer: int() gives the error
+        return int(self.parameters[index])
+    
+    def __eq__(self, other):
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return (self.line_number == other.line_number and
+                (self._shape is other._shape or self._shape == other._shape))
+    
+    # Commands are mutable (like the dataclass they replace), so not hashable
+    __hash__ = None
+    
+    def __repr__(self):
+        return (f"HappyFrogCommand(command_type={self.command_type!r}, "
+                f"line_number={self.line_number!r}, raw_text={self.raw_text!r}, "
+                f"parameters={self.parameters!r})")
+    
+    def __reduce__(self):
+        shape = self._shape
+        return (self.__class__, (shape.command_type, self.line_number,
+                                 shape.raw_text, list(shape.parameters)))
 
 
 @dataclass
@@ -109,6 +279,134 @@ class HappyFrogScript:
             self.metadata = {}
 
 
+@dataclass
+class Block:
+    """An IF or WHILE block matched with its ELSE and closing command."""
+    opener: HappyFrogCommand
+    body: List[Union[HappyFrogCommand, 'Block']] = field(default_factory=list)
+    else_command: Optional[HappyFrogCommand] = None
+    else_body: List[Union[HappyFrogCommand, 'Block']] = field(default_factory=list)
+    closer: Optional[HappyFrogCommand] = None
+
+
+class BlockChecker:
+    """
+    Checks that IF/ELSE/ENDIF and WHILE/ENDWHILE blocks are properly nested.
+    
+    Block commands are fed in script order and matched with a stack of open
+    blocks, so a whole script is checked in one O(n) pass. With
+    ``open_context=True`` the checker describes a fragment instead: closers
+    without an opener in the fragment are recorded rather than rejected, and
+    signature() summarizes how the fragment changes the surrounding blocks.
+    """
+    
+    def __init__(self, open_context: bool = False):
+        """
+        Initialize an empty checker.
+        
+        Args:
+            open_context: Accept ELSE/ENDIF/ENDWHILE that close blocks opened
+                before the fragment being checked
+        """
+        self.open_context = open_context
+        # Open blocks as [opener type, line number, seen ELSE]
+        self.stack: List[list] = []
+        # Closers matched against blocks opened outside the fragment
+        self.outside: List[CommandType] = []
+    
+    def feed(self, command_type: CommandType, line_number: int) -> None:
+        """
+        Process one block command.
+        
+        Raises:
+            HappyFrogScriptError: If the command does not fit the open blocks
+        """
+        stack = self.stack
+        if command_type is CommandType.IF or command_type is CommandType.WHILE:
+            stack.append([command_type, line_number, False])
+            return
+        
+        if not stack and self.open_context:
+            self.outside.append(command_type)
+            return
+        
+        top = stack[-1] if stack else None
+        if command_type is CommandType.ELSE:
+            if top is None or top[0] is not CommandType.IF or top[2]:
+                raise HappyFrogScriptError("ELSE without matching IF")
+            top[2] = True
+        elif command_type is CommandType.ENDIF:
+            if top is None or top[0] is not CommandType.IF:
+                raise HappyFrogScriptError("ENDIF without matching IF")
+            stack.pop()
+        elif command_type is CommandType.ENDWHILE:
+            if top is None or top[0] is not CommandType.WHILE:
+                raise HappyFrogScriptError("ENDWHILE without matching WHILE")
+            stack.pop()
+    
+    def unclosed(self) -> Optional[Tuple[str, int]]:
+        """
+        Return the error message and line of the innermost block left open,
+        or None if every block was closed.
+        """
+        if not self.stack:
+            return None
+        opener, line_number, _ = self.stack[-1]
+        closer = 'ENDIF' if opener is CommandType.IF else 'ENDWHILE'
+        return f"{opener.value} without matching {closer}", line_number
+    
+    def signature(self) -> tuple:
+        """
+        Summarize the fragment's effect on the surrounding block structure.
+        
+        Two fragments with the same signature can replace each other without
+        changing whether the whole script is properly nested.
+        """
+        return (tuple(self.outside),
+                tuple((opener, seen_else) for opener, _, seen_else in self.stack))
+    
+    def check(self, commands: Iterable[HappyFrogCommand], source_name: str,
+              line_offset: int = 0) -> 'BlockChecker':
+        """
+        Feed the block commands among already parsed commands.
+        
+        Args:
+            commands: Commands in script order
+            source_name: Name of the source (for error reporting)
+            line_offset: Added to each command's line number
+            
+        Returns:
+            The checker itself
+            
+        Raises:
+            HappyFrogScriptError: At the first command that does not fit
+        """
+        feed = self.feed
+        for command in commands:
+            role = command._shape.block_role
+            if role is not None:
+                line_number = command.line_number + line_offset
+                try:
+                    feed(role, line_number)
+                except HappyFrogScriptError as e:
+                    raise HappyFrogScriptError(
+                        f"Error in {source_name}, line {line_number}: {str(e)}"
+                    )
+        return self
+
+
+def _first_command_at(commands: List[HappyFrogCommand], line_number: int, low: int = 0) -> int:
+    """Return the index of the first command on or after a line (binary search)."""
+    high = len(commands)
+    while low < high:
+        middle = (low + high) // 2
+        if commands[middle].line_number < line_number:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
 class HappyFrogParser:
     """
     Parser for Happy Frog Script v1.0 files.
@@ -118,86 +416,62 @@ class HappyFrogParser:
     command recognition patterns.
     """
     
-    def __init__(self):
-        """Initialize the parser with command patterns."""
-        # Define regex patterns for different command types
-        self.command_patterns = {
-            # Modifier+key combos (e.g., MOD r, CTRL ALT DEL) - must have at least 2 parts
-            CommandType.MODIFIER_COMBO: re.compile(r'^(MOD|CTRL|SHIFT|ALT)(?:\s+(MOD|CTRL|SHIFT|ALT|[A-Z0-9]+))+$', re.IGNORECASE),
-            # Delay command: DELAY <value> - captures any value for validation
-            CommandType.DELAY: re.compile(r'^DELAY\s+(.+)$', re.IGNORECASE),
-            
-            # String command: STRING <text>
-            CommandType.STRING: re.compile(r'^STRING\s+(.+)$', re.IGNORECASE),
-            
-            # Simple commands with no parameters
-            CommandType.ENTER: re.compile(r'^ENTER$', re.IGNORECASE),
-            CommandType.SPACE: re.compile(r'^SPACE$', re.IGNORECASE),
-            CommandType.TAB: re.compile(r'^TAB$', re.IGNORECASE),
-            CommandType.BACKSPACE: re.compile(r'^BACKSPACE$', re.IGNORECASE),
-            CommandType.DELETE: re.compile(r'^DELETE$', re.IGNORECASE),
-            
-            # Arrow keys
-            CommandType.UP: re.compile(r'^UP$', re.IGNORECASE),
-            CommandType.DOWN: re.compile(r'^DOWN$', re.IGNORECASE),
-            CommandType.LEFT: re.compile(r'^LEFT$', re.IGNORECASE),
-            CommandType.RIGHT: re.compile(r'^RIGHT$', re.IGNORECASE),
-            
-            # Navigation keys
-            CommandType.HOME: re.compile(r'^HOME$', re.IGNORECASE),
-            CommandType.END: re.compile(r'^END$', re.IGNORECASE),
-            CommandType.INSERT: re.compile(r'^INSERT$', re.IGNORECASE),
-            CommandType.PAGE_UP: re.compile(r'^PAGE_UP$', re.IGNORECASE),
-            CommandType.PAGE_DOWN: re.compile(r'^PAGE_DOWN$', re.IGNORECASE),
-            CommandType.ESCAPE: re.compile(r'^ESCAPE$', re.IGNORECASE),
-            
-            # Function keys
-            CommandType.F1: re.compile(r'^F1$', re.IGNORECASE),
-            CommandType.F2: re.compile(r'^F2$', re.IGNORECASE),
-            CommandType.F3: re.compile(r'^F3$', re.IGNORECASE),
-            CommandType.F4: re.compile(r'^F4$', re.IGNORECASE),
-            CommandType.F5: re.compile(r'^F5$', re.IGNORECASE),
-            CommandType.F6: re.compile(r'^F6$', re.IGNORECASE),
-            CommandType.F7: re.compile(r'^F7$', re.IGNORECASE),
-            CommandType.F8: re.compile(r'^F8$', re.IGNORECASE),
-            CommandType.F9: re.compile(r'^F9$', re.IGNORECASE),
-            CommandType.F10: re.compile(r'^F10$', re.IGNORECASE),
-            CommandType.F11: re.compile(r'^F11$', re.IGNORECASE),
-            CommandType.F12: re.compile(r'^F12$', re.IGNORECASE),
-            
-            # Modifier keys (single keys)
-            CommandType.CTRL: re.compile(r'^CTRL$', re.IGNORECASE),
-            CommandType.SHIFT: re.compile(r'^SHIFT$', re.IGNORECASE),
-            CommandType.ALT: re.compile(r'^ALT$', re.IGNORECASE),
-            CommandType.MOD: re.compile(r'^MOD$', re.IGNORECASE),  # Modifier key
-            
-            # Execution control
-            CommandType.PAUSE: re.compile(r'^PAUSE$', re.IGNORECASE),  # Pause execution
-            
-            # Advanced Ducky Script features
-            CommandType.REPEAT: re.compile(r'^REPEAT\s+(\d+)$', re.IGNORECASE),  # REPEAT n
-            CommandType.DEFAULT_DELAY: re.compile(r'^(DEFAULT_DELAY|DEFAULTDELAY)\s+(\d+)$', re.IGNORECASE),  # DEFAULT_DELAY or DEFAULTDELAY n
-            
-            # Conditional logic (Happy Frog exclusive)
-            CommandType.IF: re.compile(r'^IF\s+(.+)$', re.IGNORECASE),  # IF condition
-            CommandType.ELSE: re.compile(r'^ELSE$', re.IGNORECASE),  # ELSE
-            CommandType.ENDIF: re.compile(r'^ENDIF$', re.IGNORECASE),  # ENDIF
-            CommandType.WHILE: re.compile(r'^WHILE\s+(.+)$', re.IGNORECASE),  # WHILE condition
-            CommandType.ENDWHILE: re.compile(r'^ENDWHILE$', re.IGNORECASE),  # ENDWHILE
-            
-            # Happy Frog exclusive features
-            CommandType.RANDOM_DELAY: re.compile(r'^RANDOM_DELAY\s+(\d+)\s+(\d+)$', re.IGNORECASE),  # RANDOM_DELAY min max
-            CommandType.LOG: re.compile(r'^LOG\s+(.+)$', re.IGNORECASE),  # LOG message
-            CommandType.VALIDATE: re.compile(r'^VALIDATE\s+(.+)$', re.IGNORECASE),  # VALIDATE condition
-            CommandType.SAFE_MODE: re.compile(r'^SAFE_MODE\s+(ON|OFF)$', re.IGNORECASE),  # SAFE_MODE ON/OFF
-            
-            # BadUSB compatibility commands
-            CommandType.ATTACKMODE: re.compile(r'^ATTACKMODE\s+(.+)$', re.IGNORECASE),  # ATTACKMODE configuration
-            
-            # Comments
-            CommandType.COMMENT: re.compile(r'^#(.*)$', re.IGNORECASE),
-            CommandType.REM: re.compile(r'^REM(?:\s+(.+))?$', re.IGNORECASE),  # REM with optional text
-        }
+    # The command grammar, compiled once and shared by every instance.
+    # Subclasses for other dialects set their own (see Grammar.derive).
+    grammar: Grammar = HAPPY_FROG_GRAMMAR
+    
+    def __init__(self, cache=None, grammar: Optional[Grammar] = None):
+        """
+        Initialize the parser.
+        
+        Args:
+            cache: Optional ParseCache that parse_file and parse_string
+                consult before parsing
+            grammar: Grammar to use instead of the class's grammar
+        """
+        self.cache = cache
+        self._grammar_fingerprint = None
+        if grammar is not None:
+            self.grammar = grammar
+        
+        # Shapes of lines seen before, keyed by the stripped line
+        self._shape_cache: Dict[str, CommandShape] = {}
+    
+    @property
+    def command_patterns(self) -> Mapping[CommandType, Pattern]:
+        """Regex pattern of every command, in the order they are tried (read-only)."""
+        return self.grammar.command_patterns
+    
+    @property
+    def parameter_groups(self) -> Mapping[CommandType, tuple]:
+        """Regex groups holding each command's parameters (read-only)."""
+        return self.grammar.parameter_groups
+    
+    @property
+    def keyword_table(self) -> Mapping[str, tuple]:
+        """Candidate patterns for each leading keyword (read-only)."""
+        return self.grammar.keyword_table
+    
+    @property
+    def combo_matcher(self) -> ModifierComboMatcher:
+        """The linear-time MODIFIER_COMBO recognizer."""
+        return self.grammar.combo_matcher
+    
+    def grammar_fingerprint(self) -> str:
+        """
+        Return a digest identifying the grammar this parser implements.
+        
+        It covers GRAMMAR_VERSION, the parser class and every command pattern,
+        so parse results cached under it are never reused by a parser that
+        would produce different commands.
+        """
+        if self._grammar_fingerprint is None:
+            import hashlib
+            digest = hashlib.sha256()
+            digest.update(f"{type(self).__module__}.{type(self).__qualname__}:".encode('utf-8'))
+            digest.update(self.grammar.fingerprint().encode('ascii'))
+            self._grammar_fingerprint = digest.hexdigest()
+        return self._grammar_fingerprint
     
     def parse_file(self, file_path: str) -> HappyFrogScript:
         """
@@ -214,50 +488,315 @@ class HappyFrogParser:
             FileNotFoundError: If the file doesn't exist
         """
         try:
+            if self.cache is not None:
+                with open(file_path, 'rb') as file:
+                    data = file.read()
+                # Decode only on a cache miss; StringIO splits lines the same
+                # way reading the file in text mode does
+                return self._parse_cached(data, file_path, lambda: self._parse_lines(
+                    io.StringIO(data.decode('utf-8'), newline=None), file_path
+                ), 'universal')
+            
             with open(file_path, 'r', encoding='utf-8') as file:
-                content = file.read()
-            return self.parse_string(content, file_path)
+                # Read line by line instead of loading the whole file first
+                return self._parse_lines(file, file_path)
         except FileNotFoundError:
             raise HappyFrogScriptError(f"File not found: {file_path}")
         except Exception as e:
             raise HappyFrogScriptError(f"Error reading file {file_path}: {str(e)}")
     
-    def parse_string(self, content: str, source_name: str = "<string>") -> HappyFrogScript:
+    def parse_string(self, content: str, source_name: str = "<string>",
+                     workers: Optional[int] = None) -> HappyFrogScript:
         """
         Parse Happy Frog Script content from a string.
         
         Args:
             content: String containing Happy Frog Script commands
             source_name: Name of the source (for error reporting)
+            workers: Lex large scripts in chunks on this many worker
+                processes (see happy_frog_parser.parallel); the result is
+                the same as a serial parse
+            
+        Returns:
+            HappyFrogScript object containing parsed commands
+        """
+        if self.cache is not None:
+            return self._parse_cached(
+                content.encode('utf-8', 'surrogatepass'), source_name,
+                lambda: self._parse_content(content, source_name, workers), 'lf'
+            )
+        return self._parse_content(content, source_name, workers)
+    
+    def parse_bytes(self, data, source_name: str = "<bytes>") -> HappyFrogScript:
+        """
+        Parse UTF-8 script text from bytes, a memoryview or an mmap in place.
+        
+        Lines are found and lexed directly in the buffer, and the text of
+        STRING commands is only decoded when a command is read (see
+        happy_frog_parser.buffer). The result equals parse_file for the same
+        file contents; the buffer must stay open while the commands are used.
+        
+        Args:
+            data: Bytes-like object holding the script
+            source_name: Name of the source (for error reporting)
             
         Returns:
             HappyFrogScript object containing parsed commands
         """
-        commands = []
-        lines = content.split('\n')
+        from .buffer import parse_buffer
+        return parse_buffer(self, data, source_name)
+    
+    def parse_files(self, paths: Iterable[str], workers: Optional[int] = None):
+        """
+        Parse many script files concurrently on a process pool.
+        
+        Args:
+            paths: Script files to parse
+            workers: Number of worker processes (default: one per CPU)
+            
+        Returns:
+            Iterator of happy_frog_parser.parallel.FileResult, one per file,
+            in the order the files finish; a file that fails to parse has
+            its HappyFrogScriptError in .error instead of aborting the batch
+        """
+        from .parallel import parse_files
+        return parse_files(self, paths, workers)
+    
+    def _parse_content(self, content: str, source_name: str,
+                       workers: Optional[int] = None) -> HappyFrogScript:
+        """Parse a string serially, or in chunks when workers are requested."""
+        if workers is not None and workers > 1:
+            from .parallel import parse_chunked
+            return parse_chunked(self, content, source_name, workers)
+        return self._parse_lines(content.split('\n'), source_name)
+    
+    def _parse_lines(self, lines: Iterable[str], source_name: str) -> HappyFrogScript:
+        """Parse all lines into a HappyFrogScript."""
+        metadata = {}
+        commands = list(self._iter_parse(lines, source_name, metadata))
+        return HappyFrogScript(commands=commands, metadata=metadata)
+    
+    def _parse_cached(self, data: bytes, source_name: str, parse, line_breaks: str) -> HappyFrogScript:
+        """
+        Return the parse of some source text, from the cache when possible.
+        
+        Args:
+            data: The source text as bytes (hashed for the cache key)
+            source_name: Name of the source (for metadata and errors)
+            parse: Callable returning the parsed script on a miss
+            line_breaks: How parse splits lines ('universal' or 'lf'; see
+                ParseCache.key)
+        """
+        key = self.cache.key(data, self.grammar_fingerprint(), line_breaks)
+        script = self.cache.get(key)
+        if script is not None:
+            # The same text may have been cached under another name
+            script.metadata['source'] = source_name
+            return script
+        
+        script = parse()
+        self.cache.put(key, script)
+        return script
+    
+    def reparse(self, script: HappyFrogScript, start_line: int, end_line: int,
+                new_text: str) -> HappyFrogScript:
+        """
+        Update a parsed script after an edit, re-parsing only the edited lines.
+        
+        Lines start_line up to (not including) end_line are replaced with the
+        lines of new_text; start_line == end_line inserts and an empty
+        new_text deletes. The result is the same as parsing the edited
+        source again: commands after the edit move to their new line numbers
+        and metadata is updated. Block nesting (IF/ELSE/ENDIF, WHILE/ENDWHILE)
+        is only re-checked across the whole script when the edit changes
+        which blocks the edited lines open or close.
+        
+        Args:
+            script: Script returned by parse_string or parse_file (updated in place)
+            start_line: First replaced line (1-based)
+            end_line: Line after the last replaced line
+            new_text: Replacement text; a trailing newline is optional
+            
+        Returns:
+            The updated script
+            
+        Raises:
+            ValueError: If the line range is outside the script
+            HappyFrogScriptError: If the edited script does not parse; the
+                script is left unchanged
+        """
+        metadata = script.metadata
+        source_name = metadata.get('source', '<string>')
+        commands = script.commands
+        total_lines = metadata.get('total_lines')
+        if total_lines is None:
+            total_lines = commands[-1].line_number if commands else 0
+        if not 1 <= start_line <= end_line <= total_lines + 1:
+            raise ValueError(
+                f"Invalid line range {start_line}-{end_line} for a script of {total_lines} lines"
+            )
+        
+        new_lines = new_text.split('\n')
+        if new_lines[-1] == '':
+            new_lines.pop()
+        delta = len(new_lines) - (end_line - start_line)
+        
+        first = _first_command_at(commands, start_line)
+        last = _first_command_at(commands, end_line, first)
+        
+        # Block commands are checked line by line as the new lines are
+        # lexed, as in a full parse, so that the first error is the same
+        fragment = BlockChecker(open_context=True)
+        new_commands = []
+        for line_number, line in enumerate(new_lines, start_line):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                command = self._parse_line(line, line_number)
+                role = command._shape.block_role
+                if role is not None:
+                    fragment.feed(role, line_number)
+            except HappyFrogScriptError as e:
+                # An earlier closer may not fit the blocks opened before the
+                # edit; a full parse would report that first
+                blocks = BlockChecker()
+                blocks.check(islice(commands, first), source_name)
+                blocks.check(new_commands, source_name)
+                raise HappyFrogScriptError(
+                    f"Error in {source_name}, line {line_number}: {str(e)}"
+                )
+            new_commands.append(command)
+        
+        # Blocks only need checking across the whole script when the edit
+        # changes what the edited lines open or close
+        try:
+            unchanged = (
+                BlockChecker(open_context=True).check(commands[first:last], source_name).signature() ==
+                fragment.signature()
+            )
+        except HappyFrogScriptError:
+            unchanged = False
+        if not unchanged:
+            blocks = BlockChecker()
+            blocks.check(islice(commands, first), source_name)
+            blocks.check(new_commands, source_name)
+            blocks.check(islice(commands, last, None), source_name, delta)
+            unclosed = blocks.unclosed()
+            if unclosed:
+                message, opened_on = unclosed
+                raise HappyFrogScriptError(f"Error in {source_name}, line {opened_on}: {message}")
+        
+        if not isinstance(commands, list):
+            # Lazily loaded commands (.hfb, parse cache) become a regular list
+            commands = script.commands = list(commands)
+        if delta:
+            for command in islice(commands, last, None):
+                command.line_number += delta
+        commands[first:last] = new_commands
+        
+        metadata['total_commands'] = len(commands)
+        # Like str.split('\n'), even an empty script has one line
+        metadata['total_lines'] = max(total_lines + delta, 1)
+        return script
+    
+    def iter_commands(self, source: Union[str, TextIO], source_name: Optional[str] = None,
+                      metadata: Optional[Dict[str, Any]] = None) -> Iterator[HappyFrogCommand]:
+        """
+        Parse a Happy Frog Script incrementally, yielding one command at a time.
+        
+        The file is read line by line and no command is kept after it has been
+        yielded, so memory use stays constant however large the script is.
+        
+        Args:
+            source: Path to a script file, or an open text stream
+            source_name: Name of the source for error reporting (defaults to
+                the path or the stream's name)
+            metadata: Optional dictionary that receives 'source',
+                'total_commands' and 'total_lines' once the stream ends
+            
+        Yields:
+            HappyFrogCommand objects in script order
+            
+        Returns:
+            The metadata dictionary (as the generator's return value)
+            
+        Raises:
+            HappyFrogScriptError: If the file is missing or a line cannot be parsed
+        """
+        if metadata is None:
+            metadata = {}
+        
+        if hasattr(source, 'read'):
+            if source_name is None:
+                source_name = getattr(source, 'name', '<stream>')
+            return (yield from self._iter_parse(source, source_name, metadata))
+        
+        if source_name is None:
+            source_name = str(source)
+        try:
+            file = open(source, 'r', encoding='utf-8')
+        except FileNotFoundError:
+            raise HappyFrogScriptError(f"File not found: {source}")
+        
+        with file:
+            return (yield from self._iter_parse(file, source_name, metadata))
+    
+    def _iter_parse(self, lines: Iterable[str], source_name: str,
+                    metadata: Dict[str, Any]) -> Iterator[HappyFrogCommand]:
+        """
+        Parse lines one at a time, yielding each command as it is recognized.
+        
+        Args:
+            lines: Script lines, either split on '\\n' or read from a text
+                stream (keeping their line endings)
+            source_name: Name of the source (for error reporting)
+            metadata: Dictionary filled in once all lines have been read
+            
+        Yields:
+            HappyFrogCommand objects in script order
+        """
+        command_count = 0
+        line_number = 0
+        ends_with_newline = True
+        blocks = BlockChecker()
         
         for line_number, line in enumerate(lines, 1):
+            ends_with_newline = line.endswith('\n')
+            line = line.strip()
+            
             # Skip empty lines
-            if not line.strip():
+            if not line:
                 continue
                 
             try:
-                command = self._parse_line(line.strip(), line_number)
-                if command:
-                    commands.append(command)
+                command = self._parse_line(line, line_number)
+                role = command._shape.block_role
+                if role is not None:
+                    blocks.feed(role, line_number)
             except HappyFrogScriptError as e:
                 # Add context to the error
                 raise HappyFrogScriptError(
                     f"Error in {source_name}, line {line_number}: {str(e)}"
                 )
+            if command:
+                command_count += 1
+                yield command
         
-        metadata = {
-            'source': source_name,
-            'total_commands': len(commands),
-            'total_lines': len(lines)
-        }
+        unclosed = blocks.unclosed()
+        if unclosed:
+            message, opened_on = unclosed
+            raise HappyFrogScriptError(f"Error in {source_name}, line {opened_on}: {message}")
         
-        return HappyFrogScript(commands=commands, metadata=metadata)
+        # Count lines the way str.split('\n') does: text after the last
+        # newline (even an empty one) is a line of its own
+        if ends_with_newline:
+            line_number += 1
+        
+        metadata['source'] = source_name
+        metadata['total_commands'] = command_count
+        metadata['total_lines'] = line_number
+        return metadata
     
     def _parse_line(self, line: str, line_number: int) -> Optional[HappyFrogCommand]:
         """
@@ -273,97 +812,124 @@ class HappyFrogParser:
         Raises:
             HappyFrogScriptError: If the line cannot be parsed
         """
-        # Try to match each command pattern
-        for command_type, pattern in self.command_patterns.items():
-            match = pattern.match(line)
+        return HappyFrogCommand.from_shape(self._line_shape(line), line_number)
+    
+    def _line_shape(self, line: str) -> CommandShape:
+        """Return the shape of a stripped, non-empty line."""
+        # A line always parses to the same shape, so repeated lines (ENTER,
+        # DELAY 500, ...) skip the lexer and share one CommandShape. Hits
+        # are moved to the end, so the first entry is the least recently used
+        cache = self._shape_cache
+        shape = cache.pop(line, None)
+        if shape is None:
+            shape = self._lex_line(line)
+            if shape.command_type in FREE_TEXT_COMMANDS:
+                return shape
+            if len(cache) >= _SHAPE_CACHE_LIMIT:
+                del cache[next(iter(cache))]
+        cache[line] = shape
+        return shape
+    
+    def _lex_line(self, line: str) -> CommandShape:
+        """
+        Recognize a single stripped line and return its CommandShape.
+        
+        Raises:
+            HappyFrogScriptError: If the line is not a known command
+        """
+        grammar = self.grammar
+        # Look up the candidate patterns from the first token of the line
+        if line.startswith('#'):
+            candidates = grammar.comment_candidates
+        else:
+            tokens = line.split(None, 1)
+            candidates = grammar.keyword_table.get(tokens[0].upper(), ()) if tokens else ()
+        
+        for command_type, matcher, groups in candidates:
+            match = matcher.match(line)
             if match:
-                # Special handling for MODIFIER_COMBO
-                if command_type == CommandType.MODIFIER_COMBO:
-                    # Split the line into parts (e.g., MOD r -> [MOD, r])
-                    parts = line.strip().split()
-                    return HappyFrogCommand(
-                        command_type=CommandType.MODIFIER_COMBO,
-                        line_number=line_number,
-                        raw_text=line,
-                        parameters=parts
-                    )
-                return self._create_command(command_type, line, line_number, match)
+                return self._build_shape(command_type, groups, line, match)
+        
+        # Fall back to trying every pattern in order. Valid lines never get
+        # here; this keeps unusual spellings (e.g. Unicode case variants the
+        # regexes accept) and the error for unknown commands unchanged.
+        for command_type, matcher, groups in grammar.ordered_candidates:
+            match = matcher.match(line)
+            if match:
+                return self._build_shape(command_type, groups, line, match)
         
         # If no pattern matches, it's an unknown command
         raise HappyFrogScriptError(f"Unknown command: {line}")
     
-    def _create_command(self, command_type: CommandType, raw_text: str, 
-                       line_number: int, match) -> HappyFrogCommand:
+    def _build_shape(self, command_type: CommandType, groups: tuple, raw_text: str,
+                     match) -> CommandShape:
+        """Create the CommandShape for a line, taking its parameters from the given regex groups."""
+        if command_type is CommandType.MODIFIER_COMBO:
+            # Split the line into parts (e.g., MOD r -> [MOD, r])
+            parameters = raw_text.split()
+        elif len(groups) == 1:
+            # Missing optional groups (e.g. a bare REM) become ''
+            parameters = [match.group(groups[0]) or '']
+        else:
+            parameters = [match.group(group) or '' for group in groups]
+        
+        return CommandShape.intern(command_type, raw_text, parameters)
+    
+    def build_block_tree(self, script: HappyFrogScript) -> List[Union[HappyFrogCommand, Block]]:
         """
-        Create a HappyFrogCommand object from a regex match.
+        Match IF/ELSE/ENDIF and WHILE/ENDWHILE into a tree in one stack pass.
         
         Args:
-            command_type: Type of command
-            raw_text: Original text of the command
-            line_number: Line number
-            match: Regex match object
+            script: Parsed script (HappyFrogScript or MappedScript)
             
         Returns:
-            HappyFrogCommand object
+            The top-level commands, with every block replaced by a Block
+            holding its nested commands
+            
+        Raises:
+            HappyFrogScriptError: If the blocks are not properly nested
+                (scripts returned by the parser always are)
         """
-        parameters = []
+        source_name = script.metadata.get('source', '<string>')
+        checker = BlockChecker()
+        root: List[Union[HappyFrogCommand, Block]] = []
+        # Open blocks, innermost last, and the list receiving commands
+        blocks: List[Block] = []
+        current = root
         
-        # Extract parameters based on command type
-        if command_type == CommandType.DELAY:
-            # DELAY command has a parameter (validation happens in encoder)
-            parameters = [match.group(1)]
-                
-        elif command_type in [CommandType.STRING, CommandType.REM]:
-            # STRING and REM commands capture the rest of the line
-            parameters = [match.group(1)] if match.group(1) else ['']
-            
-        elif command_type == CommandType.COMMENT:
-            # COMMENT command captures everything after #
-            parameters = [match.group(1)]
-            
-        # Advanced Ducky Script features
-        elif command_type == CommandType.REPEAT:
-            # REPEAT command has a numeric parameter
-            parameters = [match.group(1)]
-        elif command_type == CommandType.DEFAULT_DELAY:
-            # DEFAULT_DELAY or DEFAULTDELAY command has a numeric parameter in group(2)
-            parameters = [match.group(2)]
-            
-        # Conditional logic (Happy Frog exclusive)
-        elif command_type in [CommandType.IF, CommandType.WHILE]:
-            # IF and WHILE commands capture the condition
-            parameters = [match.group(1)]
-            
-        elif command_type in [CommandType.ELSE, CommandType.ENDIF, CommandType.ENDWHILE]:
-            # These commands have no parameters
-            parameters = []
-            
-        # Happy Frog exclusive features
-        elif command_type == CommandType.RANDOM_DELAY:
-            # RANDOM_DELAY has two numeric parameters (min, max)
-            parameters = [match.group(1), match.group(2)]
-            
-        elif command_type in [CommandType.LOG, CommandType.VALIDATE]:
-            # LOG and VALIDATE commands capture the message/condition
-            parameters = [match.group(1)]
-            
-        elif command_type == CommandType.SAFE_MODE:
-            # SAFE_MODE has ON/OFF parameter
-            parameters = [match.group(1)]
-            
-        # BadUSB compatibility commands
-        elif command_type == CommandType.ATTACKMODE:
-            # ATTACKMODE command captures the configuration
-            parameters = [match.group(1)]
+        for command in script.commands:
+            role = command._shape.block_role
+            if role is None:
+                current.append(command)
+                continue
             
-        # For all other commands, no parameters are extracted
+            try:
+                checker.feed(role, command.line_number)
+            except HappyFrogScriptError as e:
+                raise HappyFrogScriptError(
+                    f"Error in {source_name}, line {command.line_number}: {str(e)}"
+                )
+            if role is CommandType.IF or role is CommandType.WHILE:
+                block = Block(command)
+                current.append(block)
+                blocks.append(block)
+                current = block.body
+            elif role is CommandType.ELSE:
+                blocks[-1].else_command = command
+                current = blocks[-1].else_body
+            else:
+                blocks.pop().closer = command
+                if blocks:
+                    parent = blocks[-1]
+                    current = parent.else_body if parent.else_command is not None else parent.body
+                else:
+                    current = root
         
-        return HappyFrogCommand(
-            command_type=command_type,
-            line_number=line_number,
-            raw_text=raw_text,
-            parameters=parameters
-        )
+        unclosed = checker.unclosed()
+        if unclosed:
+            message, opened_on = unclosed
+            raise HappyFrogScriptError(f"Error in {source_name}, line {opened_on}: {message}")
+        return root
     
     def validate_script(self, script: HappyFrogScript) -> List[str]:
         """
@@ -385,7 +951,7 @@ class HappyFrogParser:
         for cmd in script.commands:
             if cmd.command_type == CommandType.DELAY:
                 try:
-                    delay_ms = int(cmd.parameters[0])
+                    delay_ms = cmd.int_arg(0)
                     if delay_ms > 60000:  # More than 1 minute
                         warnings.append(
                             f"Line {cmd.line_number}: Very long delay ({delay_ms}ms) - "
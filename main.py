@@ -15,12 +15,12 @@ License: GNU GPLv3
 import argparse
 import sys
 import os
-from pathlib import Path
+import time
 
-# Import our modules directly since we're in the root directory
-from happy_frog_parser import HappyFrogParser, CircuitPythonEncoder, HappyFrogScriptError, EncoderError
-from ducky_converter import DuckyConverter
-from devices.device_manager import DeviceManager
+# The parser, encoders, device support and the Ducky converter are imported
+# by the subcommands that use them, so each run only loads what it needs.
+# The CLI is often started many times in a row from build scripts, where
+# interpreter startup is most of the run time.
 
 
 def print_welcome_banner():
@@ -54,8 +54,15 @@ Examples:
   %(prog)s parse payloads/demo_automation.txt
   %(prog)s encode payloads/demo_automation.txt
   %(prog)s encode payloads/demo_automation.txt -d xiao_rp2040
+  %(prog)s encode payloads/demo_automation.txt -d all
+  %(prog)s encode payloads/demo_automation.txt -d xiao_rp2040,arduino_leonardo
   %(prog)s encode payloads/demo_automation.txt -o custom_output.py
   %(prog)s validate payloads/demo_automation.txt
+  %(prog)s compile payloads/demo_automation.txt
+  %(prog)s encode compiled/demo_automation.hfb -d xiao_rp2040
+  %(prog)s build payloads/ -d xiao_rp2040 -j 4
+  %(prog)s build "payloads/**/*.txt" -d arduino_leonardo -o build/leonardo
+  %(prog)s watch payloads/my_script.txt -d xiao_rp2040
   %(prog)s convert ducky_script.txt
 
 Device Selection:
@@ -67,6 +74,26 @@ Device Selection:
   - digispark: DigiSpark
   - esp32: ESP32
   - evilcrow_cable: EvilCrow-Cable (BadUSB device)
+  Give several devices separated by commas, or "all", to parse once and
+  write one file per device (named <script>_<device>.py/.ino).
+
+Batch Build:
+  build compiles every script in a directory (or matching a glob pattern)
+  on a pool of worker processes and writes the code into a tree under
+  compiled/ that mirrors the source tree. A failing file does not stop the
+  batch; a report of all files is printed at the end. With an artifact
+  cache (--cache-dir, or HAPPY_FROG_CACHE_DIR), unchanged scripts are not
+  encoded again and outputs that already hold the right code are not
+  rewritten.
+
+Watch Mode:
+  watch builds the given scripts, then rebuilds each one as it is saved,
+  keeping the parser and device encoders loaded between rebuilds. Changes
+  are detected with inotify on Linux, or by polling (--poll).
+
+Parse Cache:
+  Set HAPPY_FROG_CACHE_DIR to a directory to reuse parse results of
+  unchanged scripts across runs.
 
 Educational Purpose:
   This tool demonstrates parsing, code generation, and CLI development concepts.
@@ -85,8 +112,8 @@ Educational Purpose:
     # Encode command
     encode_parser = subparsers.add_parser('encode', help='Encode a Happy Frog Script to device-specific code')
     encode_parser.add_argument('input_file', help='Input Happy Frog Script file (.txt)')
-    encode_parser.add_argument('-o', '--output', help='Output file (.py)')
-    encode_parser.add_argument('--device', '-d', help='Target device (xiao_rp2040, raspberry_pi_pico, arduino_leonardo, teensy_4, digispark, esp32, evilcrow_cable)')
+    encode_parser.add_argument('-o', '--output', help='Output file (.py/.ino), or output directory with several devices')
+    encode_parser.add_argument('--device', '-d', help='Target device (xiao_rp2040, raspberry_pi_pico, arduino_leonardo, teensy_4, digispark, esp32, evilcrow_cable), a comma-separated list of devices, or "all"')
     encode_parser.add_argument('--verbose', '-v', action='store_true', help='Verbose output')
     
     # Validate command
@@ -100,6 +127,34 @@ Educational Purpose:
     convert_parser.add_argument('-o', '--output', help='Output Happy Frog Script file (.txt)')
     convert_parser.add_argument('--verbose', '-v', action='store_true', help='Verbose output')
     
+    # Compile command
+    compile_parser = subparsers.add_parser('compile', help='Compile a Happy Frog Script to the binary .hfb format')
+    compile_parser.add_argument('input_file', help='Input Happy Frog Script file (.txt)')
+    compile_parser.add_argument('-o', '--output', help='Output file (.hfb)')
+    compile_parser.add_argument('--verbose', '-v', action='store_true', help='Verbose output')
+    
+    # Build command
+    build_parser = subparsers.add_parser('build', help='Encode every script in a directory or glob pattern')
+    build_parser.add_argument('target', help='Directory of scripts, or a glob pattern such as "payloads/**/*.txt"')
+    build_parser.add_argument('--device', '-d', help='Target device (default: CircuitPython)')
+    build_parser.add_argument('-o', '--output', default='compiled', help='Output directory (default: compiled)')
+    build_parser.add_argument('-j', '--jobs', type=int, help='Number of worker processes (default: one per CPU)')
+    build_parser.add_argument('--cache-dir', help='Reuse the code of unchanged scripts from this artifact cache '
+                                                  '(default: HAPPY_FROG_CACHE_DIR/artifacts if set)')
+    build_parser.add_argument('--no-cache', action='store_true', help='Encode every script, even if cached')
+    build_parser.add_argument('--hardlink', action='store_true', help='Hardlink cached files into place instead of copying them')
+    build_parser.add_argument('--verbose', '-v', action='store_true', help='Verbose output')
+    
+    # Watch command
+    watch_parser = subparsers.add_parser('watch', help='Rebuild scripts whenever they are saved')
+    watch_parser.add_argument('targets', nargs='+', help='Script files, directories or glob patterns to watch')
+    watch_parser.add_argument('--device', '-d', help='Target device (default: CircuitPython)')
+    watch_parser.add_argument('-o', '--output', default='compiled', help='Output directory (default: compiled)')
+    watch_parser.add_argument('--debounce', type=float, default=100,
+                              help='Wait for this many milliseconds without changes before rebuilding (default: 100)')
+    watch_parser.add_argument('--poll', action='store_true', help='Poll for changes instead of using inotify')
+    watch_parser.add_argument('--verbose', '-v', action='store_true', help='Verbose output')
+    
     # Parse arguments
     args = parser.parse_args()
     
@@ -118,6 +173,12 @@ Educational Purpose:
             return validate_command(args)
         elif args.command == 'convert':
             return convert_command(args)
+        elif args.command == 'compile':
+            return compile_command(args)
+        elif args.command == 'build':
+            return build_command(args)
+        elif args.command == 'watch':
+            return watch_command(args)
         else:
             print(f"Unknown command: {args.command}")
             return 1
@@ -133,17 +194,51 @@ Educational Purpose:
         return 1
 
 
+def create_parser():
+    """
+    Create the script parser.
+    
+    When the HAPPY_FROG_CACHE_DIR environment variable is set, parse results
+    are cached in that directory and reused while the source is unchanged.
+    """
+    from happy_frog_parser import HappyFrogParser
+    
+    cache_dir = os.environ.get('HAPPY_FROG_CACHE_DIR')
+    if cache_dir:
+        from happy_frog_parser.cache import ParseCache
+        return HappyFrogParser(cache=ParseCache(cache_dir))
+    return HappyFrogParser()
+
+
+def load_script(input_file, parser=None):
+    """
+    Parse a script file, or load it without parsing if it is compiled (.hfb).
+    
+    Compiled scripts are memory-mapped and can be passed straight to the
+    encoders and the validation functions.
+    """
+    if str(input_file).lower().endswith('.hfb'):
+        from happy_frog_parser.hfb import load_hfb
+        return load_hfb(input_file)
+    
+    if parser is None:
+        parser = create_parser()
+    return parser.parse_file(input_file)
+
+
 def parse_command(args):
     """Handle the parse command."""
+    from happy_frog_parser import HappyFrogScriptError
+    
     try:
         # Check if input file exists
         if not os.path.exists(args.input_file):
             print(f"Error: Input file '{args.input_file}' not found.")
             return 1
         
-        # Parse the script
-        parser = HappyFrogParser()
-        script = parser.parse_file(args.input_file)
+        # Parse the script (or load it if already compiled)
+        parser = create_parser()
+        script = load_script(args.input_file, parser)
         
         # Display results
         print(f"✅ Successfully parsed '{args.input_file}'")
@@ -173,75 +268,91 @@ def parse_command(args):
 
 def encode_command(args):
     """Handle the encode command."""
+    from pathlib import Path
+    from happy_frog_parser import CircuitPythonEncoder, HappyFrogScriptError, EncoderError
+    
     try:
         # Check if input file exists
         if not os.path.exists(args.input_file):
             print(f"Error: Input file '{args.input_file}' not found.")
             return 1
         
-        # Parse the script
-        parser = HappyFrogParser()
-        script = parser.parse_file(args.input_file)
-        
-        # Determine output file
-        if args.output:
-            output_file = args.output
-        else:
-            # Generate output filename from input and save to compiled/ directory
-            input_path = Path(args.input_file)
-            # Determine appropriate extension based on device
-            if args.device:
-                # Use .ino for Arduino-based devices, .py for CircuitPython
-                if args.device in ['arduino_leonardo', 'teensy_4', 'digispark', 'evilcrow_cable']:
-                    extension = '.ino'
-                else:
-                    extension = '.py'
-            else:
-                extension = '.py'  # Default CircuitPython
-            
-            output_filename = input_path.stem + extension
-            output_file = Path('compiled') / output_filename
-        
-        # Choose encoder based on device specification
+        # Resolve the device selection: one id, a comma-separated list or 'all'
+        device_manager = None
         if args.device:
-            # Use device-specific encoder
+            from devices.device_manager import DeviceManager
             device_manager = DeviceManager()
             try:
-                code = device_manager.encode_script(script, args.device, output_file)
-                device_info = device_manager.get_device_info(args.device)
-                device_name = device_info['name'] if device_info else args.device
-                print(f"✅ Successfully encoded '{args.input_file}' for {device_name} to '{output_file}'")
+                device_ids = device_manager.resolve_devices(args.device)
             except ValueError as e:
                 print(f"❌ Device Error: {e}")
                 print(f"Available devices:")
                 for device in device_manager.list_devices():
                     print(f"   - {device['id']}: {device['name']}")
                 return 1
+        
+        # Parse the script (or load it if already compiled), once for all devices
+        parse_start = time.perf_counter()
+        parser = create_parser()
+        script = load_script(args.input_file, parser)
+        parse_seconds = time.perf_counter() - parse_start
+        
+        if device_manager is not None and (len(device_ids) > 1 or args.device.strip().lower() == 'all'):
+            return encode_for_devices(args, script, device_manager, device_ids, parse_seconds)
+        
+        # Determine output file
+        if args.output:
+            output_file = args.output
+        else:
+            # Generate output filename from input and save to compiled/ directory;
+            # .ino for Arduino-based devices, .py for CircuitPython
+            extension = device_manager.get_file_extension(device_ids[0]) if device_manager else '.py'
+            output_file = Path('compiled') / (Path(args.input_file).stem + extension)
+        
+        # Choose encoder based on device specification; the code is
+        # streamed to the output file as it is generated
+        from happy_frog_parser.emitter import open_output
+        preview_size = 20 if args.verbose else 0
+        if device_manager is not None:
+            # Use device-specific encoder
+            args.device = device_ids[0]
+            device_info = device_manager.get_device_info(args.device)
+            with open_output(output_file) as f:
+                emitter = device_manager.encode_script_to(script, args.device, f, head_size=preview_size)
+            device_name = device_info['name'] if device_info else args.device
+            print(f"✅ Successfully encoded '{args.input_file}' for {device_name} to '{output_file}'")
         else:
             # Use default CircuitPython encoder
             encoder = CircuitPythonEncoder()
-            code = encoder.encode(script, output_file)
+            with open_output(output_file) as f:
+                emitter = encoder.encode_to(script, f, head_size=preview_size)
             print(f"✅ Successfully encoded '{args.input_file}' to '{output_file}' (default CircuitPython)")
         
         # Display results
         print(f"📊 Encoding Statistics:")
         print(f"   Input Commands: {len(script.commands)}")
-        print(f"   Output Lines: {len(code.split(chr(10)))}")
+        print(f"   Output Lines: {emitter.line_count}")
+        print(f"   Output Size: {emitter.byte_count} bytes")
+        
+        # Reuse of the code of repeated commands
+        memo_encoder = device_manager.get_encoder(args.device) if args.device else encoder
+        memo = getattr(memo_encoder, 'memo', None)
+        if args.verbose and memo is not None:
+            memo_stats = memo.stats()
+            print(f"   Repeated Commands Reused: {memo_stats['hits']} "
+                  f"({memo_stats['hit_rate']:.0%} of {memo_stats['hits'] + memo_stats['misses']})")
         
         if args.verbose:
             print(f"\n📝 Generated Code Preview:")
-            lines = code.split(chr(10))
-            for i, line in enumerate(lines[:20], 1):  # Show first 20 lines
+            for i, line in enumerate(emitter.head, 1):  # Show first 20 lines
                 print(f"   {i:2d}: {line}")
-            if len(lines) > 20:
-                print(f"   ... ({len(lines) - 20} more lines)")
+            if emitter.line_count > len(emitter.head):
+                print(f"   ... ({emitter.line_count - len(emitter.head)} more lines)")
         
         # Show validation warnings
         if args.device:
-            device_manager = DeviceManager()
             warnings = device_manager.validate_device_support(args.device, script)
         else:
-            encoder = CircuitPythonEncoder()
             warnings = encoder.validate_script(script)
             
         if warnings:
@@ -256,17 +367,173 @@ def encode_command(args):
         return 1
 
 
+def encode_for_devices(args, script, device_manager, device_ids, parse_seconds):
+    """Encode one parsed script for several devices and print a timing summary."""
+    from pathlib import Path
+    
+    # One file per device, named after the input and the device
+    output_dir = Path(args.output) if args.output else Path('compiled')
+    output_dir.mkdir(parents=True, exist_ok=True)
+    stem = Path(args.input_file).stem
+    output_files = {
+        device_id: output_dir / f"{stem}_{device_id}{device_manager.get_file_extension(device_id)}"
+        for device_id in device_ids
+    }
+    
+    start = time.perf_counter()
+    program = device_manager.lower_script(script)
+    lower_seconds = time.perf_counter() - start
+    results = device_manager.encode_devices(script, device_ids, output_files, program=program)
+    total_seconds = time.perf_counter() - start
+    
+    failed = [result for result in results if not result.ok]
+    print(f"✅ Encoded '{args.input_file}' for {len(results) - len(failed)} of {len(results)} devices")
+    
+    print(f"📊 Timing Summary:")
+    print(f"   Parse: {parse_seconds * 1000:.1f} ms ({len(script.commands)} commands)")
+    print(f"   Lowering: {lower_seconds * 1000:.1f} ms (shared by all devices)")
+    for result in results:
+        if result.ok:
+            print(f"   {result.device_id:<20} {result.seconds * 1000:8.1f} ms {result.line_count:7d} lines "
+                  f"{result.byte_count:9d} bytes  -> {result.output_file}")
+        else:
+            print(f"   {result.device_id:<20} ❌ {result.error}")
+    print(f"   Total: {total_seconds * 1000:.1f} ms")
+    
+    if args.verbose:
+        for device_id in device_ids:
+            warnings = device_manager.validate_device_support(device_id, script)
+            if warnings:
+                print(f"\n⚠️  Warnings ({device_id}):")
+                for warning in warnings:
+                    print(f"   {warning}")
+    
+    return 1 if failed else 0
+
+
+def check_device(device_id):
+    """Return True if device_id is None or a known device; otherwise list the devices."""
+    if not device_id:
+        return True
+    from devices.device_manager import DeviceManager
+    device_manager = DeviceManager()
+    if device_manager.get_device_info(device_id) is not None:
+        return True
+    print(f"❌ Device Error: Unknown device: {device_id}")
+    print(f"Available devices:")
+    for device in device_manager.list_devices():
+        print(f"   - {device['id']}: {device['name']}")
+    return False
+
+
+def print_build_results(results, verbose=False):
+    """Print one line per built file, as in the build and watch reports."""
+    width = max(len(result.source) for result in results)
+    for result in results:
+        if not result.ok:
+            print(f"   ❌ {result.source}: {result.error}")
+            continue
+        mark = "⚠️ " if result.warnings else "✅"
+        note = " (cached)" if result.cached else ""
+        if not result.written:
+            note += " (unchanged)"
+        print(f"   {mark} {result.source:<{width}} {result.seconds * 1000:8.1f} ms {result.commands:6d} commands "
+              f"{result.line_count:7d} lines -> {result.output_file}{note}")
+        if verbose:
+            for warning in result.warnings:
+                print(f"         {warning}")
+
+
+def build_command(args):
+    """Handle the build command."""
+    from devices.build import build_files, discover_scripts
+    
+    # Check the device before starting any workers
+    if not check_device(args.device):
+        return 1
+    
+    root, paths = discover_scripts(args.target)
+    if not paths:
+        print(f"Error: No script files found in '{args.target}'.")
+        return 1
+    
+    cache = None
+    cache_dir = args.cache_dir
+    if cache_dir is None and os.environ.get('HAPPY_FROG_CACHE_DIR'):
+        from happy_frog_parser.artifacts import default_artifact_dir
+        cache_dir = default_artifact_dir()
+    if cache_dir and not args.no_cache:
+        from happy_frog_parser.artifacts import ArtifactCache
+        cache = ArtifactCache(cache_dir, hardlink=args.hardlink)
+    
+    start = time.perf_counter()
+    results = sorted(
+        build_files(paths, root, args.device, args.output, parser=create_parser(), workers=args.jobs,
+                    cache=cache),
+        key=lambda result: result.source,
+    )
+    total_seconds = time.perf_counter() - start
+    
+    failed = [result for result in results if not result.ok]
+    warned = [result for result in results if result.ok and result.warnings]
+    
+    print(f"📊 Build Report:")
+    print_build_results(results, args.verbose)
+    
+    print(f"\n   Files: {len(results)}")
+    print(f"   Succeeded: {len(results) - len(failed)} ({len(warned)} with warnings)")
+    print(f"   Failed: {len(failed)}")
+    if cache is not None:
+        print(f"   From Cache: {sum(result.cached for result in results)} "
+              f"({sum(not result.written for result in results if result.ok)} outputs unchanged)")
+    print(f"   Total: {total_seconds * 1000:.1f} ms "
+          f"({sum(result.seconds for result in results) * 1000:.1f} ms of work)")
+    
+    return 1 if failed else 0
+
+
+def watch_command(args):
+    """Handle the watch command."""
+    from devices.watch import WatchSession
+    
+    if not check_device(args.device):
+        return 1
+    
+    session = WatchSession(args.targets, args.device, args.output, parser=create_parser(),
+                           debounce=args.debounce / 1000, poll=args.poll)
+    if not session.scripts():
+        print(f"Note: No script files found yet; new files will be built when they are saved.")
+    print(f"👀 Watching {', '.join(args.targets)} ({session.method}); press Ctrl+C to stop")
+    
+    def report(rebuild):
+        if not rebuild.results:
+            return
+        failed = sum(not result.ok for result in rebuild.results)
+        print(f"\n🔄 [{time.strftime('%H:%M:%S')}] Rebuilt {len(rebuild.results)} file(s) in "
+              f"{rebuild.build_seconds * 1000:.1f} ms (latency {rebuild.latency * 1000:.1f} ms)"
+              + (f", {failed} failed" if failed else ""))
+        print_build_results(rebuild.results, args.verbose)
+    
+    try:
+        session.run(report)
+    except KeyboardInterrupt:
+        print("\nStopped watching.")
+    return 0
+
+
 def validate_command(args):
     """Handle the validate command."""
+    from happy_frog_parser import CircuitPythonEncoder, HappyFrogScriptError
+    
     try:
         # Check if input file exists
         if not os.path.exists(args.input_file):
             print(f"Error: Input file '{args.input_file}' not found.")
             return 1
         
-        # Parse the script
-        parser = HappyFrogParser()
-        script = parser.parse_file(args.input_file)
+        # Parse the script (or load it if already compiled)
+        parser = create_parser()
+        script = load_script(args.input_file, parser)
         
         # Validate the script
         parser_warnings = parser.validate_script(script)
@@ -306,8 +573,51 @@ def validate_command(args):
         return 1
 
 
+def compile_command(args):
+    """Handle the compile command (Happy Frog Script to binary .hfb)."""
+    from pathlib import Path
+    from happy_frog_parser import HappyFrogScriptError
+    
+    try:
+        # Check if input file exists
+        if not os.path.exists(args.input_file):
+            print(f"Error: Input file '{args.input_file}' not found.")
+            return 1
+        
+        # Parse the script once
+        parser = create_parser()
+        script = parser.parse_file(args.input_file)
+        
+        # Determine output file
+        if args.output:
+            output_file = args.output
+        else:
+            output_file = Path('compiled') / (Path(args.input_file).stem + '.hfb')
+        
+        from happy_frog_parser.hfb import dump_hfb
+        dump_hfb(script, output_file)
+        
+        print(f"✅ Successfully compiled '{args.input_file}' to '{output_file}'")
+        print(f"📊 Compilation Statistics:")
+        print(f"   Total Commands: {len(script.commands)}")
+        print(f"   Output Size: {os.path.getsize(output_file)} bytes")
+        
+        if args.verbose:
+            print(f"\n💡 Encode it without re-parsing:")
+            print(f"   happy-frog encode {output_file} -d <device>")
+        
+        return 0
+        
+    except HappyFrogScriptError as e:
+        print(f"❌ Compile Error: {e}")
+        return 1
+
+
 def convert_command(args):
     """Handle the convert command (Ducky Script to Happy Frog Script)."""
+    from pathlib import Path
+    from ducky_converter import DuckyConverter
+    
     try:
         # Check if input file exists
         if not os.path.exists(args.input_file):
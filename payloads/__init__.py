@@ -12,17 +12,31 @@ License: GNU GPLv3
 """
 
 import os
-import pkg_resources
+
+def _payload_files():
+    """Return the Traversable (or directory path) holding the payload files."""
+    try:
+        # Imported here because importlib.resources is slow to import and
+        # only needed when payloads are looked up
+        from importlib.resources import files
+    except ImportError:
+        # Python < 3.9: the payloads are plain files next to this module
+        return os.path.dirname(os.path.abspath(__file__))
+    return files(__name__)
 
 def get_payload_path(filename):
     """Get the full path to a payload file in this package."""
-    return pkg_resources.resource_filename(__name__, filename)
+    return os.path.join(str(_payload_files()), filename)
 
 def list_payloads():
     """List all available payload files."""
-    payload_dir = pkg_resources.resource_filename(__name__, "")
+    payload_dir = _payload_files()
+    if isinstance(payload_dir, str):
+        names = os.listdir(payload_dir)
+    else:
+        names = [entry.name for entry in payload_dir.iterdir() if entry.is_file()]
     payloads = []
-    for file in os.listdir(payload_dir):
+    for file in names:
         if file.endswith('.txt') and not file.startswith('.'):
             payloads.append(file)
     return sorted(payloads)
@@ -0,0 +1,148 @@
+"""
+Tests for the build artifact cache.
+
+Educational Purpose: This demonstrates testing an incremental build: what
+invalidates an entry, that unchanged outputs keep their modification time,
+and LRU eviction.
+"""
+
+import json
+import os
+import tempfile
+import time
+
+from happy_frog_parser.artifacts import ArtifactCache
+from devices.build import build_files, discover_scripts
+
+
+INFO = {'commands': 1, 'line_count': 2, 'byte_count': 10, 'warnings': []}
+
+
+class TestArtifactCache:
+    """Test cases for ArtifactCache."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = ArtifactCache(os.path.join(self.directory.name, 'cache'))
+        self.output = os.path.join(self.directory.name, 'code.py')
+
+    def teardown_method(self):
+        """Remove the test files."""
+        self.directory.cleanup()
+
+    def test_key_covers_every_setting(self):
+        """Test that the source and every build setting change the key."""
+        key = self.cache.key(b"STRING a", 'xiao_rp2040', 'encoder:1', 'grammar')
+        assert key == self.cache.key(b"STRING a", 'xiao_rp2040', 'encoder:1', 'grammar')
+        assert key != self.cache.key(b"STRING b", 'xiao_rp2040', 'encoder:1', 'grammar')
+        assert key != self.cache.key(b"STRING a", 'esp32', 'encoder:1', 'grammar')
+        assert key != self.cache.key(b"STRING a", 'xiao_rp2040', 'encoder:2', 'grammar')
+        assert key != self.cache.key(b"STRING a", 'xiao_rp2040', 'encoder:1', 'grammar', 'safe_mode=off')
+
+    def test_install_skips_unchanged_outputs(self):
+        """Test that a cached file is copied into place only when the output differs."""
+        assert self.cache.get('k') is None
+        assert self.cache.put('k', "code\n", INFO)
+        assert self.cache.get('k') == INFO
+        assert self.cache.install('k', self.output) is True
+        with open(self.output, encoding='utf-8') as f:
+            assert f.read() == "code\n"
+
+        os.utime(self.output, (1000000000, 1000000000))
+        assert self.cache.install('k', self.output) is False
+        assert os.stat(self.output).st_mtime == 1000000000
+        assert (self.cache.hits, self.cache.misses) == (1, 1)
+
+    def test_hardlink(self):
+        """Test that hardlinked outputs share the cache entry and hits keep its mtime."""
+        cache = ArtifactCache(self.cache.directory, hardlink=True)
+        cache.put('k', "code\n", INFO)
+        cache.install('k', self.output)
+        assert os.stat(self.output).st_nlink == 2
+
+        os.utime(self.output, (1000000000, 1000000000))
+        assert cache.get('k') == INFO
+        assert cache.install('k', self.output) is False
+        assert os.stat(self.output).st_mtime == 1000000000
+
+    def test_lru_eviction(self):
+        """Test that the least recently used entries are evicted past max_size."""
+        entry_size = len("x" * 100) + len(json.dumps(INFO))
+        cache = ArtifactCache(self.cache.directory, max_size=entry_size * 2)
+        cache.put('a', "x" * 100, INFO)
+        cache.put('b', "x" * 100, INFO)
+        # Make 'a' the most recently used entry
+        past = time.time() - 100
+        os.utime(os.path.join(cache.directory, 'b.out'), (past, past))
+        assert cache.get('a') is not None
+        cache.put('c', "x" * 100, INFO)
+
+        assert cache.get('b') is None
+        assert cache.get('a') is not None and cache.get('c') is not None
+        assert cache.stats()['entries'] == 2 and cache.evictions == 1
+
+
+class TestCachedBuild:
+    """Test cases for building through the artifact cache."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.directory.name, 'payloads')
+        os.makedirs(self.source)
+        for name, content in (('a.txt', "STRING a\nENTER"), ('b.txt', "DELAY 100\nSTRING b")):
+            with open(os.path.join(self.source, name), 'w', encoding='utf-8') as f:
+                f.write(content)
+        self.output_root = os.path.join(self.directory.name, 'compiled')
+        self.cache = ArtifactCache(os.path.join(self.directory.name, 'cache'))
+
+    def teardown_method(self):
+        """Remove the test files."""
+        self.directory.cleanup()
+
+    def build(self, device_id='teensy_4'):
+        """Build the payloads and return the results by file name."""
+        root, paths = discover_scripts(self.source)
+        return {os.path.basename(result.source): result
+                for result in build_files(paths, root, device_id, self.output_root, workers=1, cache=self.cache)}
+
+    def test_rebuild_only_changed_scripts(self):
+        """Test that a rebuild encodes only the edited script and leaves other outputs untouched."""
+        first = self.build()
+        assert not any(result.cached for result in first.values())
+        output_b = first['b.txt'].output_file
+        with open(output_b, encoding='utf-8') as f:
+            code_b = f.read()
+        os.utime(output_b, (1000000000, 1000000000))
+
+        with open(os.path.join(self.source, 'a.txt'), 'w', encoding='utf-8') as f:
+            f.write("STRING edited")
+        second = self.build()
+
+        assert not second['a.txt'].cached and second['a.txt'].written
+        assert second['b.txt'].cached and not second['b.txt'].written
+        assert second['b.txt'].line_count == first['b.txt'].line_count
+        assert os.stat(output_b).st_mtime == 1000000000
+        with open(output_b, encoding='utf-8') as f:
+            assert f.read() == code_b
+
+        # Another device is a different entry
+        assert not any(result.cached for result in self.build('digispark').values())
+
+    def test_identical_scripts_at_different_paths(self):
+        """Test that a copy of a script gets code naming its own source file."""
+        os.makedirs(os.path.join(self.source, 'copy'))
+        copy = os.path.join(self.source, 'copy', 'a.txt')
+        with open(os.path.join(self.source, 'a.txt'), encoding='utf-8') as f:
+            content = f.read()
+        with open(copy, 'w', encoding='utf-8') as f:
+            f.write(content)
+
+        root, paths = discover_scripts(self.source)
+        results = {result.source: result
+                   for result in build_files(paths, root, None, self.output_root, workers=1, cache=self.cache)}
+
+        assert not results[copy].cached
+        with open(results[copy].output_file, encoding='utf-8') as f:
+            assert f"# Source: {copy}" in f.read()
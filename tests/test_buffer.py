@@ -0,0 +1,97 @@
+"""
+Tests for zero-copy buffer parsing.
+
+Educational Purpose: This demonstrates checking an optimized parse path
+against the reference implementation on tricky inputs.
+"""
+
+import mmap
+import os
+import re
+import tempfile
+
+import pytest
+from happy_frog_parser import HappyFrogParser, CommandType, HappyFrogScriptError
+
+
+SCRIPT = (
+    "REM buffer test\r\n"
+    "  STRING   héllo wörld 🐸  \r\n"
+    "\r\n"
+    "string lower case\r"
+    "STRING\tx\n"
+    "STRING nbsp\n"
+    "  ENTER  \n"
+    "IF $x\n"
+    "CTRL ALT DEL\n"
+    "ENDIF\n"
+    "DELAY 100"
+)
+
+
+class TestParseBytes:
+    """Test cases for HappyFrogParser.parse_bytes."""
+
+    def setup_method(self):
+        """Write the sample script to a file."""
+        self.parser = HappyFrogParser()
+        with tempfile.NamedTemporaryFile(suffix='.txt', delete=False) as f:
+            f.write(SCRIPT.encode('utf-8'))
+            self.path = f.name
+
+    def teardown_method(self):
+        """Remove the sample script."""
+        os.unlink(self.path)
+
+    def test_matches_parse_file(self):
+        """Test that the buffer parse equals the text-mode file parse."""
+        expected = self.parser.parse_file(self.path)
+        with open(self.path, 'rb') as f:
+            script = self.parser.parse_bytes(f.read(), self.path)
+
+        assert script.commands == expected.commands
+        assert script.metadata == expected.metadata
+        assert script.commands[1].parameters == ['héllo wörld 🐸']
+
+    def test_mmap_input_is_decoded_lazily(self):
+        """Test parsing an mmap and decoding STRING text only on access."""
+        with open(self.path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            script = self.parser.parse_bytes(mapped, self.path)
+            source = script.commands.source
+
+            string_ids = [source.shape_ids[i] for i in (1, 2, 3)]
+            assert all(source._shapes[i] is None for i in string_ids)
+            assert script.commands[2].raw_text == "string lower case"
+            assert source._shapes[string_ids[1]] is not None
+            assert source._shapes[string_ids[0]] is None
+
+            # The line-offset index covers every line, whatever its line break
+            assert len(source.line_offsets) == script.metadata['total_lines'] == 11
+            assert source.source_line(2) == "  STRING   héllo wörld 🐸  "
+            assert source.source_line(4) == "string lower case"
+            assert source.source_line(11) == "DELAY 100"
+            del script, source
+
+    def test_errors_match_parse_string(self):
+        """Test that line-level errors are reported like the other parse paths."""
+        for content in ["ENTER\nSTRING ok\nBOGUS line\n", "IF $x\nSTRING a\n", "STRING\n"]:
+            with pytest.raises(HappyFrogScriptError) as expected:
+                self.parser.parse_string(content, "x.txt")
+            with pytest.raises(HappyFrogScriptError) as error:
+                self.parser.parse_bytes(content.encode('utf-8'), "x.txt")
+            assert str(error.value) == str(expected.value)
+
+        with pytest.raises(HappyFrogScriptError, match="utf-8"):
+            self.parser.parse_bytes(b"STRING caf\xe9\n", "latin1.txt")
+
+    def test_custom_string_grammar_is_respected(self):
+        """Test that parsers with a different STRING grammar lex every line normally."""
+        class QuotedStringParser(HappyFrogParser):
+            grammar = HappyFrogParser.grammar.derive({
+                CommandType.STRING: re.compile(r'^STRING\s+"(.+)"$', re.IGNORECASE),
+            })
+
+        parser = QuotedStringParser()
+        content = 'STRING "quoted"\nENTER'
+        assert parser.parse_bytes(content.encode()).commands == parser.parse_string(content).commands
+        assert parser.parse_bytes(content.encode()).commands[0].parameters == ['quoted']
@@ -0,0 +1,91 @@
+"""
+Tests for the batch build.
+
+Educational Purpose: This demonstrates testing batch processing: every file
+is accounted for, one failure stays with its file, and the worker pool
+produces the same files as a serial run.
+"""
+
+import os
+import tempfile
+
+from happy_frog_parser import HappyFrogParser
+from devices.build import build_files, discover_scripts, output_path
+from devices.device_manager import DeviceManager
+
+
+SCRIPTS = {
+    'hello.txt': "STRING hello\nENTER",
+    os.path.join('windows', 'run.txt'): "MOD r\nDELAY 200\nSTRING cmd\nENTER",
+    os.path.join('windows', 'deep', 'notes.md'): "Not a script",
+    os.path.join('windows', 'deep', 'broken.txt'): "IF $x\nSTRING never closed",
+}
+
+
+class TestBuild:
+    """Test cases for discovering and building script files."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.directory.name, 'payloads')
+        for name, content in SCRIPTS.items():
+            path = os.path.join(self.source, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(content)
+
+    def teardown_method(self):
+        """Remove the test files."""
+        self.directory.cleanup()
+
+    def test_discover_directory_and_glob(self):
+        """Test that a directory and a glob pattern find the scripts and their root."""
+        root, paths = discover_scripts(self.source)
+        assert root == self.source
+        assert [os.path.relpath(path, root) for path in paths] == [
+            'hello.txt', os.path.join('windows', 'deep', 'broken.txt'), os.path.join('windows', 'run.txt'),
+        ]
+
+        root, paths = discover_scripts(os.path.join(self.source, 'windows', '*.txt'))
+        assert root == os.path.join(self.source, 'windows')
+        assert paths == [os.path.join(self.source, 'windows', 'run.txt')]
+
+        assert output_path(paths[0], root, 'compiled', '.ino') == os.path.join('compiled', 'run.ino')
+
+    def test_failures_do_not_stop_the_batch(self):
+        """Test that the broken file is reported and the others are built into a mirrored tree."""
+        output_root = os.path.join(self.directory.name, 'compiled')
+        root, paths = discover_scripts(self.source)
+        results = {os.path.relpath(result.source, root): result
+                   for result in build_files(paths, root, 'arduino_leonardo', output_root, workers=1)}
+
+        broken = results.pop(os.path.join('windows', 'deep', 'broken.txt'))
+        assert not broken.ok and 'ENDIF' in broken.error
+        assert all(result.ok for result in results.values())
+        assert not os.path.exists(os.path.join(output_root, 'windows', 'deep', 'broken.ino'))
+
+        run = results[os.path.join('windows', 'run.txt')]
+        assert run.output_file == os.path.join(output_root, 'windows', 'run.ino')
+        script = HappyFrogParser().parse_file(run.source)
+        with open(run.output_file, encoding='utf-8') as f:
+            assert f.read() == DeviceManager().encode_script(script, 'arduino_leonardo')
+        assert run.commands == 4 and run.line_count > 0
+
+    def test_worker_pool_matches_serial_build(self):
+        """Test that building on worker processes writes the same files as a serial build."""
+        root, paths = discover_scripts(self.source)
+        outputs = []
+        for workers in (1, 2):
+            output_root = os.path.join(self.directory.name, f'compiled_{workers}')
+            results = sorted(build_files(paths, root, output_root=output_root, workers=workers),
+                             key=lambda result: result.source)
+            assert [result.ok for result in results] == [True, False, True]
+            files = {}
+            for result in results:
+                if result.ok:
+                    with open(result.output_file, encoding='utf-8') as f:
+                        files[os.path.relpath(result.output_file, output_root)] = f.read()
+            outputs.append(files)
+        assert outputs[0] == outputs[1]
+        assert sorted(outputs[0]) == ['hello.py', os.path.join('windows', 'run.py')]
@@ -0,0 +1,167 @@
+"""
+Tests for the persistent parse cache.
+
+Educational Purpose: This demonstrates testing caching behaviour: hits,
+misses, invalidation and eviction.
+"""
+
+import os
+import re
+import tempfile
+
+import pytest
+from happy_frog_parser import HappyFrogParser, CommandType, HappyFrogScriptError
+from happy_frog_parser.cache import ParseCache
+
+
+SCRIPT = "REM cached\nDELAY 500\nSTRING hello\nENTER\nCTRL c\n"
+
+
+class TestParseCache:
+    """Test cases for ParseCache."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.directory = tempfile.mkdtemp()
+        self.cache = ParseCache(self.directory)
+        self.parser = HappyFrogParser(cache=self.cache)
+
+    def teardown_method(self):
+        """Remove the cache directory."""
+        self.cache.clear()
+        os.rmdir(self.directory)
+
+    def test_parse_string_hit_and_miss(self, monkeypatch):
+        """Test that repeated parses are served from the cache."""
+        expected = HappyFrogParser().parse_string(SCRIPT)
+
+        first = self.parser.parse_string(SCRIPT)
+        assert (self.cache.hits, self.cache.misses) == (0, 1)
+
+        # A hit must not run the parser at all
+        monkeypatch.setattr(self.parser, '_iter_parse', None)
+        second = HappyFrogParser(cache=self.cache)
+        monkeypatch.setattr(second, '_iter_parse', None)
+        cached = second.parse_string(SCRIPT, "other.txt")
+
+        assert self.cache.hits == 1
+        assert first.commands == expected.commands
+        assert cached.commands == expected.commands
+        assert cached.metadata == dict(expected.metadata, source="other.txt")
+        assert list(cached.metadata) == list(expected.metadata)
+
+        stats = self.cache.stats()
+        assert stats['entries'] == 1
+        assert stats['hit_rate'] == 0.5
+
+    def test_parse_file_uses_cache(self):
+        """Test parse_file through the cache, including line ending handling."""
+        with tempfile.NamedTemporaryFile(mode='wb', suffix='.txt', delete=False) as f:
+            f.write(b"DELAY 100\r\nSTRING caf\xc3\xa9\r\nENTER")
+            temp_file = f.name
+
+        try:
+            expected = HappyFrogParser().parse_file(temp_file)
+            assert self.parser.parse_file(temp_file) == expected
+            assert self.parser.parse_file(temp_file) == expected
+            assert (self.cache.hits, self.cache.misses) == (1, 1)
+        finally:
+            os.unlink(temp_file)
+
+        with pytest.raises(HappyFrogScriptError, match="File not found"):
+            self.parser.parse_file(temp_file)
+
+    def test_cached_commands_behave_like_a_list(self):
+        """Test that cached commands can be used and modified like the parsed list."""
+        self.parser.parse_string(SCRIPT)
+        script = self.parser.parse_string(SCRIPT)
+
+        assert len(script.commands) == 5
+        assert script.commands[-1].command_type == CommandType.MODIFIER_COMBO
+        script.commands.append(script.commands[0])
+        del script.commands[0]
+        assert [cmd.line_number for cmd in script.commands] == [2, 3, 4, 5, 1]
+
+    def test_grammar_change_invalidates(self):
+        """Test that a parser with a different grammar does not reuse entries."""
+        self.parser.parse_string("ENTER")
+
+        class ShoutingParser(HappyFrogParser):
+            grammar = HappyFrogParser.grammar.derive({
+                CommandType.ENTER: re.compile(r'^ENTER!?$', re.IGNORECASE),
+            })
+
+        ShoutingParser(cache=self.cache).parse_string("ENTER")
+        assert (self.cache.hits, self.cache.misses) == (0, 2)
+        assert self.parser.grammar_fingerprint() != ShoutingParser().grammar_fingerprint()
+        assert self.parser.grammar_fingerprint() == HappyFrogParser().grammar_fingerprint()
+
+    def test_errors_and_corrupt_entries(self):
+        """Test that failures are not cached and corrupt entries are ignored."""
+        with pytest.raises(HappyFrogScriptError):
+            self.parser.parse_string("NOT_A_COMMAND")
+        assert self.cache.stats()['entries'] == 0
+
+        self.parser.parse_string(SCRIPT)
+        for name in os.listdir(self.directory):
+            with open(os.path.join(self.directory, name), 'wb') as f:
+                f.write(b'garbage')
+
+        assert self.parser.parse_string(SCRIPT).commands == HappyFrogParser().parse_string(SCRIPT).commands
+        assert self.cache.misses == 3
+
+    def test_lru_eviction(self):
+        """Test that the least recently used entries are evicted first."""
+        self.parser.parse_string(SCRIPT)
+        entry_size = self.cache.stats()['size_bytes']
+        self.cache.max_size = entry_size * 2 + entry_size // 2
+
+        self.parser.parse_string(SCRIPT + "TAB\n")
+        assert self.cache.stats()['entries'] == 2
+
+        # Make the second entry the least recently used one
+        first_key = self.cache.key(SCRIPT.encode(), self.parser.grammar_fingerprint(), 'lf')
+        second_key = self.cache.key((SCRIPT + "TAB\n").encode(), self.parser.grammar_fingerprint(), 'lf')
+        os.utime(os.path.join(self.directory, second_key + '.hfb'), (0, 1))
+
+        self.parser.parse_string(SCRIPT + "SPACE\n")
+        assert self.cache.evictions == 1
+        remaining = sorted(os.listdir(self.directory))
+        assert first_key + '.hfb' in remaining
+        assert second_key + '.hfb' not in remaining
+        # Writes are atomic: no temporary files are left behind
+        assert all(name.endswith('.hfb') for name in remaining)
+
+    def test_eviction_does_not_rescan_on_every_put(self, monkeypatch):
+        """Test that the directory is only scanned when the cache may be over its limit."""
+        scans = []
+        entries = self.cache._entries
+        monkeypatch.setattr(self.cache, '_entries', lambda: scans.append(1) or entries())
+        for i in range(5):
+            self.parser.parse_string(f"{SCRIPT}STRING {i}\n")
+        assert len(scans) == 1
+
+        self.cache.max_size = 1
+        self.parser.parse_string(SCRIPT + "TAB\n")
+        assert len(scans) == 2 and self.cache.evictions == 6
+
+    def test_line_breaks_are_part_of_the_key(self):
+        """Test that parse_file and parse_string do not share entries for text with a lone CR."""
+        data = b"STRING a\rENTER\n"
+        with tempfile.NamedTemporaryFile(mode='wb', suffix='.txt', delete=False) as f:
+            f.write(data)
+            temp_file = f.name
+
+        try:
+            as_string = [(cmd.raw_text, cmd.line_number) for cmd in HappyFrogParser().parse_string(data.decode()).commands]
+            as_file = [(cmd.raw_text, cmd.line_number) for cmd in HappyFrogParser().parse_file(temp_file).commands]
+            assert as_file == [('STRING a', 1), ('ENTER', 2)]
+
+            # Either order, cached results must match the uncached ones
+            for first, second in ((lambda: self.parser.parse_string(data.decode()), lambda: self.parser.parse_file(temp_file)),
+                                  (lambda: self.parser.parse_file(temp_file), lambda: self.parser.parse_string(data.decode()))):
+                self.cache.clear()
+                results = [[(cmd.raw_text, cmd.line_number) for cmd in parse().commands] for parse in (first, second)]
+                assert sorted(results) == sorted([as_string, as_file])
+        finally:
+            os.unlink(temp_file)
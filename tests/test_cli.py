@@ -0,0 +1,134 @@
+"""
+Tests for the happy-frog command line interface.
+
+Educational Purpose: This demonstrates checking startup cost with
+``python -X importtime``: each subcommand should import only the modules it
+needs, and the total import time should stay within a budget.
+"""
+
+import os
+import re
+import subprocess
+import sys
+import tempfile
+
+import pytest
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = os.path.join(ROOT, 'payloads', 'hello_world.txt')
+
+# Upper bound on the total import time of `happy-frog parse`, in
+# milliseconds. Currently about 45 ms; the budget leaves room for slow
+# machines while still catching accidental heavy imports.
+STARTUP_BUDGET_MS = 150
+
+# Modules that the parse and validate subcommands must not load
+HEAVY_MODULES = ('devices', 'ducky_converter', 'ducky_parser', 'pkg_resources', 'importlib.resources')
+
+IMPORT_LINE = re.compile(r'import time:\s+\d+ \|\s+(\d+) \| ( *)(\S+)')
+
+
+def run_cli(*args):
+    """
+    Run main.py with -X importtime.
+
+    Returns:
+        (completed process, {module: cumulative import time in us}, total
+        import time of the top-level imports in ms)
+    """
+    env = dict(os.environ, PYTHONIOENCODING='utf-8')
+    # Measure with cached bytecode, as an installed package would run
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', os.path.join(ROOT, 'main.py')] + list(args),
+        cwd=ROOT, env=env, capture_output=True, text=True, encoding='utf-8',
+    )
+    modules = {}
+    total = 0
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            cumulative, indent, name = int(match.group(1)), match.group(2), match.group(3)
+            modules[name] = cumulative
+            if not indent:
+                total += cumulative
+    return result, modules, total / 1000
+
+
+class TestStartup:
+    """Test cases for CLI startup cost."""
+
+    @pytest.mark.parametrize("command", ["parse", "validate"])
+    def test_subcommands_import_only_what_they_use(self, command):
+        """Test that parsing does not load device encoders, the converter or pkg_resources."""
+        result, modules, _ = run_cli(command, SCRIPT)
+        assert result.returncode == 0, result.stdout
+        assert 'happy_frog_parser.parser' in modules
+        loaded = [name for name in modules
+                  if any(name == heavy or name.startswith(heavy + '.') for heavy in HEAVY_MODULES)]
+        assert loaded == []
+        if command == 'parse':
+            assert 'happy_frog_parser.encoder' not in modules
+
+    def test_device_encoding_loads_devices(self):
+        """Test that device support is still loaded when a device is requested."""
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'hello_world.py')
+            result, modules, _ = run_cli('encode', SCRIPT, '-d', 'xiao_rp2040', '-o', output)
+            assert result.returncode == 0, result.stdout
+            assert 'devices.device_manager' in modules
+            assert os.path.exists(output)
+
+    def test_startup_within_budget(self):
+        """Test that the total import time of a parse run stays within the budget."""
+        # The first run writes the bytecode cache; take the best of the rest
+        run_cli('parse', SCRIPT)
+        best = min(run_cli('parse', SCRIPT)[2] for _ in range(3))
+        assert best < STARTUP_BUDGET_MS
+
+
+class TestEncodeDevices:
+    """Test cases for encoding one script for several devices."""
+
+    def test_encode_for_all_devices(self):
+        """Test that --device all writes one file per device with the right extension."""
+        with tempfile.TemporaryDirectory() as directory:
+            result, modules, _ = run_cli('encode', SCRIPT, '-d', 'all', '-o', directory)
+            assert result.returncode == 0, result.stdout
+            files = sorted(os.listdir(directory))
+            assert len(files) == 7
+            assert 'hello_world_xiao_rp2040.py' in files
+            assert 'hello_world_esp32.ino' in files
+            assert 'Timing Summary' in result.stdout
+
+
+class TestBuild:
+    """Test cases for the build command."""
+
+    def test_build_directory(self):
+        """Test that build mirrors the payload tree and reports every file."""
+        with tempfile.TemporaryDirectory() as directory:
+            result, modules, _ = run_cli('build', os.path.join(ROOT, 'payloads'), '-d', 'teensy_4',
+                                         '-o', directory, '-j', '2')
+            assert result.returncode == 0, result.stdout
+            assert 'hello_world.ino' in os.listdir(directory)
+            assert 'Build Report' in result.stdout
+            assert 'Failed: 0' in result.stdout
+
+
+class TestPayloads:
+    """Test cases for the bundled payload package."""
+
+    def test_payloads_are_listed_and_loaded(self):
+        """Test listing and loading the payload examples."""
+        import payloads
+
+        names = payloads.list_payloads()
+        assert 'hello_world.txt' in names
+        assert names == sorted(names)
+        assert os.path.samefile(payloads.get_payload_path('hello_world.txt'), SCRIPT)
+        with open(SCRIPT, encoding='utf-8') as f:
+            assert payloads.load_payload('hello_world.txt') == f.read()
+        with pytest.raises(FileNotFoundError):
+            payloads.load_payload('missing.txt')
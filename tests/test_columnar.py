@@ -0,0 +1,124 @@
+"""
+Tests for the columnar ScriptArray representation.
+
+Educational Purpose: This demonstrates testing an optimized data layout
+against the straightforward object form it replaces.
+"""
+
+import pytest
+from happy_frog_parser import HappyFrogParser, CircuitPythonEncoder, CommandType
+from happy_frog_parser import columnar
+from happy_frog_parser.columnar import ScriptArray, MISSING, OPCODES
+
+
+SCRIPT = """
+REM Columnar test
+DEFAULT_DELAY 50
+DELAY 500
+STRING hello
+ENTER
+DELAY 90000
+CTRL ALT DEL
+DELAY 500
+RANDOM_DELAY 100 200
+ENTER
+DELAY -5
+"""
+
+
+@pytest.fixture(params=['numpy', 'fallback'])
+def backend(request, monkeypatch):
+    """Run each test with NumPy (when installed) and with the pure-Python fallback."""
+    if request.param == 'numpy':
+        if columnar.np is None:
+            pytest.skip("NumPy is not installed")
+    else:
+        monkeypatch.setattr(columnar, 'np', None)
+    return request.param
+
+
+class TestScriptArray:
+    """Test cases for ScriptArray."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.parser = HappyFrogParser()
+        self.script = self.parser.parse_string(SCRIPT)
+
+    def test_round_trip(self, backend):
+        """Test conversion to columns and back to objects."""
+        columns = ScriptArray.from_script(self.script)
+
+        assert len(columns) == len(self.script.commands)
+        restored = columns.to_script()
+        assert restored.commands == self.script.commands
+        assert restored.metadata == self.script.metadata
+        # Identical commands still share one shape
+        assert restored.commands[4].shape is restored.commands[9].shape
+
+        encodable = self.parser.parse_string(SCRIPT.replace("DELAY -5", "TAB"))
+        restored = ScriptArray.from_script(encodable).to_script()
+        assert CircuitPythonEncoder().encode(restored) == CircuitPythonEncoder().encode(encodable)
+
+    def test_columns(self, backend):
+        """Test the contents of the columns and string pool."""
+        columns = ScriptArray.from_script(self.script)
+
+        assert list(columns.opcodes[:3]) == [
+            OPCODES[CommandType.REM], OPCODES[CommandType.DEFAULT_DELAY], OPCODES[CommandType.DELAY]
+        ]
+        assert list(columns.line_numbers) == [cmd.line_number for cmd in self.script.commands]
+        assert list(columns.arg0) == [
+            MISSING, 50, 500, MISSING, MISSING, 90000, MISSING, 500, 100, MISSING, -5
+        ]
+        assert columns.arg1[8] == 200
+        # Each distinct line is stored once
+        assert len(set(columns.shape_ids)) == 9
+        assert columns.strings.count("DELAY 500") == 1
+        # Also when equal free-text commands are separate shape objects
+        repeated = ScriptArray.from_script(self.parser.parse_string("REM ---\nENTER\nREM ---"))
+        assert list(repeated.shape_ids) == [0, 1, 0]
+
+    def test_aggregates(self, backend):
+        """Test vectorized statistics."""
+        columns = ScriptArray.from_script(self.script)
+
+        counts = columns.command_counts()
+        assert counts[CommandType.DELAY] == 4
+        assert counts[CommandType.ENTER] == 2
+        assert CommandType.TAB not in counts
+        assert columns.total_delay() == 500 + 90000 + 500
+        assert columns.lines_of(CommandType.ENTER) == [6, 11]
+        assert columns.long_delays() == [(7, 90000)]
+
+    def test_validate_matches_parser(self, backend):
+        """Test that validation gives the same warnings as the parser."""
+        for content in (SCRIPT, "", "DELAY 70000\nDELAY abc\nDELAY 60000\nDELAY 60001"):
+            script = self.parser.parse_string(content)
+            assert ScriptArray.from_script(script).validate() == self.parser.validate_script(script)
+
+    def test_values_beyond_int64(self, backend):
+        """Test that delays too large for the columns are still counted and reported."""
+        largest = 2 ** 63 - 1
+        script = self.parser.parse_string(f"DELAY 70000\nDELAY {largest}\nDELAY {largest}")
+        assert ScriptArray.from_script(script).total_delay() == 70000 + 2 * largest
+
+        content = "DELAY 99999999999999999999\nDELAY -99999999999999999999\nDELAY 70000\nDELAY 1"
+        script = self.parser.parse_string(content)
+        columns = ScriptArray.from_script(script)
+        assert columns.arg0[0] == MISSING
+        assert columns.validate() == self.parser.validate_script(script)
+        assert columns.long_delays() == [(1, 99999999999999999999), (3, 70000)]
+        assert columns.total_delay() == 99999999999999999999 + 70000 + 1
+
+    def test_from_string(self):
+        """Test that parsing straight into columns matches converting a parsed script."""
+        expected = ScriptArray.from_script(self.script)
+        columns = ScriptArray.from_string(SCRIPT, self.parser)
+
+        for name in ('opcodes', 'line_numbers', 'arg0', 'arg1', 'shape_ids', 'shape_opcodes',
+                     'shape_raw', 'shape_param_offsets', 'shape_params'):
+            assert list(getattr(columns, name)) == list(getattr(expected, name))
+        assert columns.strings == expected.strings
+        assert columns.metadata == self.script.metadata
+        assert columns.to_script().commands == self.script.commands
@@ -0,0 +1,217 @@
+"""
+Tests for the device registry.
+
+Educational Purpose: This demonstrates testing lazy loading and caching -
+checking not only the results but also which modules get imported and how
+often objects are created.
+"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+from happy_frog_parser import HappyFrogParser
+from devices import device_manager
+from devices.device_manager import DeviceManager, register_device
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class CountingEncoder:
+    """Minimal third-party style encoder that counts its instances."""
+
+    instances = 0
+
+    def __init__(self):
+        CountingEncoder.instances += 1
+
+    def generate_header(self, script):
+        return ["// header"]
+
+    def generate_footer(self):
+        return ["// footer"]
+
+    def encode_command(self, command):
+        return [f"// {command.raw_text}"]
+
+    def get_device_info(self):
+        return {'name': 'Counting Board', 'features': ['Counts']}
+
+
+class FakeEntryPoint:
+    """Stand-in for an importlib.metadata entry point."""
+
+    def __init__(self, name, value):
+        self.name = name
+        self.value = value
+        self.loaded = 0
+
+    def load(self):
+        self.loaded += 1
+        return self.value
+
+
+class TestDeviceManager:
+    """Test cases for DeviceManager and the device registry."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.manager = DeviceManager()
+        self.script = HappyFrogParser().parse_string("STRING hi\nENTER")
+
+    @pytest.fixture
+    def registry(self, monkeypatch):
+        """Give the test its own registry and caches, with no installed entry points."""
+        monkeypatch.setattr(device_manager, '_registry', {
+            device_id: dict(info) for device_id, info in device_manager.BUILTIN_DEVICES.items()
+        })
+        for name in ('_encoder_classes', '_encoders', '_encoder_info'):
+            monkeypatch.setattr(device_manager, name, {})
+        monkeypatch.setattr(device_manager, '_entry_points_loaded', False)
+        monkeypatch.setattr(device_manager, '_entry_points', lambda: [])
+        CountingEncoder.instances = 0
+
+    def test_device_modules_are_imported_on_first_use(self):
+        """Test that only the modules of the devices used are imported."""
+        code = (
+            "import sys\n"
+            "from happy_frog_parser import HappyFrogParser\n"
+            "from devices.device_manager import DeviceManager\n"
+            "manager = DeviceManager()\n"
+            "assert len(manager.list_devices()) >= 7\n"
+            "manager.encode_script(HappyFrogParser().parse_string('ENTER'), 'esp32')\n"
+            "print(sorted(name for name in sys.modules if name.startswith('devices.')))\n"
+        )
+        result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True)
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.strip() == "['devices.base', 'devices.device_manager', 'devices.esp32']"
+
+    def test_one_encoder_per_device(self, registry):
+        """Test that encoders and their info are created once and shared."""
+        register_device('counting', CountingEncoder)
+
+        first = self.manager.encode_script(self.script, 'counting')
+        second = DeviceManager().encode_script(self.script, 'counting')
+        info = self.manager.get_device_info('counting')
+        self.manager.get_device_comparison()
+
+        assert first == second == "// header\n// STRING hi\n\n// ENTER\n\n// footer"
+        assert CountingEncoder.instances == 1
+        assert info['name'] == 'Counting Board'
+        assert info['encoder_class'] is CountingEncoder
+        assert self.manager.get_encoder('counting') is DeviceManager().get_encoder('counting')
+        assert self.manager.create_encoder('counting') is not self.manager.get_encoder('counting')
+
+        with pytest.raises(ValueError, match="already registered"):
+            register_device('counting', CountingEncoder)
+
+    def test_entry_point_backends(self, registry, monkeypatch):
+        """Test that entry point backends are found lazily and loaded on first use."""
+        entry_point = FakeEntryPoint('counting', CountingEncoder)
+        shadowing = FakeEntryPoint('esp32', CountingEncoder)
+        looked_up = []
+        monkeypatch.setattr(device_manager, '_entry_points',
+                            lambda: looked_up.append(True) or [entry_point, shadowing])
+
+        # Built-in devices do not need the entry points
+        self.manager.encode_script(self.script, 'digispark')
+        assert looked_up == []
+
+        assert 'counting' in [device['id'] for device in self.manager.list_devices()]
+        assert entry_point.loaded == 0
+        assert self.manager.encode_script(self.script, 'counting').startswith("// header")
+        assert entry_point.loaded == 1
+        assert self.manager.get_device_info('esp32')['encoder_class'].__name__ == 'ESP32Encoder'
+        assert looked_up == [True]
+
+    def test_devices_mapping(self, registry):
+        """Test that devices shows encoder classes and registers the devices added to it."""
+        devices = self.manager.devices
+        assert devices['esp32']['name'] == 'ESP32'
+        assert devices['esp32']['encoder_class'].__name__ == 'ESP32Encoder'
+        assert 'encoder_class' in devices['digispark']
+        assert device_manager._encoder_classes.keys() == {'esp32'}
+
+        self.manager.devices['counting'] = {
+            'name': 'Counting Board',
+            'encoder_class': CountingEncoder,
+            'description': 'Counts',
+            'difficulty': 'Beginner',
+            'price_range': '$1',
+            'best_for': ['Tests'],
+        }
+        assert 'counting' in DeviceManager().devices
+        assert self.manager.create_encoder('counting').encode_command(self.script.commands[1]) == ["// ENTER"]
+        assert self.manager.devices['counting']['best_for'] == ['Tests']
+
+        # Replacing the encoder drops the cached one
+        self.manager.get_encoder('esp32')
+        self.manager.devices['esp32']['encoder_class'] = CountingEncoder
+        assert isinstance(self.manager.get_encoder('esp32'), CountingEncoder)
+
+        del self.manager.devices['counting']
+        assert 'counting' not in self.manager.devices
+        with pytest.raises(KeyError):
+            self.manager.devices['counting']
+        with pytest.raises(ValueError, match="No encoder given"):
+            self.manager.devices['broken'] = {'name': 'Broken'}
+
+    def test_unknown_device(self, registry):
+        """Test the errors for a device that is not registered."""
+        with pytest.raises(ValueError, match="Unknown device: nope"):
+            self.manager.encode_script(self.script, 'nope')
+        assert self.manager.get_device_info('nope') is None
+        assert self.manager.validate_device_support('nope', self.script) == ["Unknown device: nope"]
+
+    def test_device_encoders_share_the_base_handlers(self):
+        """Test that device encoders inherit the event printers of the device base class."""
+        from devices.base import DeviceEncoder
+
+        for device in self.manager.list_devices():
+            encoder_class = self.manager.get_encoder_class(device['id'])
+            assert issubclass(encoder_class, DeviceEncoder)
+            assert set(encoder_class.handled_commands()) == set(DeviceEncoder.handled_commands())
+
+        script = HappyFrogParser().parse_string("DELAY -5\nCTRL ALT DELETE\nRANDOM_DELAY 1 2")
+        lines = self.manager.get_encoder('esp32').encode_command(script.commands[0])
+        assert lines == ["  // ESP32 Command: DELAY -5", "  // ERROR: Invalid delay value"]
+        combo = self.manager.get_encoder('digispark').encode_command(script.commands[1])
+        assert combo[-1] == "  DigiKeyboard.sendKeyPress(KEY_DELETE);  // Press DELETE"
+        # The Xiao encoder overrides the random delay lines by name
+        xiao = self.manager.get_encoder('xiao_rp2040')
+        assert xiao.encode_command(script.commands[2])[1:] == [
+            "    import random",
+            "    time.sleep(random.uniform(0.001, 0.002))  # Random delay 1ms to 2ms",
+        ]
+
+    def test_device_selection(self, registry):
+        """Test resolving 'all' and comma-separated device lists."""
+        assert self.manager.resolve_devices('all') == list(device_manager.BUILTIN_DEVICES)
+        assert self.manager.resolve_devices(' esp32, digispark,esp32 ') == ['esp32', 'digispark']
+        with pytest.raises(ValueError, match="Unknown device: nope"):
+            self.manager.resolve_devices('esp32,nope')
+        with pytest.raises(ValueError):
+            self.manager.resolve_devices(',')
+        assert self.manager.get_file_extension('xiao_rp2040') == '.py'
+        assert self.manager.get_file_extension('esp32') == '.ino'
+
+    def test_encode_for_several_devices(self, tmp_path):
+        """Test encoding one script for several devices into their own files."""
+        device_ids = ['xiao_rp2040', 'arduino_leonardo', 'esp32']
+        output_files = {device_id: tmp_path / f"out_{device_id}" for device_id in device_ids}
+        # DigiSpark cannot write its file
+        output_files['digispark'] = tmp_path / 'missing' / 'out_digispark'
+        results = self.manager.encode_devices(self.script, device_ids + ['digispark'], output_files, max_workers=3)
+
+        assert [result.device_id for result in results] == device_ids + ['digispark']
+        for result in results[:3]:
+            assert result.ok
+            with open(result.output_file, encoding='utf-8') as f:
+                code = f.read()
+            assert code == self.manager.encode_script(self.script, result.device_id)
+            assert result.line_count == len(code.split('\n'))
+        # A failing device is reported without stopping the others
+        assert not results[3].ok and isinstance(results[3].error, OSError)
+        assert sorted(os.listdir(tmp_path)) == sorted(f"out_{device_id}" for device_id in device_ids)
@@ -0,0 +1,69 @@
+"""
+Tests for the streaming code emitter.
+
+Educational Purpose: This demonstrates testing streaming output against the
+string-building API it replaces.
+"""
+
+import io
+import os
+import tempfile
+
+import pytest
+from happy_frog_parser import HappyFrogParser, CircuitPythonEncoder
+from happy_frog_parser.emitter import CodeEmitter, open_output
+from devices.device_manager import DeviceManager
+
+
+class TestCodeEmitter:
+    """Test cases for the CodeEmitter."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.script = HappyFrogParser().parse_string("STRING héllo\nDELAY 100\nCTRL ALT DELETE\nENTER")
+
+    def test_counters_and_head(self):
+        """Test that the counters and the head describe what was written."""
+        stream = io.StringIO()
+        emitter = CodeEmitter(stream, head_size=3)
+        emitter.batch_size = 2  # Write in several batches
+        emitter.emit_lines(["a", "b"])
+        emitter.emit_lines([])
+        emitter.emit("é")
+        emitter.emit_lines(["", "d"])
+        emitter.flush()
+
+        assert stream.getvalue() == "a\nb\né\n\nd"
+        assert emitter.line_count == 5
+        assert emitter.byte_count == len(stream.getvalue().encode('utf-8'))
+        assert emitter.head == ["a", "b", "é"]
+
+    def test_streaming_matches_the_string_api(self):
+        """Test that the encoders write exactly the code their string API returns."""
+        stream = io.StringIO()
+        emitter = CircuitPythonEncoder().encode_to(self.script, stream)
+        assert stream.getvalue() == CircuitPythonEncoder().encode(self.script)
+        assert emitter.line_count == len(stream.getvalue().split('\n'))
+
+        manager = DeviceManager()
+        stream = io.StringIO()
+        emitter = manager.encode_script_to(self.script, 'arduino_leonardo', stream)
+        assert stream.getvalue() == manager.encode_script(self.script, 'arduino_leonardo')
+        assert emitter.byte_count == len(stream.getvalue().encode('utf-8'))
+
+    def test_failed_output_leaves_no_file(self):
+        """Test that open_output only replaces the file when writing completes."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'code.py')
+            with open_output(path) as f:
+                CircuitPythonEncoder().encode_to(self.script, f)
+            with open(path, encoding='utf-8') as f:
+                assert f.read() == CircuitPythonEncoder().encode(self.script)
+
+            with pytest.raises(ValueError):
+                with open_output(path) as f:
+                    f.write("partial")
+                    raise ValueError("encoding failed")
+            with open(path, encoding='utf-8') as f:
+                assert f.read() == CircuitPythonEncoder().encode(self.script)
+            assert os.listdir(directory) == ['code.py']
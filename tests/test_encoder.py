@@ -17,6 +17,7 @@ from happy_frog_parser import (
     HappyFrogScriptError,
     EncoderError
 )
+from happy_frog_parser.dispatch import EncoderBase, handles
 
 
 class TestCircuitPythonEncoder:
@@ -339,5 +340,95 @@ ALT F4
         assert "Educational Notes:" in footer
 
 
+class TestEncoderDispatch:
+    """Test cases for the per-class handler tables."""
+    
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.parser = HappyFrogParser()
+    
+    def test_handler_table_is_built_once_per_class(self):
+        """Test that encoders share their class handler table."""
+        first, second = CircuitPythonEncoder(), CircuitPythonEncoder()
+        assert first._handlers is second._handlers is CircuitPythonEncoder._handlers
+        assert CircuitPythonEncoder._handlers[CommandType.DEFAULTDELAY] is CircuitPythonEncoder._encode_default_delay
+        assert CircuitPythonEncoder._handlers[CommandType.PAUSE] is CircuitPythonEncoder._encode_pause
+        # Keys are encoded by the fallback, not by a table entry
+        assert CommandType.ENTER not in CircuitPythonEncoder.handled_commands()
+    
+    def test_subclass_registers_and_inherits_handlers(self):
+        """Test that a subclass can add handlers and keep the inherited ones."""
+        class LoggingEncoder(CircuitPythonEncoder):
+            @handles(CommandType.STRING)
+            def _encode_typed(self, command, context):
+                return [f"    print({command.parameters[0]!r})"]
+            
+            def _encode_comment(self, command, context):
+                return []
+        
+        script = self.parser.parse_string("REM note\nSTRING hi\nDELAY 5\nENTER")
+        code = LoggingEncoder().encode(script)
+        assert "    print('hi')" in code
+        assert "keyboard_layout.write" not in code
+        assert "    # note" not in code
+        assert "time.sleep(0.005)" in code
+        assert "keyboard.press(Keycode.ENTER)" in code
+        # The parent table is unchanged
+        assert CircuitPythonEncoder._handlers[CommandType.STRING] is CircuitPythonEncoder._encode_string
+    
+    def test_encoder_without_default(self):
+        """Test that an encoder with no handler for a command says so."""
+        class DelayOnly(EncoderBase):
+            @handles(CommandType.DELAY)
+            def _encode_delay(self, command):
+                return [f"sleep {command.parameters[0]}"]
+        
+        delay, enter = self.parser.parse_string("DELAY 5\nENTER").commands
+        assert DelayOnly().dispatch(delay) == ["sleep 5"]
+        with pytest.raises(NotImplementedError, match="ENTER"):
+            DelayOnly().dispatch(enter)
+
+
+class TestEncoderContext:
+    """Test cases for keeping encoding state out of the encoder."""
+    
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.parser = HappyFrogParser()
+    
+    def test_state_does_not_leak_between_scripts(self):
+        """Test that SAFE_MODE OFF in one script does not change the next one."""
+        encoder = CircuitPythonEncoder()
+        plain = self.parser.parse_string("STRING hi\nENTER")
+        expected = CircuitPythonEncoder().encode(plain)
+        
+        unsafe = encoder.encode(self.parser.parse_string("SAFE_MODE OFF\nSTRING hi"))
+        assert "# Run the main function" not in unsafe
+        assert encoder.encode(plain) == expected
+        assert encoder.safe_mode is True
+        assert CircuitPythonEncoder(safe_mode=False).encode(plain) != expected
+    
+    def test_repeat_uses_the_last_command(self):
+        """Test that REPEAT repeats the last command that is not a comment."""
+        code = CircuitPythonEncoder().encode(self.parser.parse_string("TAB\nREM press it again\nREPEAT 2"))
+        assert "    for _ in range(2):\n        keyboard.press(Keycode.TAB)" in code
+        with pytest.raises(EncoderError, match="No previous command"):
+            CircuitPythonEncoder().encode(self.parser.parse_string("REM nothing yet\nREPEAT 2"))
+    
+    def test_shared_encoder_on_a_thread_pool(self):
+        """Test that one encoder encodes many scripts at once like it does one at a time."""
+        from concurrent.futures import ThreadPoolExecutor
+        
+        scripts = [
+            self.parser.parse_string(f"STRING script {i}\n{'SAFE_MODE OFF' if i % 2 else 'REM on'}\n"
+                                     f"DELAY {i}\nCTRL c\nREPEAT 2\nENTER")
+            for i in range(40)
+        ]
+        expected = [CircuitPythonEncoder().encode(script) for script in scripts]
+        encoder = CircuitPythonEncoder(memo_size=8)
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            assert list(pool.map(encoder.encode, scripts)) == expected
+
+
 if __name__ == "__main__":
     pytest.main([__file__]) 
\ No newline at end of file
@@ -0,0 +1,101 @@
+"""
+Tests for the compiled .hfb script format.
+
+Educational Purpose: This demonstrates round-trip testing of a binary
+file format and checking that optimized inputs give identical output.
+"""
+
+import os
+import struct
+import tempfile
+
+import pytest
+from happy_frog_parser import HappyFrogParser, CircuitPythonEncoder, HappyFrogScriptError
+from happy_frog_parser.hfb import (
+    dump_hfb, dumps_hfb, load_hfb, loads_hfb, HFBFormatError, FORMAT_VERSION
+)
+from devices.device_manager import DeviceManager
+
+
+SCRIPT = """
+REM Compiled script test
+DEFAULT_DELAY 50
+DELAY 500
+STRING héllo wörld 🐸
+ENTER
+CTRL ALT DEL
+RANDOM_DELAY 100 200
+DELAY 500
+ENTER
+"""
+
+
+class TestHFB:
+    """Test cases for the .hfb format."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.parser = HappyFrogParser()
+        self.script = self.parser.parse_string(SCRIPT, "test.txt")
+
+    def test_bytes_round_trip(self):
+        """Test that a script survives serialization unchanged."""
+        compiled = loads_hfb(dumps_hfb(self.script))
+
+        assert len(compiled) == len(self.script.commands)
+        assert list(compiled.commands) == self.script.commands
+        assert compiled.commands[-1] == self.script.commands[-1]
+        assert compiled.commands[2:4] == self.script.commands[2:4]
+        assert compiled.metadata == self.script.metadata
+        assert compiled.to_script().commands == self.script.commands
+        # Identical commands share a shape after loading too
+        assert compiled.commands[2].shape is compiled.commands[7].shape
+
+    def test_file_is_memory_mapped_and_lazy(self):
+        """Test loading from a file decodes nothing up front."""
+        with tempfile.NamedTemporaryFile(suffix='.hfb', delete=False) as f:
+            temp_file = f.name
+        try:
+            dump_hfb(self.script, temp_file)
+            with load_hfb(temp_file) as compiled:
+                assert compiled.strings._cache.count(None) == len(compiled.strings)
+                assert compiled.commands[3].parameters == ['héllo wörld 🐸']
+                assert list(compiled.line_numbers) == [cmd.line_number for cmd in self.script.commands]
+            # Closing releases the mapping so the file can be removed
+        finally:
+            os.unlink(temp_file)
+
+    def test_encoders_accept_compiled_scripts(self):
+        """Test that every encoder gives identical output for .hfb input."""
+        compiled = loads_hfb(dumps_hfb(self.script))
+
+        assert CircuitPythonEncoder().encode(compiled) == CircuitPythonEncoder().encode(self.script)
+        device_manager = DeviceManager()
+        for device_id in device_manager.devices:
+            assert (device_manager.encode_script(compiled, device_id) ==
+                    device_manager.encode_script(self.script, device_id))
+        assert (device_manager.validate_device_support('digispark', compiled) ==
+                device_manager.validate_device_support('digispark', self.script))
+        assert self.parser.validate_script(compiled) == self.parser.validate_script(self.script)
+
+    def test_columnar_view(self):
+        """Test that a compiled script converts to a ScriptArray without re-parsing."""
+        compiled = loads_hfb(dumps_hfb(self.script))
+        columns = compiled.to_array()
+
+        assert columns.total_delay() == 1000
+        assert columns.to_script().commands == self.script.commands
+        assert dumps_hfb(compiled) == dumps_hfb(self.script)
+
+    def test_invalid_files(self):
+        """Test error handling for malformed input."""
+        data = dumps_hfb(self.script)
+
+        with pytest.raises(HFBFormatError):
+            loads_hfb(b'not a compiled script')
+        with pytest.raises(HFBFormatError):
+            loads_hfb(data[:40])
+        with pytest.raises(HFBFormatError, match="format version"):
+            loads_hfb(data[:4] + struct.pack('<H', FORMAT_VERSION + 1) + data[6:])
+        with pytest.raises(HappyFrogScriptError, match="File not found"):
+            load_hfb("nonexistent_file.hfb")
@@ -0,0 +1,54 @@
+"""
+Tests for the keymap registry.
+
+Educational Purpose: This demonstrates testing precomputed lookup tables:
+the results of the lookups, and that the tables are shared and read-only.
+"""
+
+import pytest
+from happy_frog_parser import CircuitPythonEncoder
+from happy_frog_parser.keymaps import (
+    ALIASES, ARDUINO_KEYMAP, CIRCUITPYTHON_KEYMAP, DIGIKEYBOARD_KEYMAP, KEYMAPS, Keymap, get_keymap,
+)
+from devices.device_manager import DeviceManager
+
+
+class TestKeymaps:
+    """Test cases for the keymaps."""
+
+    def test_lookups(self):
+        """Test named keys, characters, aliases and unknown keys."""
+        assert ARDUINO_KEYMAP.keycode('ENTER') == 'KEY_RETURN'
+        assert ARDUINO_KEYMAP.keycode('a') == ARDUINO_KEYMAP.keycode('A') == "'A'"
+        assert ARDUINO_KEYMAP.keycode('Esc') == ARDUINO_KEYMAP.keycode('ESCAPE') == 'KEY_ESC'
+        assert DIGIKEYBOARD_KEYMAP.keycode('del') == 'KEY_DELETE'
+        assert DIGIKEYBOARD_KEYMAP.keycode('!') == 'KEY_1'
+        assert CIRCUITPYTHON_KEYMAP.keycode('control') == 'Keycode.CONTROL'
+        assert CIRCUITPYTHON_KEYMAP.keycode('PrintScreen') == 'Keycode.PRINTSCREEN'
+
+    def test_every_keymap_has_the_aliases(self):
+        """Test that each alias resolves like the key it stands for."""
+        for keymap in KEYMAPS.values():
+            for alias, key in ALIASES.items():
+                if key in keymap.keys:
+                    assert keymap.keycode(alias) == keymap.keycode(key), (keymap.name, alias)
+
+    def test_tables_are_frozen_and_shared(self):
+        """Test that lookups reuse the compiled strings and the tables cannot change."""
+        assert ARDUINO_KEYMAP.keycode('esc') is ARDUINO_KEYMAP.keycode('ESCAPE')
+        with pytest.raises(TypeError):
+            ARDUINO_KEYMAP.table['ENTER'] = 'KEY_ENTER'
+
+        derived = ARDUINO_KEYMAP.derive({'ENTER': 'KEY_KP_ENTER'}, name='keypad')
+        assert derived.keycode('return') == 'KEY_KP_ENTER'
+        assert ARDUINO_KEYMAP.keycode('ENTER') == 'KEY_RETURN'
+        assert get_keymap('arduino') is ARDUINO_KEYMAP
+        assert isinstance(get_keymap('xiao_rp2040'), Keymap)
+
+    def test_encoders_share_the_keymaps(self):
+        """Test that encoders use the module tables instead of their own."""
+        manager = DeviceManager()
+        assert manager.create_encoder('arduino_leonardo').keymap is ARDUINO_KEYMAP
+        assert manager.create_encoder('teensy_4').keymap is ARDUINO_KEYMAP
+        assert manager.create_encoder('esp32').keymap is manager.create_encoder('digispark').keymap
+        assert CircuitPythonEncoder().key_codes is CircuitPythonEncoder().key_codes
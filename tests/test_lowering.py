@@ -0,0 +1,65 @@
+"""
+Tests for the keystroke lowering.
+
+Educational Purpose: This demonstrates testing an intermediate
+representation on its own, and checking that every back end prints it.
+"""
+
+import pytest
+from happy_frog_parser import HappyFrogParser
+from happy_frog_parser.lowering import Event, EventType, lower_command, lower_script
+from devices.device_manager import DeviceManager
+
+
+class TestLowering:
+    """Test cases for lowering scripts to keystroke events."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.parser = HappyFrogParser()
+
+    def test_commands_lower_to_events(self):
+        """Test the events of each kind of command."""
+        script = self.parser.parse_string("DELAY 250\nSTRING hi\nCTRL ALT DELETE\nRANDOM_DELAY 5 9\nENTER")
+        program = lower_script(script)
+
+        assert [lowered.command for lowered in program] == script.commands
+        assert program[0].events == (Event(EventType.WAIT, 250),)
+        assert program[1].events == (Event(EventType.TYPE_TEXT, "hi"),)
+        assert [event.type for event in program[2].events] == [
+            EventType.CHORD, EventType.KEY_DOWN, EventType.KEY_DOWN, EventType.KEY_DOWN,
+            EventType.KEY_UP, EventType.KEY_UP, EventType.KEY_UP,
+        ]
+        assert [event.value for event in program[2].events[4:]] == ["DELETE", "ALT", "CTRL"]
+        assert program[3].events == (Event(EventType.RANDOM_WAIT, (5, 9)),)
+        assert program[4].events == (Event(EventType.KEY_TAP, "ENTER"),)
+
+    def test_errors(self):
+        """Test that invalid commands lower to error events."""
+        script = self.parser.parse_string("DELAY -5\nREPEAT 2")
+        assert lower_command(script.commands[0]) == (Event(EventType.ERROR, "Invalid delay value"),)
+        # REPEAT has nothing to repeat outside of a script
+        assert lower_command(script.commands[1]) == (Event(EventType.ERROR, "No previous command to repeat"),)
+
+    def test_repeat_and_log(self):
+        """Test that REPEAT repeats the previous command's events and LOG is kept."""
+        script = self.parser.parse_string("TAB\nREPEAT 3\nREPEAT 1\nLOG done")
+        program = lower_script(script)
+        assert program[1].events == (Event(EventType.KEY_TAP, "TAB"),) * 3
+        assert program[2].events == (Event(EventType.KEY_TAP, "TAB"),)
+        assert program[3].events == (Event(EventType.LOG, "done"),)
+
+    def test_repeat_skips_comments(self):
+        """Test that REPEAT after a comment repeats the command before the comment."""
+        script = self.parser.parse_string("ENTER\nREM press it again\nREPEAT 2")
+        assert lower_script(script)[2].events == (Event(EventType.KEY_TAP, "ENTER"),) * 2
+        repeated = DeviceManager().encode_script(script, 'arduino_leonardo').split("Command: REPEAT 2")[1]
+        assert "'REM'" not in repeated and repeated.count("Keyboard.press(KEY_RETURN)") == 2
+
+    @pytest.mark.parametrize("device_id", [device['id'] for device in DeviceManager().list_devices()])
+    def test_one_lowering_serves_every_device(self, device_id):
+        """Test that printing a shared lowered script gives the same code as encoding it."""
+        manager = DeviceManager()
+        script = self.parser.parse_string("STRING a\nDELAY 5\nMOD r\nREPEAT 2\nLOG x\nRANDOM_DELAY 1 3")
+        program = manager.lower_script(script)
+        assert manager.encode_script(script, device_id, program=program) == manager.encode_script(script, device_id)
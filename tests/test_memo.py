@@ -0,0 +1,66 @@
+"""
+Tests for the fragment memo.
+
+Educational Purpose: This demonstrates testing a memo: eviction order, the
+hit/miss counters, and that memoized output is the same as fresh output.
+"""
+
+from happy_frog_parser import HappyFrogParser, CircuitPythonEncoder
+from happy_frog_parser.memo import FragmentMemo
+from devices.device_manager import DeviceManager
+
+
+SCRIPT = "ENTER\nDELAY 100\nSTRING hi\nENTER\nDELAY 100\nSTRING hi\nSAFE_MODE OFF\nENTER\nCTRL c\nCTRL c"
+
+
+class TestFragmentMemo:
+    """Test cases for the FragmentMemo."""
+
+    def test_lru_eviction_and_stats(self):
+        """Test that the least recently used entry is evicted and lookups are counted."""
+        memo = FragmentMemo(max_entries=2)
+        assert memo.get('a') is None
+        assert memo.put('a', ['1']) == ('1',)
+        memo.put('b', ['2'])
+        assert memo.get('a') == ('1',)
+        memo.put('c', ['3'])  # Evicts b, the least recently used
+
+        assert memo.get('b') is None
+        assert memo.get('c') == ('3',)
+        assert len(memo) == 2
+        assert memo.stats() == {'hits': 2, 'misses': 2, 'evictions': 1, 'hit_rate': 0.5, 'entries': 2}
+
+    def test_disabled_memo(self):
+        """Test that a memo of size 0 keeps nothing."""
+        memo = FragmentMemo(max_entries=0)
+        memo.put('a', ['1'])
+        assert memo.get('a') is None and len(memo) == 0
+
+
+class TestEncoderMemo:
+    """Test cases for the memo in the encoders."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.script = HappyFrogParser().parse_string(SCRIPT)
+
+    def test_circuitpython_encoder(self):
+        """Test that repeated commands are reused, keyed by safe_mode as well."""
+        encoder = CircuitPythonEncoder()
+        code = encoder.encode(self.script)
+        assert code == CircuitPythonEncoder(memo_size=0).encode(self.script)
+
+        stats = encoder.memo.stats()
+        # ENTER after SAFE_MODE OFF is encoded again; SAFE_MODE is never memoized
+        assert (stats['hits'], stats['misses']) == (4, 5)
+
+    def test_device_encoders(self):
+        """Test that device encoders reuse the code of repeated event sequences."""
+        manager = DeviceManager()
+        for device in manager.list_devices():
+            encoder = manager.create_encoder(device['id'])
+            fresh = manager.create_encoder(device['id'])
+            fresh.memo_size = 0
+            for command in self.script.commands:
+                assert encoder.encode_command(command) == fresh.encode_command(command)
+            assert encoder.memo.stats()['hits'] == 5
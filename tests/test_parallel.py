@@ -0,0 +1,148 @@
+"""
+Tests for parallel chunked parsing.
+
+Educational Purpose: This demonstrates differential testing - a parallel
+implementation is checked against the serial one on the same inputs.
+"""
+
+import os
+import shutil
+import tempfile
+
+import pytest
+from happy_frog_parser import HappyFrogParser, HappyFrogScriptError
+from happy_frog_parser import parallel
+from happy_frog_parser.parallel import split_chunks
+
+
+BODY = """REM chunked parse test
+DEFAULT_DELAY 10
+IF $ready
+STRING hello
+
+WHILE $busy
+DELAY 100
+ENDWHILE
+ELSE
+CTRL ALT DEL
+ENDIF
+ENTER"""
+
+
+def parse_both(parser, content):
+    """Parse serially and in chunks, returning both results or error messages."""
+    results = []
+    for workers in (None, 3):
+        try:
+            results.append(parser.parse_string(content, "chunks.txt", workers=workers))
+        except HappyFrogScriptError as e:
+            results.append(str(e))
+    return results
+
+
+class TestParallelParsing:
+    """Test cases for parse_string(workers=...)."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.parser = HappyFrogParser()
+
+    @pytest.fixture(autouse=True)
+    def small_chunks(self, monkeypatch):
+        """Split even small test scripts into chunks."""
+        monkeypatch.setattr(parallel, 'MIN_CHUNK_LINES', 4)
+
+    def test_split_chunks(self):
+        """Test that chunks cover the text at line boundaries."""
+        content = '\n'.join(f"DELAY {i}" for i in range(1, 101)) + '\n'
+        for count in (1, 2, 7, 200):
+            chunks = split_chunks(content, count)
+            assert 1 <= len(chunks) <= count
+            assert '\n'.join(text for text, _ in chunks) == content
+            for text, first_line in chunks:
+                assert text.split('\n')[0] in ('', f"DELAY {first_line}")
+
+    def test_matches_serial_parse(self):
+        """Test that the chunked result equals the serial result."""
+        content = '\n'.join([BODY] * 20) + '\n'
+        serial, chunked = parse_both(self.parser, content)
+
+        assert chunked.commands == serial.commands
+        assert chunked.metadata == serial.metadata
+        assert len(chunked.commands) == len(serial.commands)
+        assert chunked.commands[-1].line_number == serial.commands[-1].line_number
+        assert self.parser.validate_script(chunked) == self.parser.validate_script(serial)
+
+    def test_reports_the_same_first_error(self):
+        """Test that the error a serial parse reports first is the one raised."""
+        lines = [BODY] * 20
+        cases = [
+            # Unknown command late, nesting error early
+            lines[:3] + ["ENDWHILE"] + lines[3:15] + ["BOGUS"] + lines[15:],
+            # Unknown command early, nesting error late
+            lines[:3] + ["BOGUS"] + lines[3:15] + ["ENDWHILE"] + lines[15:],
+            # Two unknown commands in different chunks
+            lines[:5] + ["BOGUS 1"] + lines[5:] + ["BOGUS 2"],
+            # A block left open
+            lines[:10] + ["IF $x", "WHILE $y", "ENDWHILE"] + lines[10:],
+        ]
+        for case in cases:
+            serial, chunked = parse_both(self.parser, '\n'.join(case))
+            assert isinstance(serial, str)
+            assert chunked == serial
+
+    def test_small_scripts_are_parsed_serially(self, monkeypatch):
+        """Test that no worker processes are started for small scripts."""
+        monkeypatch.setattr(parallel, 'MIN_CHUNK_LINES', 50000)
+        monkeypatch.setattr(parallel, 'ProcessPoolExecutor', None)
+        script = self.parser.parse_string(BODY, workers=8)
+        assert script == self.parser.parse_string(BODY)
+
+
+class TestParseFiles:
+    """Test cases for parse_files."""
+
+    def setup_method(self):
+        """Write a small corpus of script files."""
+        self.parser = HappyFrogParser()
+        self.directory = tempfile.mkdtemp()
+        self.paths = []
+        for i in range(12):
+            path = os.path.join(self.directory, f"payload_{i}.txt")
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(f"REM payload {i}\nDELAY {i * 100}\nSTRING file {i}\nENTER\n")
+            self.paths.append(path)
+
+        self.bad_path = os.path.join(self.directory, "bad.txt")
+        with open(self.bad_path, 'w', encoding='utf-8') as f:
+            f.write("ENTER\nNOT_A_COMMAND\n")
+        self.missing_path = os.path.join(self.directory, "missing.txt")
+
+    def teardown_method(self):
+        """Remove the corpus."""
+        shutil.rmtree(self.directory)
+
+    @pytest.mark.parametrize("workers", [1, 3])
+    def test_results_match_parse_file(self, workers):
+        """Test that every file is parsed and errors stay with their file."""
+        paths = self.paths[:6] + [self.bad_path, self.missing_path] + self.paths[6:]
+        results = {result.path: result for result in self.parser.parse_files(paths, workers=workers)}
+
+        assert sorted(results) == sorted(paths)
+        for path in self.paths:
+            assert results[path].ok
+            assert results[path].script == self.parser.parse_file(path)
+
+        assert not results[self.bad_path].ok
+        assert results[self.bad_path].script is None
+        assert isinstance(results[self.bad_path].error, HappyFrogScriptError)
+        assert "line 2: Unknown command" in str(results[self.bad_path].error)
+        assert "File not found" in str(results[self.missing_path].error)
+
+    def test_results_stream(self):
+        """Test that results can be consumed before the whole batch is done."""
+        results = self.parser.parse_files(self.paths, workers=2)
+        first = next(results)
+        assert first.path in self.paths
+        assert first.script.commands[0].raw_text.startswith("REM payload")
+        results.close()
@@ -7,8 +7,14 @@ including test case design, edge case handling, and validation testing.
 
 import pytest
 import tempfile
+import io
 import os
-from happy_frog_parser import HappyFrogParser, HappyFrogScript, HappyFrogCommand, CommandType, HappyFrogScriptError
+import re
+import time
+import tracemalloc
+from happy_frog_parser import HappyFrogParser, HappyFrogScript, HappyFrogCommand, CommandType, HappyFrogScriptError, Block
+from happy_frog_parser.parser import BlockChecker
+from happy_frog_parser.grammar import HAPPY_FROG_GRAMMAR, DUCKY_GRAMMAR
 
 
 class TestHappyFrogParser:
@@ -226,6 +232,382 @@ mod r
         assert script.commands[3].command_type == CommandType.MODIFIER_COMBO
         assert script.commands[3].parameters == ['mod', 'r']
 
+    
+    def test_keyword_dispatch_matches_pattern_order(self):
+        """Test that the keyword lexer picks the same command as trying every pattern in order."""
+        lines = [
+            "DELAY 500", "delay abc", "STRING  spaced  text", "ENTER", "F12",
+            "PAGE_UP", "CTRL", "CTRL c", "ctrl alt delete", "MOD r", "ALT F4",
+            "DEFAULT_DELAY 100", "defaultdelay 7", "REPEAT 3", "RANDOM_DELAY 1 2",
+            "IF x > 1", "ELSE", "ENDIF", "WHILE true", "ENDWHILE", "LOG hi",
+            "VALIDATE env", "SAFE_MODE off", "ATTACKMODE HID STORAGE",
+            "#", "# note", "#REM", "REM", "REM note", "rem\tnote",
+        ]
+        
+        for line in lines:
+            expected = None
+            for command_type, pattern in self.parser.command_patterns.items():
+                if pattern.match(line):
+                    expected = command_type
+                    break
+            
+            command = self.parser._parse_line(line, 1)
+            assert command.command_type == expected, line
+    
+    def test_keyword_dispatch_rejects_near_misses(self):
+        """Test that lines only starting with a keyword are still unknown commands."""
+        for line in ["REMARK", "ENTERX", "DELAY", "STRING", "REPEAT x", "CTRL !"]:
+            with pytest.raises(HappyFrogScriptError) as exc_info:
+                self.parser.parse_string(line)
+            
+            assert f"Unknown command: {line}" in str(exc_info.value)
+
+    
+    def test_modifier_combo_matcher_agrees_with_pattern(self):
+        """Test that the token-based combo matcher accepts exactly what the regex accepts."""
+        pattern = self.parser.command_patterns[CommandType.MODIFIER_COMBO]
+        lines = [
+            "MOD r", "CTRL ALT DEL", "ctrl shift esc", "ALT\tF4", "SHIFT  1",
+            "CTRL", "CTRL !", "CTRL c!", "DELAY 5", "MODX r", "CTRL ALT  ",
+            " CTRL c", "CTRL MOD MOD MOD !",
+        ]
+        
+        for line in lines:
+            assert bool(self.parser.combo_matcher.match(line)) == bool(pattern.match(line)), line
+    
+    def test_modifier_combo_parse_time_is_linear(self):
+        """Test that adversarial modifier combo lines fail in linear time (no ReDoS)."""
+        shapes = [
+            lambda n: "CTRL " + "MOD " * n + "!",
+            lambda n: "ALT" + " a" * n + " !",
+            lambda n: "SHIFT " + "CTRL ALT1 " * n + "-",
+        ]
+        
+        def parse_time(line):
+            best = float('inf')
+            for _ in range(3):
+                start = time.perf_counter()
+                with pytest.raises(HappyFrogScriptError):
+                    self.parser.parse_string(line)
+                best = min(best, time.perf_counter() - start)
+            return best
+        
+        for shape in shapes:
+            small = parse_time(shape(500))
+            large = parse_time(shape(8000))
+            
+            # 16x the input must not take much more than 16x the time
+            assert large < small * 16 * 4
+            
+            # The pattern kept in command_patterns must not backtrack either
+            pattern = self.parser.command_patterns[CommandType.MODIFIER_COMBO]
+            start = time.perf_counter()
+            assert pattern.match(shape(8000)) is None
+            assert time.perf_counter() - start < 1.0
+
+    
+    def test_iter_commands_matches_parse_file(self):
+        """Test that streaming a file yields the same commands and metadata as parse_file."""
+        script_content = "# header\r\nDELAY 1000\n\nSTRING Streamed\nCTRL c\nENTER\n"
+        
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False, newline='') as f:
+            f.write(script_content)
+            temp_file = f.name
+        
+        try:
+            metadata = {}
+            commands = list(self.parser.iter_commands(temp_file, metadata=metadata))
+            script = self.parser.parse_file(temp_file)
+            
+            assert commands == script.commands
+            assert [cmd.line_number for cmd in commands] == [1, 2, 4, 5, 6]
+            assert metadata == script.metadata
+            assert metadata['total_commands'] == 5
+            assert metadata['total_lines'] == 7
+        finally:
+            os.unlink(temp_file)
+    
+    def test_iter_commands_from_stream(self):
+        """Test streaming from an open text stream and the generator's return value."""
+        stream = io.StringIO("STRING one\nREM two\nENTER")
+        generator = self.parser.iter_commands(stream, "stream_source")
+        
+        first = next(generator)
+        assert first.command_type == CommandType.STRING
+        assert first.parameters == ['one']
+        
+        remaining = []
+        try:
+            while True:
+                remaining.append(next(generator))
+        except StopIteration as stop:
+            metadata = stop.value
+        
+        assert [cmd.command_type for cmd in remaining] == [CommandType.REM, CommandType.ENTER]
+        assert metadata == {'source': 'stream_source', 'total_commands': 3, 'total_lines': 3}
+    
+    def test_iter_commands_errors(self):
+        """Test that streaming reports missing files and parse errors with line numbers."""
+        with pytest.raises(HappyFrogScriptError) as exc_info:
+            list(self.parser.iter_commands("nonexistent_file.txt"))
+        assert "File not found" in str(exc_info.value)
+        
+        stream = io.StringIO("ENTER\nBOGUS\n")
+        with pytest.raises(HappyFrogScriptError) as exc_info:
+            list(self.parser.iter_commands(stream, "bad_source"))
+        assert "Error in bad_source, line 2: Unknown command: BOGUS" in str(exc_info.value)
+    
+    def test_iter_commands_constant_memory(self):
+        """Test that streaming a large script does not hold it in memory."""
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as f:
+            for i in range(50000):
+                f.write(f"STRING streamed payload line number {i}\nREM step {i}\n")
+            temp_file = f.name
+        
+        try:
+            tracemalloc.start()
+            count = sum(1 for _ in self.parser.iter_commands(temp_file))
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            
+            assert count == 100000
+            # The file is ~3MB; streaming should only ever hold a few lines
+            assert peak < 512 * 1024
+        finally:
+            os.unlink(temp_file)
+
+    
+    def test_identical_commands_share_shape(self):
+        """Test that repeated commands share one flyweight shape."""
+        script = self.parser.parse_string("ENTER\nDELAY 500\nENTER\nDELAY 500\nDEFAULT_DELAY 500")
+        enter1, delay1, enter2, delay2, default_delay = script.commands
+        
+        assert enter1.shape is enter2.shape
+        assert delay1.shape is delay2.shape
+        assert enter1.shape is not delay1.shape
+        assert [cmd.line_number for cmd in script.commands] == [1, 2, 3, 4, 5]
+        # Keyword-like parameters are interned across commands
+        assert delay1.parameters[0] is default_delay.parameters[0]
+        # Directly constructed commands use the same shapes
+        assert HappyFrogCommand(CommandType.ENTER, 9, "ENTER").shape is enter1.shape
+    
+    def test_unique_text_does_not_evict_shared_shapes(self):
+        """Test that unique STRING and comment lines neither pool their shapes nor push others out."""
+        lines = []
+        for i in range(1000):
+            lines += ["ENTER", f"STRING payload {i}", f"REM note {i}", f"# comment {i}"]
+        script = self.parser.parse_string('\n'.join(lines))
+        
+        enter_shapes = {id(command.shape) for command in script.commands
+                        if command.command_type == CommandType.ENTER}
+        assert len(enter_shapes) == 1
+        assert not any(command.command_type == CommandType.STRING for command in self.parser._shape_cache.values())
+    
+    def test_command_is_compact(self):
+        """Test that commands are slotted and behave like the old dataclass."""
+        command = HappyFrogCommand(CommandType.DELAY, 3, "DELAY 100", ["100"])
+        
+        assert not hasattr(command, '__dict__')
+        assert command == HappyFrogCommand(CommandType.DELAY, 3, "DELAY 100", ["100"])
+        assert command != HappyFrogCommand(CommandType.DELAY, 4, "DELAY 100", ["100"])
+        assert command.parameters == ["100"]
+        assert HappyFrogCommand(CommandType.ENTER, 1, "ENTER").parameters == []
+        assert repr(command) == (
+            "HappyFrogCommand(command_type=<CommandType.DELAY: 'DELAY'>, line_number=3, "
+            "raw_text='DELAY 100', parameters=['100'])"
+        )
+        
+        with pytest.raises(TypeError):
+            hash(command)
+        # Shared parameters cannot be changed in place...
+        with pytest.raises(TypeError):
+            command.parameters.append("200")
+        # ...but assigning new ones only affects this command
+        other = HappyFrogCommand(CommandType.DELAY, 5, "DELAY 100", ["100"])
+        command.parameters = ["200"]
+        assert command.parameters == ["200"]
+        assert other.parameters == ["100"]
+    
+    def test_command_pickle_round_trip(self):
+        """Test that compact commands survive pickling and copying."""
+        import copy
+        import pickle
+        
+        script = self.parser.parse_string("CTRL ALT DEL\nSTRING hi\nENTER")
+        for command in script.commands:
+            assert pickle.loads(pickle.dumps(command)) == command
+            assert copy.deepcopy(command) == command
+    
+    def test_block_nesting_errors(self):
+        """Test that unbalanced IF/ELSE/ENDIF and WHILE blocks are rejected."""
+        self.parser.parse_string("IF a\nWHILE b\nENDWHILE\nELSE\nENDIF")
+        
+        cases = {
+            "ENTER\nENDIF": "line 2: ENDIF without matching IF",
+            "IF a\nELSE\nELSE\nENDIF": "line 3: ELSE without matching IF",
+            "WHILE a\nENDIF": "line 2: ENDIF without matching IF",
+            "IF a\nENDWHILE": "line 2: ENDWHILE without matching WHILE",
+            "ENTER\nIF a\nWHILE b\nENDWHILE": "line 2: IF without matching ENDIF",
+        }
+        for content, message in cases.items():
+            with pytest.raises(HappyFrogScriptError, match=message):
+                self.parser.parse_string(content)
+    
+    def test_numeric_args_are_converted_once(self):
+        """Test that numeric parameters are converted at parse time."""
+        script = self.parser.parse_string(
+            "DELAY 500\nDEFAULT_DELAY 20\nRANDOM_DELAY 10 90\nREPEAT 3\nDELAY abc\nSTRING 42"
+        )
+        delay, default_delay, random_delay, repeat, bad_delay, string = script.commands
+        
+        assert delay.args == (500,)
+        assert delay.int_arg(0) == 500
+        assert default_delay.int_arg(0) == 20
+        assert random_delay.args == (10, 90)
+        assert repeat.int_arg(0) == 3
+        # Identical lines share the conversion along with the shape
+        assert delay.args is self.parser.parse_string("DELAY 500").commands[0].args
+        
+        # Non-integers fail with int()'s errors, when the encoder reads them
+        assert bad_delay.args == (None,)
+        with pytest.raises(ValueError):
+            bad_delay.int_arg(0)
+        with pytest.raises(IndexError):
+            delay.int_arg(1)
+        assert string.args is None
+        assert string.int_arg(0) == 42
+    
+    def test_build_block_tree(self):
+        """Test that blocks are matched into a tree."""
+        script = self.parser.parse_string(
+            "ENTER\nIF $a\nTAB\nWHILE $b\nSPACE\nENDWHILE\nELSE\nESCAPE\nENDIF\nDELAY 10"
+        )
+        commands = script.commands
+        tree = self.parser.build_block_tree(script)
+        
+        assert len(tree) == 3
+        assert tree[0] is commands[0] and tree[2] is commands[9]
+        block = tree[1]
+        assert isinstance(block, Block)
+        assert (block.opener, block.else_command, block.closer) == (commands[1], commands[6], commands[8])
+        assert block.body[0] is commands[2]
+        assert block.else_body == [commands[7]]
+        loop = block.body[1]
+        assert (loop.opener, loop.body, loop.closer) == (commands[3], [commands[4]], commands[5])
+        assert loop.else_command is None
+        
+        # Hand-built scripts are checked as well
+        broken = HappyFrogScript(commands=commands[:8], metadata={'source': 'edit.txt'})
+        with pytest.raises(HappyFrogScriptError, match="edit.txt, line 2: IF without matching ENDIF"):
+            self.parser.build_block_tree(broken)
+    
+    def test_reparse_matches_full_parse(self):
+        """Test that reparse gives the same result as parsing the edited text."""
+        lines = ["REM edit me", "DELAY 100", "", "IF a", "STRING x", "ENDIF", "ENTER"]
+        edits = [
+            (2, 3, "DELAY 200"),               # replace one line
+            (3, 3, "TAB\nSPACE\n"),            # insert
+            (4, 7, ""),                         # delete a whole block
+            (5, 6, "WHILE b\nENDWHILE"),        # nested block
+            (1, 8, "ENTER"),                    # replace everything
+            (8, 8, "ESCAPE"),                   # append
+        ]
+        for start, end, new_text in edits:
+            script = self.parser.parse_string('\n'.join(lines), "edit.txt")
+            result = self.parser.reparse(script, start, end, new_text)
+            
+            new_lines = new_text.split('\n')
+            if new_lines[-1] == '':
+                new_lines.pop()
+            expected = self.parser.parse_string(
+                '\n'.join(lines[:start - 1] + new_lines + lines[end - 1:]), "edit.txt"
+            )
+            assert result is script
+            assert script.commands == expected.commands
+            assert script.metadata == expected.metadata
+        
+        with pytest.raises(ValueError):
+            self.parser.reparse(script, 3, 2, "ENTER")
+    
+    def test_reparse_errors_leave_script_unchanged(self):
+        """Test that a failed reparse reports the error and keeps the old script."""
+        script = self.parser.parse_string("IF a\nENTER\nENDIF\nTAB")
+        before = list(script.commands), dict(script.metadata)
+        
+        with pytest.raises(HappyFrogScriptError, match="line 2: Unknown command"):
+            self.parser.reparse(script, 2, 3, "NOT_A_COMMAND")
+        with pytest.raises(HappyFrogScriptError, match="line 1: IF without matching ENDIF"):
+            self.parser.reparse(script, 3, 4, "")
+        with pytest.raises(HappyFrogScriptError, match="line 4: ENDIF without matching IF"):
+            self.parser.reparse(script, 2, 3, "ENDIF\nENTER")
+        
+        assert (script.commands, script.metadata) == before
+    
+    def test_reparse_reports_the_first_error(self):
+        """Test that reparse reports the same error as a full parse of the edited text."""
+        script = self.parser.parse_string("STRING a\nSTRING b\nSTRING c\n")
+        
+        with pytest.raises(HappyFrogScriptError) as expected:
+            self.parser.parse_string("ENDIF\nBOGUS\nSTRING c\n")
+        with pytest.raises(HappyFrogScriptError, match="line 1: ENDIF without matching IF") as error:
+            self.parser.reparse(script, 1, 3, "ENDIF\nBOGUS\n")
+        assert str(error.value) == str(expected.value)
+        
+        script = self.parser.parse_string("IF a\nSTRING b\nENDIF\n")
+        with pytest.raises(HappyFrogScriptError, match="line 3: ENDIF without matching IF"):
+            self.parser.reparse(script, 2, 3, "ENDIF\nENDIF\nBOGUS")
+    
+    def test_reparse_only_checks_changed_blocks(self, monkeypatch):
+        """Test that edits which keep the block structure skip the whole-script check."""
+        content = '\n'.join(["IF a", "DELAY 10"] * 1000 + ["ENDIF"] * 1000)
+        script = self.parser.parse_string(content)
+        
+        checked = []
+        original_check = BlockChecker.check
+        monkeypatch.setattr(BlockChecker, 'check', lambda self, commands, *args: (
+            checked.extend(commands) or original_check(self, [], *args)))
+        
+        self.parser.reparse(script, 500, 501, "DELAY 20")
+        assert len(checked) == 1
+        assert script.commands[499].parameters == ["20"]
+        
+        checked.clear()
+        self.parser.reparse(script, 500, 501, "IF b\nENDIF")
+        assert len(checked) == 1
+        
+        checked.clear()
+        self.parser.reparse(script, 500, 501, "ENDIF\nIF b")
+        assert len(checked) > 1000
+
+    
+    def test_parsers_share_one_compiled_grammar(self, monkeypatch):
+        """Test that creating a parser compiles nothing and reuses the module grammar."""
+        monkeypatch.setattr(re, 'compile', None)
+        first, second = HappyFrogParser(), HappyFrogParser()
+        
+        assert first.grammar is second.grammar is HAPPY_FROG_GRAMMAR
+        assert first.keyword_table is second.keyword_table
+        with pytest.raises(TypeError):
+            first.command_patterns[CommandType.ENTER] = None
+        assert first.parse_string("ENTER").commands[0].command_type == CommandType.ENTER
+    
+    def test_ducky_parser_uses_the_ducky_subset(self):
+        """Test that ducky_parser parses Ducky Script with the shared parser classes."""
+        import ducky_parser
+        
+        parser = ducky_parser.HappyFrogParser()
+        assert isinstance(parser, HappyFrogParser)
+        assert ducky_parser.HappyFrogCommand is HappyFrogCommand
+        assert parser.grammar is DUCKY_GRAMMAR
+        
+        script = parser.parse_string("REM x\nCTRL ALT DEL\nATTACKMODE HID STORAGE\nSTRING hi")
+        assert script.commands == self.parser.parse_string(
+            "REM x\nCTRL ALT DEL\nATTACKMODE HID STORAGE\nSTRING hi").commands
+        for line in ["REPEAT 3", "IF $x", "ATTACKMODE FOO"]:
+            with pytest.raises(HappyFrogScriptError, match="Unknown command"):
+                parser.parse_string(line)
+        assert parser.grammar_fingerprint() != self.parser.grammar_fingerprint()
+
 
 if __name__ == "__main__":
     pytest.main([__file__]) 
\ No newline at end of file
@@ -0,0 +1,121 @@
+"""
+Tests for watch mode.
+
+Educational Purpose: This demonstrates testing an event loop a step at a
+time: waiting for one burst of changes and rebuilding it, with both the
+inotify and the polling watcher.
+"""
+
+import os
+import tempfile
+
+import pytest
+from devices.watch import WatchSession
+
+
+class TestWatchSession:
+    """Test cases for the WatchSession."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.directory.name, 'payloads')
+        os.makedirs(os.path.join(self.source, 'sub'))
+        self.write('a.txt', "STRING a")
+        self.write(os.path.join('sub', 'b.txt'), "STRING b")
+        self.output_root = os.path.join(self.directory.name, 'compiled')
+        self.session = None
+
+    def teardown_method(self):
+        """Stop watching and remove the test files."""
+        if self.session is not None:
+            self.session.close()
+        self.directory.cleanup()
+
+    def write(self, name, content):
+        """Write a file under the source directory."""
+        with open(os.path.join(self.source, name), 'w', encoding='utf-8') as f:
+            f.write(content)
+
+    def start(self, poll):
+        """Start a session and build everything once."""
+        self.session = WatchSession([self.source], 'xiao_rp2040', self.output_root,
+                                    debounce=0.05, poll=poll, poll_interval=0.05)
+        initial = self.session.rebuild(self.session.scripts())
+        assert sorted(os.path.relpath(result.source, self.source) for result in initial.results) == [
+            'a.txt', os.path.join('sub', 'b.txt'),
+        ]
+        return self.session
+
+    @pytest.mark.parametrize("poll", [False, True])
+    def test_rebuild_changed_files_only(self, poll):
+        """Test that a burst of saves is rebuilt once, and only the saved scripts."""
+        session = self.start(poll)
+        if not poll and session.method != 'inotify':
+            pytest.skip("inotify is not available")
+
+        self.write(os.path.join('sub', 'b.txt'), "STRING b\nENTER")
+        self.write(os.path.join('sub', 'b.txt'), "STRING b2\nENTER")
+        self.write('notes.md', "Not a script")
+        changed, first_change = session.wait_for_changes(timeout=5)
+        rebuild = session.rebuild(changed, first_change)
+
+        assert [os.path.relpath(result.source, self.source) for result in rebuild.results] == [
+            os.path.join('sub', 'b.txt'),
+        ]
+        assert rebuild.results[0].ok and rebuild.results[0].commands == 2
+        assert rebuild.latency >= rebuild.build_seconds > 0
+        with open(os.path.join(self.output_root, 'sub', 'b.py'), encoding='utf-8') as f:
+            assert 'b2' in f.read()
+
+    @pytest.mark.parametrize("poll", [False, True])
+    def test_new_files_are_built(self, poll):
+        """Test that scripts created while watching, in new directories too, are built."""
+        session = self.start(poll)
+        os.makedirs(os.path.join(self.source, 'new'))
+        self.write(os.path.join('new', 'c.txt'), "DELAY 5")
+        changed, first_change = session.wait_for_changes(timeout=5)
+        rebuild = session.rebuild(changed, first_change)
+
+        assert [os.path.relpath(result.source, self.source) for result in rebuild.results] == [
+            os.path.join('new', 'c.txt'),
+        ]
+        assert os.path.exists(os.path.join(self.output_root, 'new', 'c.py'))
+
+    @pytest.mark.parametrize("poll", [False, True])
+    def test_missing_directory_is_waited_for(self, poll):
+        """Test that scripts saved into a target directory created while watching are built."""
+        later = os.path.join(self.source, 'later')
+        self.session = session = WatchSession([later], 'xiao_rp2040', self.output_root,
+                                              debounce=0.05, poll=poll, poll_interval=0.05)
+        if not poll and session.method != 'inotify':
+            pytest.skip("inotify is not available")
+        assert session.scripts() == {}
+
+        os.makedirs(os.path.join(later, 'deep'))
+        self.write(os.path.join('later', 'deep', 'c.txt'), "DELAY 5")
+        changed, first_change = session.wait_for_changes(timeout=5)
+        rebuild = session.rebuild(changed, first_change)
+
+        assert [os.path.relpath(result.source, later) for result in rebuild.results] == [
+            os.path.join('deep', 'c.txt'),
+        ]
+        assert os.path.exists(os.path.join(self.output_root, 'deep', 'c.py'))
+
+    def test_single_file_watches_its_directory_only(self):
+        """Test that a file target does not watch the tree around it."""
+        target = os.path.join(self.source, 'a.txt')
+        self.session = session = WatchSession([target], 'xiao_rp2040', self.output_root, debounce=0.05)
+        if session.method != 'inotify':
+            pytest.skip("inotify is not available")
+        assert set(session.watcher._directories.values()) == {self.source}
+
+        self.write(os.path.join('sub', 'b.txt'), "STRING ignored")
+        self.write('a.txt', "STRING a2")
+        changed, _ = session.wait_for_changes(timeout=5)
+        assert changed == {target}
+
+    def test_no_changes(self):
+        """Test that waiting times out quietly when nothing is saved."""
+        session = self.start(poll=True)
+        assert session.wait_for_changes(timeout=0.1) == (set(), None)